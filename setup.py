@@ -8,6 +8,11 @@ setup(name="weatherconsoleapp",
             'weatherconsoleapp':['config.ini'],
             'tests': ['resources/*.json']
         },
+        extras_require={
+            'async': ['aiohttp>=3.8'],
+            'fast': ['msgspec>=0.16'],
+            'arrow': ['pyarrow>=11']
+        },
         entry_points={
         'console_scripts': [
             'weatherconsoleapp=weatherconsoleapp.main:main'
@@ -0,0 +1,127 @@
+"""Load generator driving `AccuWeatherApiConnector` at a target concurrency.
+
+Sends `--requests` connector calls (each one resolving the location key and
+then fetching the weather) from `--concurrency` threads sharing one requests
+factory, and reports the throughput, the p50/p95/p99 latencies in
+milliseconds and the number of failures and timeouts as JSON.
+
+Without `--api-url`, a local fake Accuweather API (`tests.fakes`) is started
+in process with the given latency and fault injection, so runs never use
+the daily quota. Run it from the `src` folder:
+    python -m benchmarks.load [--concurrency 8] [--requests 200] [--latency 0.05] [--error-rate 0.05]
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+import json
+import math
+import logging
+import time
+import pathlib
+import argparse
+import contextlib
+import threading
+from weatherconsoleapp.config import HttpSettings
+from weatherconsoleapp.connectors import AccuWeatherApiConnector
+from weatherconsoleapp.connectors.errors import WeatherConnectorTimeout
+from weatherconsoleapp.connectors.requests_factories import RequestsFactory
+from weatherconsoleapp.domain import Location, Units
+from tests.fakes.accuweather_server import FakeAccuWeatherServer
+
+COMMANDS = ("current", "forecast", "hourly")
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Returns the nearest-rank percentile of already sorted values.
+    """
+    if len(sorted_values) == 0:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def call_connector(connector: AccuWeatherApiConnector, command: str, location: Location):
+    if command == "current":
+        return connector.get_current_weather_for_location(location, Units.METRIC)
+    if command == "forecast":
+        return connector.get_weather_forecast_for_location(location, Units.METRIC)
+    return connector.get_hourly_forecast_for_location(location, Units.METRIC)
+
+def run_load(
+    api_url: str,
+    concurrency: int,
+    requests: int,
+    command: str = "current",
+    settings: HttpSettings = HttpSettings(),
+    apikey: str = "load-test") -> Dict[str, Any]:
+    requests_factory = RequestsFactory(settings._replace(pool_size=max(settings.pool_size, concurrency)))
+    connector = AccuWeatherApiConnector(apikey, requests_factory, api_url=api_url)
+    latencies: List[float] = []
+    outcomes = {"succeeded": 0, "failed": 0, "timed_out": 0}
+    lock = threading.Lock()
+
+    def send(index: int):
+        location = Location(f"City{index}", "ES")
+        start_time = time.perf_counter()
+        try:
+            call_connector(connector, command, location)
+            outcome = "succeeded"
+        except WeatherConnectorTimeout:
+            outcome = "timed_out"
+        except Exception:
+            outcome = "failed"
+        latency = time.perf_counter() - start_time
+        with lock:
+            latencies.append(latency)
+            outcomes[outcome] += 1
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(send, range(requests)))
+    elapsed = time.perf_counter() - start_time
+    requests_factory.close()
+
+    latencies.sort()
+    return {
+        "command": command,
+        "concurrency": concurrency,
+        "requests": requests,
+        **outcomes,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 2) if elapsed > 0 else 0.0,
+        "latency_ms": {name: round(percentile(latencies, fraction) * 1000, 2)
+            for name, fraction in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))}}
+
+def main():
+    parser = argparse.ArgumentParser(description="Load generator for the Accuweather connector.")
+    parser.add_argument("--api-url", help="Accuweather API url. A local fake API is started when missing.")
+    parser.add_argument("--command", choices=COMMANDS, default="current")
+    parser.add_argument("--concurrency", type=int, default=8, help="Number of concurrent connector calls.")
+    parser.add_argument("--requests", type=int, default=200, help="Total number of connector calls.")
+    parser.add_argument("--read-timeout", type=float, default=HttpSettings().read_timeout)
+    parser.add_argument("--max-retries", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="Latency of the fake API, in seconds.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Jitter of the fake API, in seconds.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of 503 responses of the fake API.")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="Fraction of stalled responses of the fake API.")
+    parser.add_argument("--output", help="File where the JSON results are written, besides the standard output.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    settings = HttpSettings(read_timeout=args.read_timeout, max_retries=args.max_retries)
+    with contextlib.ExitStack() as stack:
+        api_url: Optional[str] = args.api_url
+        if api_url is None:
+            fake_server = FakeAccuWeatherServer(
+                latency=args.latency,
+                jitter=args.jitter,
+                error_rate=args.error_rate,
+                timeout_rate=args.timeout_rate,
+                timeout_delay=args.read_timeout * 2)
+            api_url = stack.enter_context(fake_server).url
+        results = run_load(api_url, args.concurrency, args.requests, args.command, settings)
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output is not None:
+        pathlib.Path(args.output).write_text(output, encoding="utf-8")
+
+if __name__ == "__main__":
+    main()
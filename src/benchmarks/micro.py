@@ -0,0 +1,124 @@
+"""Micro-benchmarks of the hot paths of weatherconsoleapp.
+
+Times, offline and against the recorded Accuweather responses of
+`tests/resources`, the parsing of every request, date parsing, temperature
+averaging, argument validation and the rendering of weather information. Each
+case reports the best and median time per call in microseconds, which are
+compared against `micro_baseline.json`. A case is a regression when its best
+time exceeds the baseline by more than the tolerance.
+
+Run it from the `src` folder:
+    python -m benchmarks.micro [--repeat 5] [--tolerance 0.5] [--output micro.json] [--update-baseline]
+The exit code is 1 when any case regresses.
+"""
+import sys
+import json
+import timeit
+import pathlib
+import argparse
+import statistics
+import importlib.resources as resources
+from typing import Any, Callable, Dict, List, Optional
+from weatherconsoleapp.connectors.accuweather_requests import (
+    Request, LocationKey, LocationKeyRequest, CurrentWeatherRequest, WeatherForecastRequest, HourlyForecastRequest)
+from weatherconsoleapp.commands import PrintCurrentWeatherCommand, PrintWeatherForecastCommand, WeatherReport
+from weatherconsoleapp.formatters import JsonLinesFormatter, TextFormatter
+from weatherconsoleapp.domain import Location, Temperature, Units
+from tests import resources as test_resources
+
+BASELINE_FILEPATH = pathlib.Path(__file__).with_name("micro_baseline.json")
+DEFAULT_TOLERANCE = 0.5
+
+def read_fixture(filename: str) -> bytes:
+    return resources.files(test_resources).joinpath(filename).read_bytes()
+
+def create_cases() -> Dict[str, Callable[[], Any]]:
+    """Returns the benchmarked callables by case name. Requests are created
+    without a requests factory since only their parsing is timed.
+    """
+    location = Location("Bilbao", "ES")
+    location_key = LocationKey(location, "309382")
+    location_key_content = read_fixture("location_key_without_details.json")
+    current_weather_content = read_fixture("current_weather_without_details.json")
+    forecast_content = read_fixture("weather_forecast_in_metric_without_details.json")
+    hourly_forecast_content = read_fixture("hourly_forecast_12_hours_in_metric_without_details.json")
+
+    location_key_request = LocationKeyRequest(None, location, "")
+    current_weather_request = CurrentWeatherRequest(None, location_key, Units.METRIC, "")
+    forecast_request = WeatherForecastRequest(None, location_key, Units.IMPERIAL, 5, "")
+    hourly_forecast_request = HourlyForecastRequest(None, location_key, Units.METRIC, 12, "")
+    temperatures = [Temperature(value, Units.METRIC) for value in (8.3, 9.1, 7.4, 10.2, 6.8)]
+    forecast_report = WeatherReport(location, forecast_request._get_weather_from_response(forecast_content))
+    text_formatter = TextFormatter()
+    jsonl_formatter = JsonLinesFormatter()
+
+    return {
+        "parse_location_key": lambda: location_key_request._get_location_key_from_response(location_key_content),
+        "parse_current_weather": lambda: current_weather_request._get_weather_from_response(current_weather_content),
+        "parse_weather_forecast": lambda: forecast_request._get_weather_from_response(forecast_content),
+        "parse_hourly_forecast": lambda: hourly_forecast_request._get_series_from_response(hourly_forecast_content),
+        "parse_datetime_string": lambda: Request.parse_datetime_string("2022-11-19T22:58:00+01:00"),
+        "compute_average_temperature": lambda: Temperature.compute_average(temperatures),
+        "validate_current_weather_arguments": lambda: PrintCurrentWeatherCommand.validate_arguments("Bilbao,ES", "metric"),
+        "validate_weather_forecast_arguments": lambda: PrintWeatherForecastCommand.validate_arguments("Bilbao,ES", "imperial", "3"),
+        "format_forecast_text": lambda: text_formatter.format_report(forecast_report),
+        "format_forecast_jsonl": lambda: jsonl_formatter.format_report(forecast_report)}
+
+def time_case(case: Callable[[], Any], repeat: int, number: Optional[int] = None) -> Dict[str, float]:
+    """Returns the best and median time per call in microseconds. Without
+    `number`, each measure runs as many calls as fit in 0.2 seconds.
+    """
+    timer = timeit.Timer(case)
+    if number is None:
+        number, _ = timer.autorange()
+    times = [total / number * 1e6 for total in timer.repeat(repeat=repeat, number=number)]
+    return {"best_us": round(min(times), 3), "median_us": round(statistics.median(times), 3), "calls": number}
+
+def run_benchmarks(repeat: int = 5, number: Optional[int] = None, names: Optional[List[str]] = None) -> Dict[str, Dict[str, float]]:
+    cases = create_cases()
+    return {name: time_case(case, repeat, number) for name, case in cases.items() if names is None or name in names}
+
+def find_regressions(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """Returns the cases whose best time is more than `tolerance` (a fraction)
+    slower than the baseline. Cases missing from the baseline never regress.
+    """
+    return [name for name, result in results.items()
+        if name in baseline and result["best_us"] > baseline[name]["best_us"] * (1 + tolerance)]
+
+def read_baseline() -> Dict[str, Dict[str, float]]:
+    if not BASELINE_FILEPATH.is_file():
+        return {}
+    return json.loads(BASELINE_FILEPATH.read_text(encoding="utf-8"))
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of weatherconsoleapp.")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of measures per case, the best and median are reported.")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed slowdown over the baseline, as a fraction.")
+    parser.add_argument("--case", action="append", help="Case to run, may be repeated. All cases run by default.")
+    parser.add_argument("--output", help="File where the JSON results are written, besides the standard output.")
+    parser.add_argument("--update-baseline", action="store_true", help="Store the results as the new baseline.")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.repeat, names=args.case)
+    baseline = read_baseline()
+    regressions = find_regressions(results, baseline, args.tolerance)
+    report = {
+        "python": sys.version.split()[0],
+        "results": results,
+        "baseline": {name: baseline[name] for name in results if name in baseline},
+        "regressions": regressions}
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output is not None:
+        pathlib.Path(args.output).write_text(output, encoding="utf-8")
+    if args.update_baseline:
+        BASELINE_FILEPATH.write_text(json.dumps({**baseline, **results}, indent=2) + "\n", encoding="utf-8")
+        return
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
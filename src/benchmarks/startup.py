@@ -0,0 +1,93 @@
+"""Startup time benchmark of the weatherconsoleapp console script.
+
+Measures, in fresh interpreters, the cumulative import time of
+`weatherconsoleapp.main` reported by `python -X importtime` and the wall time
+of `weatherconsoleapp --help`, and checks them against `startup_budget.json`.
+Modules that must only be loaded when a network command runs are reported as
+violations if the import of `weatherconsoleapp.main` pulls them in.
+
+Run it from the `src` folder:
+    python -m benchmarks.startup [--runs 10] [--output startup.json]
+The exit code is 1 when the budget is exceeded.
+"""
+import os
+import sys
+import json
+import time
+import pathlib
+import argparse
+import statistics
+import subprocess
+from typing import Dict, List, Set, Tuple
+
+MODULE = "weatherconsoleapp.main"
+BUDGET_FILEPATH = pathlib.Path(__file__).with_name("startup_budget.json")
+SOURCES_DIRPATH = pathlib.Path(__file__).resolve().parents[1]
+
+def get_environment() -> Dict[str, str]:
+    environment = dict(os.environ)
+    python_path = environment.get("PYTHONPATH")
+    environment["PYTHONPATH"] = str(SOURCES_DIRPATH) if not python_path else f"{SOURCES_DIRPATH}{os.pathsep}{python_path}"
+    return environment
+
+def parse_import_time(stderr: str) -> Tuple[float, Set[str]]:
+    """Returns the cumulative import time in milliseconds of MODULE and the
+    modules imported because of it.
+    """
+    block_modules: Set[str] = set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        block_modules.add(name.strip())
+        if not name.startswith("  ") and name.strip() == MODULE:
+            return int(cumulative_us) / 1000, block_modules
+        if not name.startswith("  "):
+            block_modules = set()
+    raise ValueError(f"{MODULE} not found in -X importtime output")
+
+def measure_import_time(environment: Dict[str, str]) -> Tuple[float, Set[str]]:
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {MODULE}"],
+        env=environment, capture_output=True, text=True, check=True)
+    return parse_import_time(process.stderr)
+
+def measure_help_wall_time(environment: Dict[str, str]) -> float:
+    start_time = time.perf_counter()
+    subprocess.run([sys.executable, "-m", MODULE, "--help"], env=environment, capture_output=True, check=True)
+    return (time.perf_counter() - start_time) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup time benchmark of weatherconsoleapp.")
+    parser.add_argument("--runs", type=int, default=10, help="Number of measured runs, the median is reported.")
+    parser.add_argument("--output", help="File where the JSON results are written, besides the standard output.")
+    args = parser.parse_args()
+
+    environment = get_environment()
+    budget = json.loads(BUDGET_FILEPATH.read_text(encoding="utf-8"))
+    import_times: List[float] = []
+    imported_modules: Set[str] = set()
+    for _ in range(args.runs):
+        import_time, modules = measure_import_time(environment)
+        import_times.append(import_time)
+        imported_modules |= modules
+    help_wall_times = [measure_help_wall_time(environment) for _ in range(args.runs)]
+
+    results = {
+        "import_time_ms": round(statistics.median(import_times), 2),
+        "help_wall_time_ms": round(statistics.median(help_wall_times), 2),
+        "forbidden_modules_imported": sorted(imported_modules & set(budget["forbidden_modules"])),
+        "budget": budget}
+    violations = [name for name in ("import_time_ms", "help_wall_time_ms") if results[name] > budget[name]]
+    if results["forbidden_modules_imported"]:
+        violations.append("forbidden_modules")
+    results["violations"] = violations
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output is not None:
+        pathlib.Path(args.output).write_text(output, encoding="utf-8")
+    sys.exit(1 if violations else 0)
+
+if __name__ == "__main__":
+    main()
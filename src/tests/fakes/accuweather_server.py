@@ -0,0 +1,31 @@
+"""Local stand-in of the Accuweather API serving the recorded responses of
+`tests/resources`, with configurable latency and fault injection.
+
+Serves the endpoints used by `accuweather_requests.py`:
+    GET /locations/v1/cities/{country_code}/search?q={city}
+    GET /currentconditions/v1/{location_key}
+    GET /forecasts/v1/daily/5day/{location_key}
+    GET /forecasts/v1/hourly/{hours}hour/{location_key}
+Requests without an apikey are answered with 401. Latency and faults are
+injected as described in `tests.fakes.api_server`.
+
+Run it from the `src` folder:
+    python -m tests.fakes.accuweather_server [--port 8081] [--latency 0.05] [--error-rate 0.1]
+and point the `api_url` option of the config file to it.
+"""
+import re
+from .api_server import FakeApiServer, run_server
+
+class FakeAccuWeatherServer(FakeApiServer):
+    """Fake Accuweather API listening on `server_address`, port 0 picking a free
+    one. Use it as a context manager to serve from a background thread.
+    """
+    ROUTES = (
+        ("location_key", re.compile(r"^/locations/v1/cities/[A-Z]{2}/search$"), "location_key_without_details.json"),
+        ("current_conditions", re.compile(r"^/currentconditions/v1/\w+$"), "current_weather_without_details.json"),
+        ("daily_forecast", re.compile(r"^/forecasts/v1/daily/5day/\w+$"), "weather_forecast_in_metric_without_details.json"),
+        ("hourly_forecast", re.compile(r"^/forecasts/v1/hourly/\d+hour/\w+$"), "hourly_forecast_12_hours_in_metric_without_details.json"))
+    REQUIRED_PARAMS = ("apikey",)
+
+if __name__ == "__main__":
+    run_server(FakeAccuWeatherServer, "Local stand-in of the Accuweather API.", 8081)
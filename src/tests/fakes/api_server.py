@@ -0,0 +1,195 @@
+"""Base of the local stand-ins of weather APIs: serves recorded responses of
+`tests/resources` by path, with configurable latency and fault injection.
+
+Each request waits `latency` seconds plus a uniform random jitter of up to
+`jitter` seconds, then a fraction `timeout_rate` of them stalls for
+`timeout_delay` seconds and a fraction `error_rate` is answered with 503.
+
+Responses carry an `ETag` header, and conditional requests whose
+`If-None-Match` header matches it are answered with `304 Not Modified`.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Pattern, Tuple, Type
+from urllib.parse import urlsplit, parse_qs
+import json
+import hashlib
+import random
+import argparse
+import threading
+import importlib.resources as resources
+from tests import resources as test_resources
+
+class FakeApiServer(ThreadingHTTPServer):
+    """Fake API listening on `server_address`, port 0 picking a free one. Use it
+    as a context manager to serve from a background thread. Subclasses list
+    their `ROUTES` as (name, path pattern, fixture filename) and the query
+    params every request must have in `REQUIRED_PARAMS`.
+    """
+    daemon_threads = True
+
+    ROUTES: Tuple[Tuple[str, Pattern, str], ...] = ()
+    REQUIRED_PARAMS: Tuple[str, ...] = ()
+
+    def __init__(self,
+        server_address=("127.0.0.1", 0),
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        timeout_rate: float = 0.0,
+        timeout_delay: float = 30.0,
+        seed: Optional[int] = None):
+        super().__init__(server_address, FakeApiRequestHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.timeout_delay = timeout_delay
+        self.request_counts: Dict[str, int] = {}
+        self._fixtures = {name: resources.files(test_resources).joinpath(filename).read_bytes()
+            for name, _, filename in self.ROUTES}
+        self.not_modified_count = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def __enter__(self) -> "FakeApiServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._stopped.set()
+        self.shutdown()
+        self.server_close()
+
+    def route(self, path: str) -> Optional[str]:
+        for name, pattern, _ in self.ROUTES:
+            if pattern.match(path):
+                return name
+        return None
+
+    def get_fixture(self, name: str) -> bytes:
+        return self._fixtures[name]
+
+    def set_fixture(self, name: str, content: bytes):
+        """Replaces the content served by a route, e.g. to simulate an update.
+        """
+        self._fixtures[name] = content
+
+    @staticmethod
+    def get_etag(content: bytes) -> str:
+        return f'"{hashlib.sha1(content).hexdigest()}"'
+
+    def count_not_modified(self):
+        with self._lock:
+            self.not_modified_count += 1
+
+    def count_request(self, name: str):
+        with self._lock:
+            self.request_counts[name] = self.request_counts.get(name, 0) + 1
+
+    def draw_fault(self) -> Optional[str]:
+        """Returns 'timeout', 'error' or None for a faultless request.
+        """
+        with self._lock:
+            draw = self._random.random()
+        if draw < self.timeout_rate:
+            return "timeout"
+        if draw < self.timeout_rate + self.error_rate:
+            return "error"
+        return None
+
+    def wait(self, seconds: float):
+        """Sleeps `seconds`, returning early when the server stops.
+        """
+        if seconds > 0:
+            self._stopped.wait(seconds)
+
+    def get_delay(self) -> float:
+        with self._lock:
+            return self.latency + self._random.uniform(0, self.jitter)
+
+class FakeApiRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: FakeApiServer
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        name = self.server.route(url.path)
+        if name is None:
+            self._send(404, {"Code": "ResourceNotFound", "Message": f"Unknown path {url.path}."})
+            return
+        self.server.count_request(name)
+        query = parse_qs(url.query)
+        missing_params = [param for param in self.server.REQUIRED_PARAMS if param not in query]
+        if len(missing_params) > 0:
+            self._send(401, {"Code": "Unauthorized", "Message": f"Missing {', '.join(missing_params)}."})
+            return
+
+        self.server.wait(self.server.get_delay())
+        fault = self.server.draw_fault()
+        if fault == "timeout":
+            self.server.wait(self.server.timeout_delay)
+        if fault == "error":
+            self._send(503, {"Code": "ServiceUnavailable", "Message": "Injected error."})
+            return
+        content = self.server.get_fixture(name)
+        etag = self.server.get_etag(content)
+        if self.headers.get("If-None-Match") == etag:
+            self.server.count_not_modified()
+            self._send_content(304, b"", etag)
+            return
+        self._send_content(200, content, etag)
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status_code: int, content: dict):
+        self._send_content(status_code, json.dumps(content).encode("utf-8"))
+
+    def _send_content(self, status_code: int, body: bytes, etag: Optional[str] = None):
+        try:
+            self.send_response(status_code)
+            self.send_header("Content-Type", "application/json")
+            if etag is not None:
+                self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+def run_server(server_class: Type[FakeApiServer], description: str, default_port: int):
+    """Runs the fake API with the command line arguments until interrupted.
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=default_port)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds every response waits.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Maximum random seconds added to the latency.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503.")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="Fraction of requests stalling for --timeout-delay.")
+    parser.add_argument("--timeout-delay", type=float, default=30.0)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    server = server_class(
+        (args.host, args.port),
+        args.latency,
+        args.jitter,
+        args.error_rate,
+        args.timeout_rate,
+        args.timeout_delay,
+        args.seed)
+    print(f"{description} Serving on {server.url} (press Ctrl+C to stop).")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
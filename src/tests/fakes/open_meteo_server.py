@@ -0,0 +1,29 @@
+"""Local stand-in of the Open-Meteo API serving the recorded responses of
+`tests/resources`, with configurable latency and fault injection.
+
+Serves the endpoints used by `open_meteo_requests.py`:
+    GET /v1/search?name={city}
+    GET /v1/forecast?latitude={latitude}&longitude={longitude}
+The forecast fixture holds current conditions, daily and hourly forecasts, so
+it answers every forecast request. Latency and faults are injected as
+described in `tests.fakes.api_server`.
+
+Run it from the `src` folder:
+    python -m tests.fakes.open_meteo_server [--port 8082] [--latency 0.05] [--error-rate 0.1]
+and point the `api_url` and `geocoding_url` options of the config file to it.
+"""
+import re
+from .api_server import FakeApiServer, run_server
+
+class FakeOpenMeteoServer(FakeApiServer):
+    """Fake Open-Meteo API, serving both the geocoding and the forecast
+    endpoints, listening on `server_address`, port 0 picking a free one. Use it
+    as a context manager to serve from a background thread.
+    """
+    ROUTES = (
+        ("geocoding", re.compile(r"^/v1/search$"), "open_meteo_geocoding.json"),
+        ("forecast", re.compile(r"^/v1/forecast$"), "open_meteo_forecast.json"))
+    REQUIRED_PARAMS = ()
+
+if __name__ == "__main__":
+    run_server(FakeOpenMeteoServer, "Local stand-in of the Open-Meteo API.", 8082)
@@ -0,0 +1,52 @@
+from unittest import TestCase, main, mock
+from datetime import date
+import sys
+import importlib
+import importlib.resources as resources
+from weatherconsoleapp.connectors import accuweather_decoders
+from tests import resources as test_resources
+
+class AccuWeatherDecodersTest(TestCase):
+
+    def _assert_decoders_read_fixtures(self, decoders):
+        location_keys = resources.read_binary(test_resources, "location_key_without_details.json")
+        current_weather = resources.read_binary(test_resources, "current_weather_without_details.json")
+        forecast = resources.read_binary(test_resources, "weather_forecast_in_metric_without_details.json")
+        hourly_forecast = resources.read_binary(test_resources, "hourly_forecast_12_hours_in_metric_without_details.json")
+        self.assertEqual(decoders.decode_location_key_code(location_keys), "309382")
+        self.assertEqual(
+            decoders.decode_current_conditions(current_weather),
+            ("2022-11-19T22:58:00+01:00", "Light rain", 8.3, 47))
+        daily_forecasts = decoders.decode_daily_forecasts(forecast)
+        self.assertEqual(len(daily_forecasts), 5)
+        self.assertTrue(all(isinstance(field, str) for f in daily_forecasts for field in f[:2]))
+        hourly_forecasts = decoders.decode_hourly_forecasts(hourly_forecast)
+        self.assertEqual(len(hourly_forecasts), 12)
+        self.assertEqual(hourly_forecasts[0], (1668877200, "2022-11-19T18:00:00+01:00", 12, "Showers", 9.4))
+
+    def test_given_iso_timestamp_when_parsing_then_local_date_is_returned(self):
+        self.assertEqual(accuweather_decoders.parse_iso_date("2022-11-19T23:58:00-05:00"), date(2022, 11, 19))
+
+    def test_given_invalid_timestamp_when_parsing_then_value_error_is_raised(self):
+        with self.assertRaises(ValueError):
+            accuweather_decoders.parse_iso_date("19/11/2022")
+
+    def test_given_iso_timestamp_when_parsing_utc_offset_then_seconds_are_returned(self):
+        self.assertEqual(accuweather_decoders.parse_utc_offset("2022-11-19T18:00:00+01:00"), 3600)
+        self.assertEqual(accuweather_decoders.parse_utc_offset("2022-11-19T18:00:00-05:30"), -19800)
+        self.assertEqual(accuweather_decoders.parse_utc_offset("2022-11-19T18:00:00Z"), 0)
+
+    def test_given_fixtures_when_decoding_then_read_fields_are_returned(self):
+        self._assert_decoders_read_fixtures(accuweather_decoders)
+
+    def test_given_msgspec_is_missing_when_decoding_fixtures_then_json_decoders_return_the_same_fields(self):
+        try:
+            with mock.patch.dict(sys.modules, {"msgspec": None}):
+                json_decoders = importlib.reload(accuweather_decoders)
+                self.assertIsNone(json_decoders.msgspec)
+                self._assert_decoders_read_fixtures(json_decoders)
+        finally:
+            importlib.reload(accuweather_decoders)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+from typing import List, Optional
+from unittest import IsolatedAsyncioTestCase, main
+from datetime import date
+import json
+import asyncio
+import pathlib
+import tempfile
+import threading
+import importlib.resources as resources
+from weatherconsoleapp.connectors import AsyncAccuWeatherApiConnector
+from weatherconsoleapp.connectors.location_key_cache import LocationKeyCache
+from weatherconsoleapp.connectors.requests_factories import AsyncBaseRequestsFactory
+from weatherconsoleapp.domain import Location, Units, Date
+from tests import resources as test_resources
+
+class AsyncRequestsFactoryMock(AsyncBaseRequestsFactory):
+
+    def __init__(self, delay: float = 0):
+        self._delay = delay
+        self.requested_urls: List[str] = []
+
+    async def get(self, url: str, params: Optional[dict] = None) -> dict:
+        self.requested_urls.append(url)
+        await asyncio.sleep(self._delay)
+        if "locations" in url:
+            filename = "location_key_without_details.json"
+        elif "currentconditions" in url:
+            filename = "current_weather_without_details.json"
+        else:
+            filename = "weather_forecast_in_metric_without_details.json"
+        return json.loads(resources.read_text(test_resources, filename))
+
+class AsyncAccuWeatherApiConnectorTest(IsolatedAsyncioTestCase):
+
+    async def test_given_location_when_getting_current_weather_then_weather_is_parsed(self):
+        connector = AsyncAccuWeatherApiConnector("", AsyncRequestsFactoryMock())
+        current_weather = await connector.get_current_weather_for_location(Location("Bilbao", "ES"), Units.METRIC)
+        self.assertEqual(current_weather.date, Date(date(2022, 11, 19)))
+        self.assertEqual(current_weather.weather_description, "Light rain")
+
+    async def test_given_location_when_getting_forecast_then_requested_days_are_returned(self):
+        requests_factory = AsyncRequestsFactoryMock()
+        connector = AsyncAccuWeatherApiConnector("", requests_factory)
+        weather_forecast = await connector.get_weather_forecast_for_location(Location("Bilbao", "ES"), Units.METRIC, 3)
+        self.assertEqual(len(weather_forecast), 3)
+        self.assertIn("309382", requests_factory.requested_urls[1])
+
+    async def test_given_many_locations_when_gathering_lookups_then_they_share_the_event_loop(self):
+        delay = 0.05
+        connector = AsyncAccuWeatherApiConnector("", AsyncRequestsFactoryMock(delay))
+        lookups = [connector.get_current_weather_for_location(Location("Bilbao", "ES"), Units.METRIC) for _ in range(200)]
+        start_time = asyncio.get_running_loop().time()
+        results = await asyncio.gather(*lookups)
+        self.assertEqual(len(results), 200)
+        self.assertLess(asyncio.get_running_loop().time() - start_time, delay * 20)
+
+    async def test_given_location_key_cache_when_getting_weather_then_cache_is_used_outside_the_event_loop(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        cache = LocationKeyCache(pathlib.Path(temp_dir.name, LocationKeyCache.FILENAME))
+        threads: List[threading.Thread] = []
+        cache_get, cache_put = cache.get, cache.put
+        cache.get = lambda location: threads.append(threading.current_thread()) or cache_get(location)
+        cache.put = lambda location, key_code: threads.append(threading.current_thread()) or cache_put(location, key_code)
+        requests_factory = AsyncRequestsFactoryMock()
+        connector = AsyncAccuWeatherApiConnector("", requests_factory, location_key_cache=cache)
+
+        await connector.get_current_weather_for_location(Location("Bilbao", "ES"), Units.METRIC)
+        await connector.get_current_weather_for_location(Location("Bilbao", "ES"), Units.METRIC)
+        self.assertEqual(len(threads), 3)
+        self.assertNotIn(threading.current_thread(), threads)
+        self.assertEqual(len([url for url in requests_factory.requested_urls if "locations" in url]), 1)
+
+if __name__ == "__main__":
+    main()
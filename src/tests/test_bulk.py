@@ -0,0 +1,88 @@
+from unittest import TestCase, main
+from datetime import date
+from typing import List
+import io
+import pathlib
+import tempfile
+from weatherconsoleapp.bulk import BulkJobRunner, JournalEntry, ShardJournal, get_shard, read_journals
+from weatherconsoleapp.commands import CommandResultStatus, PrintCurrentWeatherCommand
+from weatherconsoleapp.connectors import WeatherApiConnector
+from weatherconsoleapp.domain import Date, Location, Temperature, Units, WeatherInfo
+from weatherconsoleapp.formatters import JsonLinesFormatter
+
+LOCATIONS = [f"City{index},ES" for index in range(20)]
+
+class FailingCitiesConnectorMock(WeatherApiConnector):
+
+    def __init__(self, failing_cities: List[str]):
+        self._failing_cities = failing_cities
+
+    def get_current_weather_for_location(self, location: Location, units: Units) -> WeatherInfo:
+        if location.city in self._failing_cities:
+            raise ValueError("Unknown city")
+        return WeatherInfo(Date(date(2024, 1, 1)), location, Temperature(10.0, units), "Sunny")
+
+    def get_weather_forecast_for_location(self, location: Location, units: Units, days: int = 5) -> List[WeatherInfo]:
+        return []
+
+def create_connector() -> WeatherApiConnector:
+    return FailingCitiesConnectorMock([])
+
+def create_failing_connector() -> WeatherApiConnector:
+    return FailingCitiesConnectorMock(["City3", "City7"])
+
+class BulkJobRunnerTest(TestCase):
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self._dirname = pathlib.Path(temp_dir.name, "job")
+        self._labeled_inputs = [(location, PrintCurrentWeatherCommand.validate_arguments(location, "metric")[1])
+            for location in LOCATIONS]
+
+    def _create_runner(self, connector_factory, **settings) -> BulkJobRunner:
+        return BulkJobRunner(self._dirname, PrintCurrentWeatherCommand, self._labeled_inputs, JsonLinesFormatter(),
+            connector_factory, **settings)
+
+    def test_given_shard_counts_when_sharding_then_every_location_has_one_stable_shard(self):
+        shards = [get_shard(location, 3) for location in LOCATIONS]
+        self.assertEqual(shards, [get_shard(f" {location.upper()}", 3) for location in LOCATIONS])
+        self.assertEqual(set(shards), {0, 1, 2})
+        pending = [self._create_runner(create_connector, processes=2, shard_index=index, shard_count=3).get_pending()
+            for index in range(3)]
+        labels = sorted(label for node in pending for worker in node for label, _ in worker)
+        self.assertEqual(labels, sorted(LOCATIONS))
+
+    def test_given_failed_locations_when_running_again_then_only_they_are_retried_and_output_merged(self):
+        summary = self._create_runner(create_failing_connector, processes=2).run()
+        self.assertEqual((summary.skipped, summary.succeeded, summary.failed), (0, 18, 2))
+        self.assertEqual(self._create_runner(create_connector).merge(io.StringIO()), ["City3,ES", "City7,ES"])
+
+        summary = self._create_runner(create_connector).run()
+        self.assertEqual((summary.skipped, summary.succeeded, summary.failed), (18, 2, 0))
+        output = io.StringIO()
+        self.assertEqual(self._create_runner(create_connector).merge(output), [])
+        self.assertEqual([line.split('"')[3] for line in output.getvalue().splitlines()], [location.split(",")[0] for location in LOCATIONS])
+
+    def test_given_sharded_job_when_every_node_ran_then_output_is_merged(self):
+        for index in range(2):
+            runner = self._create_runner(create_connector, shard_index=index, shard_count=2)
+            summary = runner.run()
+            self.assertEqual(summary.succeeded, sum(1 for location in LOCATIONS if get_shard(location, 2) == index))
+        output = io.StringIO()
+        self.assertEqual(runner.merge(output), [])
+        self.assertEqual(len(output.getvalue().splitlines()), len(LOCATIONS))
+
+    def test_given_torn_journal_line_when_reading_and_appending_then_line_is_ignored(self):
+        self._dirname.mkdir()
+        filepath = self._dirname.joinpath(f"crashed{ShardJournal.SUFFIX}")
+        with ShardJournal(filepath) as journal:
+            journal.append(JournalEntry("City1,ES", CommandResultStatus.SUCCESS, "output\n"))
+        with open(filepath, "a", encoding="utf-8") as journal_file:
+            journal_file.write('{"label": "City2,ES", "sta')
+        with ShardJournal(filepath) as journal, self.assertLogs("weatherconsoleapp.bulk", "WARNING"):
+            journal.append(JournalEntry("City3,ES", CommandResultStatus.ERROR, ""))
+            self.assertEqual(sorted(read_journals(self._dirname)), ["City1,ES", "City3,ES"])
+
+if __name__ == "__main__":
+    main()
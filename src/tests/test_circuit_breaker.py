@@ -0,0 +1,104 @@
+from typing import List, Optional
+from unittest import TestCase, main
+import tempfile
+import importlib.resources as resources
+from weatherconsoleapp.connectors.accuweather_requests import CurrentWeatherRequest, WeatherForecastRequest
+from weatherconsoleapp.connectors.circuit_breaker import CircuitBreakerRequestsFactory, CircuitState
+from weatherconsoleapp.connectors.errors import CircuitOpenError, DeadlineExceeded, WeatherConnectorTimeout
+from weatherconsoleapp.connectors.requests_factories import BaseRequestsFactory, HttpResponse, request_cache_key
+from weatherconsoleapp.connectors.response_cache import CachingRequestsFactory, ResponseCache
+from tests import resources as test_resources
+
+FORECAST_URL = "http://dataservice.accuweather.com/forecasts/v1/daily/5day/309382"
+CURRENT_URL = "http://dataservice.accuweather.com/currentconditions/v1/309382"
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+class FailingRequestsFactoryMock(BaseRequestsFactory):
+
+    def __init__(self):
+        self.calls: List[str] = []
+        self.error: Optional[BaseException] = None
+        self.status_code = 200
+
+    def get(self, url: str, params: Optional[dict] = None) -> dict:
+        return self.get_response(url, params).json()
+
+    def get_response(self, url: str, params: Optional[dict] = None, headers: Optional[dict] = None) -> HttpResponse:
+        self.calls.append(url)
+        if self.error is not None:
+            raise self.error
+        content = resources.read_binary(test_resources, "weather_forecast_in_metric_without_details.json")
+        return HttpResponse(self.status_code, {}, content)
+
+class CircuitBreakerRequestsFactoryTest(TestCase):
+
+    def setUp(self):
+        self._clock = FakeClock()
+        self._inner_factory = FailingRequestsFactoryMock()
+        self._factory = CircuitBreakerRequestsFactory(
+            self._inner_factory,
+            [CurrentWeatherRequest.request_url, WeatherForecastRequest.request_url],
+            failure_threshold=2,
+            reset_timeout=30,
+            clock=self._clock)
+
+    def _fail(self, url: str, times: int):
+        for _ in range(times):
+            with self.assertRaises(WeatherConnectorTimeout):
+                self._factory.get(url)
+
+    def test_given_consecutive_failures_when_requesting_endpoint_then_it_fails_fast_and_others_are_sent(self):
+        self._inner_factory.error = WeatherConnectorTimeout("Timed out.")
+        self._fail(FORECAST_URL, 2)
+        with self.assertRaises(CircuitOpenError):
+            self._factory.get(FORECAST_URL)
+        self.assertEqual(len(self._inner_factory.calls), 2)
+
+        self._inner_factory.error = None
+        self._factory.get(CURRENT_URL)
+        self.assertEqual(self._factory.get_breaker(WeatherForecastRequest.request_url).state, CircuitState.OPEN)
+        self.assertEqual(self._factory.get_breaker(CurrentWeatherRequest.request_url).state, CircuitState.CLOSED)
+
+    def test_given_open_circuit_when_reset_timeout_elapsed_then_one_probe_decides_the_state(self):
+        self._inner_factory.status_code = 503
+        self._factory.get_response(FORECAST_URL)
+        self._factory.get_response(FORECAST_URL)
+        self._clock.now = 30
+        self.assertEqual(self._factory.get_response(FORECAST_URL).status_code, 503)
+        with self.assertRaises(CircuitOpenError):
+            self._factory.get(FORECAST_URL)
+
+        self._inner_factory.status_code = 200
+        self._clock.now = 60
+        self._factory.get(FORECAST_URL)
+        self._factory.get(FORECAST_URL)
+        self.assertEqual(self._factory.get_breaker(WeatherForecastRequest.request_url).state, CircuitState.CLOSED)
+        self.assertEqual(len(self._inner_factory.calls), 5)
+
+    def test_given_expired_deadlines_when_requesting_then_circuit_stays_closed(self):
+        self._inner_factory.error = DeadlineExceeded("Request deadline exceeded.")
+        self._fail(FORECAST_URL, 3)
+        self.assertEqual(self._factory.get_breaker(WeatherForecastRequest.request_url).state, CircuitState.CLOSED)
+
+    def test_given_stale_cached_response_when_circuit_is_open_then_it_is_served_without_request(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        cache = ResponseCache(temp_dir.name)
+        content = resources.read_binary(test_resources, "weather_forecast_in_metric_without_details.json")
+        cache.put(request_cache_key(FORECAST_URL), HttpResponse(200, {}, content), ttl=-1)
+        factory = CachingRequestsFactory(self._factory, cache, {WeatherForecastRequest.request_url: 60})
+        self._inner_factory.error = WeatherConnectorTimeout("Timed out.")
+        self._fail(FORECAST_URL.replace("309382", "1"), 2)
+
+        self.assertEqual(factory.get_response(FORECAST_URL).content, content)
+        self.assertEqual(len(self._inner_factory.calls), 2)
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,15 @@
-from unittest import TestCase, main
+from unittest import TestCase, main, mock
 from typing import List
 from datetime import date, timedelta
+import io
+import time
+import functools
 from weatherconsoleapp.connectors import WeatherApiConnector
 from weatherconsoleapp.domain import Location, Units, WeatherInfo, Temperature
-from weatherconsoleapp.commands import PrintCurrentWeatherCommand, PrintWeatherForecastCommand, CommandResultStatus
+from weatherconsoleapp.commands import PrintCurrentWeatherCommand, PrintWeatherForecastCommand, WatchCommand, BatchCommand, CommandResultStatus
+from weatherconsoleapp.formatters import LineDiffRenderer
+from weatherconsoleapp.connectors.deadlines import get_remaining_time
+from weatherconsoleapp.connectors.errors import WeatherConnectorConnectionError, WeatherConnectorTimeout
 
 class WeatherApiConnectorMock(WeatherApiConnector):
 
@@ -27,7 +33,32 @@ class WeatherApiConnectorMock(WeatherApiConnector):
         dates = [self._date + timedelta(days=i) for i in range(days)]
         temperature = Temperature(self._default_temperature_value, units)
         return [WeatherInfo(date, location, temperature, self._weather_description) for date in dates]
-        
+
+class SlowWeatherApiConnectorMock(WeatherApiConnectorMock):
+
+    def __init__(self, delay: float, failing_city: str):
+        super().__init__(date(2022, 1, 1), "Sunny", 5)
+        self._delay = delay
+        self._failing_city = failing_city
+
+    def get_current_weather_for_location(self, location: Location, units: Units) -> WeatherInfo:
+        time.sleep(self._delay)
+        if location.city == self._failing_city:
+            raise ValueError("Unknown city")
+        return super().get_current_weather_for_location(location, units)
+
+class DeadlineWeatherApiConnectorMock(WeatherApiConnectorMock):
+
+    def __init__(self, delay: float):
+        super().__init__(date(2022, 1, 1), "Sunny", 5)
+        self._delay = delay
+
+    def get_current_weather_for_location(self, location: Location, units: Units) -> WeatherInfo:
+        remaining = get_remaining_time()
+        if remaining is not None and remaining < self._delay:
+            raise WeatherConnectorTimeout("Timed out.")
+        return super().get_current_weather_for_location(location, units)
+
 class CurrentWeatherCommandTestCase(TestCase):
 
     def setUp(self):
@@ -61,6 +92,21 @@ class CurrentWeatherCommandTestCase(TestCase):
         command = PrintCurrentWeatherCommand(self._connector, location, units)
         result= command.execute()
         self.assertEqual(result, CommandResultStatus.SUCCESS)
+
+    def test_given_deadline_shorter_than_request_when_command_is_executed_then_result_is_timeout(self):
+        connector = DeadlineWeatherApiConnectorMock(delay=1)
+        output = io.StringIO()
+        self.assertEqual(PrintCurrentWeatherCommand(connector, Location("Bilbao", "ES"), output=output, deadline=0.5).execute(),
+            CommandResultStatus.TIMEOUT)
+        self.assertEqual(output.getvalue(), "")
+        self.assertEqual(PrintCurrentWeatherCommand(connector, Location("Bilbao", "ES"), output=output, deadline=5).execute(),
+            CommandResultStatus.SUCCESS)
+
+    def test_given_unreachable_service_when_command_is_executed_then_result_is_connection_error(self):
+        connector = DeadlineWeatherApiConnectorMock(delay=0)
+        connector.get_current_weather_for_location = mock.Mock(side_effect=WeatherConnectorConnectionError("Could not connect."))
+        self.assertEqual(PrintCurrentWeatherCommand(connector, Location("Bilbao", "ES"), output=io.StringIO()).execute(),
+            CommandResultStatus.CONNECTION_ERROR)
     
 class WeatherForecastCommandTestCase(TestCase):
 
@@ -94,5 +140,68 @@ class WeatherForecastCommandTestCase(TestCase):
         result= command.execute()
         self.assertEqual(result, CommandResultStatus.SUCCESS)
 
+class BatchCommandTestCase(TestCase):
+
+    def setUp(self):
+        self._delay = 0.1
+        self._connector = SlowWeatherApiConnectorMock(self._delay, "Atlantis")
+
+    def _create_command(self, cities: List[str], output: io.StringIO) -> BatchCommand:
+        labeled_command_builders = [
+            (city, functools.partial(PrintCurrentWeatherCommand, self._connector, Location(city, "ES"), Units.METRIC))
+            for city in cities]
+        return BatchCommand(labeled_command_builders, max_workers=len(cities), output=output)
+
+    def test_given_failing_location_when_command_is_executed_then_other_locations_succeed(self):
+        results = self._create_command(["Bilbao", "Atlantis", "Teruel"], io.StringIO()).execute()
+        statuses = [result.status for result in results]
+        self.assertEqual(statuses, [CommandResultStatus.SUCCESS, CommandResultStatus.ERROR, CommandResultStatus.SUCCESS])
+
+    def test_given_many_locations_when_command_is_executed_then_output_keeps_locations_order(self):
+        output = io.StringIO()
+        self._create_command(["Bilbao", "Teruel", "Madrid"], output).execute()
+        printed_text = output.getvalue()
+        self.assertLess(printed_text.index("BILBAO"), printed_text.index("TERUEL"))
+        self.assertLess(printed_text.index("TERUEL"), printed_text.index("MADRID"))
+
+    def test_given_many_locations_when_command_is_executed_then_locations_are_fetched_concurrently(self):
+        cities = ["Bilbao", "Teruel", "Madrid", "Sevilla"]
+        start_time = time.perf_counter()
+        self._create_command(cities, io.StringIO()).execute()
+        self.assertLess(time.perf_counter() - start_time, self._delay * len(cities))
+
+class ChangingWeatherApiConnectorMock(WeatherApiConnectorMock):
+    """Connector whose forecast for the last day gets one degree warmer on every request.
+    """
+    def __init__(self):
+        super().__init__(date(2022, 1, 1), "Sunny", 5)
+        self.forecast_requests = 0
+
+    def get_weather_forecast_for_location(self, location: Location, units: Units, days: int = 5) -> List[WeatherInfo]:
+        forecast = super().get_weather_forecast_for_location(location, units, days)
+        self.forecast_requests += 1
+        last_day = forecast[-1]._replace(temperature=Temperature(5 + self.forecast_requests, units))
+        return forecast[:-1] + [last_day]
+
+class WatchCommandTestCase(TestCase):
+
+    def test_given_interval_below_minimum_when_validating_data_then_one_validation_message_returned(self):
+        validation_error_messages, _ = WatchCommand.validate_arguments("Bilbao,ES", "metric", "3", "5")
+        self.assertEqual(len(validation_error_messages), 1)
+        validation_error_messages, validated_input = WatchCommand.validate_arguments("Bilbao,ES", "metric", "3", "30")
+        self.assertEqual(len(validation_error_messages), 0)
+        self.assertEqual(validated_input[WatchCommand.INTERVAL], 30)
+
+    def test_given_changing_forecast_when_polling_then_only_changed_lines_are_redrawn(self):
+        output = io.StringIO()
+        sleeps = []
+        command = WatchCommand(ChangingWeatherApiConnectorMock(), Location("Bilbao", "ES"), Units.METRIC, 3, 30,
+            polls=2, sleep=sleeps.append, renderer=LineDiffRenderer(output, is_terminal=False))
+        self.assertEqual(command.execute(), CommandResultStatus.SUCCESS)
+        redrawn_lines = output.getvalue().splitlines()[16:]
+        self.assertEqual(sleeps, [30])
+        self.assertEqual(len(redrawn_lines), 1)
+        self.assertTrue(redrawn_lines[0].endswith(" 2022-01-03 > Temperature: 7.00 ºC"))
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,57 @@
+from typing import List, Optional
+from unittest import TestCase, main
+import json
+import time
+import importlib.resources as resources
+from weatherconsoleapp.connectors import AccuWeatherApiConnector
+from weatherconsoleapp.connectors.deadlines import get_remaining_time, get_request_deadline, request_deadline, split_request_deadline
+from weatherconsoleapp.connectors.errors import DeadlineExceeded
+from weatherconsoleapp.connectors.requests_factories import BaseRequestsFactory
+from weatherconsoleapp.domain import Location, Units
+from tests import resources as test_resources
+
+class DeadlineRecordingRequestsFactoryMock(BaseRequestsFactory):
+
+    def __init__(self):
+        self.remaining_times: List[Optional[float]] = []
+
+    def get(self, url: str, params: Optional[dict] = None) -> dict:
+        self.remaining_times.append(get_remaining_time())
+        filename = "location_key_without_details.json" if "locations" in url else "current_weather_without_details.json"
+        return json.loads(resources.read_text(test_resources, filename))
+
+class RequestDeadlineTest(TestCase):
+
+    def test_given_nested_deadlines_when_entering_then_enclosing_deadline_is_never_extended(self):
+        self.assertIsNone(get_request_deadline())
+        with request_deadline(1) as outer:
+            with request_deadline(60) as inner:
+                self.assertIs(inner, outer)
+            with request_deadline(None) as inner:
+                self.assertIs(inner, outer)
+            with request_deadline(0.5) as inner:
+                self.assertLess(inner.expires_at, outer.expires_at)
+        self.assertIsNone(get_request_deadline())
+
+    def test_given_expired_deadline_when_getting_remaining_time_then_deadline_exceeded_is_raised(self):
+        with request_deadline(0.01):
+            time.sleep(0.02)
+            with self.assertRaises(DeadlineExceeded):
+                get_remaining_time()
+
+    def test_given_deadline_when_location_key_is_requested_then_it_gets_half_the_time_left(self):
+        requests_factory = DeadlineRecordingRequestsFactoryMock()
+        connector = AccuWeatherApiConnector("apikey", requests_factory)
+        with request_deadline(10):
+            connector.get_current_weather_for_location(Location("Bilbao", "ES"), Units.METRIC)
+        location_key_time, current_weather_time = requests_factory.remaining_times
+        self.assertAlmostEqual(location_key_time, 5, delta=0.5)
+        self.assertAlmostEqual(current_weather_time, 10, delta=0.5)
+
+    def test_given_no_deadline_when_splitting_then_requests_stay_unbounded(self):
+        with split_request_deadline(2) as deadline:
+            self.assertIsNone(deadline)
+            self.assertIsNone(get_remaining_time())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+from unittest import TestCase, main
+import io
+import tempfile
+from weatherconsoleapp.config import HttpSettings
+from weatherconsoleapp.connectors import AccuWeatherApiConnector
+from weatherconsoleapp.connectors.errors import WeatherConnectorTimeout
+from weatherconsoleapp.connectors.accuweather_requests import CurrentWeatherRequest, WeatherForecastRequest, parsed_responses
+from weatherconsoleapp.connectors.requests_factories import RequestsFactory
+from weatherconsoleapp.connectors.response_cache import CachingRequestsFactory, ResponseCache
+from weatherconsoleapp.domain import Location, Units
+from weatherconsoleapp.commands import CommandResultStatus, WatchCommand
+from weatherconsoleapp.formatters import LineDiffRenderer
+from weatherconsoleapp import metrics
+from tests.fakes.accuweather_server import FakeAccuWeatherServer
+from benchmarks import load
+
+class FakeAccuWeatherServerTest(TestCase):
+
+    def _create_connector(self, server: FakeAccuWeatherServer, **settings) -> AccuWeatherApiConnector:
+        requests_factory = RequestsFactory(HttpSettings(**settings))
+        self.addCleanup(requests_factory.close)
+        return AccuWeatherApiConnector("apikey", requests_factory, api_url=server.url)
+
+    def test_given_api_url_when_requesting_every_endpoint_then_fixtures_are_served(self):
+        with FakeAccuWeatherServer() as server:
+            connector = self._create_connector(server)
+            current_weather = connector.get_current_weather_for_location(Location("Bilbao", "ES"), Units.METRIC)
+            forecast = connector.get_weather_forecast_for_location(Location("Bilbao", "ES"), Units.METRIC, 3)
+            hourly_forecast = connector.get_hourly_forecast_for_location(Location("Bilbao", "ES"), Units.METRIC, 12)
+        self.assertEqual(current_weather.weather_description, "Light rain")
+        self.assertEqual(len(forecast), 3)
+        self.assertEqual(len(hourly_forecast), 12)
+        self.assertEqual(server.request_counts["location_key"], 3)
+
+    def test_given_injected_timeouts_when_requesting_then_connector_times_out(self):
+        with FakeAccuWeatherServer(timeout_rate=1, timeout_delay=5) as server:
+            connector = self._create_connector(server, read_timeout=0.1, max_retries=0)
+            with self.assertRaises(WeatherConnectorTimeout):
+                connector.get_current_weather_for_location(Location("Bilbao", "ES"), Units.METRIC)
+
+    def test_given_injected_errors_when_generating_load_then_failures_and_percentiles_are_reported(self):
+        with FakeAccuWeatherServer(error_rate=1, seed=1) as server:
+            results = load.run_load(server.url, concurrency=4, requests=8, settings=HttpSettings(max_retries=0))
+        self.assertEqual(results["failed"], 8)
+        self.assertEqual(results["succeeded"], 0)
+        self.assertLessEqual(results["latency_ms"]["p50"], results["latency_ms"]["p99"])
+
+    def test_given_sorted_latencies_when_computing_percentiles_then_nearest_rank_is_returned(self):
+        latencies = [float(value) for value in range(1, 101)]
+        self.assertEqual(load.percentile(latencies, 0.5), 50.0)
+        self.assertEqual(load.percentile(latencies, 0.99), 99.0)
+        self.assertEqual(load.percentile([], 0.5), 0.0)
+
+    def test_given_unchanged_payloads_when_watching_then_responses_are_revalidated_and_not_parsed_again(self):
+        metrics.registry.reset()
+        parsed_responses.clear()
+        output = io.StringIO()
+        with FakeAccuWeatherServer() as server, tempfile.TemporaryDirectory() as dirname:
+            requests_factory = RequestsFactory(HttpSettings(max_retries=0))
+            self.addCleanup(requests_factory.close)
+            caching_factory = CachingRequestsFactory(requests_factory, ResponseCache(dirname),
+                {CurrentWeatherRequest.request_url: 600, WeatherForecastRequest.request_url: 600})
+            connector = AccuWeatherApiConnector("apikey", caching_factory, api_url=server.url)
+            # A zero interval revalidates the cached responses on every poll.
+            command = WatchCommand(connector, Location("Bilbao", "ES"), Units.METRIC, 3, 0,
+                polls=3, sleep=lambda _: None, renderer=LineDiffRenderer(output, is_terminal=False))
+            status = command.execute()
+        self.assertEqual(status, CommandResultStatus.SUCCESS)
+        self.assertEqual(server.not_modified_count, 4)
+        self.assertEqual(metrics.registry.get_span_stats("parse", endpoint="forecasts/v1/daily/5day").count, 1)
+        self.assertEqual(len(output.getvalue().splitlines()), 16)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+from unittest import TestCase, main
+from datetime import date
+import io
+import csv
+import json
+import functools
+from weatherconsoleapp.commands import PrintCurrentWeatherCommand, BatchCommand, WeatherReport
+from weatherconsoleapp.domain import Location, Units, WeatherInfo, Temperature, Date
+from weatherconsoleapp.formatters import CsvFormatter, JsonFormatter, JsonLinesFormatter, LineDiffRenderer, ReportWriter, TextFormatter, create_formatter
+from tests.test_commands import WeatherApiConnectorMock
+
+class CountingStringIO(io.StringIO):
+
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, text: str) -> int:
+        self.writes += 1
+        return super().write(text)
+
+class FormattersTest(TestCase):
+
+    def setUp(self):
+        location = Location("Bilbao", "ES")
+        weather_infos = [WeatherInfo(Date(date(2022, 1, day)), location, Temperature(5.5, Units.METRIC), "Sunny") for day in (1, 2)]
+        self._report = WeatherReport(location, weather_infos)
+
+    def _write(self, formatter, reports) -> str:
+        output = io.StringIO()
+        with ReportWriter(formatter, output) as writer:
+            for report in reports:
+                writer.write_report(report)
+        return output.getvalue()
+
+    def test_given_report_when_formatting_text_then_output_matches_console_output(self):
+        self.assertEqual(
+            TextFormatter().format_report(self._report),
+            "BILBAO (ES)\nJan 01, 2022\n> Weather: Sunny.\n> Temperature: 5.50 ºC\nJan 02, 2022\n> Weather: Sunny.\n> Temperature: 5.50 ºC\n")
+
+    def test_given_reports_when_writing_json_then_a_single_array_of_records_is_written(self):
+        records = json.loads(self._write(JsonFormatter(), [self._report, self._report]))
+        self.assertEqual(len(records), 4)
+        self.assertEqual(records[0], {
+            "city": "Bilbao", "country_code": "ES", "date": "2022-01-01", "weather": "Sunny", "temperature": 5.5, "units": "metric"})
+        self.assertEqual(json.loads(self._write(JsonFormatter(), [])), [])
+
+    def test_given_reports_when_writing_jsonl_then_one_object_per_line_is_written(self):
+        lines = self._write(JsonLinesFormatter(), [self._report]).splitlines()
+        self.assertEqual([json.loads(line)["date"] for line in lines], ["2022-01-01", "2022-01-02"])
+
+    def test_given_reports_when_writing_csv_then_header_is_written_once(self):
+        rows = list(csv.DictReader(io.StringIO(self._write(CsvFormatter(), [self._report, self._report]))))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[3]["temperature"], "5.5")
+
+    def test_given_many_small_reports_when_writing_then_writes_are_buffered(self):
+        output = CountingStringIO()
+        with ReportWriter(JsonLinesFormatter(), output, buffer_size=1024) as writer:
+            for _ in range(100):
+                writer.write_report(self._report)
+        self.assertEqual(len(output.getvalue().splitlines()), 200)
+        self.assertLess(output.writes, 30)
+
+    def test_given_unknown_format_when_creating_formatter_then_value_error_is_raised(self):
+        with self.assertRaises(ValueError):
+            create_formatter("xml")
+
+    def test_given_batch_command_when_writing_json_then_locations_are_written_in_order_as_one_array(self):
+        connector = WeatherApiConnectorMock(Date(date(2022, 1, 1)), "Sunny", 5)
+        formatter = JsonFormatter()
+        labeled_command_builders = ((city, functools.partial(PrintCurrentWeatherCommand, connector, Location(city, "ES"), formatter=formatter))
+            for city in ("Bilbao", "Teruel", "Madrid"))
+        output = io.StringIO()
+        with ReportWriter(formatter, output) as writer:
+            list(BatchCommand(labeled_command_builders, max_workers=1, output=writer).iter_results())
+        self.assertEqual([record["city"] for record in json.loads(output.getvalue())], ["Bilbao", "Teruel", "Madrid"])
+
+class LineDiffRendererTest(TestCase):
+
+    def test_given_terminal_when_one_line_changes_then_only_that_line_is_rewritten_in_place(self):
+        output = io.StringIO()
+        renderer = LineDiffRenderer(output, is_terminal=True)
+        renderer.render(["BILBAO (ES)", "> Temperature: 5.50 ºC", ""])
+        self.assertEqual(renderer.render(["BILBAO (ES)", "> Temperature: 6.50 ºC", ""]), 1)
+        self.assertTrue(output.getvalue().endswith("\x1b[2F\x1b[2K> Temperature: 6.50 ºC\x1b[2E"))
+
+    def test_given_terminal_when_block_length_changes_then_block_is_redrawn(self):
+        output = io.StringIO()
+        renderer = LineDiffRenderer(output, is_terminal=True)
+        renderer.render(["BILBAO (ES)", ""])
+        self.assertEqual(renderer.render(["BILBAO (ES)", "> Weather: Sunny.", ""]), 3)
+        self.assertIn("\x1b[2F\x1b[J", output.getvalue())
+
+    def test_given_unchanged_lines_when_rendering_then_nothing_is_written(self):
+        output = io.StringIO()
+        renderer = LineDiffRenderer(output, is_terminal=False)
+        renderer.render(["BILBAO (ES)"])
+        self.assertEqual(renderer.render(["BILBAO (ES)"], prefix="12:00:00 "), 0)
+        self.assertEqual(output.getvalue(), "BILBAO (ES)\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+from typing import Optional
+from unittest import TestCase, main, mock
+import json
+import pathlib
+import tempfile
+import importlib.resources as resources
+from weatherconsoleapp.connectors import AccuWeatherApiConnector
+from weatherconsoleapp.connectors.location_key_cache import LocationKeyCache
+from weatherconsoleapp.connectors.requests_factories import BaseRequestsFactory
+from weatherconsoleapp.domain import Location, Units
+from weatherconsoleapp.gazetteer import Gazetteer, GazetteerEntry, read_seed_file
+from tests import resources as test_resources
+
+ENTRIES = [
+    GazetteerEntry("Bilbao", "ES", "309382"),
+    GazetteerEntry("Barcelona", "ES", "307297"),
+    GazetteerEntry("Badajoz", "ES", "307290"),
+    GazetteerEntry("Málaga", "ES", "308526"),
+    GazetteerEntry("Paris", "FR", "623"),
+    GazetteerEntry("Bilbao", "PH", "264884"),
+]
+
+class CountingRequestsFactoryMock(BaseRequestsFactory):
+
+    def __init__(self):
+        self.requested_urls = []
+
+    def get(self, url: str, params: Optional[dict] = None) -> dict:
+        self.requested_urls.append(url)
+        filename = "location_key_without_details.json" if "locations" in url else "current_weather_without_details.json"
+        return json.loads(resources.read_text(test_resources, filename))
+
+class GazetteerTest(TestCase):
+
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._temp_dir.cleanup)
+        self._filepath = pathlib.Path(self._temp_dir.name, Gazetteer.FILENAME)
+
+    def _build(self, entries=ENTRIES) -> Gazetteer:
+        Gazetteer.build(self._filepath, entries)
+        gazetteer = Gazetteer(self._filepath)
+        self.addCleanup(gazetteer.close)
+        return gazetteer
+
+    def test_given_seeded_gazetteer_when_getting_equivalent_location_then_entry_returned(self):
+        gazetteer = self._build()
+        self.assertEqual(len(gazetteer), 6)
+        self.assertEqual(gazetteer.get(Location(" BILBAO", "es")), GazetteerEntry("Bilbao", "ES", "309382"))
+        self.assertEqual(gazetteer.get(Location("malaga", "ES")).key_code, "308526")
+        self.assertEqual(gazetteer.get(Location("Bilbao", "PH")).key_code, "264884")
+        self.assertIsNone(gazetteer.get(Location("Bilba", "ES")))
+        self.assertIsNone(gazetteer.get(Location("Paris", "ES")))
+
+    def test_given_seeded_gazetteer_when_finding_prefix_then_cities_of_the_country_returned_in_order(self):
+        gazetteer = self._build()
+        self.assertEqual([entry.city for entry in gazetteer.find_prefix("ES", "ba")], ["Badajoz", "Barcelona"])
+        self.assertEqual(gazetteer.find_prefix("ES", "b", limit=1), [GazetteerEntry("Badajoz", "ES", "307290")])
+        self.assertEqual(gazetteer.find_prefix("FR", "Bil"), [])
+
+    def test_given_misspelled_location_when_checking_then_suggestions_given_and_rejected_only_if_strict(self):
+        gazetteer = self._build()
+        self.assertEqual(gazetteer.suggest(Location("Bilboa", "ES")), [GazetteerEntry("Bilbao", "ES", "309382")])
+        self.assertEqual(gazetteer.get_suggestion_message(Location("Bilboa", "ES")),
+            "Unknown location Bilboa,ES. Did you mean: Bilbao,ES?")
+        self.assertIsNone(gazetteer.get_unknown_location_message(Location("Bilboa", "ES")))
+        self.assertEqual(gazetteer.get_unknown_location_message(Location("Bilboa", "ES"), strict=True),
+            "Unknown location Bilboa,ES. Did you mean: Bilbao,ES?")
+        self.assertIsNone(gazetteer.get_suggestion_message(Location("Bilbao", "ES")))
+
+    def test_given_unindexed_city_prefix_of_indexed_city_when_checking_then_not_rejected(self):
+        gazetteer = self._build([GazetteerEntry("Newcastle upon Tyne", "GB", "329683"), GazetteerEntry("Yorkton", "CA", "49562")])
+        self.assertIsNone(gazetteer.get_unknown_location_message(Location("Newcastle", "GB")))
+        self.assertIsNone(gazetteer.get_unknown_location_message(Location("York", "CA")))
+        self.assertEqual(gazetteer.get_suggestion_message(Location("York", "CA")),
+            "Unknown location York,CA. Did you mean: Yorkton,CA?")
+
+    def test_given_large_country_when_suggesting_then_only_a_window_of_cities_is_scanned(self):
+        entries = [GazetteerEntry(f"Town {index:05d}", "ES", str(index)) for index in range(3 * Gazetteer.SUGGESTION_SCAN_LIMIT)]
+        gazetteer = self._build(entries + ENTRIES + [GazetteerEntry("Tarragona", "ES", "307294")])
+        with mock.patch.object(gazetteer, "_get_record", wraps=gazetteer._get_record) as get_record:
+            self.assertEqual(gazetteer.suggest(Location("Taragona", "ES")), [GazetteerEntry("Tarragona", "ES", "307294")])
+        self.assertLess(get_record.call_count, Gazetteer.SUGGESTION_SCAN_LIMIT + 100)
+        self.assertEqual(gazetteer.suggest(Location("Bilboa", "ES")), [GazetteerEntry("Bilbao", "ES", "309382")])
+
+    def test_given_unknown_location_without_suggestions_when_checking_then_rejected_only_if_strict(self):
+        gazetteer = self._build()
+        self.assertIsNone(gazetteer.get_unknown_location_message(Location("Zaragoza", "ES")))
+        self.assertEqual(gazetteer.get_unknown_location_message(Location("Zaragoza", "ES"), strict=True),
+            "Unknown location Zaragoza,ES.")
+        self.assertFalse(gazetteer.has_country("DE"))
+
+    def test_given_repeated_locations_when_building_then_last_entry_wins(self):
+        gazetteer = self._build(ENTRIES + [GazetteerEntry("PARIS", "fr", "12345")])
+        self.assertEqual(len(gazetteer), 6)
+        self.assertEqual(gazetteer.get(Location("Paris", "FR")), GazetteerEntry("PARIS", "FR", "12345"))
+
+    def test_given_missing_or_corrupt_file_when_opening_then_none_returned(self):
+        self.assertIsNone(Gazetteer.open(self._filepath))
+        self._filepath.write_bytes(b"not a gazetteer")
+        with self.assertLogs("weatherconsoleapp.gazetteer", "WARNING"):
+            self.assertIsNone(Gazetteer.open(self._filepath))
+
+    def test_given_seed_files_when_reading_then_entries_returned(self):
+        listing_filepath = pathlib.Path(self._temp_dir.name, "topcities.json")
+        listing_filepath.write_text(resources.read_text(test_resources, "location_key_without_details.json"), encoding="utf-8")
+        csv_filepath = pathlib.Path(self._temp_dir.name, "cities.csv")
+        csv_filepath.write_text("city,country_code,key\nParis,FR,623\n", encoding="utf-8")
+        cache = LocationKeyCache(pathlib.Path(self._temp_dir.name, LocationKeyCache.FILENAME))
+        cache.put(Location("San Sebastián", "ES"), "309381")
+
+        self.assertEqual(read_seed_file(listing_filepath), [GazetteerEntry("Bilbao", "ES", "309382")])
+        self.assertEqual(read_seed_file(csv_filepath), [GazetteerEntry("Paris", "FR", "623")])
+        self.assertEqual(read_seed_file(pathlib.Path(self._temp_dir.name, LocationKeyCache.FILENAME)),
+            [GazetteerEntry("San Sebastián", "ES", "309381")])
+
+    def test_given_seeded_gazetteer_when_requesting_known_location_then_key_resolved_without_request(self):
+        requests_factory = CountingRequestsFactoryMock()
+        connector = AccuWeatherApiConnector("apikey", requests_factory, gazetteer=self._build())
+        connector.get_current_weather_for_location(Location("Bilbao", "ES"), Units.METRIC)
+        connector.get_current_weather_for_location(Location("Zaragoza", "ES"), Units.METRIC)
+        self.assertEqual(len([url for url in requests_factory.requested_urls if "locations" in url]), 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+from typing import List
+from unittest import TestCase, main
+from datetime import date
+import time
+import threading
+from weatherconsoleapp.connectors import WeatherApiConnector
+from weatherconsoleapp.connectors.errors import WeatherConnectorTimeout
+from weatherconsoleapp.connectors.hedged_connector import HedgedWeatherApiConnector, ProviderHealth
+from weatherconsoleapp.domain import Date, Location, Temperature, Units, WeatherInfo
+from weatherconsoleapp import metrics
+
+LOCATION = Location("Bilbao", "ES")
+
+class ConnectorMock(WeatherApiConnector):
+
+    def __init__(self, description: str, delay: float = 0.0, error: BaseException = None):
+        self._description = description
+        self.delay = delay
+        self.error = error
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def get_current_weather_for_location(self, location: Location, unit: Units) -> WeatherInfo:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return WeatherInfo(Date(date(2022, 11, 19)), location, Temperature(8.0, unit), self._description)
+
+    def get_weather_forecast_for_location(self, location: Location, unit: Units, days: int = 5) -> List[WeatherInfo]:
+        return [self.get_current_weather_for_location(location, unit)] * days
+
+class ClockMock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+class HedgedWeatherApiConnectorTest(TestCase):
+
+    def setUp(self):
+        metrics.registry.reset()
+
+    def _create_connector(self, primary: ConnectorMock, secondary: ConnectorMock, **kwargs) -> HedgedWeatherApiConnector:
+        connector = HedgedWeatherApiConnector([("primary", primary), ("secondary", secondary)], **kwargs)
+        self.addCleanup(connector.close)
+        return connector
+
+    def test_given_fast_primary_when_getting_weather_then_secondary_is_not_called(self):
+        primary, secondary = ConnectorMock("primary"), ConnectorMock("secondary")
+        connector = self._create_connector(primary, secondary)
+        weather_info = connector.get_current_weather_for_location(LOCATION, Units.METRIC)
+        self.assertEqual(weather_info.weather_description, "primary")
+        self.assertEqual(secondary.calls, 0)
+
+    def test_given_slow_primary_when_hedge_delay_elapses_then_secondary_result_is_returned(self):
+        primary, secondary = ConnectorMock("primary", delay=1.0), ConnectorMock("secondary")
+        connector = self._create_connector(primary, secondary, default_hedge_delay=0.05)
+        start_time = time.perf_counter()
+        weather_info = connector.get_current_weather_for_location(LOCATION, Units.METRIC)
+        self.assertLess(time.perf_counter() - start_time, 0.5)
+        self.assertEqual(weather_info.weather_description, "secondary")
+        self.assertEqual(metrics.registry.get_counter("weatherconsoleapp_hedged_requests_total", provider="secondary", reason="slow"), 1)
+
+    def test_given_failing_primary_when_getting_forecast_then_secondary_is_called_without_waiting(self):
+        primary = ConnectorMock("primary", error=WeatherConnectorTimeout("Timed out."))
+        secondary = ConnectorMock("secondary")
+        connector = self._create_connector(primary, secondary, default_hedge_delay=5.0)
+        start_time = time.perf_counter()
+        forecast = connector.get_weather_forecast_for_location(LOCATION, Units.METRIC, 2)
+        self.assertLess(time.perf_counter() - start_time, 1.0)
+        self.assertEqual([weather_info.weather_description for weather_info in forecast], ["secondary", "secondary"])
+        self.assertEqual(metrics.registry.get_counter("weatherconsoleapp_hedged_requests_total", provider="secondary", reason="error"), 1)
+
+    def test_given_every_provider_failing_when_getting_weather_then_first_error_is_raised(self):
+        primary = ConnectorMock("primary", error=WeatherConnectorTimeout("Timed out."))
+        secondary = ConnectorMock("secondary", delay=0.05, error=ValueError("Not found."))
+        connector = self._create_connector(primary, secondary)
+        with self.assertRaises(WeatherConnectorTimeout):
+            connector.get_current_weather_for_location(LOCATION, Units.METRIC)
+
+    def test_given_primary_error_rate_spike_when_getting_weather_then_secondary_becomes_first_until_cooldown(self):
+        clock = ClockMock()
+        primary = ConnectorMock("primary", error=ValueError("Server error."))
+        secondary = ConnectorMock("secondary")
+        connector = self._create_connector(primary, secondary, min_calls=4, failover_cooldown=60, clock=clock)
+        for _ in range(4):
+            connector.get_current_weather_for_location(LOCATION, Units.METRIC)
+        self.assertEqual(primary.calls, 4)
+
+        connector.get_current_weather_for_location(LOCATION, Units.METRIC)
+        self.assertEqual(primary.calls, 4)
+        self.assertEqual(secondary.calls, 5)
+
+        primary.error = None
+        clock.now = 61
+        weather_info = connector.get_current_weather_for_location(LOCATION, Units.METRIC)
+        self.assertEqual(weather_info.weather_description, "primary")
+
+    def test_given_slow_primary_when_getting_weather_repeatedly_then_calls_share_bounded_threads(self):
+        primary, secondary = ConnectorMock("primary", delay=0.2), ConnectorMock("secondary")
+        connector = self._create_connector(primary, secondary, default_hedge_delay=0.01, max_workers=2)
+        for _ in range(5):
+            connector.get_current_weather_for_location(LOCATION, Units.METRIC)
+        self.assertLessEqual(len([thread for thread in threading.enumerate() if thread.name.startswith("hedged")]), 2)
+
+    def test_given_no_providers_when_creating_then_error_is_raised(self):
+        with self.assertRaises(ValueError):
+            HedgedWeatherApiConnector([])
+
+class ProviderHealthTest(TestCase):
+
+    def test_given_latencies_when_getting_quantile_then_nearest_rank_is_returned(self):
+        health = ProviderHealth()
+        self.assertIsNone(health.get_latency_quantile(0.95))
+        for latency in range(1, 21):
+            health.record_success(latency / 100)
+        health.record_failure()
+        self.assertEqual(health.get_latency_quantile(0.95), 0.19)
+        self.assertEqual(health.get_latency_quantile(0.5), 0.10)
+        self.assertEqual(health.get_error_rate(), (1 / 21, 21))
+
+    def test_given_window_when_recording_more_calls_then_oldest_are_forgotten(self):
+        health = ProviderHealth(window=3)
+        health.record_failure()
+        for _ in range(3):
+            health.record_success(0.1)
+        self.assertEqual(health.get_error_rate(), (0.0, 3))
+
+if __name__ == "__main__":
+    main()
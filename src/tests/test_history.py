@@ -0,0 +1,129 @@
+from unittest import TestCase, main, skipUnless
+from datetime import date, timedelta
+from typing import List
+import io
+import pathlib
+import tempfile
+import importlib.util
+from weatherconsoleapp.commands import PrintHistoryCommand, CommandResultStatus
+from weatherconsoleapp.connectors import WeatherApiConnector
+from weatherconsoleapp.connectors.location_key_cache import LocationKeyCache
+from weatherconsoleapp.domain import Date, Location, Temperature, Units, WeatherInfo
+from weatherconsoleapp.formatters import CsvFormatter
+from weatherconsoleapp.history import CURRENT, FORECAST, HistoryStore, RecordingConnector
+
+BILBAO = Location("Bilbao", "ES")
+FIRST_DAY = date(2024, 1, 1)
+
+def create_forecast(location: Location, temperatures: List[float], units: Units = Units.METRIC) -> List[WeatherInfo]:
+    return [WeatherInfo(Date(FIRST_DAY + timedelta(days=day)), location, Temperature(value, units), "Sunny")
+        for day, value in enumerate(temperatures)]
+
+class ForecastConnectorMock(WeatherApiConnector):
+
+    def __init__(self, temperatures: List[float]):
+        self.temperatures = temperatures
+
+    def get_current_weather_for_location(self, location: Location, units: Units) -> WeatherInfo:
+        return create_forecast(location, self.temperatures[:1])[0]
+
+    def get_weather_forecast_for_location(self, location: Location, units: Units, days: int = 5) -> List[WeatherInfo]:
+        return [WeatherInfo(weather_info.date, location, weather_info.temperature.to_units(units), weather_info.weather_description)
+            for weather_info in create_forecast(location, self.temperatures[:days])]
+
+class HistoryStoreTest(TestCase):
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self._dirname = temp_dir.name
+        self._store = HistoryStore(pathlib.Path(self._dirname, HistoryStore.FILENAME))
+        self.addCleanup(self._store.close)
+
+    def test_given_recorded_forecast_when_recording_it_again_in_other_units_then_no_row_added(self):
+        self.assertEqual(self._store.record(FORECAST, create_forecast(BILBAO, [10.0, 12.5, 15.0])), 3)
+        imperial_forecast = [WeatherInfo(info.date, info.location, info.temperature.to_units(Units.IMPERIAL), info.weather_description)
+            for info in create_forecast(BILBAO, [10.0, 12.5, 15.0])]
+        self.assertEqual(self._store.record(FORECAST, imperial_forecast), 0)
+        self.assertEqual(self._store.record(CURRENT, create_forecast(BILBAO, [10.0])), 1)
+
+    def test_given_recorded_forecast_when_recording_revised_forecast_then_latest_revision_kept(self):
+        self._store.record(FORECAST, create_forecast(BILBAO, [10.0, 12.5, 15.0]))
+        self.assertEqual(self._store.record(FORECAST, create_forecast(BILBAO, [10.0, 14.0, 16.0])), 2)
+        self.assertEqual([info.temperature.value for info in self._store.query(BILBAO, FORECAST)], [10.0, 14.0, 16.0])
+        aggregates = self._store.aggregate(BILBAO, FORECAST)
+        self.assertEqual(aggregates.records, 3)
+        self.assertEqual(aggregates.max_temperature, Temperature(16.0, Units.METRIC))
+
+    def test_given_aliases_of_one_location_key_when_recording_then_they_share_the_history(self):
+        location_key_cache = LocationKeyCache(pathlib.Path(self._dirname, LocationKeyCache.FILENAME))
+        location_key_cache.put(Location("San Sebastian", "ES"), "309380")
+        location_key_cache.put(Location("Donostia", "ES"), "309380")
+        store = HistoryStore(pathlib.Path(self._dirname, "aliases.sqlite3"), location_key_cache)
+        self.addCleanup(store.close)
+        store.record(FORECAST, create_forecast(Location("San Sebastian", "ES"), [10.0, 12.0]))
+        store.record(FORECAST, create_forecast(Location("Donostia", "ES"), [10.0, 14.0]))
+        self.assertEqual([info.temperature.value for info in store.query(Location("Donostia", "ES"), FORECAST)], [10.0, 14.0])
+        reopened_store = HistoryStore(pathlib.Path(self._dirname, "aliases.sqlite3"))
+        self.addCleanup(reopened_store.close)
+        self.assertEqual(reopened_store.aggregate(Location("san sebastian", "ES"), FORECAST).records, 2)
+
+    def test_given_recorded_forecast_when_querying_range_then_days_of_range_returned_in_units(self):
+        self._store.record(FORECAST, create_forecast(BILBAO, [10.0, 12.5, 15.0, 20.0]))
+        self._store.record(FORECAST, create_forecast(Location("Paris", "FR"), [0.0, 0.0]))
+        weather_infos = list(self._store.query(Location("bilbao", "ES"), FORECAST, Units.IMPERIAL,
+            FIRST_DAY + timedelta(days=1), FIRST_DAY + timedelta(days=2)))
+        self.assertEqual([info.date for info in weather_infos], [Date(FIRST_DAY + timedelta(days=1)), Date(FIRST_DAY + timedelta(days=2))])
+        self.assertEqual([info.temperature for info in weather_infos], [Temperature(54.5, Units.IMPERIAL), Temperature(59.0, Units.IMPERIAL)])
+        self.assertEqual(list(self._store.query(BILBAO, CURRENT)), [])
+
+    def test_given_recorded_forecast_when_aggregating_then_statistics_computed_for_range(self):
+        self._store.record(FORECAST, create_forecast(BILBAO, [10.0, 12.5, 15.0, 20.0]))
+        aggregates = self._store.aggregate(BILBAO, FORECAST, Units.METRIC, end=FIRST_DAY + timedelta(days=2))
+        self.assertEqual(aggregates.records, 3)
+        self.assertEqual(aggregates.min_temperature, Temperature(10.0, Units.METRIC))
+        self.assertEqual(aggregates.max_temperature, Temperature(15.0, Units.METRIC))
+        self.assertAlmostEqual(aggregates.mean_temperature.value, 12.5)
+        self.assertEqual(self._store.aggregate(BILBAO, CURRENT).records, 0)
+
+    def test_given_recording_connector_when_requesting_forecast_then_forecast_recorded(self):
+        connector = RecordingConnector(ForecastConnectorMock([10.0, 12.5]), self._store)
+        connector.get_weather_forecast_for_location(BILBAO, Units.IMPERIAL, 2)
+        connector.get_current_weather_for_location(BILBAO, Units.METRIC)
+        self.assertEqual(self._store.aggregate(BILBAO, FORECAST).records, 2)
+        self.assertEqual(self._store.aggregate(BILBAO, CURRENT).records, 1)
+
+    def test_given_history_command_when_aggregating_then_statistics_printed(self):
+        self._store.record(FORECAST, create_forecast(BILBAO, [10.0, 20.0]))
+        output = io.StringIO()
+        status = PrintHistoryCommand(self._store, BILBAO, Units.METRIC, FORECAST, aggregate=True, output=output).execute()
+        self.assertEqual(status, CommandResultStatus.SUCCESS)
+        self.assertIn("Records: 2", output.getvalue())
+        self.assertIn("Mean temperature: 15.00 ºC", output.getvalue())
+
+    def test_given_history_command_when_querying_then_records_printed_in_format(self):
+        self._store.record(FORECAST, create_forecast(BILBAO, [10.0, 20.0]))
+        output = io.StringIO()
+        formatter = CsvFormatter()
+        output.write(formatter.header)
+        PrintHistoryCommand(self._store, BILBAO, Units.METRIC, FORECAST, output=output, formatter=formatter).execute()
+        self.assertEqual(len(output.getvalue().splitlines()), 3)
+
+    def test_given_invalid_arguments_when_validating_history_command_then_errors_returned(self):
+        messages, validated_input = PrintHistoryCommand.validate_arguments("Bilbao,ES", "metric", "daily", "2024-01-05", "2024-01-01")
+        self.assertEqual(len(messages), 2)
+        messages, validated_input = PrintHistoryCommand.validate_arguments("Bilbao,ES", "metric", "forecast", "2024-01-01", None)
+        self.assertEqual(messages, [])
+        self.assertEqual(validated_input[PrintHistoryCommand.START], FIRST_DAY)
+
+    @skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow is not installed")
+    def test_given_recorded_forecast_when_exporting_to_parquet_then_every_row_written(self):
+        import pyarrow.parquet
+
+        self._store.record(FORECAST, create_forecast(BILBAO, [10.0, 12.5, 15.0]))
+        filepath = pathlib.Path(self._dirname, "history.parquet")
+        self.assertEqual(self._store.export(filepath, batch_size=2), 3)
+        self.assertEqual(pyarrow.parquet.read_table(filepath).column("temperature").to_pylist(), [10.0, 12.5, 15.0])
+
+if __name__ == "__main__":
+    main()
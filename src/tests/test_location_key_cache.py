@@ -0,0 +1,82 @@
+from typing import Optional
+from unittest import TestCase, main
+import json
+import pathlib
+import tempfile
+import importlib.resources as resources
+from weatherconsoleapp.connectors import AccuWeatherApiConnector
+from weatherconsoleapp.connectors.location_key_cache import LocationKeyCache
+from weatherconsoleapp.connectors.requests_factories import BaseRequestsFactory
+from weatherconsoleapp.domain import Location, Units
+from tests import resources as test_resources
+
+class CountingRequestsFactoryMock(BaseRequestsFactory):
+
+    def __init__(self):
+        self.requested_urls = []
+
+    def get(self, url: str, params: Optional[dict] = None) -> dict:
+        self.requested_urls.append(url)
+        filename = "location_key_without_details.json" if "locations" in url else "current_weather_without_details.json"
+        return json.loads(resources.read_text(test_resources, filename))
+
+class LocationKeyCacheTest(TestCase):
+
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._filepath = pathlib.Path(self._temp_dir.name, LocationKeyCache.FILENAME)
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def test_given_empty_cache_when_getting_location_then_none_returned(self):
+        cache = LocationKeyCache(self._filepath)
+        self.assertIsNone(cache.get(Location("Bilbao", "ES")))
+
+    def test_given_stored_location_when_getting_equivalent_location_then_key_returned(self):
+        cache = LocationKeyCache(self._filepath)
+        cache.put(Location("Bilbao", "ES"), "309382")
+        self.assertEqual(cache.get(Location(" BILBAO", "es")), "309382")
+
+    def test_given_stored_location_when_reading_from_new_instance_then_key_returned(self):
+        LocationKeyCache(self._filepath).put(Location("Bilbao", "ES"), "309382")
+        self.assertEqual(LocationKeyCache(self._filepath).get(Location("Bilbao", "ES")), "309382")
+
+    def test_given_full_cache_when_putting_location_then_least_recently_used_is_evicted(self):
+        cache = LocationKeyCache(self._filepath, max_entries=2)
+        cache.put(Location("Bilbao", "ES"), "1")
+        cache.put(Location("Paris", "FR"), "2")
+        cache.get(Location("Bilbao", "ES"))
+        cache.put(Location("Teruel", "ES"), "3")
+        reloaded_cache = LocationKeyCache(self._filepath, max_entries=2)
+        self.assertEqual(reloaded_cache.get(Location("Bilbao", "ES")), "1")
+        self.assertIsNone(reloaded_cache.get(Location("Paris", "FR")))
+        self.assertEqual(reloaded_cache.get(Location("Teruel", "ES")), "3")
+
+    def test_given_two_writers_when_both_put_then_no_entry_is_lost(self):
+        first_cache = LocationKeyCache(self._filepath)
+        second_cache = LocationKeyCache(self._filepath)
+        first_cache.put(Location("Bilbao", "ES"), "1")
+        second_cache.put(Location("Paris", "FR"), "2")
+        reloaded_cache = LocationKeyCache(self._filepath)
+        self.assertEqual(reloaded_cache.get(Location("Bilbao", "ES")), "1")
+        self.assertEqual(reloaded_cache.get(Location("Paris", "FR")), "2")
+
+    def test_given_corrupt_file_when_using_cache_then_file_is_ignored_and_rewritten(self):
+        self._filepath.write_text("{not json", encoding="utf-8")
+        cache = LocationKeyCache(self._filepath)
+        self.assertIsNone(cache.get(Location("Bilbao", "ES")))
+        cache.put(Location("Bilbao", "ES"), "309382")
+        self.assertEqual(LocationKeyCache(self._filepath).get(Location("Bilbao", "ES")), "309382")
+
+    def test_given_warm_cache_when_requesting_current_weather_then_one_upstream_call_is_made(self):
+        requests_factory = CountingRequestsFactoryMock()
+        connector = AccuWeatherApiConnector("", requests_factory, LocationKeyCache(self._filepath))
+        connector.get_current_weather_for_location(Location("Bilbao", "ES"), Units.METRIC)
+        requests_factory.requested_urls.clear()
+        connector.get_current_weather_for_location(Location("Bilbao", "ES"), Units.METRIC)
+        self.assertEqual(len(requests_factory.requested_urls), 1)
+        self.assertIn("currentconditions", requests_factory.requested_urls[0])
+
+if __name__ == "__main__":
+    main()
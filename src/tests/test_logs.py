@@ -0,0 +1,95 @@
+from unittest import TestCase, main
+import io
+import json
+import pathlib
+import logging
+import tempfile
+import configparser
+from weatherconsoleapp.config import AppConfig, LoggingSettings
+from weatherconsoleapp.logs import LogPipeline, RotationLock, create_file_handler
+
+class LogPipelineTest(TestCase):
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self._dirname = pathlib.Path(temp_dir.name)
+        self._filepath = self._dirname.joinpath("weatherconsoleapp.log")
+        self._logger = logging.getLogger("tests.logs")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        self.addCleanup(setattr, self._logger, "handlers", [])
+
+    def _start(self, settings: LoggingSettings) -> LogPipeline:
+        pipeline = LogPipeline(create_file_handler(self._filepath, settings), settings.queue_size)
+        self._logger.addHandler(pipeline.handler)
+        pipeline.start()
+        self.addCleanup(pipeline.stop)
+        return pipeline
+
+    def test_given_json_format_when_logging_then_records_written_as_json_lines(self):
+        pipeline = self._start(LoggingSettings(format="json"))
+        self._logger.debug("Skipped %s", "record")
+        self._logger.info("Response status code: %s %s", 200, "OK")
+        try:
+            raise ValueError("Unknown city")
+        except ValueError:
+            self._logger.error("Exception raised", exc_info=True)
+        pipeline.stop()
+        pipeline.stop()
+
+        entries = [json.loads(line) for line in self._filepath.read_text(encoding="utf-8").splitlines()]
+        self.assertEqual([entry["message"] for entry in entries], ["Response status code: 200 OK", "Exception raised"])
+        self.assertEqual(entries[0]["level"], "INFO")
+        self.assertEqual(entries[0]["logger"], "tests.logs")
+        self.assertIn("ValueError: Unknown city", entries[1]["exception"])
+
+    def test_given_max_bytes_when_log_grows_then_file_is_rotated(self):
+        pipeline = self._start(LoggingSettings(max_bytes=200, backup_count=2))
+        for index in range(20):
+            self._logger.info("Record number %s of the rotation test", index)
+        pipeline.stop()
+        self.assertEqual(sorted(path.name for path in self._dirname.iterdir()),
+            ["weatherconsoleapp.log", "weatherconsoleapp.log.1", "weatherconsoleapp.log.2", "weatherconsoleapp.log.lock"])
+        self.assertIn("Record number 19", self._filepath.read_text(encoding="utf-8"))
+
+    def test_given_full_queue_when_logging_then_records_dropped_without_blocking(self):
+        pipeline = LogPipeline(logging.StreamHandler(io.StringIO()), queue_size=2)
+        self._logger.addHandler(pipeline.handler)
+        for index in range(5):
+            self._logger.info("Record %s", index)
+        self.assertEqual(pipeline.dropped, 3)
+
+    def test_given_invalid_logging_options_when_reading_config_then_defaults_used(self):
+        parser = configparser.ConfigParser()
+        parser.read_string("[logging]\nlevel=verbose\nformat=JSON\nrotate_when=midnight\n")
+        with self.assertLogs("weatherconsoleapp.config", "WARNING"):
+            settings = AppConfig(parser).get_logging_settings()
+        self.assertEqual(settings, LoggingSettings(level="INFO", format="json", rotate_when="midnight"))
+        self.assertIsInstance(create_file_handler(self._filepath, settings), logging.handlers.TimedRotatingFileHandler)
+
+    def test_given_unknown_rotation_interval_when_reading_config_then_size_rotation_used(self):
+        parser = configparser.ConfigParser()
+        parser.read_string("[logging]\nrotate_when=daily\n")
+        with self.assertLogs("weatherconsoleapp.config", "WARNING"):
+            settings = AppConfig(parser).get_logging_settings()
+        self.assertEqual(settings.rotate_when, "")
+        self.assertIsInstance(create_file_handler(self._filepath, settings), logging.handlers.RotatingFileHandler)
+
+    def test_given_process_rotating_the_file_when_another_one_logs_then_it_only_appends(self):
+        settings = LoggingSettings(max_bytes=100, backup_count=2)
+        rotating_handler = create_file_handler(self._filepath, settings)
+        appending_handler = create_file_handler(self._filepath, settings)
+        self.addCleanup(appending_handler.close)
+        self.addCleanup(rotating_handler.close)
+        record = logging.LogRecord("tests.logs", logging.INFO, __file__, 1, "x" * 80, None, None)
+        for _ in range(3):
+            rotating_handler.handle(record)
+        self.assertFalse(RotationLock(self._filepath).acquire())
+
+        appending_handler.handle(record)
+        appending_handler.handle(record)
+        self.assertEqual(len(self._filepath.read_text(encoding="utf-8").splitlines()), 3)
+
+if __name__ == "__main__":
+    main()
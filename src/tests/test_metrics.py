@@ -0,0 +1,47 @@
+from unittest import TestCase, main
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+from weatherconsoleapp.metrics import MetricsRegistry, profiling
+
+class MetricsRegistryTest(TestCase):
+
+    def setUp(self):
+        self._registry = MetricsRegistry()
+
+    def test_given_labelled_counters_when_incrementing_then_each_label_set_is_counted_apart(self):
+        self._registry.increment("requests_total", status_code=200)
+        self._registry.increment("requests_total", status_code=200)
+        self._registry.increment("requests_total", status_code=503)
+        self.assertEqual(self._registry.get_counter("requests_total", status_code=200), 2)
+        self.assertEqual(self._registry.get_counter("requests_total", status_code=503), 1)
+
+    def test_given_span_raising_when_leaving_then_duration_is_recorded(self):
+        with self.assertRaises(ValueError):
+            with self._registry.span("parse", endpoint="currentconditions/v1"):
+                raise ValueError()
+        self.assertEqual(self._registry.get_span_stats("parse", endpoint="currentconditions/v1").count, 1)
+
+    def test_given_counters_and_spans_when_exporting_prometheus_then_text_format_is_returned(self):
+        self._registry.increment("bytes_total", 512)
+        self._registry.observe("request", 0.25, endpoint='a"b')
+        lines = self._registry.to_prometheus().splitlines()
+        self.assertIn("# TYPE bytes_total counter", lines)
+        self.assertIn("bytes_total 512", lines)
+        self.assertIn('weatherconsoleapp_span_seconds_count{span="request",endpoint="a\\"b"} 1', lines)
+        self.assertIn('weatherconsoleapp_span_seconds_sum{span="request",endpoint="a\\"b"} 0.250000', lines)
+
+    def test_given_active_profile_when_spans_run_in_copied_contexts_then_profile_breaks_them_down_by_phase(self):
+        with profiling() as profile:
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                for _ in range(3):
+                    executor.submit(contextvars.copy_context().run, self._registry.observe, "request", 0.1, endpoint="x")
+            self._registry.observe("render", 0.2)
+        self._registry.observe("render", 0.2)
+        breakdown = dict(profile.get_breakdown())
+        self.assertEqual(list(breakdown), ["request x", "render"])
+        self.assertEqual(breakdown["request x"].count, 3)
+        self.assertEqual(breakdown["render"].count, 1)
+        self.assertIn("request x", profile.format())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+from unittest import TestCase, main
+from benchmarks import micro
+
+class MicroBenchmarksTest(TestCase):
+
+    def test_given_fixtures_when_running_every_case_once_then_results_are_reported_per_case(self):
+        results = micro.run_benchmarks(repeat=1, number=1)
+        self.assertEqual(set(results), set(micro.create_cases()))
+        self.assertTrue(all(result["best_us"] > 0 for result in results.values()))
+
+    def test_given_stored_baseline_when_reading_then_every_case_has_a_baseline(self):
+        self.assertEqual(set(micro.read_baseline()), set(micro.create_cases()))
+
+    def test_given_slower_case_when_comparing_to_baseline_then_only_it_is_a_regression(self):
+        baseline = {"fast": {"best_us": 10.0}, "slow": {"best_us": 10.0}}
+        results = {"fast": {"best_us": 14.0}, "slow": {"best_us": 16.0}, "new": {"best_us": 100.0}}
+        self.assertEqual(micro.find_regressions(results, baseline, tolerance=0.5), ["slow"])
+
+if __name__ == "__main__":
+    main()
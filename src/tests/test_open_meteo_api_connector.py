@@ -0,0 +1,67 @@
+from unittest import TestCase, main
+from datetime import date
+import tempfile
+import pathlib
+from weatherconsoleapp.config import HttpSettings
+from weatherconsoleapp.connectors.location_key_cache import LocationKeyCache
+from weatherconsoleapp.connectors.open_meteo_api_connector import OpenMeteoApiConnector
+from weatherconsoleapp.connectors.open_meteo_requests import describe_weather_code
+from weatherconsoleapp.connectors.requests_factories import RequestsFactory
+from weatherconsoleapp.domain import Location, Units
+from tests.fakes.open_meteo_server import FakeOpenMeteoServer
+
+class OpenMeteoApiConnectorTest(TestCase):
+
+    def _create_connector(self, server: FakeOpenMeteoServer, coordinates_cache: LocationKeyCache = None) -> OpenMeteoApiConnector:
+        requests_factory = RequestsFactory(HttpSettings(max_retries=0))
+        self.addCleanup(requests_factory.close)
+        return OpenMeteoApiConnector(requests_factory, coordinates_cache, server.url, server.url)
+
+    def test_given_location_when_getting_current_weather_then_weather_code_is_described(self):
+        with FakeOpenMeteoServer() as server:
+            weather_info = self._create_connector(server).get_current_weather_for_location(Location("Bilbao", "ES"), Units.METRIC)
+        self.assertEqual(weather_info.date.date, date(2022, 11, 19))
+        self.assertEqual(weather_info.temperature.value, 8.4)
+        self.assertEqual(weather_info.weather_description, "Slight rain")
+
+    def test_given_imperial_units_when_getting_forecast_then_daily_averages_are_converted(self):
+        with FakeOpenMeteoServer() as server:
+            forecast = self._create_connector(server).get_weather_forecast_for_location(Location("Bilbao", "ES"), Units.IMPERIAL, 3)
+        self.assertEqual(len(forecast), 3)
+        self.assertEqual(forecast[0].date.date, date(2022, 11, 19))
+        self.assertAlmostEqual(forecast[0].temperature.value, 50.0)
+        self.assertEqual(forecast[0].temperature.units, Units.IMPERIAL)
+        self.assertEqual(forecast[1].weather_description, "Slight rain showers")
+
+    def test_given_hours_when_getting_hourly_forecast_then_series_is_returned(self):
+        with FakeOpenMeteoServer() as server:
+            series = self._create_connector(server).get_hourly_forecast_for_location(Location("Bilbao", "ES"), Units.METRIC, 12)
+        self.assertEqual(len(series), 12)
+        self.assertEqual(series.timestamps[0], 1668877200)
+        self.assertEqual(series.utc_offsets[0], 3600)
+
+    def test_given_coordinates_cache_when_requesting_twice_then_geocoding_is_requested_once(self):
+        with tempfile.TemporaryDirectory() as dirname, FakeOpenMeteoServer() as server:
+            coordinates_cache = LocationKeyCache(pathlib.Path(dirname, OpenMeteoApiConnector.FILENAME))
+            connector = self._create_connector(server, coordinates_cache)
+            connector.get_current_weather_for_location(Location("Bilbao", "ES"), Units.METRIC)
+            connector.get_current_weather_for_location(Location("bilbao", "es"), Units.METRIC)
+            self.assertEqual(server.request_counts, {"geocoding": 1, "forecast": 2})
+            self.assertEqual(coordinates_cache.get(Location("Bilbao", "ES")), "43.26271,-2.92528")
+
+    def test_given_unknown_country_when_getting_current_weather_then_error_is_raised(self):
+        with FakeOpenMeteoServer() as server:
+            with self.assertRaises(ValueError):
+                self._create_connector(server).get_current_weather_for_location(Location("Bilbao", "FR"), Units.METRIC)
+
+    def test_given_injected_errors_when_getting_current_weather_then_error_is_raised(self):
+        with FakeOpenMeteoServer(error_rate=1) as server:
+            with self.assertRaises(ValueError):
+                self._create_connector(server).get_current_weather_for_location(Location("Bilbao", "ES"), Units.METRIC)
+
+    def test_given_unknown_weather_code_when_describing_then_unknown_is_returned(self):
+        self.assertEqual(describe_weather_code(0), "Clear sky")
+        self.assertEqual(describe_weather_code(42), "Unknown")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+from typing import List, Optional
+from unittest import TestCase, main
+import time
+import pathlib
+import tempfile
+import threading
+from weatherconsoleapp.connectors.requests_factories import BaseRequestsFactory, HttpResponse
+from weatherconsoleapp.connectors.quota_scheduler import (
+    QuotaExhausted, QuotaScheduler, QuotaSchedulingRequestsFactory, QuotaUsageStore, RequestPriority,
+    TokenBucket, request_priority)
+from weatherconsoleapp.connectors.deadlines import Deadline
+from weatherconsoleapp.connectors.errors import DeadlineExceeded
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+class ParamsRecorderRequestsFactoryMock(BaseRequestsFactory):
+
+    def __init__(self):
+        self.params: List[dict] = []
+
+    def get(self, url: str, params: Optional[dict] = None) -> dict:
+        return self.get_response(url, params).json()
+
+    def get_response(self, url: str, params: Optional[dict] = None, headers: Optional[dict] = None) -> HttpResponse:
+        self.params.append(params)
+        return HttpResponse(200, {}, b"{}")
+
+class TokenBucketTest(TestCase):
+
+    def test_given_empty_bucket_when_time_passes_then_tokens_are_refilled(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, capacity=2, clock=clock)
+        self.assertEqual(bucket.try_acquire(), 0)
+        self.assertEqual(bucket.try_acquire(), 0)
+        self.assertAlmostEqual(bucket.try_acquire(), 0.5)
+        clock.now = 0.5
+        self.assertEqual(bucket.try_acquire(), 0)
+
+class QuotaSchedulerTest(TestCase):
+
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._usage_filepath = pathlib.Path(self._temp_dir.name, QuotaUsageStore.FILENAME)
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def test_given_several_apikeys_when_acquiring_then_key_with_most_remaining_quota_is_used(self):
+        scheduler = QuotaScheduler(["first", "second"], daily_limit=10, requests_per_second=100)
+        apikeys = [scheduler.acquire() for _ in range(4)]
+        self.assertEqual(sorted(apikeys), ["first", "first", "second", "second"])
+
+    def test_given_exhausted_daily_quotas_when_acquiring_then_quota_exhausted_is_raised(self):
+        scheduler = QuotaScheduler(["first", "second"], daily_limit=1, requests_per_second=100)
+        scheduler.acquire()
+        scheduler.acquire()
+        with self.assertRaises(QuotaExhausted):
+            scheduler.acquire()
+
+    def test_given_usage_store_when_creating_new_scheduler_then_daily_usage_is_restored(self):
+        scheduler = QuotaScheduler(["first"], 10, 100, QuotaUsageStore(self._usage_filepath))
+        scheduler.acquire()
+        scheduler.acquire()
+        restored_scheduler = QuotaScheduler(["first"], 10, 100, QuotaUsageStore(self._usage_filepath))
+        self.assertEqual(restored_scheduler.snapshot()[0].used_today, 2)
+        self.assertEqual(restored_scheduler.snapshot()[0].remaining_today, 8)
+
+    def test_given_shared_usage_store_when_several_schedulers_acquire_then_daily_limit_is_global(self):
+        schedulers = [QuotaScheduler(["first"], 3, 100, QuotaUsageStore(self._usage_filepath), shared=True) for _ in range(2)]
+        schedulers[0].acquire()
+        schedulers[1].acquire()
+        schedulers[0].acquire()
+        with self.assertRaises(QuotaExhausted):
+            schedulers[1].acquire()
+
+    def test_given_exhausted_daily_quota_when_utc_date_changes_then_requests_are_allowed_again(self):
+        today = "2024-01-01"
+        store = QuotaUsageStore(self._usage_filepath, today=lambda: today)
+        scheduler = QuotaScheduler(["first"], daily_limit=2, requests_per_second=100, usage_store=store, today=lambda: today)
+        scheduler.acquire()
+        scheduler.acquire()
+        with self.assertRaises(QuotaExhausted):
+            scheduler.acquire()
+
+        today = "2024-01-02"
+        self.assertEqual(store.get_usage(), {})
+        self.assertEqual(scheduler.acquire(), "first")
+        self.assertEqual(scheduler.snapshot()[0].used_today, 1)
+        self.assertEqual(store.get_usage()[QuotaUsageStore.hash_apikey("first")], 1)
+
+    def test_given_shared_usage_store_when_rate_is_exceeded_then_wait_is_returned(self):
+        store = QuotaUsageStore(self._usage_filepath)
+        self.assertEqual(store.try_reserve("first", 10, 2, clock=lambda: 100.0), (1, None))
+        self.assertEqual(store.try_reserve("first", 10, 2, clock=lambda: 100.0), (2, None))
+        self.assertEqual(store.try_reserve("first", 10, 2, clock=lambda: 100.0), (None, 0.5))
+        self.assertEqual(store.try_reserve("first", 10, 2, clock=lambda: 100.5), (3, None))
+        self.assertEqual(store.get_usage()[QuotaUsageStore.hash_apikey("first")], 3)
+
+    def test_given_waiting_batch_request_when_interactive_request_arrives_then_interactive_is_served_first(self):
+        scheduler = QuotaScheduler(["first"], daily_limit=20, requests_per_second=10)
+        for _ in range(10):
+            scheduler.acquire()
+        served_priorities = []
+
+        def acquire(priority: RequestPriority):
+            scheduler.acquire(priority)
+            served_priorities.append(priority)
+
+        batch_thread = threading.Thread(target=acquire, args=(RequestPriority.BATCH,))
+        batch_thread.start()
+        time.sleep(0.02)
+        interactive_thread = threading.Thread(target=acquire, args=(RequestPriority.INTERACTIVE,))
+        interactive_thread.start()
+        batch_thread.join()
+        interactive_thread.join()
+        self.assertEqual(served_priorities, [RequestPriority.INTERACTIVE, RequestPriority.BATCH])
+
+    def test_given_token_available_after_deadline_when_acquiring_then_deadline_exceeded_is_raised(self):
+        clock = FakeClock()
+        scheduler = QuotaScheduler(["first"], daily_limit=10, requests_per_second=1, clock=clock)
+        scheduler.acquire(deadline=Deadline(0.5))
+        with self.assertRaises(DeadlineExceeded):
+            scheduler.acquire(deadline=Deadline(0.5))
+        clock.now = 1
+        self.assertEqual(scheduler.acquire(deadline=Deadline(0.5)), "first")
+
+    def test_given_scheduling_factory_when_getting_then_scheduled_apikey_is_sent(self):
+        inner_factory = ParamsRecorderRequestsFactoryMock()
+        scheduler = QuotaScheduler(["scheduled"], daily_limit=10, requests_per_second=100)
+        factory = QuotaSchedulingRequestsFactory(inner_factory, scheduler)
+        with request_priority(RequestPriority.BACKGROUND):
+            factory.get("http://localhost", {"apikey": "configured", "q": "Bilbao"})
+        self.assertEqual(inner_factory.params, [{"apikey": "scheduled", "q": "Bilbao"}])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+from typing import List
+from unittest import TestCase, main
+import json
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from weatherconsoleapp.config import HttpSettings
+from weatherconsoleapp.connectors.requests_factories import RequestsFactory, WeatherConnectorTimeout
+from weatherconsoleapp.connectors.deadlines import request_deadline
+from weatherconsoleapp.connectors.errors import DeadlineExceeded, WeatherConnectorConnectionError
+
+class ScriptedServer(ThreadingHTTPServer):
+    """Local HTTP server answering every GET with the next scripted response.
+    """
+    def __init__(self, responses: List[tuple]):
+        super().__init__(("127.0.0.1", 0), ScriptedRequestHandler)
+        self.responses = responses
+        self.client_ports = []
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/resource"
+
+class ScriptedRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.client_ports.append(self.client_address[1])
+        status_code, headers, delay = self.server.responses.pop(0)
+        if delay > 0:
+            threading.Event().wait(delay)
+        content = json.dumps({"status": status_code}).encode("utf-8")
+        self.send_response(status_code)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+class RequestsFactoryTest(TestCase):
+
+    def _start_server(self, responses: List[tuple]) -> ScriptedServer:
+        server = ScriptedServer(responses)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def _create_factory(self, **settings) -> RequestsFactory:
+        factory = RequestsFactory(HttpSettings(**settings))
+        self.sleeps = []
+        factory._sleep = self.sleeps.append
+        self.addCleanup(factory.close)
+        return factory
+
+    def test_given_consecutive_requests_when_getting_then_connection_is_reused(self):
+        server = self._start_server([(200, {}, 0), (200, {}, 0)])
+        factory = self._create_factory()
+        factory.get(server.url)
+        factory.get(server.url)
+        self.assertEqual(len(set(server.client_ports)), 1)
+
+    def test_given_server_errors_when_getting_then_request_is_retried(self):
+        server = self._start_server([(503, {}, 0), (500, {}, 0), (200, {}, 0)])
+        factory = self._create_factory(max_retries=3)
+        self.assertEqual(factory.get(server.url), {"status": 200})
+        self.assertEqual(len(self.sleeps), 2)
+
+    def test_given_retry_after_header_when_retrying_then_delay_is_honoured(self):
+        server = self._start_server([(429, {"Retry-After": "2"}, 0), (200, {}, 0)])
+        factory = self._create_factory(backoff_factor=0.01)
+        factory.get(server.url)
+        self.assertEqual(self.sleeps, [2.0])
+
+    def test_given_retry_after_longer_than_max_backoff_when_getting_then_response_is_returned(self):
+        server = self._start_server([(429, {"Retry-After": "120"}, 0)])
+        factory = self._create_factory(max_backoff=30)
+        self.assertEqual(factory.get_response(server.url).status_code, 429)
+        self.assertEqual(self.sleeps, [])
+
+    def test_given_exhausted_retries_when_getting_then_last_response_is_returned(self):
+        server = self._start_server([(503, {}, 0), (503, {}, 0)])
+        factory = self._create_factory(max_retries=1)
+        self.assertEqual(factory.get_response(server.url).status_code, 503)
+
+    def test_given_stalled_server_when_getting_then_timeout_is_raised(self):
+        server = self._start_server([(200, {}, 0.5), (200, {}, 0.5)])
+        factory = self._create_factory(read_timeout=0.05, max_retries=1)
+        with self.assertRaises(WeatherConnectorTimeout) as context:
+            factory.get(server.url)
+        self.assertNotIsInstance(context.exception, WeatherConnectorConnectionError)
+
+    def test_given_refused_connection_when_getting_then_connection_error_is_raised(self):
+        with socket.socket() as unused_socket:
+            unused_socket.bind(("127.0.0.1", 0))
+            port = unused_socket.getsockname()[1]
+        factory = self._create_factory(max_retries=1)
+        with self.assertRaises(WeatherConnectorConnectionError) as context:
+            factory.get(f"http://127.0.0.1:{port}/resource")
+        self.assertEqual(str(context.exception), f"Could not connect to 127.0.0.1:{port}.")
+        self.assertEqual(len(self.sleeps), 1)
+
+    def test_given_stalled_server_when_getting_within_deadline_then_deadline_bounds_the_wait(self):
+        server = self._start_server([(200, {}, 0.5), (200, {}, 0.5)])
+        factory = self._create_factory(read_timeout=10, max_retries=3, backoff_factor=1)
+        with request_deadline(0.1), self.assertRaises(DeadlineExceeded):
+            factory.get(server.url)
+        self.assertEqual(len(server.client_ports), 1)
+
+    def test_given_retry_after_beyond_deadline_when_getting_then_response_is_returned(self):
+        server = self._start_server([(503, {"Retry-After": "5"}, 0)])
+        factory = self._create_factory()
+        with request_deadline(1):
+            self.assertEqual(factory.get_response(server.url).status_code, 503)
+        self.assertEqual(self.sleeps, [])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+from typing import Dict, List, Optional
+from unittest import TestCase, main
+import time
+import pathlib
+import tempfile
+import importlib.resources as resources
+from weatherconsoleapp.connectors.accuweather_requests import LocationKey, WeatherForecastRequest
+from weatherconsoleapp.connectors.requests_factories import BaseRequestsFactory, HttpResponse, WeatherConnectorTimeout
+from weatherconsoleapp.connectors.response_cache import ResponseCache, CachingRequestsFactory, refresh_ahead
+from weatherconsoleapp.domain import Location, Units
+from tests import resources as test_resources
+
+FORECAST_URL = "http://dataservice.accuweather.com/forecasts/v1/daily/5day/309382"
+
+class ScriptedRequestsFactoryMock(BaseRequestsFactory):
+
+    def __init__(self, headers: Optional[Dict[str, str]] = None):
+        self.headers = {} if headers is None else headers
+        self.calls: List[str] = []
+        self.request_headers: List[Optional[dict]] = []
+        self.timeout = False
+        self.not_modified = False
+
+    def get(self, url: str, params: Optional[dict] = None) -> dict:
+        return self.get_response(url, params).json()
+
+    def get_response(self, url: str, params: Optional[dict] = None, headers: Optional[dict] = None) -> HttpResponse:
+        self.calls.append(url)
+        self.request_headers.append(headers)
+        if self.timeout:
+            raise WeatherConnectorTimeout("Timed out.")
+        if self.not_modified:
+            return HttpResponse(304, self.headers, b"")
+        content = resources.read_binary(test_resources, "weather_forecast_in_metric_without_details.json")
+        return HttpResponse(200, self.headers, content)
+
+class CachingRequestsFactoryTest(TestCase):
+
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._cache = ResponseCache(self._temp_dir.name)
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def _create_factory(self, inner_factory: BaseRequestsFactory, ttl: float = 60) -> CachingRequestsFactory:
+        return CachingRequestsFactory(inner_factory, self._cache, {WeatherForecastRequest.request_url: ttl})
+
+    def test_given_fresh_response_when_requesting_again_then_upstream_is_not_called(self):
+        inner_factory = ScriptedRequestsFactoryMock()
+        factory = self._create_factory(inner_factory)
+        first_payload = factory.get(FORECAST_URL, {"apikey": "first"})
+        second_payload = factory.get(FORECAST_URL, {"apikey": "second"})
+        self.assertEqual(first_payload, second_payload)
+        self.assertEqual(len(inner_factory.calls), 1)
+
+    def test_given_fresh_response_in_memory_when_getting_then_it_is_served_without_its_file(self):
+        self._cache.put("key", HttpResponse(200, {"ETag": '"v1"'}, b"{}"), ttl=60)
+        for filepath in pathlib.Path(self._temp_dir.name).iterdir():
+            filepath.unlink()
+        self.assertEqual(self._cache.get("key").response.headers, {"etag": '"v1"'})
+
+        self._cache.put("expired", HttpResponse(200, {}, b"{}"), ttl=-1)
+        for filepath in pathlib.Path(self._temp_dir.name).iterdir():
+            filepath.unlink()
+        self.assertIsNone(self._cache.get("expired"))
+        self.assertIsNone(ResponseCache(self._temp_dir.name, memory_entries=0).get("key"))
+
+    def test_given_endpoint_without_ttl_when_requesting_then_response_is_not_cached(self):
+        inner_factory = ScriptedRequestsFactoryMock()
+        factory = self._create_factory(inner_factory)
+        factory.get("http://dataservice.accuweather.com/locations/v1/cities/ES/search", {"q": "Bilbao"})
+        factory.get("http://dataservice.accuweather.com/locations/v1/cities/ES/search", {"q": "Bilbao"})
+        self.assertEqual(len(inner_factory.calls), 2)
+
+    def test_given_no_store_header_when_requesting_again_then_upstream_is_called(self):
+        inner_factory = ScriptedRequestsFactoryMock({"Cache-Control": "no-store"})
+        factory = self._create_factory(inner_factory)
+        factory.get(FORECAST_URL)
+        factory.get(FORECAST_URL)
+        self.assertEqual(len(inner_factory.calls), 2)
+
+    def test_given_upstream_max_age_when_computing_ttl_then_shortest_ttl_is_used(self):
+        response = HttpResponse(200, {"Cache-Control": "public, max-age=30"}, b"{}")
+        self.assertEqual(CachingRequestsFactory._get_response_ttl(response, 60), 30)
+        self.assertEqual(CachingRequestsFactory._get_response_ttl(response, 10), 10)
+
+    def test_given_expires_header_when_computing_ttl_then_ttl_is_relative_to_date_header(self):
+        response = HttpResponse(200, {
+            "Date": "Sat, 19 Nov 2022 22:00:00 GMT",
+            "Expires": "Sat, 19 Nov 2022 22:05:00 GMT"}, b"{}")
+        self.assertEqual(CachingRequestsFactory._get_response_ttl(response, 3600), 300)
+
+    def test_given_stale_response_when_upstream_times_out_then_stale_response_is_served(self):
+        inner_factory = ScriptedRequestsFactoryMock()
+        factory = self._create_factory(inner_factory, ttl=0.01)
+        first_payload = factory.get(FORECAST_URL)
+        time.sleep(0.02)
+        inner_factory.timeout = True
+        self.assertEqual(factory.get(FORECAST_URL), first_payload)
+        self.assertEqual(len(inner_factory.calls), 2)
+
+    def test_given_no_cached_response_when_upstream_times_out_then_timeout_is_raised(self):
+        inner_factory = ScriptedRequestsFactoryMock()
+        inner_factory.timeout = True
+        factory = self._create_factory(inner_factory)
+        with self.assertRaises(WeatherConnectorTimeout):
+            factory.get(FORECAST_URL)
+
+    def test_given_cached_forecast_when_requesting_fewer_days_then_cached_document_is_sliced(self):
+        inner_factory = ScriptedRequestsFactoryMock()
+        location_key = LocationKey(Location("Bilbao", "ES"), "309382")
+        five_days = WeatherForecastRequest(self._create_factory(inner_factory), location_key, Units.METRIC, 5, "").get_result()
+        one_day = WeatherForecastRequest(self._create_factory(inner_factory), location_key, Units.METRIC, 1, "").get_result()
+        self.assertEqual(len(five_days), 5)
+        self.assertEqual(one_day, five_days[:1])
+        self.assertEqual(len(inner_factory.calls), 1)
+
+    def test_given_response_expiring_within_margin_when_refreshing_ahead_then_upstream_is_called(self):
+        inner_factory = ScriptedRequestsFactoryMock()
+        factory = self._create_factory(inner_factory, ttl=60)
+        factory.get(FORECAST_URL)
+        with refresh_ahead(30) as state:
+            factory.get(FORECAST_URL)
+        self.assertEqual(state.upstream_requests, 0)
+        with refresh_ahead(90) as state:
+            factory.get(FORECAST_URL)
+        self.assertEqual(state.upstream_requests, 1)
+        self.assertEqual(len(inner_factory.calls), 2)
+
+    def test_given_expired_response_with_etag_when_not_modified_then_cached_response_is_extended(self):
+        inner_factory = ScriptedRequestsFactoryMock({"ETag": '"v1"'})
+        factory = self._create_factory(inner_factory, ttl=60)
+        first_payload = factory.get(FORECAST_URL)
+        inner_factory.not_modified = True
+        with refresh_ahead(0, max_age=0):
+            second_payload = factory.get(FORECAST_URL)
+        third_payload = factory.get(FORECAST_URL)
+        self.assertEqual(inner_factory.request_headers, [None, {"If-None-Match": '"v1"'}])
+        self.assertEqual(first_payload, second_payload)
+        self.assertEqual(first_payload, third_payload)
+
+if __name__ == "__main__":
+    main()
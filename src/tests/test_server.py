@@ -0,0 +1,108 @@
+from typing import List
+from unittest import TestCase, main
+from datetime import date, timedelta
+import json
+import threading
+import http.client
+import urllib.error
+import urllib.request
+from weatherconsoleapp.connectors import WeatherApiConnector
+from weatherconsoleapp.domain import Location, Units, WeatherInfo, Temperature, Date
+from weatherconsoleapp.server import WeatherHttpServer
+
+class WeatherApiConnectorMock(WeatherApiConnector):
+
+    def get_current_weather_for_location(self, location: Location, units: Units) -> WeatherInfo:
+        if location.city == "Atlantis":
+            raise ValueError("Unknown city")
+        return WeatherInfo(Date(date(2022, 1, 1)), location, Temperature(5, units), "Sunny")
+
+    def get_weather_forecast_for_location(self, location: Location, units: Units, days: int = 5) -> List[WeatherInfo]:
+        dates = [Date(date(2022, 1, 1) + timedelta(days=i)) for i in range(days)]
+        return [WeatherInfo(d, location, Temperature(5, units), "Sunny") for d in dates]
+
+class WeatherHttpServerTest(TestCase):
+
+    def setUp(self):
+        self._server = WeatherHttpServer(("127.0.0.1", 0), WeatherApiConnectorMock(), max_workers=4)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _get(self, path: str):
+        url = f"http://127.0.0.1:{self._server.server_address[1]}{path}"
+        try:
+            with urllib.request.urlopen(url, timeout=5) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as error:
+            return error.code, json.loads(error.read())
+
+    def test_given_valid_location_when_requesting_current_weather_then_json_is_returned(self):
+        status_code, content = self._get("/current?location=Bilbao,ES&units=imperial")
+        self.assertEqual(status_code, 200)
+        self.assertEqual(content["location"], {"city": "Bilbao", "country_code": "ES"})
+        self.assertEqual(content["weather"], [{"date": "2022-01-01", "weather": "Sunny", "temperature": 5, "units": "imperial"}])
+
+    def test_given_days_when_requesting_forecast_then_requested_days_are_returned(self):
+        status_code, content = self._get("/forecast?location=Bilbao,ES&days=3")
+        self.assertEqual(status_code, 200)
+        self.assertEqual(len(content["weather"]), 3)
+
+    def test_given_invalid_arguments_when_requesting_forecast_then_validation_errors_are_returned(self):
+        status_code, content = self._get("/forecast?location=Bilbao,%20ES&days=9")
+        self.assertEqual(status_code, 400)
+        self.assertEqual(len(content["errors"]), 2)
+
+    def test_given_failing_connector_when_requesting_current_weather_then_bad_gateway_is_returned(self):
+        status_code, _ = self._get("/current?location=Atlantis,ES")
+        self.assertEqual(status_code, 502)
+
+    def test_given_metrics_path_when_requesting_json_format_then_counters_and_spans_are_returned(self):
+        status_code, content = self._get("/metrics?format=json")
+        self.assertEqual(status_code, 200)
+        self.assertEqual(set(content), {"counters", "spans"})
+
+    def test_given_unknown_path_when_requesting_then_not_found_is_returned(self):
+        status_code, _ = self._get("/history")
+        self.assertEqual(status_code, 404)
+
+class WeatherHttpServerConnectionsTest(TestCase):
+
+    def _start_server(self, **kwargs) -> int:
+        server = WeatherHttpServer(("127.0.0.1", 0), WeatherApiConnectorMock(), **kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server.server_address[1]
+
+    def _open_idle_connection(self, port: int) -> http.client.HTTPConnection:
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        self.addCleanup(connection.close)
+        connection.request("GET", "/current?location=Bilbao,ES")
+        response = connection.getresponse()
+        response.read()
+        self.assertEqual(response.status, 200)
+        return connection
+
+    def test_given_idle_keep_alive_clients_on_every_worker_when_requesting_then_idle_connections_are_closed(self):
+        port = self._start_server(max_workers=2, idle_timeout=0.2)
+        connections = [self._open_idle_connection(port) for _ in range(2)]
+
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/current?location=Paris,FR", timeout=5) as response:
+            self.assertEqual(response.status, 200)
+        for connection in connections:
+            self.assertEqual(connection.sock.recv(1), b"")
+
+    def test_given_busy_workers_and_full_queue_when_connecting_then_service_unavailable_is_returned(self):
+        port = self._start_server(max_workers=1, idle_timeout=0.5, max_pending=0)
+        self._open_idle_connection(port)
+
+        with self.assertRaises(urllib.error.HTTPError) as context:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/current?location=Paris,FR", timeout=5)
+        self.assertEqual(context.exception.code, 503)
+        self.assertEqual(context.exception.headers["Retry-After"], "1")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+from unittest import TestCase, main
+from datetime import date, timedelta
+from typing import List
+import io
+import pathlib
+import tempfile
+from weatherconsoleapp.connectors import WeatherApiConnector
+from weatherconsoleapp.domain import Date, Location, Temperature, Units, WeatherInfo
+from weatherconsoleapp.shell import WeatherShell
+
+class CountingConnectorMock(WeatherApiConnector):
+
+    def __init__(self):
+        self.requested_locations: List[Location] = []
+
+    def get_current_weather_for_location(self, location: Location, units: Units) -> WeatherInfo:
+        self.requested_locations.append(location)
+        return WeatherInfo(Date(date(2024, 1, 1)), location, Temperature(10.0, units), "Sunny")
+
+    def get_weather_forecast_for_location(self, location: Location, units: Units, days: int = 5) -> List[WeatherInfo]:
+        self.requested_locations.append(location)
+        return [WeatherInfo(Date(date(2024, 1, 1) + timedelta(days=day)), location, Temperature(10.0, units), "Sunny")
+            for day in range(days)]
+
+class WeatherShellTest(TestCase):
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self._history_filepath = pathlib.Path(temp_dir.name, WeatherShell.FILENAME)
+        self._connector = CountingConnectorMock()
+
+    def _run(self, *lines: str) -> str:
+        output = io.StringIO()
+        shell = WeatherShell(self._connector, self._history_filepath, stdin=io.StringIO("\n".join(lines) + "\n"), stdout=output)
+        shell.intro = ""
+        shell.cmdloop()
+        return output.getvalue()
+
+    def test_given_queries_when_running_shell_then_reports_and_latencies_printed_with_one_connector(self):
+        output = self._run("current Bilbao,ES", "forecast San Sebastian,ES --days=2 --units imperial", "exit")
+        self.assertIn("BILBAO (ES)", output)
+        self.assertIn("SAN SEBASTIAN (ES)", output)
+        self.assertIn("10.00 ºF", output)
+        self.assertEqual(output.count(" ms)"), 2)
+        self.assertEqual(self._connector.requested_locations, [Location("Bilbao", "ES"), Location("San Sebastian", "ES")])
+
+    def test_given_city_with_apostrophe_when_running_shell_then_location_requested(self):
+        output = self._run("current L'Aquila,IT", "forecast Sant'Agata,IT --days 2", "exit")
+        self.assertIn("L'AQUILA (IT)", output)
+        self.assertEqual(self._connector.requested_locations, [Location("L'Aquila", "IT"), Location("Sant'Agata", "IT")])
+        shell = WeatherShell(self._connector, self._history_filepath, stdin=io.StringIO(), stdout=io.StringIO())
+        self.assertEqual(shell.complete_location("l'"), ["L'Aquila,IT"])
+
+    def test_given_invalid_queries_when_running_shell_then_messages_printed_without_request(self):
+        output = self._run("current Bilbao", "forecast Bilbao,ES --days 9", "hourly --hours 12", "current Bilbao,ES --colour red", "")
+        self.assertIn("Location argument must have this format: Cityname,COUNTRYCODE.", output)
+        self.assertIn("Input 'days' argument must be an integer in the range 1-5.", output)
+        self.assertIn("A location is required, e.g. Bilbao,ES.", output)
+        self.assertIn("Unknown option --colour.", output)
+        self.assertEqual(self._connector.requested_locations, [])
+
+    def test_given_previous_sessions_when_completing_location_then_used_locations_returned(self):
+        self._run("current Bilbao,ES", "forecast Barcelona,ES", "current Paris,FR", "current Bilbao", "exit")
+        shell = WeatherShell(self._connector, self._history_filepath, stdin=io.StringIO(), stdout=io.StringIO())
+        self.assertEqual(shell.complete_location("b"), ["Barcelona,ES", "Bilbao,ES"])
+        self.assertEqual(shell.complete_forecast("Pa", "forecast Pa", 9, 11), ["Paris,FR"])
+        self.assertEqual(len(self._history_filepath.read_text(encoding="utf-8").splitlines()), 4)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+from typing import List, Optional
+from unittest import IsolatedAsyncioTestCase, TestCase, main
+from concurrent.futures import ThreadPoolExecutor
+import time
+import asyncio
+import threading
+from weatherconsoleapp.connectors.requests_factories import (
+    AsyncBaseRequestsFactory, BaseRequestsFactory, HttpResponse, WeatherConnectorTimeout)
+from weatherconsoleapp.connectors.single_flight import AsyncSingleFlightRequestsFactory, SingleFlightRequestsFactory
+from weatherconsoleapp.connectors.deadlines import get_remaining_time, request_deadline
+from weatherconsoleapp.connectors.errors import DeadlineExceeded
+
+URL = "http://dataservice.accuweather.com/currentconditions/v1/309382"
+
+class SlowRequestsFactoryMock(BaseRequestsFactory):
+
+    def __init__(self, delay: float, timeout: bool = False):
+        self._delay = delay
+        self._timeout = timeout
+        self._lock = threading.Lock()
+        self.calls: List[str] = []
+
+    def get(self, url: str, params: Optional[dict] = None) -> dict:
+        return self.get_response(url, params).json()
+
+    def get_response(self, url: str, params: Optional[dict] = None, headers: Optional[dict] = None) -> HttpResponse:
+        with self._lock:
+            self.calls.append(url)
+        time.sleep(self._delay)
+        if self._timeout:
+            raise WeatherConnectorTimeout("Timed out.")
+        get_remaining_time()
+        return HttpResponse(200, {}, b'{"url": "%s"}' % url.encode("utf-8"))
+
+class SingleFlightRequestsFactoryTest(TestCase):
+
+    def _get_concurrently(self, factory: BaseRequestsFactory, urls: List[str]) -> list:
+        def get(index_and_url):
+            index, url = index_and_url
+            try:
+                return factory.get(url, {"apikey": f"key{index}", "details": False})
+            except BaseException as error:
+                return error
+        with ThreadPoolExecutor(max_workers=len(urls)) as executor:
+            return list(executor.map(get, enumerate(urls)))
+
+    def test_given_identical_concurrent_requests_when_getting_then_one_upstream_call_is_made(self):
+        inner_factory = SlowRequestsFactoryMock(0.1)
+        results = self._get_concurrently(SingleFlightRequestsFactory(inner_factory), [URL] * 10)
+        self.assertEqual(len(inner_factory.calls), 1)
+        self.assertTrue(all(result is results[0] for result in results))
+
+    def test_given_different_concurrent_requests_when_getting_then_each_one_is_sent(self):
+        inner_factory = SlowRequestsFactoryMock(0.1)
+        self._get_concurrently(SingleFlightRequestsFactory(inner_factory), [URL, f"{URL}0", URL, f"{URL}0"])
+        self.assertEqual(len(inner_factory.calls), 2)
+
+    def test_given_timed_out_request_when_getting_concurrently_then_every_caller_gets_the_timeout(self):
+        inner_factory = SlowRequestsFactoryMock(0.1, timeout=True)
+        results = self._get_concurrently(SingleFlightRequestsFactory(inner_factory), [URL] * 5)
+        self.assertEqual(len(inner_factory.calls), 1)
+        self.assertTrue(all(isinstance(result, WeatherConnectorTimeout) for result in results))
+
+    def test_given_finished_request_when_getting_again_then_a_new_request_is_sent(self):
+        inner_factory = SlowRequestsFactoryMock(0)
+        factory = SingleFlightRequestsFactory(inner_factory)
+        factory.get(URL)
+        factory.get(URL)
+        self.assertEqual(len(inner_factory.calls), 2)
+
+    def test_given_joined_request_slower_than_deadline_when_waiting_then_deadline_exceeded_is_raised(self):
+        inner_factory = SlowRequestsFactoryMock(0.3)
+        factory = SingleFlightRequestsFactory(inner_factory)
+        leader = threading.Thread(target=factory.get, args=(URL,))
+        leader.start()
+        time.sleep(0.05)
+        started_at = time.monotonic()
+        with request_deadline(0.05), self.assertRaises(DeadlineExceeded):
+            factory.get(URL)
+        self.assertLess(time.monotonic() - started_at, 0.2)
+        leader.join()
+        self.assertEqual(len(inner_factory.calls), 1)
+
+    def test_given_leader_deadline_exceeded_when_joiner_has_longer_deadline_then_joiner_sends_the_request(self):
+        inner_factory = SlowRequestsFactoryMock(0.1)
+        factory = SingleFlightRequestsFactory(inner_factory)
+
+        def get_with_short_deadline():
+            with request_deadline(0.05), self.assertRaises(DeadlineExceeded):
+                factory.get(URL)
+
+        leader = threading.Thread(target=get_with_short_deadline)
+        leader.start()
+        time.sleep(0.02)
+        with request_deadline(5):
+            self.assertEqual(factory.get(URL), {"url": URL})
+        leader.join()
+        self.assertEqual(len(inner_factory.calls), 2)
+
+class AsyncSlowRequestsFactoryMock(AsyncBaseRequestsFactory):
+
+    def __init__(self, delay: float, timeout: bool = False):
+        self._delay = delay
+        self._timeout = timeout
+        self.calls: List[str] = []
+
+    async def get(self, url: str, params: Optional[dict] = None) -> dict:
+        self.calls.append(url)
+        await asyncio.sleep(self._delay)
+        if self._timeout:
+            raise WeatherConnectorTimeout("Timed out.")
+        return {"url": url}
+
+class AsyncSingleFlightRequestsFactoryTest(IsolatedAsyncioTestCase):
+
+    async def test_given_identical_concurrent_requests_when_getting_then_one_upstream_call_is_made(self):
+        inner_factory = AsyncSlowRequestsFactoryMock(0.05)
+        factory = AsyncSingleFlightRequestsFactory(inner_factory)
+        results = await asyncio.gather(*[factory.get(URL, {"apikey": str(i)}) for i in range(10)])
+        self.assertEqual(len(inner_factory.calls), 1)
+        self.assertTrue(all(result is results[0] for result in results))
+
+    async def test_given_timed_out_request_when_getting_concurrently_then_every_caller_gets_the_timeout(self):
+        inner_factory = AsyncSlowRequestsFactoryMock(0.05, timeout=True)
+        factory = AsyncSingleFlightRequestsFactory(inner_factory)
+        results = await asyncio.gather(*[factory.get(URL) for _ in range(5)], return_exceptions=True)
+        self.assertEqual(len(inner_factory.calls), 1)
+        self.assertTrue(all(isinstance(result, WeatherConnectorTimeout) for result in results))
+
+    async def test_given_cancelled_leader_when_joiner_is_waiting_then_joiner_sends_the_request_again(self):
+        inner_factory = AsyncSlowRequestsFactoryMock(0.05)
+        factory = AsyncSingleFlightRequestsFactory(inner_factory)
+        leader = asyncio.create_task(factory.get(URL))
+        await asyncio.sleep(0.01)
+        joiner = asyncio.create_task(factory.get(URL))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+
+        self.assertEqual(await joiner, {"url": URL})
+        self.assertTrue(leader.cancelled())
+        self.assertEqual(len(inner_factory.calls), 2)
+
+    async def test_given_cancelled_joiner_when_leader_is_waiting_then_leader_gets_the_response(self):
+        inner_factory = AsyncSlowRequestsFactoryMock(0.05)
+        factory = AsyncSingleFlightRequestsFactory(inner_factory)
+        leader = asyncio.create_task(factory.get(URL))
+        await asyncio.sleep(0.01)
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(factory.get(URL), 0.01)
+
+        self.assertEqual(await leader, {"url": URL})
+        self.assertEqual(len(inner_factory.calls), 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+from unittest import TestCase, main
+import os
+import sys
+import pathlib
+import tempfile
+import subprocess
+
+SOURCES_DIRPATH = pathlib.Path(__file__).resolve().parents[1]
+
+class StartupTest(TestCase):
+
+    def setUp(self):
+        self._home_dir = tempfile.TemporaryDirectory()
+        self._environment = dict(os.environ, HOME=self._home_dir.name, USERPROFILE=self._home_dir.name)
+        self._environment["PYTHONPATH"] = os.pathsep.join(filter(None, [str(SOURCES_DIRPATH), os.environ.get("PYTHONPATH")]))
+
+    def tearDown(self):
+        self._home_dir.cleanup()
+
+    def _run_python(self, *args: str) -> subprocess.CompletedProcess:
+        return subprocess.run([sys.executable, *args], env=self._environment, capture_output=True, text=True, check=True)
+
+    def test_given_main_module_when_imported_then_http_client_is_not_loaded(self):
+        process = self._run_python("-c", "import sys, weatherconsoleapp.main; print('requests' in sys.modules)")
+        self.assertEqual(process.stdout.strip(), "False")
+
+    def test_given_invalid_location_when_running_then_error_is_printed_before_creating_config(self):
+        process = self._run_python("-m", "weatherconsoleapp.main", "current", "Bilbao, ES")
+        self.assertIn("Location argument must have this format", process.stdout)
+        self.assertFalse(pathlib.Path(self._home_dir.name, ".weatherconsoleapp").exists())
+
+if __name__ == "__main__":
+    main()
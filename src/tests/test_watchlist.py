@@ -0,0 +1,106 @@
+from unittest import TestCase, main
+import pathlib
+import tempfile
+from weatherconsoleapp.config import HttpSettings
+from weatherconsoleapp.connectors import AccuWeatherApiConnector
+from weatherconsoleapp.connectors.accuweather_requests import CurrentWeatherRequest, WeatherForecastRequest
+from weatherconsoleapp.connectors.location_key_cache import LocationKeyCache
+from weatherconsoleapp.connectors.quota_scheduler import QuotaUsageStore
+from weatherconsoleapp.connectors.requests_factories import RequestsFactory
+from weatherconsoleapp.connectors.response_cache import CachingRequestsFactory, ResponseCache
+from weatherconsoleapp.domain import Location, Units
+from weatherconsoleapp.watchlist import AccessCounter, AccessCountingConnector, WatchListRefresher, parse_watchlist
+from tests.fakes.accuweather_server import FakeAccuWeatherServer
+
+BILBAO = Location("Bilbao", "ES")
+PARIS = Location("Paris", "FR")
+
+class WatchListRefresherTest(TestCase):
+
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._temp_dir.cleanup)
+        self._server = FakeAccuWeatherServer()
+        self._server.__enter__()
+        self.addCleanup(self._server.__exit__)
+
+    def _create_connector(self, ttl: float = 600) -> AccuWeatherApiConnector:
+        requests_factory = RequestsFactory(HttpSettings(max_retries=0))
+        self.addCleanup(requests_factory.close)
+        caching_factory = CachingRequestsFactory(
+            requests_factory,
+            ResponseCache(pathlib.Path(self._temp_dir.name, ResponseCache.DIRNAME)),
+            {CurrentWeatherRequest.request_url: ttl, WeatherForecastRequest.request_url: ttl})
+        location_key_cache = LocationKeyCache(pathlib.Path(self._temp_dir.name, LocationKeyCache.FILENAME))
+        return AccuWeatherApiConnector("apikey", caching_factory, location_key_cache, self._server.url)
+
+    def _create_usage_store(self) -> QuotaUsageStore:
+        return QuotaUsageStore(pathlib.Path(self._temp_dir.name, WatchListRefresher.FILENAME))
+
+    def test_given_cold_cache_when_refreshing_then_interactive_calls_are_served_from_cache(self):
+        connector = self._create_connector()
+        refresher = WatchListRefresher(connector, [BILBAO], refresh_margin=60)
+        self.assertEqual(refresher.refresh_once(), 3)
+        connector.get_current_weather_for_location(BILBAO, Units.IMPERIAL)
+        connector.get_weather_forecast_for_location(BILBAO, Units.METRIC, 2)
+        self.assertEqual(sum(self._server.request_counts.values()), 3)
+
+    def test_given_fresh_cache_when_refreshing_then_only_expiring_responses_are_fetched(self):
+        connector = self._create_connector(ttl=600)
+        WatchListRefresher(connector, [BILBAO], refresh_margin=60).refresh_once()
+        self.assertEqual(WatchListRefresher(connector, [BILBAO], refresh_margin=60).refresh_once(), 0)
+        self.assertEqual(WatchListRefresher(connector, [BILBAO], refresh_margin=900).refresh_once(), 2)
+
+    def test_given_daily_budget_when_refreshing_then_budget_is_shared_and_never_exceeded(self):
+        connector = self._create_connector()
+        refresher = WatchListRefresher(connector, [BILBAO, PARIS], daily_budget=3, usage_store=self._create_usage_store())
+        self.assertEqual(refresher.refresh_once(), 3)
+        self.assertEqual(refresher.get_remaining_budget(), 0)
+        other_refresher = WatchListRefresher(connector, [PARIS], daily_budget=3, usage_store=self._create_usage_store())
+        self.assertEqual(other_refresher.refresh_once(), 0)
+        self.assertEqual(self._server.request_counts["location_key"], 1)
+
+    def test_given_budget_short_of_a_location_when_refreshing_then_budget_is_not_overshot(self):
+        connector = self._create_connector()
+        refresher = WatchListRefresher(connector, [BILBAO, PARIS], daily_budget=5)
+        self.assertEqual(refresher.refresh_once(), 3)
+        self.assertEqual(refresher.get_remaining_budget(), 2)
+        self.assertEqual(sum(self._server.request_counts.values()), 3)
+
+    def test_given_spent_budget_without_usage_store_when_utc_date_changes_then_budget_is_renewed(self):
+        today = ["2024-01-01"]
+        refresher = WatchListRefresher(self._create_connector(ttl=0), [BILBAO], daily_budget=3, today=lambda: today[0])
+        self.assertEqual(refresher.refresh_once(), 3)
+        self.assertEqual(refresher.refresh_once(), 0)
+        today[0] = "2024-01-02"
+        self.assertEqual(refresher.get_remaining_budget(), 3)
+        self.assertEqual(refresher.refresh_once(), 2)
+
+    def test_given_access_counts_when_ordering_locations_then_most_accessed_come_first(self):
+        access_counter = AccessCounter(pathlib.Path(self._temp_dir.name, AccessCounter.FILENAME))
+        connector = AccessCountingConnector(self._create_connector(), access_counter)
+        connector.get_current_weather_for_location(PARIS, Units.METRIC)
+        refresher = WatchListRefresher(connector, [BILBAO, PARIS, Location("Lyon", "FR")], access_counter)
+        self.assertEqual(refresher.get_ordered_locations(), [PARIS, BILBAO, Location("Lyon", "FR")])
+
+class AccessCounterTest(TestCase):
+
+    def test_given_two_counters_when_flushing_then_counts_are_added(self):
+        with tempfile.TemporaryDirectory() as dirname:
+            filepath = pathlib.Path(dirname, AccessCounter.FILENAME)
+            first_counter, second_counter = AccessCounter(filepath), AccessCounter(filepath)
+            first_counter.record(BILBAO)
+            second_counter.record(Location("bilbao", "es"))
+            second_counter.record(PARIS)
+            self.assertEqual(first_counter.get_count(BILBAO), 1)
+            first_counter.flush()
+            second_counter.flush()
+            self.assertEqual(AccessCounter(filepath).get_counts(), {"bilbao,ES": 2, "paris,FR": 1})
+
+    def test_given_watchlist_strings_when_parsing_then_invalid_and_duplicated_locations_are_skipped(self):
+        with self.assertLogs("weatherconsoleapp.watchlist", level="WARNING"):
+            locations = parse_watchlist(["Bilbao,ES", "Paris", "Bilbao,ES", "Paris,FR"])
+        self.assertEqual(locations, [BILBAO, PARIS])
+
+if __name__ == "__main__":
+    main()
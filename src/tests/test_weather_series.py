@@ -0,0 +1,59 @@
+from unittest import TestCase, main
+from datetime import date, datetime, timedelta, timezone
+from weatherconsoleapp.domain import WeatherSeries, Location, Units, Temperature, Date, DateTime
+
+# Nov 19, 2022 22:00 (UTC+1)
+START = 1668891600
+UTC_PLUS_ONE = 3600
+
+class WeatherSeriesTest(TestCase):
+
+    def setUp(self):
+        self._series = WeatherSeries(Location("Bilbao", "ES"), Units.METRIC)
+        samples = [(9.0, 12, "Showers"), (8.0, 12, "Showers"), (6.0, 7, "Cloudy"), (4.0, 7, "Cloudy"), (5.0, 12, "Showers")]
+        for hour, (temperature, condition_code, condition_phrase) in enumerate(samples):
+            self._series.append(START + hour * 3600, UTC_PLUS_ONE, temperature, condition_code, condition_phrase)
+
+    def test_given_series_when_aggregating_then_min_max_and_mean_are_returned(self):
+        self.assertEqual(self._series.min_temperature(), Temperature(4.0, Units.METRIC))
+        self.assertEqual(self._series.max_temperature(), Temperature(9.0, Units.METRIC))
+        self.assertEqual(self._series.mean_temperature(), Temperature(6.4, Units.METRIC))
+
+    def test_given_empty_series_when_aggregating_then_value_error_is_raised(self):
+        with self.assertRaises(ValueError):
+            WeatherSeries(Location("Bilbao", "ES"), Units.METRIC).mean_temperature()
+
+    def test_given_columns_of_different_length_when_creating_series_then_value_error_is_raised(self):
+        with self.assertRaises(ValueError):
+            WeatherSeries(Location("Bilbao", "ES"), Units.METRIC, timestamps=[START], utc_offsets=[], temperatures=[1.0], condition_codes=[1])
+
+    def test_given_hours_across_midnight_when_resampling_daily_then_one_entry_per_local_day_is_returned(self):
+        daily = self._series.resample_daily()
+        self.assertEqual(len(daily), 2)
+        self.assertEqual(list(daily.temperatures), [8.5, 5.0])
+        self.assertEqual(list(daily.condition_codes), [12, 7])
+        self.assertEqual(list(self._series.resample_daily("max").temperatures), [9.0, 6.0])
+        self.assertEqual(
+            [weather_info.date for weather_info in daily.to_weather_infos()],
+            [Date(date(2022, 11, 19)), Date(date(2022, 11, 20))])
+
+    def test_given_metric_series_when_converting_to_imperial_then_every_temperature_is_converted(self):
+        imperial = self._series.to_units(Units.IMPERIAL)
+        self.assertEqual(imperial.units, Units.IMPERIAL)
+        self.assertEqual(list(imperial.temperatures), [48.2, 46.4, 42.8, 39.2, 41.0])
+        self.assertAlmostEqual(imperial.to_units(Units.METRIC).mean_temperature().value, 6.4)
+        self.assertAlmostEqual(Temperature(100.0, Units.METRIC).to_units(Units.IMPERIAL).value, 212.0)
+
+    def test_given_unknown_aggregate_when_resampling_then_value_error_is_raised(self):
+        with self.assertRaises(ValueError):
+            self._series.resample_daily("median")
+
+    def test_given_hourly_series_when_converting_to_weather_infos_then_local_times_are_kept(self):
+        weather_info = self._series.to_weather_infos()[0]
+        self.assertEqual(weather_info.date, DateTime(datetime(2022, 11, 19, 22, 0, tzinfo=timezone(timedelta(hours=1)))))
+        self.assertEqual(str(weather_info.date), "Nov 19, 2022 22:00")
+        self.assertEqual(weather_info.weather_description, "Showers")
+        self.assertEqual(weather_info.location, Location("Bilbao", "ES"))
+
+if __name__ == "__main__":
+    main()
@@ -4,29 +4,35 @@ import json
 import importlib.resources as resources
 from pathlib import Path
 from datetime import date
-from weatherconsoleapp.connectors.requests_factories import RequestsFactory
-from weatherconsoleapp.connectors.accuweather_requests import LocationKey, LocationKeyRequest, CurrentWeatherRequest, WeatherForecastRequest
+from weatherconsoleapp.connectors.requests_factories import BaseRequestsFactory
+from weatherconsoleapp.connectors.accuweather_requests import LocationKey, LocationKeyRequest, CurrentWeatherRequest, WeatherForecastRequest, HourlyForecastRequest
 from weatherconsoleapp.domain import Location, Units, Date
 from tests import resources as test_resources
 
-class LocationKeyRequestsFactoryMock(RequestsFactory):
+class LocationKeyRequestsFactoryMock(BaseRequestsFactory):
     
     def get(self, url: str, params: Optional[dict] = None) -> dict:
         json_str = resources.read_text(test_resources, "location_key_without_details.json")
         return json.loads(json_str)
     
-class CurrentWeatherFactoryMock(RequestsFactory):
+class CurrentWeatherFactoryMock(BaseRequestsFactory):
     
     def get(self, url: str, params: Optional[dict] = None) -> dict:
         json_str = resources.read_text(test_resources, "current_weather_without_details.json")
         return json.loads(json_str)
 
-class WeatherForecastFactoryMock(RequestsFactory):
+class WeatherForecastFactoryMock(BaseRequestsFactory):
     
     def get(self, url: str, params: Optional[dict] = None) -> dict:
         json_str = resources.read_text(test_resources, "weather_forecast_in_metric_without_details.json")
         return json.loads(json_str)
 
+class HourlyForecastFactoryMock(BaseRequestsFactory):
+
+    def get(self, url: str, params: Optional[dict] = None) -> dict:
+        json_str = resources.read_text(test_resources, "hourly_forecast_12_hours_in_metric_without_details.json")
+        return json.loads(json_str)
+
 class LocationKeyRequestTest(TestCase):
     
     def setUp(self):
@@ -58,5 +64,32 @@ class WeatherForecastRequestTest(TestCase):
         weather_forecast = request.get_result()
         self.assertEqual(len(weather_forecast), 5)
 
+    def test_given_imperial_units_when_getting_result_then_metric_forecast_is_converted_locally(self):
+        location_key = LocationKey(Location("Bilbao", "ES"), "309382")
+        metric_request = WeatherForecastRequest(self._requests_factory, location_key, Units.METRIC, 5, "")
+        imperial_request = WeatherForecastRequest(self._requests_factory, location_key, Units.IMPERIAL, 5, "")
+        self.assertEqual(imperial_request._get_params(), metric_request._get_params())
+        for metric_info, imperial_info in zip(metric_request.get_result(), imperial_request.get_result()):
+            self.assertEqual(imperial_info.temperature.units, Units.IMPERIAL)
+            self.assertAlmostEqual(imperial_info.temperature.value, metric_info.temperature.value * 9 / 5 + 32)
+
+class HourlyForecastRequestTest(TestCase):
+
+    def setUp(self):
+        self._requests_factory = HourlyForecastFactoryMock()
+
+    def test_get_result(self):
+        location_key = LocationKey(Location("Bilbao", "ES"), "309382")
+        request = HourlyForecastRequest(self._requests_factory, location_key, Units.METRIC, 12, "")
+        series = request.get_result()
+        self.assertEqual(len(series), 12)
+        self.assertEqual(series.timestamps[0], 1668877200)
+        self.assertEqual(series.utc_offsets[0], 3600)
+        self.assertEqual(series.condition_phrases[series.condition_codes[0]], "Showers")
+
+    def test_given_unsupported_hours_when_creating_request_then_value_error_is_raised(self):
+        with self.assertRaises(ValueError):
+            HourlyForecastRequest(self._requests_factory, LocationKey(Location("Bilbao", "ES"), "309382"), Units.METRIC, 6, "")
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,237 @@
+"""Resumable bulk jobs over very large location lists.
+
+A bulk job runs the same command for every location of a list, spread over
+`shard_count` nodes (e.g. machines sharing the list) and `processes` worker
+processes per node. Locations are assigned by a hash of their name, so every
+node computes the same partition without coordination, whatever the order of
+the list.
+
+Each worker appends the formatted output of every location it completes to
+its own journal, a JSON lines file of the job directory. Reruns skip the
+locations found in any journal of the directory, so a job interrupted by a
+crash resumes where it stopped. Once every location is journaled, the
+outputs are merged in the order of the list.
+"""
+import io
+import os
+import json
+import zlib
+import logging
+import pathlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, TextIO, Tuple
+from .commands import BatchCommand, CommandResultStatus, WeatherReportCommand
+from .connectors import WeatherApiConnector
+from .connectors.quota_scheduler import RequestPriority, request_priority
+from .formatters import ReportFormatter, ReportWriter
+from .persistence import PathLike
+
+logger = logging.getLogger(__name__)
+
+LabeledInput = Tuple[str, Dict[str, Any]]
+
+def get_shard(label: str, shard_count: int) -> int:
+    """Returns the shard of a location, stable across processes and machines.
+    """
+    return zlib.crc32(label.strip().casefold().encode("utf-8")) % shard_count
+
+class JournalEntry(NamedTuple):
+    label: str
+    status: CommandResultStatus
+    output: str
+
+class ShardJournal:
+    """Append-only JSON lines file with an entry per location processed by a
+    worker. A line torn by a crash is ignored when read and terminated before
+    the next append.
+    """
+    SUFFIX = ".journal"
+
+    def __init__(self, filepath: PathLike):
+        self._filepath = filepath
+        self._file: Optional[TextIO] = None
+
+    def read(self) -> Dict[str, JournalEntry]:
+        """Returns the last entry of each location.
+        """
+        entries: Dict[str, JournalEntry] = {}
+        try:
+            with open(self._filepath, "r", encoding="utf-8") as journal_file:
+                for line in journal_file:
+                    try:
+                        content = json.loads(line)
+                        entry = JournalEntry(content["label"], CommandResultStatus[content["status"]], content["output"])
+                    except (ValueError, KeyError, TypeError):
+                        logger.warning("Ignoring corrupt line of journal %s", self._filepath)
+                        continue
+                    entries[entry.label] = entry
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def append(self, entry: JournalEntry):
+        """Writes the entry and flushes it to disk before returning.
+        """
+        if self._file is None:
+            torn = self._ends_with_torn_line()
+            self._file = open(self._filepath, "a", encoding="utf-8")
+            if torn:
+                self._file.write("\n")
+        self._file.write(json.dumps({"label": entry.label, "status": entry.status.name, "output": entry.output}, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _ends_with_torn_line(self) -> bool:
+        try:
+            with open(self._filepath, "rb") as journal_file:
+                journal_file.seek(0, os.SEEK_END)
+                if journal_file.tell() == 0:
+                    return False
+                journal_file.seek(-1, os.SEEK_END)
+                return journal_file.read(1) != b"\n"
+        except FileNotFoundError:
+            return False
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> "ShardJournal":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def read_journals(dirname: PathLike) -> Dict[str, JournalEntry]:
+    """Returns the entries of every journal of a job directory, successful
+    entries winning over failed ones.
+    """
+    entries: Dict[str, JournalEntry] = {}
+    for filepath in sorted(pathlib.Path(dirname).glob(f"*{ShardJournal.SUFFIX}")):
+        for label, entry in ShardJournal(filepath).read().items():
+            current = entries.get(label)
+            if current is None or current.status != CommandResultStatus.SUCCESS:
+                entries[label] = entry
+    return entries
+
+class BulkJobSummary(NamedTuple):
+    """Number of locations of a node run: already journaled by a previous run,
+    completed now and failed now.
+    """
+    skipped: int
+    succeeded: int
+    failed: int
+
+def run_worker(
+    journal_filepath: PathLike,
+    command_builder: Callable[..., WeatherReportCommand],
+    formatter: ReportFormatter,
+    connector_factory: Callable[[], WeatherApiConnector],
+    labeled_inputs: List[LabeledInput],
+    max_workers: int) -> Tuple[int, int]:
+    """Runs the command for the locations of a worker, journaling each result,
+    and returns the number of successful and failed locations. Module level so
+    that worker processes can run it.
+    """
+    connector = connector_factory()
+    labeled_command_builders = (
+        (label, lambda output, validated_input=validated_input: command_builder(connector, output=output, formatter=formatter, **validated_input))
+        for label, validated_input in labeled_inputs)
+    succeeded, failed = 0, 0
+    with ShardJournal(journal_filepath) as journal, request_priority(RequestPriority.BATCH):
+        for result in BatchCommand(labeled_command_builders, max_workers, io.StringIO()).iter_results():
+            journal.append(JournalEntry(result.label, result.status, result.output))
+            if result.status == CommandResultStatus.SUCCESS:
+                succeeded += 1
+            else:
+                failed += 1
+    return succeeded, failed
+
+class BulkJobRunner:
+    """Runs the share of a bulk job of node `shard_index` out of `shard_count`
+    with `processes` worker processes, each running the command for up to
+    `max_workers` locations concurrently.
+
+    `connector_factory` creates the connector of each worker process, so it
+    must be picklable (e.g. a module level function) when `processes` > 1.
+    Connectors should share their quota usage between processes, see
+    `QuotaScheduler`.
+    """
+    def __init__(self,
+        dirname: PathLike,
+        command_builder: Callable[..., WeatherReportCommand],
+        labeled_inputs: List[LabeledInput],
+        formatter: ReportFormatter,
+        connector_factory: Callable[[], WeatherApiConnector],
+        processes: int = 1,
+        max_workers: int = BatchCommand.DEFAULT_MAX_WORKERS,
+        shard_index: int = 0,
+        shard_count: int = 1):
+        if not 0 <= shard_index < shard_count:
+            raise ValueError("shard_index must be between 0 and shard_count - 1.")
+        self._dirname = pathlib.Path(dirname)
+        self._command_builder = command_builder
+        self._labeled_inputs = labeled_inputs
+        self._formatter = formatter
+        self._connector_factory = connector_factory
+        self._processes = max(1, processes)
+        self._max_workers = max(1, max_workers)
+        self._shard_index = shard_index
+        self._shard_count = shard_count
+
+    def get_pending(self) -> List[List[LabeledInput]]:
+        """Returns the locations of this node not successfully journaled yet,
+        split by worker process.
+        """
+        journaled = read_journals(self._dirname)
+        pending: List[List[LabeledInput]] = [[] for _ in range(self._processes)]
+        for label, validated_input in self._labeled_inputs:
+            entry = journaled.get(label)
+            if entry is not None and entry.status == CommandResultStatus.SUCCESS:
+                continue
+            # The node takes a hash modulo, its workers split the quotient.
+            shard = get_shard(label, self._shard_count * self._processes)
+            if shard % self._shard_count == self._shard_index:
+                pending[shard // self._shard_count].append((label, validated_input))
+        return pending
+
+    def run(self) -> BulkJobSummary:
+        """Runs the pending locations of this node and returns the summary.
+        """
+        self._dirname.mkdir(parents=True, exist_ok=True)
+        pending = self.get_pending()
+        node_locations = sum(1 for label, _ in self._labeled_inputs if get_shard(label, self._shard_count) == self._shard_index)
+        skipped = node_locations - sum(len(labeled_inputs) for labeled_inputs in pending)
+        arguments = [(self._get_journal_filepath(worker), self._command_builder, self._formatter,
+                self._connector_factory, labeled_inputs, self._max_workers)
+            for worker, labeled_inputs in enumerate(pending) if len(labeled_inputs) > 0]
+
+        if len(arguments) == 0:
+            return BulkJobSummary(skipped, 0, 0)
+        if self._processes == 1:
+            results = [run_worker(*arguments[0])]
+        else:
+            with ProcessPoolExecutor(max_workers=len(arguments)) as executor:
+                results = [future.result() for future in [executor.submit(run_worker, *args) for args in arguments]]
+        return BulkJobSummary(skipped, sum(result[0] for result in results), sum(result[1] for result in results))
+
+    def merge(self, output: Optional[TextIO] = None) -> List[str]:
+        """Writes the journaled outputs of every location, of every node, in the
+        order of the list, if all of them succeeded. Returns the locations
+        missing or failed, in which case nothing is written.
+        """
+        journaled = read_journals(self._dirname)
+        missing = [label for label, _ in self._labeled_inputs
+            if label not in journaled or journaled[label].status != CommandResultStatus.SUCCESS]
+        if len(missing) > 0:
+            return missing
+        with ReportWriter(self._formatter, output) as writer:
+            for label, _ in self._labeled_inputs:
+                writer.write(journaled[label].output)
+        return []
+
+    def _get_journal_filepath(self, worker: int) -> pathlib.Path:
+        # Nodes may run different numbers of processes, hence both in the name.
+        return self._dirname.joinpath(
+            f"shard-{self._shard_index}-of-{self._shard_count}-worker-{worker}-of-{self._processes}{ShardJournal.SUFFIX}")
@@ -1,11 +1,24 @@
 from enum import Enum
 from abc import ABC, abstractmethod
-from typing import Tuple, List, Dict, Union, Optional, Any
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Tuple, List, Dict, Union, Optional, Any, NamedTuple, Deque, TextIO, Callable, Iterable, Iterator, TYPE_CHECKING
+from collections import deque
+from datetime import date, datetime
+import io
+import sys
+import time
 import logging
+import contextvars
 from .connectors import WeatherApiConnector
-from .connectors.requests_factories import WeatherConnectorTimeout
-from .domain import Location, Units
+from .connectors.errors import WeatherConnectorConnectionError, WeatherConnectorTimeout
+from .connectors.deadlines import request_deadline
+from .domain import Location, Units, WeatherInfo
 from . import Utils
+from . import metrics
+from .formatters import LineDiffRenderer, ReportFormatter, TextFormatter, TextOutput
+
+if TYPE_CHECKING:
+    from .history import HistoryAggregates, HistoryStore
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +26,7 @@ class CommandResultStatus(Enum):
     SUCCESS = 0
     ERROR = 1
     TIMEOUT = 2
+    CONNECTION_ERROR = 3
 
 class WeatherCommand(ABC):
 
@@ -21,6 +35,7 @@ class WeatherCommand(ABC):
     UNITS = "units"
     LOCATION = "location"
     DAYS = "days"
+    HOURS = "hours"
 
     @abstractmethod
     def execute(self):
@@ -46,33 +61,91 @@ class WeatherCommand(ABC):
             return ("Location argument must have this format: Cityname,COUNTRYCODE.", None)
         return ("", Location(substrings[0], substrings[1]))
 
-class PrintCurrentWeatherCommand(WeatherCommand):
-    def __init__(self,
-        connector: WeatherApiConnector,
-        location: Optional[Location] = None,
-        units: Units = Units.METRIC):
-        self._connector = connector
-        self._location = location
-        self._units = units
+class WeatherReport(NamedTuple):
+    """Weather information retrieved by a command for a location.
+    """
+    location: Location
+    weather_infos: List[WeatherInfo]
+
+class WeatherReportCommand(WeatherCommand):
+    """Base class for the commands retrieving and printing weather information
+    of a location. Reports are written to `output` (the standard output by
+    default) in the format of `formatter` (text by default).
+
+    With a `deadline`, in seconds, the requests retrieving the report must be
+    answered within it, otherwise the command times out.
+    """
+    DEADLINE = "deadline"
+
+    _output: Optional[TextOutput]
+    _formatter: Optional[ReportFormatter]
+    _deadline: Optional[float] = None
+
+    @abstractmethod
+    def get_report(self) -> WeatherReport:
+        """Retrieves the weather information. Raises the connector exceptions.
+        """
 
     def execute(self):
+        command_name = type(self).__name__
+        with metrics.span("command", command=command_name):
+            status, _ = self.try_get_report(self._print_report)
+        metrics.increment("weatherconsoleapp_commands_total", command=command_name, status=status.name.lower())
+        return status
+
+    def try_get_report(
+        self,
+        report_handler: Optional[Callable[[WeatherReport], None]] = None) -> Tuple[CommandResultStatus, Optional[WeatherReport]]:
+        """Retrieves the weather information, passing it to `report_handler` if
+        any, and returns it together with the result status of the command.
+        """
         try:
-            current_weather_info = self._connector.get_current_weather_for_location(
-                self._location,
-                self._units)
-            Utils.print_location(current_weather_info.location)
-            Utils.print_weather_forecast(current_weather_info)
-            return CommandResultStatus.SUCCESS
+            with request_deadline(self._deadline):
+                report = self.get_report()
+            if report_handler is not None:
+                report_handler(report)
+            return (CommandResultStatus.SUCCESS, report)
+        except WeatherConnectorConnectionError:
+            logger.warning("Could not connect to the weather service while executing command")
+            return (CommandResultStatus.CONNECTION_ERROR, None)
         except WeatherConnectorTimeout:
-            return CommandResultStatus.Timeout
+            logger.warning("Request timed out while executing command")
+            return (CommandResultStatus.TIMEOUT, None)
         except Exception:
             logger.error("Exception raised while executing command", exc_info=True)
-            return CommandResultStatus.ERROR
+            return (CommandResultStatus.ERROR, None)
+
+    def _print_report(self, report: WeatherReport):
+        with metrics.span("render"):
+            formatter = TextFormatter() if self._formatter is None else self._formatter
+            output = sys.stdout if self._output is None else self._output
+            output.write(formatter.format_report(report))
+
+class PrintCurrentWeatherCommand(WeatherReportCommand):
+    def __init__(self,
+        connector: WeatherApiConnector,
+        location: Location,
+        units: Units = Units.METRIC,
+        output: Optional[TextOutput] = None,
+        formatter: Optional[ReportFormatter] = None,
+        deadline: Optional[float] = None):
+        self._connector = connector
+        self._location = location
+        self._units = units
+        self._output = output
+        self._formatter = formatter
+        self._deadline = deadline
+
+    def get_report(self) -> WeatherReport:
+        current_weather_info = self._connector.get_current_weather_for_location(
+            self._location,
+            self._units)
+        return WeatherReport(current_weather_info.location, [current_weather_info])
 
     @classmethod
     def validate_arguments(cls, location: str, units: str) -> Tuple[List[str], Dict[str, Any]]:
         validations_error_messages = []
-        validated_input = {}
+        validated_input: Dict[str, Any] = {}
 
         location_validation_message, validated_location = cls.validate_location_argument(location)
         units_validation_message, validated_units = super().validate_units_argument(units)
@@ -89,35 +162,32 @@ class PrintCurrentWeatherCommand(WeatherCommand):
 
         return (validations_error_messages, validated_input)
 
-class PrintWeatherForecastCommand(WeatherCommand):
+class PrintWeatherForecastCommand(WeatherReportCommand):
 
     MAX_NUMBER_OF_DAYS = 5
 
     def __init__(self,
         connector: WeatherApiConnector,
-        location: Optional[Location] = None,
-        units: Optional[Units] = Units.METRIC,
-        days: Optional[int] = 5):
+        location: Location,
+        units: Units = Units.METRIC,
+        days: int = 5,
+        output: Optional[TextOutput] = None,
+        formatter: Optional[ReportFormatter] = None,
+        deadline: Optional[float] = None):
         self._connector = connector
         self._location = location
         self._units = units
         self._days = days
+        self._output = output
+        self._formatter = formatter
+        self._deadline = deadline
 
-    def execute(self):
-        try:
-            weather_forecast_infos = self._connector.get_weather_forecast_for_location(
-                self._location,
-                self._units,
-                self._days)
-            Utils.print_location(self._location)
-            for weather_info in weather_forecast_infos:
-                Utils.print_weather_forecast(weather_info)
-            return CommandResultStatus.SUCCESS
-        except WeatherConnectorTimeout:
-            return CommandResultStatus.Timeout
-        except Exception:
-            logger.error("Exception raised while executing command", exc_info=True)
-            return CommandResultStatus.ERROR
+    def get_report(self) -> WeatherReport:
+        weather_forecast_infos = self._connector.get_weather_forecast_for_location(
+            self._location,
+            self._units,
+            self._days)
+        return WeatherReport(self._location, weather_forecast_infos)
 
     @classmethod
     def validate_days_argument(cls, days: str):
@@ -130,7 +200,7 @@ class PrintWeatherForecastCommand(WeatherCommand):
     @classmethod
     def validate_arguments(cls, location: str, units: str, days: str) -> Tuple[List[str], Dict[str, Any]]:
         validations_error_messages = []
-        validated_input = {}
+        validated_input: Dict[str, Any] = {}
 
         location_validation_message, validated_location = cls.validate_location_argument(location)
         units_validation_message, validated_units = cls.validate_units_argument(units)
@@ -152,3 +222,318 @@ class PrintWeatherForecastCommand(WeatherCommand):
             validated_input[cls.DAYS] = validated_days
 
         return (validations_error_messages, validated_input)
+
+class PrintHourlyForecastCommand(WeatherReportCommand):
+
+    VALID_HOURS = (1, 12, 24, 72, 120)
+
+    def __init__(self,
+        connector: WeatherApiConnector,
+        location: Location,
+        units: Units = Units.METRIC,
+        hours: int = 12,
+        output: Optional[TextOutput] = None,
+        formatter: Optional[ReportFormatter] = None,
+        deadline: Optional[float] = None):
+        self._connector = connector
+        self._location = location
+        self._units = units
+        self._hours = hours
+        self._output = output
+        self._formatter = formatter
+        self._deadline = deadline
+
+    def get_report(self) -> WeatherReport:
+        series = self._connector.get_hourly_forecast_for_location(
+            self._location,
+            self._units,
+            self._hours)
+        return WeatherReport(self._location, series.to_weather_infos())
+
+    @classmethod
+    def validate_hours_argument(cls, hours: str):
+        value = Utils.try_parse_string_to_int(hours)
+
+        if value not in cls.VALID_HOURS:
+            return ("Input 'hours' argument must be one of 1, 12, 24, 72 or 120.", None)
+        return (None, value)
+
+    @classmethod
+    def validate_arguments(cls, location: str, units: str, hours: str) -> Tuple[List[str], Dict[str, Any]]:
+        validations_error_messages = []
+        validated_input: Dict[str, Any] = {}
+
+        location_validation_message, validated_location = cls.validate_location_argument(location)
+        units_validation_message, validated_units = cls.validate_units_argument(units)
+        hours_validation_message, validated_hours = cls.validate_hours_argument(hours)
+
+        if validated_location is None:
+            validations_error_messages.append(location_validation_message)
+        else:
+            validated_input[cls.LOCATION]  = validated_location
+
+        if validated_units is None:
+            validations_error_messages.append(units_validation_message)
+        else:
+            validated_input[cls.UNITS] = validated_units
+
+        if validated_hours is None:
+            validations_error_messages.append(hours_validation_message)
+        else:
+            validated_input[cls.HOURS] = validated_hours
+
+        return (validations_error_messages, validated_input)
+
+class WatchCommand(WeatherCommand):
+    """Polls the current weather and the forecast of a location every
+    `interval` seconds, redrawing only the lines that changed.
+
+    Each poll revalidates the cached responses older than the interval with
+    conditional requests, so unchanged upstream payloads are neither downloaded
+    nor parsed again. The location key is resolved by the first poll only.
+    """
+    INTERVAL = "interval"
+    MIN_INTERVAL = 10
+
+    def __init__(self,
+        connector: WeatherApiConnector,
+        location: Location,
+        units: Units = Units.METRIC,
+        days: int = 5,
+        interval: int = 60,
+        output: Optional[TextIO] = None,
+        polls: Optional[int] = None,
+        sleep: Callable[[float], None] = time.sleep,
+        renderer: Optional[LineDiffRenderer] = None):
+        self._connector = connector
+        self._location = location
+        self._units = units
+        self._days = days
+        self._interval = interval
+        self._polls = polls
+        self._sleep = sleep
+        self._renderer = LineDiffRenderer(output) if renderer is None else renderer
+
+    def execute(self) -> CommandResultStatus:
+        """Polls `polls` times, or until interrupted, and returns the status of
+        the last poll.
+        """
+        lines: List[str] = []
+        poll = 0
+        while True:
+            status, lines = self.poll(lines)
+            self._renderer.render(lines, prefix=f"{datetime.now():%H:%M:%S} ")
+            poll += 1
+            if self._polls is not None and poll >= self._polls:
+                return status
+            self._sleep(self._interval)
+
+    def poll(self, previous_lines: List[str]) -> Tuple[CommandResultStatus, List[str]]:
+        """Returns the status of the poll and the lines to draw. When a request
+        fails, the previous weather lines are kept along with an error line.
+        """
+        # Imported here since the caches pull in the HTTP client libraries.
+        from .connectors.response_cache import refresh_ahead
+
+        with metrics.span("poll"), refresh_ahead(0, max_age=self._interval):
+            current_status, current_report = PrintCurrentWeatherCommand(
+                self._connector, self._location, self._units).try_get_report()
+            forecast_status, forecast_report = PrintWeatherForecastCommand(
+                self._connector, self._location, self._units, self._days).try_get_report()
+
+        if current_report is None or forecast_report is None:
+            status = forecast_status if current_report is not None else current_status
+            message = {
+                CommandResultStatus.TIMEOUT: "Request timed out",
+                CommandResultStatus.CONNECTION_ERROR: "Could not connect to the weather service"}.get(status, "An unexpected error happened")
+            weather_lines = previous_lines[:-1] if len(previous_lines) > 0 else []
+            return (status, weather_lines + [f"{message}, retrying every {self._interval} seconds."])
+
+        lines = [TextFormatter.format_location(self._location), "Now:"]
+        lines.extend(TextFormatter.format_weather_info(current_report.weather_infos[0]))
+        lines.append("Forecast:")
+        for weather_info in forecast_report.weather_infos:
+            lines.extend(TextFormatter.format_weather_info(weather_info))
+        # Status line, empty while requests succeed.
+        lines.append("")
+        return (CommandResultStatus.SUCCESS, lines)
+
+    @classmethod
+    def validate_interval_argument(cls, interval: str):
+        value = Utils.try_parse_string_to_int(interval)
+
+        if value is None or value < cls.MIN_INTERVAL:
+            return (f"Input 'interval' argument must be an integer of at least {cls.MIN_INTERVAL} seconds.", None)
+        return (None, value)
+
+    @classmethod
+    def validate_arguments(cls, location: str, units: str, days: str, interval: str) -> Tuple[List[str], Dict[str, Any]]:
+        validations_error_messages, validated_input = PrintWeatherForecastCommand.validate_arguments(location, units, days)
+        interval_validation_message, validated_interval = cls.validate_interval_argument(interval)
+
+        if validated_interval is None:
+            validations_error_messages.append(interval_validation_message)
+        else:
+            validated_input[cls.INTERVAL] = validated_interval
+
+        return (validations_error_messages, validated_input)
+
+class PrintHistoryCommand(WeatherReportCommand):
+    """Prints the weather information of a location recorded in the history
+    between two dates, or only the number of records and their minimum,
+    maximum and mean temperatures with `aggregate`.
+    """
+    KIND = "kind"
+    START = "start"
+    END = "end"
+    # Kinds of the history records, see `history.KINDS`.
+    KINDS = ("current", "forecast", "hourly")
+
+    def __init__(self,
+        store: "HistoryStore",
+        location: Location,
+        units: Units = Units.METRIC,
+        kind: str = "current",
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        aggregate: bool = False,
+        output: Optional[TextOutput] = None,
+        formatter: Optional[ReportFormatter] = None):
+        self._store = store
+        self._location = location
+        self._units = units
+        self._kind = kind
+        self._start = start
+        self._end = end
+        self._aggregate = aggregate
+        self._output = output
+        self._formatter = formatter
+
+    def execute(self) -> CommandResultStatus:
+        if not self._aggregate:
+            return super().execute()
+        aggregates = self._store.aggregate(self._location, self._kind, self._units, self._start, self._end)
+        output = sys.stdout if self._output is None else self._output
+        output.write(self.format_aggregates(self._location, aggregates))
+        return CommandResultStatus.SUCCESS
+
+    def get_report(self) -> WeatherReport:
+        weather_infos = list(self._store.query(self._location, self._kind, self._units, self._start, self._end))
+        return WeatherReport(self._location, weather_infos)
+
+    @staticmethod
+    def format_aggregates(location: Location, aggregates: "HistoryAggregates") -> str:
+        lines = [TextFormatter.format_location(location)]
+        if aggregates.records == 0:
+            lines.append("    No records.")
+        else:
+            lines.append(f"    Records: {aggregates.records}")
+            lines.append(f"    Minimum temperature: {aggregates.min_temperature}")
+            lines.append(f"    Maximum temperature: {aggregates.max_temperature}")
+            lines.append(f"    Mean temperature: {aggregates.mean_temperature}")
+        lines.append("")
+        return "\n".join(lines)
+
+    @classmethod
+    def validate_kind_argument(cls, kind: str):
+        if kind.strip() not in cls.KINDS:
+            return ("Input 'kind' argument must be 'current' (default), 'forecast' or 'hourly'.", None)
+        return (None, kind.strip())
+
+    @classmethod
+    def validate_date_argument(cls, name: str, date_string: Optional[str]):
+        """Returns the date of an optional YYYY-MM-DD argument.
+        """
+        if date_string is None:
+            return (None, None)
+        try:
+            return (None, date.fromisoformat(date_string.strip()))
+        except ValueError:
+            return (f"Input '{name}' argument must be a date with this format: YYYY-MM-DD.", None)
+
+    @classmethod
+    def validate_arguments(cls,
+        location: str,
+        units: str,
+        kind: str,
+        start: Optional[str] = None,
+        end: Optional[str] = None) -> Tuple[List[str], Dict[str, Any]]:
+        validations_error_messages, validated_input = PrintCurrentWeatherCommand.validate_arguments(location, units)
+        kind_validation_message, validated_kind = cls.validate_kind_argument(kind)
+        start_validation_message, validated_start = cls.validate_date_argument("from", start)
+        end_validation_message, validated_end = cls.validate_date_argument("to", end)
+
+        if validated_kind is None:
+            validations_error_messages.append(kind_validation_message)
+        else:
+            validated_input[cls.KIND] = validated_kind
+
+        for message in (start_validation_message, end_validation_message):
+            if message is not None:
+                validations_error_messages.append(message)
+        validated_input[cls.START] = validated_start
+        validated_input[cls.END] = validated_end
+        if validated_start is not None and validated_end is not None and validated_start > validated_end:
+            validations_error_messages.append("Input 'from' date must not be after the 'to' date.")
+
+        return (validations_error_messages, validated_input)
+
+class BatchCommandResult(NamedTuple):
+    """Outcome of one of the commands run by a `BatchCommand`.
+    """
+    label: str
+    status: CommandResultStatus
+    output: str
+
+class BatchCommand(WeatherCommand):
+    """Runs several independent commands concurrently, e.g. the same command for
+    many locations. The output of each command is buffered and written in the
+    original order, so results of different commands never interleave.
+    Commands run in a copy of the caller's context, keeping its context variables.
+    At most twice `max_workers` commands are pending at any time, so memory stays
+    bounded however many commands there are.
+    """
+    DEFAULT_MAX_WORKERS = 8
+
+    def __init__(self,
+        labeled_command_builders: Iterable[Tuple[str, Any]],
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        output: Optional[TextOutput] = None):
+        self._labeled_command_builders = labeled_command_builders
+        self._max_workers = max(1, max_workers)
+        self._output = output
+
+    def execute(self) -> List[BatchCommandResult]:
+        """Returns the result of every command, in the original order. The output
+        of each command is written as soon as the previous ones are written.
+        """
+        return list(self.iter_results())
+
+    def iter_results(self) -> Iterator[BatchCommandResult]:
+        """Yields the result of every command, in the original order, right after
+        writing its output.
+        """
+        output = sys.stdout if self._output is None else self._output
+        pending: Deque[Future] = deque()
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            for label, command_builder in self._labeled_command_builders:
+                if len(pending) >= 2 * self._max_workers:
+                    yield self._write_result(pending.popleft().result(), output)
+                pending.append(executor.submit(contextvars.copy_context().run, self._execute_buffered, label, command_builder))
+            while len(pending) > 0:
+                yield self._write_result(pending.popleft().result(), output)
+
+    @staticmethod
+    def _write_result(result: BatchCommandResult, output: TextOutput) -> BatchCommandResult:
+        output.write(result.output)
+        return result
+
+    @staticmethod
+    def _execute_buffered(label: str, command_builder) -> BatchCommandResult:
+        buffer = io.StringIO()
+        try:
+            status = command_builder(output=buffer).execute()
+        except Exception:
+            logger.error("Exception raised while executing command for %s", label, exc_info=True)
+            status = CommandResultStatus.ERROR
+        return BatchCommandResult(label, status, buffer.getvalue())
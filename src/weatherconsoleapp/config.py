@@ -0,0 +1,299 @@
+import os
+import pathlib
+import logging
+import configparser
+from typing import List, NamedTuple, Optional
+
+CONFIG_FILENAME = "config.ini"
+
+logger = logging.getLogger(__name__)
+
+def get_config_dirname() -> pathlib.Path:
+    app_directory = ".weatherconsoleapp"
+    user_directory = os.path.expanduser("~")
+    return pathlib.Path(user_directory, app_directory)
+
+def get_config_filepath() -> pathlib.Path:
+    return pathlib.Path(get_config_dirname(), CONFIG_FILENAME)
+
+class HttpSettings(NamedTuple):
+    """Settings of the HTTP session used to reach weather APIs. Timeouts and
+    backoff delays are in seconds.
+    """
+    connect_timeout: float = 3.05
+    read_timeout: float = 10.0
+    pool_size: int = 10
+    max_retries: int = 3
+    backoff_factor: float = 0.5
+    max_backoff: float = 30.0
+
+class LoggingSettings(NamedTuple):
+    """Settings of the application log file. It is rotated once it reaches
+    `max_bytes`, or at the `rotate_when` interval (e.g. 'midnight', see
+    `logging.handlers.TimedRotatingFileHandler`) if set, keeping
+    `backup_count` files. `format` is 'text' or 'json', one object per line.
+    """
+    level: str = "INFO"
+    format: str = "text"
+    max_bytes: int = 10 * 1024 * 1024
+    backup_count: int = 5
+    rotate_when: str = ""
+    queue_size: int = 10000
+
+class AppConfig:
+    """Typed, read-only access to the user's config.ini file. Every option
+    but the apikey has a default, so config files created by older versions
+    keep working.
+    """
+    ACCUWEATHER_SECTION = "accuweather"
+    CACHE_SECTION = "cache"
+    BATCH_SECTION = "batch"
+    HTTP_SECTION = "http"
+    SERVER_SECTION = "server"
+    PROVIDERS_SECTION = "providers"
+    OPEN_METEO_SECTION = "open-meteo"
+    WATCHLIST_SECTION = "watchlist"
+    GAZETTEER_SECTION = "gazetteer"
+    HISTORY_SECTION = "history"
+    LOGGING_SECTION = "logging"
+
+    LOG_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+    LOG_FORMATS = ("text", "json")
+    # Intervals accepted by logging.handlers.TimedRotatingFileHandler, ignoring case.
+    LOG_ROTATION_INTERVALS = ("S", "M", "H", "D", "MIDNIGHT") + tuple(f"W{day}" for day in range(7))
+
+    ACCUWEATHER_PROVIDER = "accuweather"
+    OPEN_METEO_PROVIDER = "open-meteo"
+    PROVIDERS = (ACCUWEATHER_PROVIDER, OPEN_METEO_PROVIDER)
+
+    DEFAULT_API_URL = "http://dataservice.accuweather.com"
+    DEFAULT_DAILY_LIMIT = 50
+    DEFAULT_REQUESTS_PER_SECOND = 5
+    DEFAULT_LOCATION_KEY_CACHE_SIZE = 1000
+    DEFAULT_CURRENT_CONDITIONS_TTL = 600
+    DEFAULT_FORECAST_TTL = 3600
+    DEFAULT_MAX_STALE = 86400
+    DEFAULT_BATCH_MAX_WORKERS = 8
+    DEFAULT_SERVER_HOST = "127.0.0.1"
+    DEFAULT_SERVER_PORT = 8080
+    DEFAULT_SERVER_MAX_WORKERS = 16
+    DEFAULT_SERVER_IDLE_TIMEOUT = 5.0
+    DEFAULT_SERVER_MAX_PENDING = 64
+    DEFAULT_OPEN_METEO_API_URL = "https://api.open-meteo.com"
+    DEFAULT_OPEN_METEO_GEOCODING_URL = "https://geocoding-api.open-meteo.com"
+    DEFAULT_HEDGE_QUANTILE = 0.95
+    DEFAULT_HEDGE_DELAY = 1.0
+    DEFAULT_MAX_ERROR_RATE = 0.5
+    DEFAULT_FAILOVER_COOLDOWN = 60
+    DEFAULT_REFRESH_MARGIN = 120
+    DEFAULT_REFRESH_INTERVAL = 60
+    DEFAULT_REFRESH_DAILY_BUDGET = 25
+    DEFAULT_GAZETTEER_STRICT = False
+    DEFAULT_HISTORY_ENABLED = True
+    DEFAULT_CIRCUIT_FAILURE_THRESHOLD = 5
+    DEFAULT_CIRCUIT_RESET_TIMEOUT = 30
+
+    def __init__(self, parser: configparser.ConfigParser):
+        self._parser = parser
+
+    @classmethod
+    def load(cls, filepath: Optional[pathlib.Path] = None) -> "AppConfig":
+        parser = configparser.ConfigParser()
+        parser.read(get_config_filepath() if filepath is None else filepath, encoding="utf-8")
+        return cls(parser)
+
+    def get_apikey(self) -> Optional[str]:
+        apikeys = self.get_apikeys()
+        return apikeys[0] if len(apikeys) > 0 else None
+
+    def get_apikeys(self) -> List[str]:
+        """Returns the configured apikeys, which are separated by commas or new lines.
+        """
+        apikeys = self._parser.get(self.ACCUWEATHER_SECTION, "apikey", fallback="").replace("\n", ",")
+        return [apikey.strip() for apikey in apikeys.split(",") if len(apikey.strip()) > 0]
+
+    def get_api_url(self) -> str:
+        return self._parser.get(self.ACCUWEATHER_SECTION, "api_url", fallback=self.DEFAULT_API_URL)
+
+    def get_daily_limit(self) -> int:
+        return self._parser.getint(self.ACCUWEATHER_SECTION, "daily_limit", fallback=self.DEFAULT_DAILY_LIMIT)
+
+    def get_requests_per_second(self) -> float:
+        return self._parser.getfloat(
+            self.ACCUWEATHER_SECTION,
+            "requests_per_second",
+            fallback=self.DEFAULT_REQUESTS_PER_SECOND)
+
+    def get_location_key_cache_size(self) -> int:
+        return self._parser.getint(
+            self.CACHE_SECTION,
+            "location_keys_max_entries",
+            fallback=self.DEFAULT_LOCATION_KEY_CACHE_SIZE)
+
+    def get_current_conditions_ttl(self) -> float:
+        return self._parser.getfloat(
+            self.CACHE_SECTION,
+            "current_conditions_ttl",
+            fallback=self.DEFAULT_CURRENT_CONDITIONS_TTL)
+
+    def get_forecast_ttl(self) -> float:
+        return self._parser.getfloat(self.CACHE_SECTION, "forecast_ttl", fallback=self.DEFAULT_FORECAST_TTL)
+
+    def get_max_stale(self) -> float:
+        return self._parser.getfloat(self.CACHE_SECTION, "max_stale", fallback=self.DEFAULT_MAX_STALE)
+
+    def get_batch_max_workers(self) -> int:
+        return self._parser.getint(self.BATCH_SECTION, "max_workers", fallback=self.DEFAULT_BATCH_MAX_WORKERS)
+
+    def get_http_settings(self) -> HttpSettings:
+        defaults = HttpSettings()
+        return HttpSettings(
+            connect_timeout=self._parser.getfloat(self.HTTP_SECTION, "connect_timeout", fallback=defaults.connect_timeout),
+            read_timeout=self._parser.getfloat(self.HTTP_SECTION, "read_timeout", fallback=defaults.read_timeout),
+            pool_size=self._parser.getint(self.HTTP_SECTION, "pool_size", fallback=defaults.pool_size),
+            max_retries=self._parser.getint(self.HTTP_SECTION, "max_retries", fallback=defaults.max_retries),
+            backoff_factor=self._parser.getfloat(self.HTTP_SECTION, "backoff_factor", fallback=defaults.backoff_factor),
+            max_backoff=self._parser.getfloat(self.HTTP_SECTION, "max_backoff", fallback=defaults.max_backoff))
+
+    def get_deadline(self) -> Optional[float]:
+        """Returns the seconds within which the requests of a command must be
+        answered, or None if they are not bounded.
+        """
+        deadline = self._parser.get(self.HTTP_SECTION, "deadline", fallback="").strip()
+        if len(deadline) == 0:
+            return None
+        try:
+            value = float(deadline)
+        except ValueError:
+            logger.warning("Ignoring invalid deadline '%s'.", deadline)
+            return None
+        return value if value > 0 else None
+
+    def get_circuit_failure_threshold(self) -> int:
+        return self._parser.getint(
+            self.HTTP_SECTION,
+            "circuit_failure_threshold",
+            fallback=self.DEFAULT_CIRCUIT_FAILURE_THRESHOLD)
+
+    def get_circuit_reset_timeout(self) -> float:
+        return self._parser.getfloat(
+            self.HTTP_SECTION,
+            "circuit_reset_timeout",
+            fallback=self.DEFAULT_CIRCUIT_RESET_TIMEOUT)
+
+    def get_server_host(self) -> str:
+        return self._parser.get(self.SERVER_SECTION, "host", fallback=self.DEFAULT_SERVER_HOST)
+
+    def get_server_port(self) -> int:
+        return self._parser.getint(self.SERVER_SECTION, "port", fallback=self.DEFAULT_SERVER_PORT)
+
+    def get_server_max_workers(self) -> int:
+        return self._parser.getint(self.SERVER_SECTION, "max_workers", fallback=self.DEFAULT_SERVER_MAX_WORKERS)
+
+    def get_server_idle_timeout(self) -> float:
+        return self._parser.getfloat(self.SERVER_SECTION, "idle_timeout", fallback=self.DEFAULT_SERVER_IDLE_TIMEOUT)
+
+    def get_server_max_pending(self) -> int:
+        return self._parser.getint(self.SERVER_SECTION, "max_pending", fallback=self.DEFAULT_SERVER_MAX_PENDING)
+
+    def get_providers(self) -> List[str]:
+        """Returns the names of the configured weather providers, the primary
+        first. A secondary provider is optional and enables hedged requests.
+        Unknown names are ignored.
+        """
+        providers = []
+        for option, fallback in (("primary", self.ACCUWEATHER_PROVIDER), ("secondary", "")):
+            provider = self._parser.get(self.PROVIDERS_SECTION, option, fallback=fallback).strip().lower()
+            if provider in self.PROVIDERS and provider not in providers:
+                providers.append(provider)
+            elif len(provider) > 0:
+                logger.warning("Ignoring unknown %s provider '%s'.", option, provider)
+        return providers if len(providers) > 0 else [self.ACCUWEATHER_PROVIDER]
+
+    def get_hedge_quantile(self) -> float:
+        return self._parser.getfloat(self.PROVIDERS_SECTION, "hedge_quantile", fallback=self.DEFAULT_HEDGE_QUANTILE)
+
+    def get_default_hedge_delay(self) -> float:
+        return self._parser.getfloat(self.PROVIDERS_SECTION, "default_hedge_delay", fallback=self.DEFAULT_HEDGE_DELAY)
+
+    def get_max_error_rate(self) -> float:
+        return self._parser.getfloat(self.PROVIDERS_SECTION, "max_error_rate", fallback=self.DEFAULT_MAX_ERROR_RATE)
+
+    def get_failover_cooldown(self) -> float:
+        return self._parser.getfloat(self.PROVIDERS_SECTION, "failover_cooldown", fallback=self.DEFAULT_FAILOVER_COOLDOWN)
+
+    def get_open_meteo_api_url(self) -> str:
+        return self._parser.get(self.OPEN_METEO_SECTION, "api_url", fallback=self.DEFAULT_OPEN_METEO_API_URL)
+
+    def get_open_meteo_geocoding_url(self) -> str:
+        return self._parser.get(self.OPEN_METEO_SECTION, "geocoding_url", fallback=self.DEFAULT_OPEN_METEO_GEOCODING_URL)
+
+    def get_watchlist(self) -> List[str]:
+        """Returns the locations to keep refreshed, which are separated by
+        semicolons or new lines since locations contain commas.
+        """
+        locations = self._parser.get(self.WATCHLIST_SECTION, "locations", fallback="").replace("\n", ";")
+        return [location.strip() for location in locations.split(";") if len(location.strip()) > 0]
+
+    def get_refresh_margin(self) -> float:
+        return self._parser.getfloat(self.WATCHLIST_SECTION, "refresh_margin", fallback=self.DEFAULT_REFRESH_MARGIN)
+
+    def get_refresh_interval(self) -> float:
+        return self._parser.getfloat(self.WATCHLIST_SECTION, "interval", fallback=self.DEFAULT_REFRESH_INTERVAL)
+
+    def get_refresh_daily_budget(self) -> int:
+        return self._parser.getint(self.WATCHLIST_SECTION, "daily_budget", fallback=self.DEFAULT_REFRESH_DAILY_BUDGET)
+
+
+    def get_gazetteer_path(self) -> Optional[str]:
+        """Returns the configured gazetteer index file, or None for the default
+        one in the config directory.
+        """
+        path = self._parser.get(self.GAZETTEER_SECTION, "path", fallback="").strip()
+        return path if len(path) > 0 else None
+
+    def is_gazetteer_strict(self) -> bool:
+        return self._parser.getboolean(self.GAZETTEER_SECTION, "strict", fallback=self.DEFAULT_GAZETTEER_STRICT)
+
+    def is_history_enabled(self) -> bool:
+        return self._parser.getboolean(self.HISTORY_SECTION, "enabled", fallback=self.DEFAULT_HISTORY_ENABLED)
+
+    def get_history_path(self) -> Optional[str]:
+        """Returns the configured history database file, or None for the default
+        one in the config directory.
+        """
+        path = self._parser.get(self.HISTORY_SECTION, "path", fallback="").strip()
+        return path if len(path) > 0 else None
+
+    def get_logging_settings(self) -> LoggingSettings:
+        """Returns the logging settings. Unknown levels, formats and rotation
+        intervals are replaced by the defaults.
+        """
+        defaults = LoggingSettings()
+        level = self._parser.get(self.LOGGING_SECTION, "level", fallback=defaults.level).strip().upper()
+        if level not in self.LOG_LEVELS:
+            logger.warning("Ignoring unknown log level '%s'.", level)
+            level = defaults.level
+        log_format = self._parser.get(self.LOGGING_SECTION, "format", fallback=defaults.format).strip().lower()
+        if log_format not in self.LOG_FORMATS:
+            logger.warning("Ignoring unknown log format '%s'.", log_format)
+            log_format = defaults.format
+        rotate_when = self._parser.get(self.LOGGING_SECTION, "rotate_when", fallback=defaults.rotate_when).strip()
+        if len(rotate_when) > 0 and rotate_when.upper() not in self.LOG_ROTATION_INTERVALS:
+            logger.warning("Ignoring unknown log rotation interval '%s', valid ones are %s.",
+                rotate_when, ", ".join(self.LOG_ROTATION_INTERVALS))
+            rotate_when = defaults.rotate_when
+        return LoggingSettings(
+            level=level,
+            format=log_format,
+            max_bytes=self._parser.getint(self.LOGGING_SECTION, "max_bytes", fallback=defaults.max_bytes),
+            backup_count=self._parser.getint(self.LOGGING_SECTION, "backup_count", fallback=defaults.backup_count),
+            rotate_when=rotate_when,
+            queue_size=self._parser.getint(self.LOGGING_SECTION, "queue_size", fallback=defaults.queue_size))
+
+    def get_log_path(self) -> Optional[str]:
+        """Returns the configured log file, or None for the default one in the
+        config directory.
+        """
+        path = self._parser.get(self.LOGGING_SECTION, "path", fallback="").strip()
+        return path if len(path) > 0 else None
@@ -1,2 +1,17 @@
+import importlib
 from .weather_api_connector import WeatherApiConnector
-from .accuweather_api_connector import AccuWeatherApiConnector
+from .async_weather_api_connector import AsyncWeatherApiConnector
+
+# Connector implementations pull in HTTP client libraries, so they are only
+# imported when first accessed.
+_LAZY_EXPORTS = {
+    "AccuWeatherApiConnector": ".accuweather_api_connector",
+    "AsyncAccuWeatherApiConnector": ".async_accuweather_api_connector",
+}
+
+def __getattr__(name: str):
+    if name not in _LAZY_EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
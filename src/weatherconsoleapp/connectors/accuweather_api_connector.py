@@ -1,28 +1,65 @@
-from typing import List
+from typing import List, Optional
 from logging import getLogger
 from . import WeatherApiConnector
-from ..domain import Location, WeatherInfo, Units
-from .accuweather_requests import LocationKeyRequest, CurrentWeatherRequest, WeatherForecastRequest
+from ..domain import Location, WeatherInfo, WeatherSeries, Units
+from .accuweather_requests import LocationKey, LocationKeyRequest, CurrentWeatherRequest, WeatherForecastRequest, HourlyForecastRequest
+from .location_key_cache import LocationKeyCache
+from ..gazetteer import Gazetteer
+from .deadlines import split_request_deadline
 from.requests_factories import BaseRequestsFactory
 
 class AccuWeatherApiConnector(WeatherApiConnector):
     """Connector for the Accuweather API https://developer.accuweather.com/
     """
-    def __init__(self, apikey, requests_factory: BaseRequestsFactory):
+    def __init__(self,
+        apikey,
+        requests_factory: BaseRequestsFactory,
+        location_key_cache: Optional[LocationKeyCache] = None,
+        api_url: Optional[str] = None,
+        gazetteer: Optional[Gazetteer] = None):
         self._apikey = apikey
+        self._api_url = api_url
         self._requests_factory = requests_factory
+        self._location_key_cache = location_key_cache
+        self._gazetteer = gazetteer
 
     def get_current_weather_for_location(
         self,
         location: Location,
         unit: Units) -> WeatherInfo:
-        location_key = LocationKeyRequest(self._requests_factory, location, self._apikey).get_result()
-        return CurrentWeatherRequest(self._requests_factory, location_key, unit, self._apikey).get_result()
+        location_key = self._get_location_key(location)
+        return CurrentWeatherRequest(self._requests_factory, location_key, unit, self._apikey, self._api_url).get_result()
 
     def get_weather_forecast_for_location(
         self,
         location: Location,
         unit: Units,
         days: int = 5) -> List[WeatherInfo]:
-        location_key = LocationKeyRequest(self._requests_factory, location, self._apikey).get_result()
-        return WeatherForecastRequest(self._requests_factory, location_key, unit, days, self._apikey).get_result()
+        location_key = self._get_location_key(location)
+        return WeatherForecastRequest(self._requests_factory, location_key, unit, days, self._apikey, self._api_url).get_result()
+
+    def get_hourly_forecast_for_location(
+        self,
+        location: Location,
+        unit: Units,
+        hours: int = 12) -> WeatherSeries:
+        location_key = self._get_location_key(location)
+        return HourlyForecastRequest(self._requests_factory, location_key, unit, hours, self._apikey, self._api_url).get_result()
+
+    def _get_location_key(self, location: Location) -> LocationKey:
+        if self._gazetteer is not None:
+            entry = self._gazetteer.get(location)
+            if entry is not None:
+                return LocationKey(location, entry.key_code)
+
+        if self._location_key_cache is not None:
+            key_code = self._location_key_cache.get(location)
+            if key_code is not None:
+                return LocationKey(location, key_code)
+
+        # The weather request follows, so the key request gets half the time left.
+        with split_request_deadline(2):
+            location_key = LocationKeyRequest(self._requests_factory, location, self._apikey, self._api_url).get_result()
+        if self._location_key_cache is not None:
+            self._location_key_cache.put(location, location_key.key_code)
+        return location_key
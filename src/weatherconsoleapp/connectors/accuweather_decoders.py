@@ -0,0 +1,135 @@
+"""Decoders turning raw Accuweather response bodies into domain values.
+
+The schema of each endpoint lists the only fields the application reads. When
+the optional `msgspec` dependency is installed (`pip install .[fast]`), bodies
+are decoded straight from bytes into the schema structs and every other field
+is skipped without being materialized. Otherwise they are decoded with the
+standard `json` module, reading the same fields.
+"""
+from datetime import date, datetime
+from typing import List, Tuple
+import json
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None  # type: ignore[assignment]
+
+def parse_iso_date(datetime_string: str) -> date:
+    """Returns the local date of an ISO 8601 timestamp such as
+    '2022-11-19T22:58:00+01:00'.
+    """
+    try:
+        return date.fromisoformat(datetime_string[:10])
+    except (TypeError, ValueError):
+        return datetime.strptime(datetime_string, "%Y-%m-%dT%H:%M:%S%z").date()
+
+def parse_utc_offset(datetime_string: str) -> int:
+    """Returns the UTC offset in seconds of an ISO 8601 timestamp such as
+    '2022-11-19T22:00:00+01:00'.
+    """
+    if datetime_string.endswith("Z"):
+        return 0
+    sign = -1 if datetime_string[-6] == "-" else 1
+    return sign * (int(datetime_string[-5:-3]) * 3600 + int(datetime_string[-2:]) * 60)
+
+# (observation timestamp, weather text, metric temperature, imperial temperature)
+CurrentConditionsFields = Tuple[str, str, float, float]
+# (date timestamp, day icon phrase, minimum temperature, maximum temperature)
+DailyForecastFields = Tuple[str, str, float, float]
+# (epoch timestamp, local timestamp, weather icon code, icon phrase, temperature)
+HourlyForecastFields = Tuple[int, str, int, str, float]
+
+if msgspec is not None:
+    class _Value(msgspec.Struct):
+        Value: float
+
+    class _MetricAndImperial(msgspec.Struct):
+        Metric: _Value
+        Imperial: _Value
+
+    class _CurrentConditions(msgspec.Struct):
+        LocalObservationDateTime: str
+        WeatherText: str
+        Temperature: _MetricAndImperial
+
+    class _LocationKey(msgspec.Struct):
+        Key: str
+
+    class _DayPart(msgspec.Struct):
+        IconPhrase: str
+
+    class _MinimumAndMaximum(msgspec.Struct):
+        Minimum: _Value
+        Maximum: _Value
+
+    class _DailyForecast(msgspec.Struct):
+        Date: str
+        Day: _DayPart
+        Temperature: _MinimumAndMaximum
+
+    class _Forecast(msgspec.Struct):
+        DailyForecasts: List[_DailyForecast]
+
+    class _HourlyForecast(msgspec.Struct):
+        EpochDateTime: int
+        DateTime: str
+        WeatherIcon: int
+        IconPhrase: str
+        Temperature: _Value
+
+    _LOCATION_KEYS_DECODER = msgspec.json.Decoder(List[_LocationKey])
+    _CURRENT_CONDITIONS_DECODER = msgspec.json.Decoder(List[_CurrentConditions])
+    _FORECAST_DECODER = msgspec.json.Decoder(_Forecast)
+    _HOURLY_FORECASTS_DECODER = msgspec.json.Decoder(List[_HourlyForecast])
+
+    def decode_location_key_code(content: bytes) -> str:
+        return _LOCATION_KEYS_DECODER.decode(content)[0].Key
+
+    def decode_current_conditions(content: bytes) -> CurrentConditionsFields:
+        data = _CURRENT_CONDITIONS_DECODER.decode(content)[0]
+        return (
+            data.LocalObservationDateTime,
+            data.WeatherText,
+            data.Temperature.Metric.Value,
+            data.Temperature.Imperial.Value)
+
+    def decode_daily_forecasts(content: bytes) -> List[DailyForecastFields]:
+        return [(forecast.Date, forecast.Day.IconPhrase, forecast.Temperature.Minimum.Value, forecast.Temperature.Maximum.Value)
+            for forecast in _FORECAST_DECODER.decode(content).DailyForecasts]
+
+    def decode_hourly_forecasts(content: bytes) -> List[HourlyForecastFields]:
+        return [(forecast.EpochDateTime, forecast.DateTime, forecast.WeatherIcon, forecast.IconPhrase, forecast.Temperature.Value)
+            for forecast in _HOURLY_FORECASTS_DECODER.decode(content)]
+else:
+    def decode_location_key_code(content: bytes) -> str:
+        return json.loads(content)[0]["Key"]
+
+    def decode_current_conditions(content: bytes) -> CurrentConditionsFields:
+        data = json.loads(content)[0]
+        temperature = data["Temperature"]
+        return (
+            data["LocalObservationDateTime"],
+            data["WeatherText"],
+            temperature["Metric"]["Value"],
+            temperature["Imperial"]["Value"])
+
+    def decode_daily_forecasts(content: bytes) -> List[DailyForecastFields]:
+        daily_forecasts = []
+        for forecast in json.loads(content)["DailyForecasts"]:
+            temperature = forecast["Temperature"]
+            daily_forecasts.append((
+                forecast["Date"],
+                forecast["Day"]["IconPhrase"],
+                temperature["Minimum"]["Value"],
+                temperature["Maximum"]["Value"]))
+        return daily_forecasts
+
+    def decode_hourly_forecasts(content: bytes) -> List[HourlyForecastFields]:
+        return [(
+                forecast["EpochDateTime"],
+                forecast["DateTime"],
+                forecast["WeatherIcon"],
+                forecast["IconPhrase"],
+                forecast["Temperature"]["Value"])
+            for forecast in json.loads(content)]
@@ -1,20 +1,92 @@
 from abc import ABC, abstractmethod
-from typing import Dict, List, NamedTuple
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, NamedTuple, Optional, Tuple, TypeVar, cast
 import logging
-from datetime import datetime
-from ..domain import Units, Location, WeatherInfo, Date, Temperature
-from .requests_factories import BaseRequestsFactory
+import threading
+from ..domain import Units, Location, WeatherInfo, Date, Temperature, WeatherSeries
+from .requests_factories import BaseRequestsFactory, HttpResponse
+from . import accuweather_decoders
+from .. import metrics
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+class ParsedResponses:
+    """Bounded LRU of parse results by request and response content, so an
+    unchanged payload, e.g. served again from the cache or polled by `watch`,
+    is not parsed again. Thread safe.
+    """
+    def __init__(self, max_entries: int = 128):
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[Hashable, bytes], Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, content: bytes) -> Optional[Any]:
+        with self._lock:
+            result = self._entries.get((key, content))
+            if result is not None:
+                self._entries.move_to_end((key, content))
+            return result
+
+    def put(self, key: Hashable, content: bytes, result: Any):
+        with self._lock:
+            self._entries[(key, content)] = result
+            self._entries.move_to_end((key, content))
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+parsed_responses = ParsedResponses()
+
 class Request(ABC):
+    """Base Accuweather request. Temperatures are always requested in
+    `canonical_units` and converted to the requested units once parsed, so the
+    same upstream response serves every unit system. `api_url` may be
+    overridden per request, e.g. to target a local stand-in of the API.
+    """
     api_url = "http://dataservice.accuweather.com"
     api_version = 1
+    canonical_units = Units.METRIC
     _requests_factory: BaseRequestsFactory
 
-    def make_request(self) -> dict:
-        return self._requests_factory.get(self._get_url(), params= self._get_params())
-        
+    request_url: str
+
+    def make_request(self) -> HttpResponse:
+        with metrics.span("request", endpoint=self.request_url):
+            response = self._requests_factory.get_response(self._get_url(), params= self._get_params())
+        self._count_response(response)
+        return response
+
+    def _count_response(self, response: HttpResponse):
+        metrics.increment("weatherconsoleapp_requests_total", endpoint=self.request_url, status_code=response.status_code)
+
+    def _parse_response(self, parse: Callable[[bytes], T], response: HttpResponse) -> T:
+        parse_key = self._get_parse_key()
+        if parse_key is not None:
+            result = parsed_responses.get(parse_key, response.content)
+            metrics.increment("weatherconsoleapp_parsed_responses_lookups_total", result="miss" if result is None else "hit")
+            if result is not None:
+                return cast(T, list(result) if isinstance(result, list) else result)
+        with metrics.span("parse", endpoint=self.request_url):
+            result = parse(response.content)
+        if parse_key is not None:
+            parsed_responses.put(parse_key, response.content, list(result) if isinstance(result, list) else result)
+        return result
+
+    def _get_parse_key(self) -> Optional[Hashable]:
+        """Returns what the parse result depends on besides the response content,
+        or None when results must not be reused, e.g. because they are mutable.
+        """
+        return None
+
+    def _set_api_url(self, api_url: Optional[str]):
+        if api_url is not None:
+            self.api_url = api_url.rstrip("/")
+
     @abstractmethod
     def _get_url(self) -> str:
         pass
@@ -28,7 +100,7 @@ class Request(ABC):
 
     @staticmethod
     def parse_datetime_string(datetime_string):
-        return datetime.strptime(datetime_string, "%Y-%m-%dT%H:%M:%S%z").date()
+        return accuweather_decoders.parse_iso_date(datetime_string)
 
 class LocationKey(NamedTuple):
     location: Location
@@ -37,7 +109,8 @@ class LocationKey(NamedTuple):
 class LocationKeyRequest(Request):
     request_url = "locations/v1/cities"
 
-    def __init__(self, requests_factory: BaseRequestsFactory, location: Location, apikey: str):
+    def __init__(self, requests_factory: BaseRequestsFactory, location: Location, apikey: str, api_url: Optional[str] = None):
+        self._set_api_url(api_url)
         self._location = location
         self._apikey = apikey
         self._requests_factory = requests_factory
@@ -45,21 +118,30 @@ class LocationKeyRequest(Request):
     def get_result(self) -> LocationKey:
         logger.info("Sending LocationKeyRequest: %s %s.", self._location.city, self._location.country_code)
         response = self.make_request()
-        return self._get_location_key_from_response_json(response)
+        return self._parse_response(self._get_location_key_from_response, response)
 
     def _get_url(self) -> str:
         return f"{self.api_url}/{self.request_url}/{self._location.country_code}/search"
 
+    def _get_parse_key(self):
+        return (self.request_url, self._location)
+
     def _get_params(self):
         return {"apikey" : self._apikey, "q": self._location.city }
 
-    def _get_location_key_from_response_json(self, response: dict) -> LocationKey:
-        return LocationKey(self._location, response[0]["Key"])
+    def _get_location_key_from_response(self, content: bytes) -> LocationKey:
+        return LocationKey(self._location, accuweather_decoders.decode_location_key_code(content))
 
 class CurrentWeatherRequest(Request):
     request_url = "currentconditions/v1"
 
-    def __init__(self, requests_factory: BaseRequestsFactory, location_key: LocationKey, units: Units, apikey: str):
+    def __init__(self,
+        requests_factory: BaseRequestsFactory,
+        location_key: LocationKey,
+        units: Units,
+        apikey: str,
+        api_url: Optional[str] = None):
+        self._set_api_url(api_url)
         self._location_key = location_key
         self._units = units
         self._apikey = apikey
@@ -68,7 +150,7 @@ class CurrentWeatherRequest(Request):
     def get_result(self) -> WeatherInfo:
         logger.info("Sending CurrentWeatherRequest: %s %s.", self._location_key, self._units.name)
         response = self.make_request()
-        return self._get_weather_from_response_json(response)
+        return self._parse_response(self._get_weather_from_response, response)
 
     def _get_url(self) -> str:
         return f"{self.api_url}/{self.request_url}/{self._location_key.key_code}"
@@ -76,20 +158,27 @@ class CurrentWeatherRequest(Request):
     def _get_params(self):
         return {"apikey" : self._apikey, "details" : False}
 
-    def _get_weather_from_response_json(self, response: dict) -> WeatherInfo:
-        data = response[0]
-        date = Date(self.parse_datetime_string(data["LocalObservationDateTime"]))
-        weather_description = data["WeatherText"]
-        unit_str = Request._convert_unit_to_key(self._units)
-        temperature_value = data["Temperature"][unit_str]["Value"]
-        temperature = Temperature(temperature_value, self._units)
+    def _get_parse_key(self):
+        return (self.request_url, self._location_key, self._units)
+
+    def _get_weather_from_response(self, content: bytes) -> WeatherInfo:
+        datetime_string, weather_description, metric_value, _ = accuweather_decoders.decode_current_conditions(content)
+        date = Date(self.parse_datetime_string(datetime_string))
+        temperature = Temperature(metric_value, self.canonical_units).to_units(self._units)
         location = self._location_key.location
         return WeatherInfo(date, location, temperature, weather_description)
 
 class WeatherForecastRequest(Request):
     request_url = "forecasts/v1/daily/5day"
 
-    def __init__(self,  requests_factory: BaseRequestsFactory, location_key: LocationKey, units: Units, days: int, apikey: str):
+    def __init__(self,
+        requests_factory: BaseRequestsFactory,
+        location_key: LocationKey,
+        units: Units,
+        days: int,
+        apikey: str,
+        api_url: Optional[str] = None):
+        self._set_api_url(api_url)
         self._location_key = location_key
         self._apikey = apikey
         self._units = units
@@ -99,30 +188,61 @@ class WeatherForecastRequest(Request):
     def get_result(self) -> List[WeatherInfo]:
         logger.info("Sending WeatherForecastRequest: %s %s %s.", self._location_key, self._units.name, self._days)
         response = self.make_request()
-        return self._get_weather_from_response_json(response)
+        return self._parse_response(self._get_weather_from_response, response)
 
     def _get_url(self) -> str:
         return f"{self.api_url}/{self.request_url}/{self._location_key.key_code}"
 
     def _get_params(self):
-        params = {"apikey" : self._apikey, "details" : False}
-        if self._units == Units.METRIC:
-            params["metric"] = "true"
-        return params
-
-    def _get_weather_from_response_json(self, response: dict) -> List[WeatherInfo]:
-        daily_forecasts = response["DailyForecasts"]
-        indices =  range(self._days)
-        filtered_forecasts = [daily_forecasts[i] for i in indices]
-        return [self._parse_raw_forecast(f) for f in filtered_forecasts]
-
-    def _parse_raw_forecast(self, raw_forecast) -> WeatherInfo:
-        date = Date(self.parse_datetime_string(raw_forecast["Date"]))
-        weather_description = raw_forecast["Day"]["IconPhrase"]
-        min_temperature_value = raw_forecast["Temperature"]["Minimum"]["Value"]
-        max_temperature_value = raw_forecast["Temperature"]["Maximum"]["Value"]
-        min_temperature = Temperature(min_temperature_value, self._units)
-        max_temperature = Temperature(max_temperature_value, self._units)
-        average_temperature = Temperature.compute_average([min_temperature, max_temperature])
+        return {"apikey" : self._apikey, "details" : False, "metric": "true"}
+
+    def _get_parse_key(self):
+        return (self.request_url, self._location_key, self._units, self._days)
+
+    def _get_weather_from_response(self, content: bytes) -> List[WeatherInfo]:
+        daily_forecasts = accuweather_decoders.decode_daily_forecasts(content)
+        return [self._parse_daily_forecast(f) for f in daily_forecasts[:self._days]]
+
+    def _parse_daily_forecast(self, daily_forecast: accuweather_decoders.DailyForecastFields) -> WeatherInfo:
+        datetime_string, weather_description, min_temperature_value, max_temperature_value = daily_forecast
+        date = Date(self.parse_datetime_string(datetime_string))
+        average_temperature = Temperature((min_temperature_value + max_temperature_value) / 2, self.canonical_units)
         location = self._location_key.location
-        return WeatherInfo(date, location, average_temperature, weather_description)
\ No newline at end of file
+        return WeatherInfo(date, location, average_temperature.to_units(self._units), weather_description)
+
+class HourlyForecastRequest(Request):
+    request_url = "forecasts/v1/hourly"
+    HOURS = (1, 12, 24, 72, 120)
+
+    def __init__(self,
+        requests_factory: BaseRequestsFactory,
+        location_key: LocationKey,
+        units: Units,
+        hours: int,
+        apikey: str,
+        api_url: Optional[str] = None):
+        if hours not in self.HOURS:
+            raise ValueError(f"hours must be one of {self.HOURS}.")
+        self._set_api_url(api_url)
+        self._location_key = location_key
+        self._apikey = apikey
+        self._units = units
+        self._hours = hours
+        self._requests_factory = requests_factory
+
+    def get_result(self) -> WeatherSeries:
+        logger.info("Sending HourlyForecastRequest: %s %s %s.", self._location_key, self._units.name, self._hours)
+        response = self.make_request()
+        return self._parse_response(self._get_series_from_response, response)
+
+    def _get_url(self) -> str:
+        return f"{self.api_url}/{self.request_url}/{self._hours}hour/{self._location_key.key_code}"
+
+    def _get_params(self):
+        return {"apikey" : self._apikey, "details" : False, "metric": "true"}
+
+    def _get_series_from_response(self, content: bytes) -> WeatherSeries:
+        series = WeatherSeries(self._location_key.location, self.canonical_units)
+        for timestamp, datetime_string, icon, icon_phrase, temperature in accuweather_decoders.decode_hourly_forecasts(content):
+            series.append(timestamp, accuweather_decoders.parse_utc_offset(datetime_string), temperature, icon, icon_phrase)
+        return series.to_units(self._units)
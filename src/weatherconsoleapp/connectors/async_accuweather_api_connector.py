@@ -0,0 +1,62 @@
+from typing import List, Optional
+import asyncio
+from .async_weather_api_connector import AsyncWeatherApiConnector
+from ..domain import Location, WeatherInfo, Units
+from .accuweather_requests import LocationKey
+from .async_accuweather_requests import AsyncLocationKeyRequest, AsyncCurrentWeatherRequest, AsyncWeatherForecastRequest
+from .location_key_cache import LocationKeyCache
+from ..gazetteer import Gazetteer
+from .requests_factories import AsyncBaseRequestsFactory
+
+class AsyncAccuWeatherApiConnector(AsyncWeatherApiConnector):
+    """Asynchronous connector for the Accuweather API https://developer.accuweather.com/
+    """
+    def __init__(self,
+        apikey,
+        requests_factory: AsyncBaseRequestsFactory,
+        location_key_cache: Optional[LocationKeyCache] = None,
+        api_url: Optional[str] = None,
+        gazetteer: Optional[Gazetteer] = None):
+        self._apikey = apikey
+        self._api_url = api_url
+        self._requests_factory = requests_factory
+        self._location_key_cache = location_key_cache
+        self._gazetteer = gazetteer
+
+    async def get_current_weather_for_location(
+        self,
+        location: Location,
+        unit: Units) -> WeatherInfo:
+        location_key = await self._get_location_key(location)
+        return await AsyncCurrentWeatherRequest(self._requests_factory, location_key, unit, self._apikey, self._api_url).get_async_result()
+
+    async def get_weather_forecast_for_location(
+        self,
+        location: Location,
+        unit: Units,
+        days: int = 5) -> List[WeatherInfo]:
+        location_key = await self._get_location_key(location)
+        return await AsyncWeatherForecastRequest(self._requests_factory, location_key, unit, days, self._apikey, self._api_url).get_async_result()
+
+    async def _get_location_key(self, location: Location) -> LocationKey:
+        # The gazetteer and the cache read files, so they are used from the
+        # default executor rather than blocking the event loop.
+        loop = asyncio.get_running_loop()
+        if self._gazetteer is not None or self._location_key_cache is not None:
+            key_code = await loop.run_in_executor(None, self._get_known_key_code, location)
+            if key_code is not None:
+                return LocationKey(location, key_code)
+
+        location_key = await AsyncLocationKeyRequest(self._requests_factory, location, self._apikey, self._api_url).get_async_result()
+        if self._location_key_cache is not None:
+            await loop.run_in_executor(None, self._location_key_cache.put, location, location_key.key_code)
+        return location_key
+
+    def _get_known_key_code(self, location: Location) -> Optional[str]:
+        if self._gazetteer is not None:
+            entry = self._gazetteer.get(location)
+            if entry is not None:
+                return entry.key_code
+        if self._location_key_cache is not None:
+            return self._location_key_cache.get(location)
+        return None
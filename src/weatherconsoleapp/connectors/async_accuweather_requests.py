@@ -0,0 +1,79 @@
+from typing import Any, Callable, Dict, List, Optional
+import logging
+from ..domain import Location, Units, WeatherInfo
+from .accuweather_requests import LocationKey, LocationKeyRequest, CurrentWeatherRequest, WeatherForecastRequest
+from .requests_factories import AsyncBaseRequestsFactory, BaseRequestsFactory, HttpResponse
+from .. import metrics
+
+logger = logging.getLogger(__name__)
+
+class _SyncRequestsUnsupported(BaseRequestsFactory):
+    """Requests factory of the synchronous methods inherited by asynchronous
+    requests, which must be sent with `get_async_result` instead.
+    """
+    def get(self, url: str, params: Optional[dict] = None) -> dict:
+        raise TypeError("Asynchronous requests are sent with get_async_result.")
+
+_SYNC_REQUESTS_UNSUPPORTED = _SyncRequestsUnsupported()
+
+class AsyncRequestMixin:
+    """Adds awaitable requests to a `Request`, whose url, params and response
+    parsing are reused. The synchronous `make_request` and `get_result` are
+    left unusable.
+    """
+    request_url: str
+    _async_requests_factory: AsyncBaseRequestsFactory
+    # Implemented by `Request`.
+    _get_url: Callable[[], str]
+    _get_params: Callable[[], Dict[str, Any]]
+    _count_response: Callable[[HttpResponse], None]
+
+    async def make_async_request(self) -> HttpResponse:
+        with metrics.span("request", endpoint=self.request_url):
+            response = await self._async_requests_factory.get_response(self._get_url(), params=self._get_params())
+        self._count_response(response)
+        return response
+
+class AsyncLocationKeyRequest(AsyncRequestMixin, LocationKeyRequest):
+
+    def __init__(self, requests_factory: AsyncBaseRequestsFactory, location: Location, apikey: str, api_url: Optional[str] = None):
+        super().__init__(_SYNC_REQUESTS_UNSUPPORTED, location, apikey, api_url)
+        self._async_requests_factory = requests_factory
+
+    async def get_async_result(self) -> LocationKey:
+        logger.info("Sending LocationKeyRequest: %s %s.", self._location.city, self._location.country_code)
+        response = await self.make_async_request()
+        return self._parse_response(self._get_location_key_from_response, response)
+
+class AsyncCurrentWeatherRequest(AsyncRequestMixin, CurrentWeatherRequest):
+
+    def __init__(self,
+        requests_factory: AsyncBaseRequestsFactory,
+        location_key: LocationKey,
+        units: Units,
+        apikey: str,
+        api_url: Optional[str] = None):
+        super().__init__(_SYNC_REQUESTS_UNSUPPORTED, location_key, units, apikey, api_url)
+        self._async_requests_factory = requests_factory
+
+    async def get_async_result(self) -> WeatherInfo:
+        logger.info("Sending CurrentWeatherRequest: %s %s.", self._location_key, self._units.name)
+        response = await self.make_async_request()
+        return self._parse_response(self._get_weather_from_response, response)
+
+class AsyncWeatherForecastRequest(AsyncRequestMixin, WeatherForecastRequest):
+
+    def __init__(self,
+        requests_factory: AsyncBaseRequestsFactory,
+        location_key: LocationKey,
+        units: Units,
+        days: int,
+        apikey: str,
+        api_url: Optional[str] = None):
+        super().__init__(_SYNC_REQUESTS_UNSUPPORTED, location_key, units, days, apikey, api_url)
+        self._async_requests_factory = requests_factory
+
+    async def get_async_result(self) -> List[WeatherInfo]:
+        logger.info("Sending WeatherForecastRequest: %s %s %s.", self._location_key, self._units.name, self._days)
+        response = await self.make_async_request()
+        return self._parse_response(self._get_weather_from_response, response)
@@ -0,0 +1,61 @@
+from typing import Optional
+import asyncio
+import logging
+from urllib.parse import urlsplit
+from .errors import WeatherConnectorConnectionError
+from .requests_factories import AsyncBaseRequestsFactory, HttpResponse, WeatherConnectorTimeout
+
+logger = logging.getLogger(__name__)
+
+class AiohttpRequestsFactory(AsyncBaseRequestsFactory):
+    """Asynchronous requests factory backed by an `aiohttp` client session, which
+    keeps a pool of connections shared by every in-flight request.
+
+    Requires the optional `aiohttp` dependency (`pip install .[async]`). The
+    session is created on first use, in the running event loop, and must be
+    released with `close` or by using the factory as an async context manager.
+    """
+    def __init__(self, timeout: float = 10.0, max_connections: int = 100):
+        try:
+            import aiohttp  # type: ignore[import-not-found]
+        except ImportError as error:
+            raise ImportError("AiohttpRequestsFactory requires aiohttp: pip install weatherconsoleapp[async]") from error
+        self._aiohttp = aiohttp
+        self._timeout = timeout
+        self._max_connections = max_connections
+        self._session = None
+
+    async def __aenter__(self) -> "AiohttpRequestsFactory":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def get(self, url: str, params: Optional[dict] = None) -> dict:
+        return (await self.get_response(url, params)).json()
+
+    async def get_response(self, url: str, params: Optional[dict] = None) -> HttpResponse:
+        query = {} if params is None else {name: str(value) for name, value in params.items()}
+        try:
+            async with self._get_session().get(url, params=query) as response:
+                content = await response.read()
+        except asyncio.TimeoutError:
+            logger.error("Server timeout", exc_info=True)
+            raise WeatherConnectorTimeout("AccuweatherApiConnector timed out.")
+        except self._aiohttp.ClientConnectionError as error:
+            logger.error("Could not connect to the server", exc_info=True)
+            raise WeatherConnectorConnectionError(f"Could not connect to {urlsplit(url).netloc}.") from error
+        logger.info("Response status code: %s %s", response.status, response.reason)
+        return HttpResponse(response.status, response.headers, content)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _get_session(self):
+        if self._session is None:
+            self._session = self._aiohttp.ClientSession(
+                timeout=self._aiohttp.ClientTimeout(total=self._timeout),
+                connector=self._aiohttp.TCPConnector(limit=self._max_connections))
+        return self._session
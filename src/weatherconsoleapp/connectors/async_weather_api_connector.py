@@ -0,0 +1,21 @@
+from abc import ABC, abstractmethod
+from typing import List
+from ..domain import Location, WeatherInfo, Units
+
+class AsyncWeatherApiConnector(ABC):
+    """Base asynchronous weather APIs connector, the awaitable counterpart of
+    `WeatherApiConnector`.
+    """
+    @abstractmethod
+    async def get_current_weather_for_location(self, location: Location, unit: Units) -> WeatherInfo:
+        """Retrieves the current weather for a given location.
+        """
+
+    @abstractmethod
+    async def get_weather_forecast_for_location(
+        self,
+        location: Location,
+        unit: Units,
+        days: int = 5) -> List[WeatherInfo]:
+        """Retrieves the 5 days weather forecast for a given location.
+        """
@@ -0,0 +1,146 @@
+from enum import Enum
+from typing import Callable, Dict, Iterable, Optional
+from urllib.parse import urlsplit
+import time
+import logging
+import threading
+from .. import metrics
+from .errors import CircuitOpenError, DeadlineExceeded, WeatherConnectorTimeout
+from .requests_factories import BaseRequestsFactory, HttpResponse
+
+logger = logging.getLogger(__name__)
+
+class CircuitState(Enum):
+    CLOSED = 0
+    OPEN = 1
+    HALF_OPEN = 2
+
+class CircuitBreaker:
+    """Circuit of an endpoint, opened by `failure_threshold` consecutive
+    failures. While open, requests are rejected. After `reset_timeout`
+    seconds, a single probe request is let through: its success closes the
+    circuit, its failure opens it again. Thread safe.
+    """
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30, clock: Callable[[], float] = time.monotonic):
+        self._failure_threshold = max(1, failure_threshold)
+        self._reset_timeout = reset_timeout
+        self._clock = clock
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> CircuitState:
+        with self._lock:
+            return self._state
+
+    def allow_request(self) -> bool:
+        """Returns whether a request may be sent, making it the probe request
+        once the reset timeout of an open circuit has elapsed.
+        """
+        with self._lock:
+            if self._state == CircuitState.CLOSED:
+                return True
+            if self._state == CircuitState.OPEN and self._clock() - self._opened_at >= self._reset_timeout:
+                self._state = CircuitState.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = CircuitState.CLOSED
+            self._failures = 0
+
+    def record_failure(self) -> bool:
+        """Counts a failure and returns whether it opened the circuit.
+        """
+        with self._lock:
+            self._failures += 1
+            if self._state == CircuitState.HALF_OPEN or (self._state == CircuitState.CLOSED and self._failures >= self._failure_threshold):
+                self._state = CircuitState.OPEN
+                self._opened_at = self._clock()
+                return True
+            return False
+
+    def record_ignored(self):
+        """Releases the probe request of a half-open circuit when its outcome
+        says nothing about the endpoint, e.g. the caller's deadline expired.
+        """
+        with self._lock:
+            if self._state == CircuitState.HALF_OPEN:
+                self._state = CircuitState.OPEN
+
+class CircuitBreakerRequestsFactory(BaseRequestsFactory):
+    """Requests factory decorator failing fast with `CircuitOpenError` while an
+    endpoint is unhealthy, instead of sending requests bound to time out.
+
+    Each endpoint has its own `CircuitBreaker`. Endpoints are identified by the
+    first of `endpoints` found in the url, or else by the host. Timeouts and
+    5xx responses count as failures. Expired deadlines and other errors, e.g.
+    exhausted quotas, are not the endpoint's fault and are not counted.
+
+    Decorated by a `CachingRequestsFactory`, stale cached responses are served
+    while the circuit is open.
+    """
+    def __init__(self,
+        requests_factory: BaseRequestsFactory,
+        endpoints: Iterable[str] = (),
+        failure_threshold: int = 5,
+        reset_timeout: float = 30,
+        clock: Callable[[], float] = time.monotonic):
+        self._requests_factory = requests_factory
+        self._endpoints = list(endpoints)
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._clock = clock
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, url: str, params: Optional[dict] = None) -> dict:
+        return self.get_response(url, params).json()
+
+    def get_response(self, url: str, params: Optional[dict] = None, headers: Optional[dict] = None) -> HttpResponse:
+        endpoint = self.get_endpoint(url)
+        breaker = self.get_breaker(endpoint)
+        if not breaker.allow_request():
+            metrics.increment("weatherconsoleapp_circuit_breaker_rejections_total", endpoint=endpoint)
+            raise CircuitOpenError(f"Circuit open for {endpoint}, request not sent.")
+
+        try:
+            response = self._requests_factory.get_response(url, params, headers)
+        except DeadlineExceeded:
+            breaker.record_ignored()
+            raise
+        except WeatherConnectorTimeout:
+            self._record_failure(breaker, endpoint)
+            raise
+        except BaseException:
+            breaker.record_ignored()
+            raise
+
+        if response.status_code >= 500:
+            self._record_failure(breaker, endpoint)
+        else:
+            breaker.record_success()
+        return response
+
+    def get_endpoint(self, url: str) -> str:
+        for endpoint in self._endpoints:
+            if endpoint in url:
+                return endpoint
+        return urlsplit(url).netloc
+
+    def get_breaker(self, endpoint: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(endpoint)
+            if breaker is None:
+                breaker = CircuitBreaker(self._failure_threshold, self._reset_timeout, self._clock)
+                self._breakers[endpoint] = breaker
+            return breaker
+
+    @staticmethod
+    def _record_failure(breaker: CircuitBreaker, endpoint: str):
+        if breaker.record_failure():
+            logger.warning("Circuit opened for %s after repeated failures.", endpoint)
+            metrics.increment("weatherconsoleapp_circuit_breaker_opened_total", endpoint=endpoint)
@@ -0,0 +1,78 @@
+"""Deadlines of the requests sent on behalf of a command.
+
+A command with a total deadline sets it with `request_deadline` around the
+requests it sends. Connectors sending several sequential requests, e.g. the
+location key before the current conditions, give each one a share of the
+remaining time with `split_request_deadline`, so the first request cannot use
+up the time of the next ones. Requests factories bound their timeouts,
+retries and waits by the current deadline and raise `DeadlineExceeded` once
+it has expired.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, Optional
+import time
+from .errors import DeadlineExceeded
+
+class Deadline:
+    """Point in time by which a request must be answered.
+    """
+    def __init__(self, seconds: float, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self.expires_at = clock() + seconds
+
+    def remaining(self) -> float:
+        """Returns the seconds left, 0 once expired.
+        """
+        return max(0.0, self.expires_at - self._clock())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+_current_request_deadline: "ContextVar[Optional[Deadline]]" = ContextVar("request_deadline", default=None)
+
+@contextmanager
+def request_deadline(seconds: Optional[float]) -> Iterator[Optional[Deadline]]:
+    """Sets a deadline `seconds` from now for the requests sent within the
+    context. A nested deadline never extends the enclosing one, and None keeps
+    the enclosing one, if any.
+    """
+    current = _current_request_deadline.get()
+    if seconds is None:
+        yield current
+        return
+    state = Deadline(seconds)
+    if current is not None and current.expires_at < state.expires_at:
+        state = current
+    token = _current_request_deadline.set(state)
+    try:
+        yield state
+    finally:
+        _current_request_deadline.reset(token)
+
+@contextmanager
+def split_request_deadline(requests: int) -> Iterator[Optional[Deadline]]:
+    """Gives the requests sent within the context an even share of the time
+    left, `requests` being the number of sequential requests still to send,
+    these included. Without deadline, requests stay unbounded.
+    """
+    current = _current_request_deadline.get()
+    seconds = None if current is None else current.remaining() / max(1, requests)
+    with request_deadline(seconds) as state:
+        yield state
+
+def get_request_deadline() -> Optional[Deadline]:
+    return _current_request_deadline.get()
+
+def get_remaining_time() -> Optional[float]:
+    """Returns the seconds left before the current deadline, or None without
+    deadline. Raises DeadlineExceeded if it has expired.
+    """
+    deadline = _current_request_deadline.get()
+    if deadline is None:
+        return None
+    remaining = deadline.remaining()
+    if remaining <= 0:
+        raise DeadlineExceeded("Request deadline exceeded.")
+    return remaining
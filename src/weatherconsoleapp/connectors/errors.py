@@ -0,0 +1,19 @@
+class WeatherConnectorTimeout(BaseException):
+    """Exception thrown when connector times out.
+    """
+
+class WeatherConnectorConnectionError(WeatherConnectorTimeout):
+    """Exception thrown when the connector cannot reach the server, e.g. on a
+    DNS failure or a refused connection. Caches and circuit breakers handle it
+    like a timeout.
+    """
+
+class DeadlineExceeded(WeatherConnectorTimeout):
+    """Exception thrown when the deadline of a request expires before it is
+    answered, see `request_deadline`.
+    """
+
+class CircuitOpenError(WeatherConnectorTimeout):
+    """Exception thrown without sending the request while the circuit breaker
+    of its endpoint is open.
+    """
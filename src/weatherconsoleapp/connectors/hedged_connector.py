@@ -0,0 +1,201 @@
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, List, Optional, Tuple
+import math
+import time
+import logging
+import threading
+import contextvars
+from . import WeatherApiConnector
+from ..domain import Location, WeatherInfo, WeatherSeries, Units
+from .. import metrics
+
+logger = logging.getLogger(__name__)
+
+class ProviderHealth:
+    """Latencies and outcomes of the last `window` calls to a provider. Thread safe.
+    """
+    def __init__(self, window: int = 50, clock: Callable[[], float] = time.monotonic):
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._clock = clock
+        self._failed_over_until = 0.0
+        self._lock = threading.Lock()
+
+    def record_success(self, latency: float):
+        with self._lock:
+            self._latencies.append(latency)
+            self._outcomes.append(True)
+
+    def record_failure(self):
+        with self._lock:
+            self._outcomes.append(False)
+
+    def get_latency_quantile(self, quantile: float) -> Optional[float]:
+        """Returns the nearest-rank quantile of the latencies of successful calls,
+        or None when there are none.
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if len(latencies) == 0:
+            return None
+        return latencies[max(1, math.ceil(quantile * len(latencies))) - 1]
+
+    def get_error_rate(self) -> Tuple[float, int]:
+        """Returns the error rate of the window together with its number of calls.
+        """
+        with self._lock:
+            calls = len(self._outcomes)
+            failures = calls - sum(self._outcomes)
+        return (failures / calls if calls > 0 else 0.0, calls)
+
+    def is_failed_over(self, max_error_rate: float, min_calls: int, cooldown: float) -> bool:
+        """Returns whether the provider should be avoided: its error rate reached
+        `max_error_rate` over at least `min_calls` calls. It is avoided for
+        `cooldown` seconds, then given a fresh window.
+        """
+        now = self._clock()
+        with self._lock:
+            if now < self._failed_over_until:
+                return True
+            if self._failed_over_until > 0:
+                self._failed_over_until = 0.0
+                self._outcomes.clear()
+                return False
+            calls = len(self._outcomes)
+            if calls < min_calls or (calls - sum(self._outcomes)) / calls < max_error_rate:
+                return False
+            self._failed_over_until = now + cooldown
+            return True
+
+class HedgedWeatherApiConnector(WeatherApiConnector):
+    """Connector asking several providers for the same information.
+
+    Each call goes to the first healthy provider. If it has not answered within
+    its `hedge_quantile` latency (or `default_hedge_delay` until latencies are
+    known), or if it fails, the call is also sent to the next provider and the
+    first successful result is returned. Providers whose error rate reaches
+    `max_error_rate` are moved to the back of the list for `failover_cooldown`
+    seconds.
+
+    Calls run in a pool of `max_workers` threads (`MAX_CALLS_PER_PROVIDER`
+    per provider by default), released with `close`. A losing call is left to
+    finish in the background, still recording the latency of its provider.
+    """
+    MAX_CALLS_PER_PROVIDER = 8
+
+    def __init__(self,
+        providers: List[Tuple[str, WeatherApiConnector]],
+        hedge_quantile: float = 0.95,
+        default_hedge_delay: float = 1.0,
+        min_hedge_delay: float = 0.05,
+        max_error_rate: float = 0.5,
+        min_calls: int = 10,
+        failover_cooldown: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+        max_workers: Optional[int] = None):
+        if len(providers) == 0:
+            raise ValueError("At least one provider is required.")
+        self._providers = [(name, connector, ProviderHealth(clock=clock)) for name, connector in providers]
+        self._hedge_quantile = hedge_quantile
+        self._default_hedge_delay = default_hedge_delay
+        self._min_hedge_delay = min_hedge_delay
+        self._max_error_rate = max_error_rate
+        self._min_calls = min_calls
+        self._failover_cooldown = failover_cooldown
+        self._clock = clock
+        self._executor = ThreadPoolExecutor(
+            max_workers=len(providers) * self.MAX_CALLS_PER_PROVIDER if max_workers is None else max_workers,
+            thread_name_prefix="hedged")
+
+    def __enter__(self) -> "HedgedWeatherApiConnector":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Stops the threads of the calls once they finish.
+        """
+        self._executor.shutdown(wait=False)
+
+    def get_current_weather_for_location(self, location: Location, unit: Units) -> WeatherInfo:
+        return self._call(lambda connector: connector.get_current_weather_for_location(location, unit))
+
+    def get_weather_forecast_for_location(self, location: Location, unit: Units, days: int = 5) -> List[WeatherInfo]:
+        return self._call(lambda connector: connector.get_weather_forecast_for_location(location, unit, days))
+
+    def get_hourly_forecast_for_location(self, location: Location, unit: Units, hours: int = 12) -> WeatherSeries:
+        return self._call(lambda connector: connector.get_hourly_forecast_for_location(location, unit, hours))
+
+    def get_hedge_delay(self, health: ProviderHealth) -> float:
+        latency = health.get_latency_quantile(self._hedge_quantile)
+        return self._default_hedge_delay if latency is None else max(self._min_hedge_delay, latency)
+
+    def _get_ordered_providers(self) -> List[Tuple[str, WeatherApiConnector, ProviderHealth]]:
+        healthy: List[Tuple[str, WeatherApiConnector, ProviderHealth]] = []
+        failed_over: List[Tuple[str, WeatherApiConnector, ProviderHealth]] = []
+        for provider in self._providers:
+            is_failed_over = provider[2].is_failed_over(self._max_error_rate, self._min_calls, self._failover_cooldown)
+            (failed_over if is_failed_over else healthy).append(provider)
+        return healthy + failed_over
+
+    def _call(self, method: Callable[[WeatherApiConnector], Any]) -> Any:
+        providers = self._get_ordered_providers()
+        futures: List[Future] = []
+        errors: List[BaseException] = []
+        for index, (name, connector, health) in enumerate(providers):
+            if index > 0:
+                reason = "error" if len(errors) > 0 else "slow"
+                logger.info("Hedging request to %s (%s).", name, reason)
+                metrics.increment("weatherconsoleapp_hedged_requests_total", provider=name, reason=reason)
+            futures.append(self._submit(name, connector, health, method))
+            is_last = index == len(providers) - 1
+            result_found, result = self._wait_for_result(futures, errors, None if is_last else self.get_hedge_delay(health))
+            if result_found:
+                return result
+
+        while len(futures) > 0:
+            result_found, result = self._wait_for_result(futures, errors, None)
+            if result_found:
+                return result
+        raise errors[0]
+
+    def _wait_for_result(self, futures: List[Future], errors: List[BaseException], timeout: Optional[float]) -> Tuple[bool, Any]:
+        """Waits up to `timeout` seconds for a pending call to complete, or for
+        any when None, and returns its result if it succeeded. Completed calls
+        are removed from `futures` and their errors appended to `errors`.
+        """
+        deadline = None if timeout is None else self._clock() + timeout
+        while len(futures) > 0:
+            remaining = None if deadline is None else max(0.0, deadline - self._clock())
+            done, _ = wait(futures, timeout=remaining, return_when=FIRST_COMPLETED)
+            if len(done) == 0:
+                return (False, None)
+            for future in done:
+                futures.remove(future)
+                error = future.exception()
+                if error is None:
+                    return (True, future.result())
+                errors.append(error)
+            if timeout is not None:
+                return (False, None)
+        return (False, None)
+
+    def _submit(self, name: str, connector: WeatherApiConnector, health: ProviderHealth, method: Callable[[WeatherApiConnector], Any]) -> Future:
+        context = contextvars.copy_context()
+        return self._executor.submit(context.run, self._call_provider, name, connector, health, method)
+
+    @staticmethod
+    def _call_provider(name: str, connector: WeatherApiConnector, health: ProviderHealth, method: Callable[[WeatherApiConnector], Any]) -> Any:
+        start_time = time.perf_counter()
+        try:
+            with metrics.span("provider", provider=name):
+                result = method(connector)
+        except BaseException:
+            health.record_failure()
+            metrics.increment("weatherconsoleapp_provider_calls_total", provider=name, outcome="failure")
+            raise
+        health.record_success(time.perf_counter() - start_time)
+        metrics.increment("weatherconsoleapp_provider_calls_total", provider=name, outcome="success")
+        return result
@@ -0,0 +1,121 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+from ..domain import Location
+from ..persistence import FileLock, PathLike, read_json_file, write_json_file_atomically
+
+logger = logging.getLogger(__name__)
+
+class LocationKeyCache:
+    """Persistent LRU cache mapping locations to Accuweather location keys.
+
+    Entries are stored in a JSON file shared by every process of the application.
+    Writers merge their in-memory state with the file content under an
+    inter-process lock, so concurrent processes never lose each other's entries.
+    """
+    FILENAME = "location_keys.json"
+    FORMAT_VERSION = 1
+
+    def __init__(self, filepath: PathLike, max_entries: int = 1000):
+        if max_entries < 1:
+            raise ValueError("max_entries must be a positive integer.")
+        self._filepath = filepath
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._loaded_mtime: Optional[float] = None
+        self._touched = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(location: Location) -> str:
+        return f"{location.city.strip().casefold()},{location.country_code.strip().upper()}"
+
+    def get(self, location: Location) -> Optional[str]:
+        """Returns the cached key code for `location`, or None on a cache miss.
+        """
+        normalized_location = self.normalize(location)
+        with self._lock:
+            if self._loaded_mtime is None or normalized_location not in self._entries:
+                self._reload_if_modified()
+            entry = self._entries.get(normalized_location)
+            if entry is None:
+                return None
+            self._entries[normalized_location] = (entry[0], time.time())
+            self._entries.move_to_end(normalized_location)
+            self._touched = True
+            return entry[0]
+
+    def put(self, location: Location, key_code: str):
+        """Stores a key code and persists the cache immediately.
+        """
+        normalized_location = self.normalize(location)
+        with self._lock:
+            self._entries[normalized_location] = (key_code, time.time())
+            self._entries.move_to_end(normalized_location)
+            self._persist()
+
+    def flush(self):
+        """Persists the access times of the entries read since the last write,
+        so the least recently used order survives across runs.
+        """
+        with self._lock:
+            if self._touched:
+                self._persist()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def _reload_if_modified(self):
+        mtime = self._get_file_mtime()
+        if mtime is not None and mtime != self._loaded_mtime:
+            self._merge(self._read_entries())
+        self._loaded_mtime = mtime if mtime is not None else 0.0
+
+    def _persist(self):
+        try:
+            with FileLock(self._filepath):
+                self._merge(self._read_entries())
+                self._evict()
+                entries = [[location, key_code, last_used]
+                    for location, (key_code, last_used) in self._entries.items()]
+                write_json_file_atomically(self._filepath, {"version": self.FORMAT_VERSION, "entries": entries})
+                self._loaded_mtime = self._get_file_mtime()
+                self._touched = False
+        except OSError:
+            logger.warning("Could not persist location keys cache %s", self._filepath, exc_info=True)
+
+    def _merge(self, stored_entries: "OrderedDict[str, Tuple[str, float]]"):
+        for location, (key_code, last_used) in stored_entries.items():
+            current = self._entries.get(location)
+            if current is None or current[1] < last_used:
+                self._entries[location] = (key_code, last_used)
+        self._entries = OrderedDict(sorted(self._entries.items(), key=lambda item: item[1][1]))
+
+    def _evict(self):
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def _read_entries(self) -> "OrderedDict[str, Tuple[str, float]]":
+        content = read_json_file(self._filepath)
+        entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        if content is None:
+            return entries
+        try:
+            if content["version"] != self.FORMAT_VERSION:
+                raise ValueError(f"Unsupported version {content['version']}")
+            for location, key_code, last_used in content["entries"]:
+                entries[str(location)] = (str(key_code), float(last_used))
+        except (KeyError, TypeError, ValueError):
+            logger.warning("Ignoring corrupt location keys cache %s", self._filepath, exc_info=True)
+            return OrderedDict()
+        return entries
+
+    def _get_file_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self._filepath).st_mtime
+        except OSError:
+            return None
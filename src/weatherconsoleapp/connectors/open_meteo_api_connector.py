@@ -0,0 +1,59 @@
+from typing import List, Optional
+from . import WeatherApiConnector
+from ..domain import Location, WeatherInfo, WeatherSeries, Units
+from .open_meteo_requests import Coordinates, GeocodingRequest, CurrentConditionsRequest, DailyForecastRequest, HourlyForecastRequest
+from .location_key_cache import LocationKeyCache
+from .requests_factories import BaseRequestsFactory
+from .deadlines import split_request_deadline
+
+class OpenMeteoApiConnector(WeatherApiConnector):
+    """Connector for the Open-Meteo API https://open-meteo.com/, which needs no
+    apikey. Coordinates of the locations may be kept in a `LocationKeyCache`.
+    """
+    FILENAME = "open_meteo_locations.json"
+
+    def __init__(self,
+        requests_factory: BaseRequestsFactory,
+        coordinates_cache: Optional[LocationKeyCache] = None,
+        api_url: Optional[str] = None,
+        geocoding_url: Optional[str] = None):
+        self._requests_factory = requests_factory
+        self._coordinates_cache = coordinates_cache
+        self._api_url = api_url
+        self._geocoding_url = geocoding_url
+
+    def get_current_weather_for_location(
+        self,
+        location: Location,
+        unit: Units) -> WeatherInfo:
+        coordinates = self._get_coordinates(location)
+        return CurrentConditionsRequest(self._requests_factory, coordinates, unit, self._api_url).get_result()
+
+    def get_weather_forecast_for_location(
+        self,
+        location: Location,
+        unit: Units,
+        days: int = 5) -> List[WeatherInfo]:
+        coordinates = self._get_coordinates(location)
+        return DailyForecastRequest(self._requests_factory, coordinates, unit, days, self._api_url).get_result()
+
+    def get_hourly_forecast_for_location(
+        self,
+        location: Location,
+        unit: Units,
+        hours: int = 12) -> WeatherSeries:
+        coordinates = self._get_coordinates(location)
+        return HourlyForecastRequest(self._requests_factory, coordinates, unit, hours, self._api_url).get_result()
+
+    def _get_coordinates(self, location: Location) -> Coordinates:
+        if self._coordinates_cache is not None:
+            key_code = self._coordinates_cache.get(location)
+            if key_code is not None:
+                return Coordinates.from_key_code(location, key_code)
+
+        # The weather request follows, so geocoding gets half the time left.
+        with split_request_deadline(2):
+            coordinates = GeocodingRequest(self._requests_factory, location, self._geocoding_url).get_result()
+        if self._coordinates_cache is not None:
+            self._coordinates_cache.put(location, coordinates.to_key_code())
+        return coordinates
@@ -0,0 +1,213 @@
+from abc import ABC, abstractmethod
+from datetime import date
+from typing import Any, Dict, List, NamedTuple, Optional
+import json
+import logging
+from ..domain import Units, Location, WeatherInfo, Date, Temperature, WeatherSeries
+from .requests_factories import BaseRequestsFactory, HttpResponse
+from .. import metrics
+
+logger = logging.getLogger(__name__)
+
+# Descriptions of the WMO weather interpretation codes used by Open-Meteo.
+WEATHER_CODE_DESCRIPTIONS = {
+    0: "Clear sky",
+    1: "Mainly clear",
+    2: "Partly cloudy",
+    3: "Overcast",
+    45: "Fog",
+    48: "Depositing rime fog",
+    51: "Light drizzle",
+    53: "Moderate drizzle",
+    55: "Dense drizzle",
+    56: "Light freezing drizzle",
+    57: "Dense freezing drizzle",
+    61: "Slight rain",
+    63: "Moderate rain",
+    65: "Heavy rain",
+    66: "Light freezing rain",
+    67: "Heavy freezing rain",
+    71: "Slight snow fall",
+    73: "Moderate snow fall",
+    75: "Heavy snow fall",
+    77: "Snow grains",
+    80: "Slight rain showers",
+    81: "Moderate rain showers",
+    82: "Violent rain showers",
+    85: "Slight snow showers",
+    86: "Heavy snow showers",
+    95: "Thunderstorm",
+    96: "Thunderstorm with slight hail",
+    99: "Thunderstorm with heavy hail",
+}
+
+def describe_weather_code(weather_code: int) -> str:
+    return WEATHER_CODE_DESCRIPTIONS.get(weather_code, "Unknown")
+
+class OpenMeteoRequest(ABC):
+    """Base Open-Meteo request https://open-meteo.com/en/docs. No apikey is
+    needed. Temperatures are always requested in Celsius and converted to the
+    requested units once parsed.
+    """
+    api_url = "https://api.open-meteo.com"
+    canonical_units = Units.METRIC
+    request_url: str
+    _requests_factory: BaseRequestsFactory
+
+    def make_request(self) -> HttpResponse:
+        with metrics.span("request", endpoint=self.request_url):
+            response = self._requests_factory.get_response(self._get_url(), params=self._get_params())
+        metrics.increment("weatherconsoleapp_requests_total", endpoint=self.request_url, status_code=response.status_code)
+        return response
+
+    def _get_content(self) -> Any:
+        response = self.make_request()
+        if response.status_code != 200:
+            raise ValueError(f"Open-Meteo answered with status code {response.status_code}.")
+        with metrics.span("parse", endpoint=self.request_url):
+            return json.loads(response.content)
+
+    def _set_api_url(self, api_url: Optional[str]):
+        if api_url is not None:
+            self.api_url = api_url.rstrip("/")
+
+    def _get_url(self) -> str:
+        return f"{self.api_url}/{self.request_url}"
+
+    @abstractmethod
+    def _get_params(self) -> Dict[str, Any]:
+        pass
+
+class Coordinates(NamedTuple):
+    location: Location
+    latitude: float
+    longitude: float
+
+    def to_key_code(self) -> str:
+        """Returns the coordinates as a string, to store them in a `LocationKeyCache`.
+        """
+        return f"{self.latitude},{self.longitude}"
+
+    @classmethod
+    def from_key_code(cls, location: Location, key_code: str) -> "Coordinates":
+        latitude, longitude = key_code.split(",")
+        return cls(location, float(latitude), float(longitude))
+
+class GeocodingRequest(OpenMeteoRequest):
+    api_url = "https://geocoding-api.open-meteo.com"
+    request_url = "v1/search"
+    MAX_RESULTS = 10
+
+    def __init__(self, requests_factory: BaseRequestsFactory, location: Location, api_url: Optional[str] = None):
+        self._set_api_url(api_url)
+        self._location = location
+        self._requests_factory = requests_factory
+
+    def get_result(self) -> Coordinates:
+        logger.info("Sending GeocodingRequest: %s %s.", self._location.city, self._location.country_code)
+        return self._get_coordinates_from_content(self._get_content())
+
+    def _get_params(self):
+        return {"name": self._location.city, "count": self.MAX_RESULTS, "language": "en", "format": "json"}
+
+    def _get_coordinates_from_content(self, content: Dict[str, Any]) -> Coordinates:
+        for result in content.get("results", []):
+            if result.get("country_code", "").upper() == self._location.country_code.upper():
+                return Coordinates(self._location, result["latitude"], result["longitude"])
+        raise ValueError(f"Open-Meteo does not know {self._location.city} ({self._location.country_code}).")
+
+class ForecastRequest(OpenMeteoRequest):
+    """Base request of the forecast endpoint, which serves current conditions,
+    daily and hourly forecasts depending on the params.
+    """
+    request_url = "v1/forecast"
+
+    def __init__(self, requests_factory: BaseRequestsFactory, coordinates: Coordinates, units: Units, api_url: Optional[str] = None):
+        self._set_api_url(api_url)
+        self._coordinates = coordinates
+        self._units = units
+        self._requests_factory = requests_factory
+
+    def _get_params(self):
+        return {
+            "latitude": self._coordinates.latitude,
+            "longitude": self._coordinates.longitude,
+            "timezone": "auto",
+            "temperature_unit": "celsius"}
+
+    def _create_weather_info(self, day: date, temperature_value: float, weather_code: int) -> WeatherInfo:
+        temperature = Temperature(temperature_value, self.canonical_units).to_units(self._units)
+        return WeatherInfo(Date(day), self._coordinates.location, temperature, describe_weather_code(weather_code))
+
+class CurrentConditionsRequest(ForecastRequest):
+
+    def get_result(self) -> WeatherInfo:
+        logger.info("Sending CurrentConditionsRequest: %s %s.", self._coordinates, self._units.name)
+        return self._get_weather_from_content(self._get_content())
+
+    def _get_params(self):
+        return {**super()._get_params(), "current": "temperature_2m,weather_code"}
+
+    def _get_weather_from_content(self, content: Dict[str, Any]) -> WeatherInfo:
+        current = content["current"]
+        day = date.fromisoformat(current["time"][:10])
+        return self._create_weather_info(day, current["temperature_2m"], current["weather_code"])
+
+class DailyForecastRequest(ForecastRequest):
+    FORECAST_DAYS = 5
+
+    def __init__(self,
+        requests_factory: BaseRequestsFactory,
+        coordinates: Coordinates,
+        units: Units,
+        days: int,
+        api_url: Optional[str] = None):
+        super().__init__(requests_factory, coordinates, units, api_url)
+        self._days = days
+
+    def get_result(self) -> List[WeatherInfo]:
+        logger.info("Sending DailyForecastRequest: %s %s %s.", self._coordinates, self._units.name, self._days)
+        return self._get_weather_from_content(self._get_content())
+
+    def _get_params(self):
+        # Always the same number of days, so every --days value shares the response.
+        return {
+            **super()._get_params(),
+            "daily": "weather_code,temperature_2m_max,temperature_2m_min",
+            "forecast_days": self.FORECAST_DAYS}
+
+    def _get_weather_from_content(self, content: Dict[str, Any]) -> List[WeatherInfo]:
+        daily = content["daily"]
+        columns = zip(daily["time"], daily["weather_code"], daily["temperature_2m_min"], daily["temperature_2m_max"])
+        return [self._create_weather_info(date.fromisoformat(day), (minimum + maximum) / 2, weather_code)
+            for day, weather_code, minimum, maximum in list(columns)[:self._days]]
+
+class HourlyForecastRequest(ForecastRequest):
+
+    def __init__(self,
+        requests_factory: BaseRequestsFactory,
+        coordinates: Coordinates,
+        units: Units,
+        hours: int,
+        api_url: Optional[str] = None):
+        super().__init__(requests_factory, coordinates, units, api_url)
+        self._hours = hours
+
+    def get_result(self) -> WeatherSeries:
+        logger.info("Sending HourlyForecastRequest: %s %s %s.", self._coordinates, self._units.name, self._hours)
+        return self._get_series_from_content(self._get_content())
+
+    def _get_params(self):
+        return {
+            **super()._get_params(),
+            "hourly": "temperature_2m,weather_code",
+            "forecast_hours": self._hours,
+            "timeformat": "unixtime"}
+
+    def _get_series_from_content(self, content: Dict[str, Any]) -> WeatherSeries:
+        hourly = content["hourly"]
+        utc_offset = content.get("utc_offset_seconds", 0)
+        series = WeatherSeries(self._coordinates.location, self.canonical_units)
+        for timestamp, temperature, weather_code in list(zip(hourly["time"], hourly["temperature_2m"], hourly["weather_code"]))[:self._hours]:
+            series.append(timestamp, utc_offset, temperature, weather_code, describe_weather_code(weather_code))
+        return series.to_units(self._units)
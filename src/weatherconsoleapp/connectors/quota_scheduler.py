@@ -0,0 +1,345 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from enum import IntEnum
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+import heapq
+import hashlib
+import logging
+import itertools
+import threading
+import time
+from ..persistence import FileLock, PathLike, read_json_file, write_json_file_atomically
+from .deadlines import Deadline, get_request_deadline
+from .errors import DeadlineExceeded
+from .requests_factories import BaseRequestsFactory, HttpResponse
+
+logger = logging.getLogger(__name__)
+
+class RequestPriority(IntEnum):
+    """Priority of the upstream requests: lower values are served first.
+    """
+    INTERACTIVE = 0
+    BATCH = 1
+    BACKGROUND = 2
+
+_current_request_priority: "ContextVar[RequestPriority]" = ContextVar(
+    "request_priority",
+    default=RequestPriority.INTERACTIVE)
+
+@contextmanager
+def request_priority(priority: RequestPriority) -> Iterator[None]:
+    """Sets the priority of the requests sent within the context.
+    """
+    token = _current_request_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_request_priority.reset(token)
+
+def get_request_priority() -> RequestPriority:
+    return _current_request_priority.get()
+
+def get_utc_today() -> str:
+    """Returns today's date (UTC) in ISO format, the day of the daily quotas.
+    """
+    return datetime.now(timezone.utc).date().isoformat()
+
+class QuotaExhausted(Exception):
+    """Exception thrown when every apikey has used up its daily quota.
+    """
+
+class ApiKeyStatus(NamedTuple):
+    """Snapshot of the quota of an apikey.
+    """
+    apikey: str
+    used_today: int
+    daily_limit: int
+    available_tokens: float
+
+    @property
+    def remaining_today(self) -> int:
+        return max(0, self.daily_limit - self.used_today)
+
+    @property
+    def masked_apikey(self) -> str:
+        return f"...{self.apikey[-4:]}"
+
+class TokenBucket:
+    """Token bucket allowing `rate` acquisitions per second, with bursts of up
+    to `capacity` acquisitions. Not thread safe.
+    """
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self._rate = rate
+        self._capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated_at = clock()
+
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+    def try_acquire(self) -> float:
+        """Takes a token and returns 0 if there is one, otherwise returns the
+        seconds until the next token is available.
+        """
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self._rate
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self._capacity, self._tokens + (now - self._updated_at) * self._rate)
+        self._updated_at = now
+
+class QuotaUsageStore:
+    """Daily number of requests per apikey, persisted in a JSON file shared by
+    every process of the application. Apikeys are stored hashed and counters
+    restart every day (UTC). The file also keeps, per apikey, the earliest
+    time of its next request when processes share the rate limit (see
+    `try_reserve`).
+    """
+    FILENAME = "quota_usage.json"
+
+    def __init__(self, filepath: PathLike, today: Callable[[], str] = get_utc_today):
+        self._filepath = filepath
+        self._today = today
+
+    def get_usage(self) -> Dict[str, int]:
+        """Returns today's number of requests per hashed apikey.
+        """
+        return self._read_usage()
+
+    def increment(self, apikey: str) -> int:
+        """Counts one request for `apikey` and returns its count for today, which
+        includes the requests of other processes.
+        """
+        hashed_apikey = self.hash_apikey(apikey)
+        try:
+            with FileLock(self._filepath):
+                content = read_json_file(self._filepath)
+                usage = self._read_usage(content)
+                usage[hashed_apikey] = usage.get(hashed_apikey, 0) + 1
+                self._write(usage, self._read_schedule(content))
+                return usage[hashed_apikey]
+        except OSError:
+            logger.warning("Could not persist quota usage %s", self._filepath, exc_info=True)
+            return 0
+
+    def try_reserve(self,
+        apikey: str,
+        daily_limit: int,
+        requests_per_second: float,
+        clock: Callable[[], float] = time.time) -> Tuple[Optional[int], Optional[float]]:
+        """Counts one request for `apikey` if it is within its daily limit and
+        its rate, checked and updated atomically for every process sharing the
+        file. Returns today's count and None, or None and the seconds to wait
+        when the rate is exceeded, or (None, None) when the daily limit is
+        reached. Raises OSError if the file cannot be used.
+
+        The rate allows bursts of `requests_per_second` requests, like the
+        token buckets of `QuotaScheduler`.
+        """
+        hashed_apikey = self.hash_apikey(apikey)
+        with FileLock(self._filepath):
+            content = read_json_file(self._filepath)
+            usage = self._read_usage(content)
+            if usage.get(hashed_apikey, 0) >= daily_limit:
+                return (None, None)
+            now = clock()
+            schedule = {hashed: next_request for hashed, next_request in self._read_schedule(content).items() if next_request > now}
+            interval = 1 / requests_per_second
+            next_request = max(schedule.get(hashed_apikey, now), now)
+            wait = next_request - now - (max(1.0, requests_per_second) - 1) * interval
+            if wait > 0:
+                return (None, wait)
+            usage[hashed_apikey] = usage.get(hashed_apikey, 0) + 1
+            schedule[hashed_apikey] = next_request + interval
+            self._write(usage, schedule)
+            return (usage[hashed_apikey], None)
+
+    @staticmethod
+    def hash_apikey(apikey: str) -> str:
+        return hashlib.sha256(apikey.encode("utf-8")).hexdigest()[:16]
+
+    def _write(self, usage: Dict[str, int], schedule: Dict[str, float]):
+        write_json_file_atomically(self._filepath, {"date": self._today(), "usage": usage, "schedule": schedule})
+
+    def _read_schedule(self, content) -> Dict[str, float]:
+        try:
+            return {} if content is None else {str(hashed_apikey): float(next_request)
+                for hashed_apikey, next_request in content.get("schedule", {}).items()}
+        except (TypeError, ValueError, AttributeError):
+            return {}
+
+    def _read_usage(self, content=None) -> Dict[str, int]:
+        if content is None:
+            content = read_json_file(self._filepath)
+        try:
+            if content is None or content["date"] != self._today():
+                return {}
+            return {str(hashed_apikey): int(count) for hashed_apikey, count in content["usage"].items()}
+        except (KeyError, TypeError, ValueError, AttributeError):
+            logger.warning("Ignoring corrupt quota usage file %s", self._filepath, exc_info=True)
+            return {}
+
+class QuotaScheduler:
+    """Hands out apikeys for upstream requests within their quotas.
+
+    Every apikey has a token bucket limiting its requests per second and a daily
+    limit. Each request gets the apikey with the most remaining daily quota
+    among the ones with an available token. Requests waiting for a token are
+    served by priority, then in arrival order.
+
+    With `shared`, the daily limits and rates are enforced across every
+    process using the same `usage_store`, e.g. the workers of a bulk job,
+    instead of per process: each request is reserved in the store's file
+    under its lock.
+
+    Daily counts restart when the UTC date returned by `today` changes, from
+    the counts of the new day in `usage_store`, if any.
+    """
+    def __init__(self,
+        apikeys: List[str],
+        daily_limit: int,
+        requests_per_second: float,
+        usage_store: Optional[QuotaUsageStore] = None,
+        clock: Callable[[], float] = time.monotonic,
+        shared: bool = False,
+        today: Callable[[], str] = get_utc_today):
+        if len(apikeys) == 0:
+            raise ValueError("At least one apikey is required.")
+        self._apikeys = list(dict.fromkeys(apikeys))
+        self._daily_limit = daily_limit
+        self._requests_per_second = requests_per_second
+        self._shared = shared and usage_store is not None
+        self._buckets = {apikey: TokenBucket(requests_per_second, max(1.0, requests_per_second), clock)
+            for apikey in self._apikeys}
+        self._usage_store = usage_store
+        self._today = today
+        self._date = ""
+        self._used_today: Dict[str, int] = {}
+        self._roll_over()
+        self._waiters: List[Tuple[int, int]] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+
+    def acquire(self, priority: RequestPriority = RequestPriority.INTERACTIVE, deadline: Optional[Deadline] = None) -> str:
+        """Blocks until a request can be sent and returns the apikey to use.
+        Raises QuotaExhausted if every apikey has reached its daily limit, and
+        DeadlineExceeded if no request can be sent before `deadline`.
+        """
+        ticket = (int(priority), next(self._sequence))
+        with self._condition:
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    if self._waiters[0] != ticket:
+                        self._wait(deadline)
+                        continue
+                    apikey, wait = self._try_reserve()
+                    if apikey is not None:
+                        break
+                    if wait is None:
+                        raise QuotaExhausted("Every apikey has used up its daily quota.")
+                    self._wait(deadline, wait)
+            finally:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._condition.notify_all()
+
+        if self._usage_store is not None and not self._shared:
+            used_today = self._usage_store.increment(apikey)
+            # The store counts the requests of every process, and 0 when it
+            # cannot be written, which keeps the count of this process.
+            if used_today > 0:
+                with self._condition:
+                    self._used_today[apikey] = used_today
+        return apikey
+
+    def snapshot(self) -> List[ApiKeyStatus]:
+        with self._condition:
+            self._roll_over()
+            return [ApiKeyStatus(apikey, self._used_today[apikey], self._daily_limit, self._buckets[apikey].tokens)
+                for apikey in self._apikeys]
+
+    def _wait(self, deadline: Optional[Deadline], timeout: Optional[float] = None):
+        """Waits for a notification or `timeout` seconds, failing fast when the
+        deadline expires first.
+        """
+        if deadline is not None:
+            remaining = deadline.remaining()
+            if remaining <= 0 or (timeout is not None and timeout >= remaining):
+                raise DeadlineExceeded("No request can be sent within the quota before the deadline.")
+            timeout = remaining if timeout is None else timeout
+        self._condition.wait(timeout)
+
+    def _roll_over(self):
+        """Restarts the daily counts from the usage store when the date changes.
+        """
+        today = self._today()
+        if today == self._date:
+            return
+        stored_usage = {} if self._usage_store is None else self._usage_store.get_usage()
+        self._used_today = {apikey: stored_usage.get(QuotaUsageStore.hash_apikey(apikey), 0)
+            for apikey in self._apikeys}
+        self._date = today
+
+    def _try_reserve(self) -> Tuple[Optional[str], Optional[float]]:
+        """Returns the reserved apikey, or the seconds to wait for a token, or
+        (None, None) if the daily quotas are exhausted.
+        """
+        self._roll_over()
+        apikeys = [apikey for apikey in self._apikeys if self._used_today[apikey] < self._daily_limit]
+        apikeys.sort(key=lambda apikey: self._used_today[apikey])
+        if self._shared and self._usage_store is not None:
+            try:
+                return self._try_reserve_shared(self._usage_store, apikeys)
+            except OSError:
+                logger.warning("Could not reserve a request in the shared quota usage, using the process quota.", exc_info=True)
+        min_wait = None
+        for apikey in apikeys:
+            wait = self._buckets[apikey].try_acquire()
+            if wait == 0:
+                self._used_today[apikey] += 1
+                remaining = self._daily_limit - self._used_today[apikey]
+                if remaining <= self._daily_limit // 10:
+                    logger.warning("Apikey ...%s has %s requests left today.", apikey[-4:], remaining)
+                return (apikey, None)
+            min_wait = wait if min_wait is None else min(min_wait, wait)
+        return (None, min_wait)
+
+    def _try_reserve_shared(self, usage_store: QuotaUsageStore, apikeys: List[str]) -> Tuple[Optional[str], Optional[float]]:
+        min_wait = None
+        for apikey in apikeys:
+            used_today, wait = usage_store.try_reserve(apikey, self._daily_limit, self._requests_per_second)
+            if used_today is not None:
+                self._used_today[apikey] = used_today
+                return (apikey, None)
+            if wait is None:
+                self._used_today[apikey] = self._daily_limit
+                continue
+            min_wait = wait if min_wait is None else min(min_wait, wait)
+        return (None, min_wait)
+
+class QuotaSchedulingRequestsFactory(BaseRequestsFactory):
+    """Requests factory decorator sending each request with the apikey handed out
+    by a `QuotaScheduler`, using the priority set with `request_priority` and
+    the deadline set with `request_deadline`.
+    """
+    def __init__(self, requests_factory: BaseRequestsFactory, scheduler: QuotaScheduler):
+        self._requests_factory = requests_factory
+        self._scheduler = scheduler
+
+    def get(self, url: str, params: Optional[dict] = None) -> dict:
+        return self.get_response(url, params).json()
+
+    def get_response(self, url: str, params: Optional[dict] = None, headers: Optional[dict] = None) -> HttpResponse:
+        apikey = self._scheduler.acquire(get_request_priority(), get_request_deadline())
+        scheduled_params = {} if params is None else dict(params)
+        scheduled_params["apikey"] = apikey
+        return self._requests_factory.get_response(url, scheduled_params, headers)
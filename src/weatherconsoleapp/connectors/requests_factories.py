@@ -1,32 +1,197 @@
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import Any, Mapping, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+from email.utils import parsedate_to_datetime
+import json
+import time
+import random
 import logging
 import requests
+import requests.adapters
+from ..config import HttpSettings
+from .. import metrics
+from .errors import DeadlineExceeded, WeatherConnectorConnectionError, WeatherConnectorTimeout
+from .deadlines import get_remaining_time
 
 logger = logging.getLogger(__name__)
 
-class WeatherConnectorTimeout(BaseException):
-    """Exception thrown when connector times out.
+class HttpResponse:
+    """Raw response of a GET request. Header names are lower case.
     """
+    __slots__ = ("status_code", "headers", "content", "_payload")
+
+    def __init__(self, status_code: int, headers: Mapping[str, str], content: bytes):
+        self.status_code = status_code
+        self.headers = {name.lower(): value for name, value in headers.items()}
+        self.content = content
+        self._payload = None
+
+    @classmethod
+    def from_payload(cls, payload: Any, status_code: int = 200) -> "HttpResponse":
+        response = cls(status_code, {}, json.dumps(payload).encode("utf-8"))
+        response._payload = payload
+        return response
+
+    def json(self) -> Any:
+        if self._payload is None:
+            self._payload = json.loads(self.content)
+        return self._payload
+
+def request_cache_key(url: str, params: Optional[dict] = None) -> str:
+    """Identifies a request by its url and params. The apikey is left out, so
+    the same resource requested with different keys shares the key.
+    """
+    if not params:
+        return url
+    query = urlencode(sorted((name, str(value)) for name, value in params.items() if name != "apikey"))
+    return f"{url}?{query}"
 
 class BaseRequestsFactory(ABC):
 
     @abstractmethod
-    def get(self, url: str, params: dict) -> dict:
+    def get(self, url: str, params: Optional[dict] = None) -> dict:
         """GET requests against the resource specified in the `url` parameter.
         """
 
-class RequestsFactory(ABC):
+    def get_response(self, url: str, params: Optional[dict] = None, headers: Optional[dict] = None) -> HttpResponse:
+        """GET requests returning the status code and headers along with the
+        content. Request `headers`, e.g. conditional ones, may be ignored.
+        Factories with access to the HTTP response should override it.
+        """
+        return HttpResponse.from_payload(self.get(url, params))
+
+class AsyncBaseRequestsFactory(ABC):
+
+    @abstractmethod
+    async def get(self, url: str, params: Optional[dict] = None) -> dict:
+        """Awaitable GET requests against the resource specified in the `url` parameter.
+        """
+
+    async def get_response(self, url: str, params: Optional[dict] = None) -> HttpResponse:
+        """Awaitable counterpart of `BaseRequestsFactory.get_response`.
+        """
+        return HttpResponse.from_payload(await self.get(url, params))
+
+class RequestsFactory(BaseRequestsFactory):
+    """Requests factory backed by a pooled keep-alive `requests.Session`, so
+    consecutive requests to the same host reuse their connection.
+
+    Requests failing with a timeout, a connection error or a 429/5xx status code
+    are retried with jittered exponential backoff, waiting at least what the
+    `Retry-After` header asks for. A response asking to wait longer than
+    `max_backoff` is returned as is. Once retries are exhausted, timeouts raise
+    `WeatherConnectorTimeout` and connection errors (DNS failure, refused
+    connection...) `WeatherConnectorConnectionError`.
+
+    Within a `request_deadline`, the timeouts of each attempt are bounded by
+    the time left, retries that would not complete in time are not attempted,
+    and `DeadlineExceeded` is raised once the deadline has expired.
+
+    Each attempt records a `http_wait` span, until the response headers are
+    received (connection and server time), and a `http_download` span for the
+    body, along with status code, bytes, retries and timeouts counters.
+    """
+    RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+    def __init__(self, settings: HttpSettings = HttpSettings()):
+        self._settings = settings
+        self._session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=settings.pool_size,
+            pool_maxsize=settings.pool_size,
+            max_retries=0)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._sleep = time.sleep
+
+    def close(self):
+        self._session.close()
 
     def get(self, url: str, params: Optional[dict] = None) -> dict:
+        return self.get_response(url, params).json()
+
+    def get_response(self, url: str, params: Optional[dict] = None, headers: Optional[dict] = None) -> HttpResponse:
         if params is None:
             params = {}
 
+        attempt = 0
+        while True:
+            try:
+                response = self._get_with_spans(url, params, headers, self._get_timeout())
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as error:
+                metrics.increment("weatherconsoleapp_http_errors_total", error=type(error).__name__)
+                # Connect timeouts are both timeouts and connection errors.
+                timed_out = isinstance(error, requests.exceptions.Timeout)
+                if attempt >= self._settings.max_retries:
+                    if timed_out:
+                        metrics.increment("weatherconsoleapp_http_timeouts_total")
+                        logger.error("Server timeout", exc_info=True)
+                        raise WeatherConnectorTimeout("AccuweatherApiConnector timed out.") from error
+                    logger.error("Could not connect to the server", exc_info=True)
+                    raise WeatherConnectorConnectionError(f"Could not connect to {urlsplit(url).netloc}.") from error
+                delay = self._get_backoff_delay(attempt)
+                if not self._is_before_deadline(delay):
+                    if timed_out:
+                        metrics.increment("weatherconsoleapp_http_timeouts_total")
+                    logger.error("Request failed (%s), no time left to retry before the deadline", type(error).__name__, exc_info=True)
+                    raise DeadlineExceeded("Request deadline exceeded.") from error
+                logger.warning("Request failed (%s), retrying in %.2f seconds.", type(error).__name__, delay)
+            else:
+                logger.info("Response status code: %s %s", response.status_code, response.reason)
+                if response.status_code not in self.RETRY_STATUS_CODES or attempt >= self._settings.max_retries:
+                    return HttpResponse(response.status_code, response.headers, response.content)
+                retry_after = self._parse_retry_after(response.headers.get("Retry-After"))
+                if retry_after is not None and retry_after > self._settings.max_backoff:
+                    return HttpResponse(response.status_code, response.headers, response.content)
+                delay = max(self._get_backoff_delay(attempt), retry_after or 0.0)
+                if not self._is_before_deadline(delay):
+                    return HttpResponse(response.status_code, response.headers, response.content)
+                logger.warning("Status code %s, retrying in %.2f seconds.", response.status_code, delay)
+            metrics.increment("weatherconsoleapp_http_retries_total")
+            self._sleep(delay)
+            attempt += 1
+
+    def _get_with_spans(self, url: str, params: dict, headers: Optional[dict], timeout) -> requests.Response:
+        with metrics.span("http_wait"):
+            response = self._session.get(url, params=params, headers=headers, timeout=timeout, stream=True)
+        with metrics.span("http_download"):
+            content = response.content
+        metrics.increment("weatherconsoleapp_http_responses_total", status_code=response.status_code)
+        metrics.increment("weatherconsoleapp_http_response_bytes_total", len(content))
+        return response
+
+    def _get_timeout(self) -> Tuple[float, float]:
+        """Returns the connect and read timeouts of an attempt, bounded by the
+        time left before the deadline, if any.
+        """
+        remaining = get_remaining_time()
+        if remaining is None:
+            return (self._settings.connect_timeout, self._settings.read_timeout)
+        return (min(self._settings.connect_timeout, remaining), min(self._settings.read_timeout, remaining))
+
+    @staticmethod
+    def _is_before_deadline(delay: float) -> bool:
+        """Returns whether an attempt may still be sent after waiting `delay` seconds.
+        """
         try:
-            response = requests.get(url, params=params)
-        except requests.exceptions.Timeout:
-            logger.error("Server timeout", exc_info=True)
-            raise WeatherConnectorTimeout("AccuweatherApiConnector timed out.")
-        logger.info("Response status code: %s %s", response.status_code, response.reason)
-        return response.json()
+            remaining = get_remaining_time()
+        except DeadlineExceeded:
+            return False
+        return remaining is None or delay < remaining
 
+    def _get_backoff_delay(self, attempt: int) -> float:
+        max_delay = min(self._settings.max_backoff, self._settings.backoff_factor * 2 ** attempt)
+        return random.uniform(0, max_delay)
+
+    @staticmethod
+    def _parse_retry_after(retry_after: Optional[str]) -> Optional[float]:
+        if retry_after is None:
+            return None
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+        except (TypeError, ValueError, IndexError):
+            return None
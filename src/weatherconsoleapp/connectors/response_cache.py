@@ -0,0 +1,294 @@
+import os
+import re
+import time
+import pathlib
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterator, NamedTuple, Optional
+from ..persistence import PathLike, read_json_file, write_json_file_atomically
+from .. import metrics
+from .requests_factories import BaseRequestsFactory, HttpResponse, WeatherConnectorTimeout, request_cache_key
+
+logger = logging.getLogger(__name__)
+
+class RefreshAhead:
+    """Refresh-ahead state of the requests sent within a `refresh_ahead` context:
+    cached responses expiring within `margin` seconds, or stored more than
+    `max_age` seconds ago, are fetched again, and the upstream requests are
+    counted.
+    """
+    def __init__(self, margin: float, max_age: Optional[float] = None):
+        self.margin = margin
+        self.max_age = max_age
+        self.upstream_requests = 0
+
+    def is_fresh(self, cached_response: "CachedResponse", now: float) -> bool:
+        if self.max_age is not None and now - cached_response.stored_at >= self.max_age:
+            return False
+        return cached_response.is_fresh(now + self.margin)
+
+_current_refresh_ahead: "ContextVar[Optional[RefreshAhead]]" = ContextVar("refresh_ahead", default=None)
+
+@contextmanager
+def refresh_ahead(margin: float, max_age: Optional[float] = None) -> Iterator[RefreshAhead]:
+    """Refreshes the cached responses expiring within `margin` seconds, or older
+    than `max_age` seconds, which are requested within the context, instead of
+    serving them from the cache.
+    """
+    state = RefreshAhead(margin, max_age)
+    token = _current_refresh_ahead.set(state)
+    try:
+        yield state
+    finally:
+        _current_refresh_ahead.reset(token)
+
+class CachedResponse(NamedTuple):
+    """A response stored in the cache together with its freshness lifetime.
+    """
+    response: HttpResponse
+    stored_at: float
+    expires_at: float
+
+    def is_fresh(self, now: float) -> bool:
+        return now < self.expires_at
+
+class ResponseCache:
+    """On-disk store of raw responses, one JSON file per request.
+
+    Files are replaced atomically, so several processes can share the cache
+    directory without locking. The last `memory_entries` responses read or
+    stored are also kept in memory and served without reading their file
+    while fresh. Expired ones are read from disk again, since another process
+    may have refreshed them.
+    """
+    DIRNAME = "responses"
+    STORED_HEADERS = ("etag", "last-modified", "date")
+
+    def __init__(self, dirpath: PathLike, max_stale: float = 86400, memory_entries: int = 128):
+        self._dirpath = pathlib.Path(dirpath)
+        self._max_stale = max_stale
+        self._memory_entries = memory_entries
+        self._memory: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """Returns the cached response for `key`, fresh or stale, or None if there
+        is none or it is older than the allowed staleness.
+        """
+        with self._lock:
+            cached_response = self._memory.get(key)
+            if cached_response is not None and cached_response.is_fresh(time.time()):
+                self._memory.move_to_end(key)
+                return cached_response
+
+        filepath = self._get_filepath(key)
+        content = read_json_file(filepath)
+        if content is None:
+            return None
+        try:
+            if content["key"] != key:
+                return None
+            response = HttpResponse(content["status_code"], content["headers"], content["content"].encode("utf-8"))
+            cached_response = CachedResponse(response, float(content["stored_at"]), float(content["expires_at"]))
+        except (KeyError, TypeError, ValueError, AttributeError):
+            logger.warning("Ignoring corrupt cached response %s", filepath, exc_info=True)
+            return None
+
+        if time.time() > cached_response.expires_at + self._max_stale:
+            self._remove(filepath)
+            self._forget(key)
+            return None
+        self._remember(key, cached_response)
+        return cached_response
+
+    def put(self, key: str, response: HttpResponse, ttl: float):
+        now = time.time()
+        headers = {name: value for name, value in response.headers.items() if name in self.STORED_HEADERS}
+        entry = {
+            "key": key,
+            "status_code": response.status_code,
+            "headers": headers,
+            "content": response.content.decode("utf-8"),
+            "stored_at": now,
+            "expires_at": now + ttl}
+        self._remember(key, CachedResponse(HttpResponse(response.status_code, headers, response.content), now, now + ttl))
+        try:
+            self._dirpath.mkdir(parents=True, exist_ok=True)
+            write_json_file_atomically(self._get_filepath(key), entry)
+        except (OSError, UnicodeDecodeError):
+            logger.warning("Could not store response for %s", key, exc_info=True)
+
+    def _remember(self, key: str, cached_response: CachedResponse):
+        if self._memory_entries <= 0:
+            return
+        with self._lock:
+            self._memory[key] = cached_response
+            self._memory.move_to_end(key)
+            while len(self._memory) > self._memory_entries:
+                self._memory.popitem(last=False)
+
+    def _forget(self, key: str):
+        with self._lock:
+            self._memory.pop(key, None)
+
+    def _get_filepath(self, key: str) -> pathlib.Path:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+        return pathlib.Path(self._dirpath, f"{digest}.json")
+
+    @staticmethod
+    def _remove(filepath: pathlib.Path):
+        try:
+            os.remove(filepath)
+        except OSError:
+            pass
+
+class CachingRequestsFactory(BaseRequestsFactory):
+    """Requests factory decorator serving successful responses from a
+    `ResponseCache` while they are fresh.
+
+    The time to live of a response is configured per endpoint, matching the
+    `endpoint_ttls` keys against the url, and is shortened when the upstream
+    `Cache-Control` or `Expires` headers say so. Endpoints without a configured
+    time to live are not cached. When the upstream request times out or fails
+    with a server error, the stale cached response is served instead. Within a
+    `refresh_ahead` context, responses about to expire are fetched again.
+
+    Expired responses with an `ETag` or `Last-Modified` header are revalidated
+    with a conditional request: a `304 Not Modified` answer extends the cached
+    response, which is served without downloading it again.
+    """
+    _MAX_AGE_PATTERN = re.compile(r"(?:s-maxage|max-age)\s*=\s*(\d+)")
+
+    def __init__(self, requests_factory: BaseRequestsFactory, cache: ResponseCache, endpoint_ttls: Dict[str, float]):
+        self._requests_factory = requests_factory
+        self._cache = cache
+        self._endpoint_ttls = endpoint_ttls
+
+    def get(self, url: str, params: Optional[dict] = None) -> dict:
+        return self.get_response(url, params).json()
+
+    def get_response(self, url: str, params: Optional[dict] = None, headers: Optional[dict] = None) -> HttpResponse:
+        configured_ttl = self._get_endpoint_ttl(url)
+        refresh_ahead_state = _current_refresh_ahead.get()
+        if configured_ttl <= 0:
+            return self._get_upstream_response(url, params, headers, refresh_ahead_state)
+
+        key = request_cache_key(url, params)
+        cached_response = self._cache.get(key)
+        if cached_response is not None and self._is_fresh(cached_response, refresh_ahead_state):
+            logger.info("Response cache hit: %s", key)
+            self._count_lookup("hit")
+            return cached_response.response
+
+        request_headers = dict(headers or {})
+        if cached_response is not None:
+            request_headers.update(self._get_conditional_headers(cached_response.response))
+        try:
+            response = self._get_upstream_response(url, params, request_headers or None, refresh_ahead_state)
+        except WeatherConnectorTimeout:
+            if cached_response is None:
+                raise
+            logger.warning("Request timed out, serving stale cached response: %s", key)
+            self._count_lookup("stale")
+            return cached_response.response
+
+        if response.status_code >= 500 and cached_response is not None:
+            logger.warning("Server error %s, serving stale cached response: %s", response.status_code, key)
+            self._count_lookup("stale")
+            return cached_response.response
+
+        if response.status_code == 304 and cached_response is not None:
+            logger.info("Response not modified, extending cached response: %s", key)
+            self._count_lookup("revalidated")
+            return self._extend_cached_response(key, cached_response.response, response, configured_ttl)
+
+        self._count_lookup("miss")
+
+        if response.status_code == 200:
+            ttl = self._get_response_ttl(response, configured_ttl)
+            if ttl > 0:
+                self._cache.put(key, response, ttl)
+        return response
+
+    def _get_upstream_response(
+        self,
+        url: str,
+        params: Optional[dict],
+        headers: Optional[dict],
+        refresh_ahead_state: Optional[RefreshAhead]) -> HttpResponse:
+        if refresh_ahead_state is not None:
+            refresh_ahead_state.upstream_requests += 1
+        return self._requests_factory.get_response(url, params, headers)
+
+    @staticmethod
+    def _is_fresh(cached_response: CachedResponse, refresh_ahead_state: Optional[RefreshAhead]) -> bool:
+        now = time.time()
+        if refresh_ahead_state is None:
+            return cached_response.is_fresh(now)
+        return refresh_ahead_state.is_fresh(cached_response, now)
+
+    @staticmethod
+    def _get_conditional_headers(cached_response: HttpResponse) -> Dict[str, str]:
+        conditional_headers = {}
+        if "etag" in cached_response.headers:
+            conditional_headers["If-None-Match"] = cached_response.headers["etag"]
+        if "last-modified" in cached_response.headers:
+            conditional_headers["If-Modified-Since"] = cached_response.headers["last-modified"]
+        return conditional_headers
+
+    def _extend_cached_response(
+        self,
+        key: str,
+        cached_response: HttpResponse,
+        not_modified_response: HttpResponse,
+        configured_ttl: float) -> HttpResponse:
+        """Stores the cached content again with the headers of the `304` answer,
+        which may carry a new `ETag` or lifetime, and returns it.
+        """
+        headers = {name: value for name, value in not_modified_response.headers.items() if name in ResponseCache.STORED_HEADERS}
+        response = HttpResponse(200, {**cached_response.headers, **headers}, cached_response.content)
+        ttl = self._get_response_ttl(not_modified_response, configured_ttl)
+        if ttl > 0:
+            self._cache.put(key, response, ttl)
+        return response
+
+    @staticmethod
+    def _count_lookup(result: str):
+        metrics.increment("weatherconsoleapp_response_cache_lookups_total", result=result)
+
+    def _get_endpoint_ttl(self, url: str) -> float:
+        for endpoint, ttl in self._endpoint_ttls.items():
+            if endpoint in url:
+                return ttl
+        return 0
+
+    @classmethod
+    def _get_response_ttl(cls, response: HttpResponse, configured_ttl: float) -> float:
+        upstream_ttl = cls._get_upstream_ttl(response.headers)
+        if upstream_ttl is None:
+            return configured_ttl
+        return min(configured_ttl, upstream_ttl)
+
+    @classmethod
+    def _get_upstream_ttl(cls, headers: Dict[str, str]) -> Optional[float]:
+        cache_control = headers.get("cache-control", "").lower()
+        if "no-store" in cache_control or "no-cache" in cache_control:
+            return 0
+        max_age = cls._MAX_AGE_PATTERN.search(cache_control)
+        if max_age is not None:
+            return float(max_age.group(1))
+
+        expires = headers.get("expires")
+        if expires is None:
+            return None
+        try:
+            expires_at = parsedate_to_datetime(expires).timestamp()
+            now = parsedate_to_datetime(headers["date"]).timestamp() if "date" in headers else time.time()
+        except (TypeError, ValueError, IndexError):
+            return 0
+        return max(0.0, expires_at - now)
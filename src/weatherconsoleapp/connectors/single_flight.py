@@ -0,0 +1,116 @@
+from typing import Dict, Optional
+import asyncio
+import logging
+import threading
+from .. import metrics
+from .deadlines import get_remaining_time
+from .errors import CircuitOpenError, DeadlineExceeded
+from .requests_factories import AsyncBaseRequestsFactory, BaseRequestsFactory, HttpResponse, request_cache_key
+
+logger = logging.getLogger(__name__)
+
+class _InFlightCall:
+    __slots__ = ("done", "response", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response: Optional[HttpResponse] = None
+        self.error: Optional[BaseException] = None
+
+class SingleFlightRequestsFactory(BaseRequestsFactory):
+    """Requests factory decorator coalescing identical concurrent requests.
+
+    Requests are identified by url, params and headers, leaving the apikey out. While a
+    request is in flight, other threads asking for the same resource wait for
+    it and receive the same response, or the same exception, instead of sending
+    their own request. Within a `request_deadline`, they stop waiting when it
+    expires. When the request fails with the deadline of the thread which sent
+    it, or because its circuit was open, they send it again under their own.
+    """
+    def __init__(self, requests_factory: BaseRequestsFactory):
+        self._requests_factory = requests_factory
+        self._calls: Dict[str, _InFlightCall] = {}
+        self._lock = threading.Lock()
+
+    def get(self, url: str, params: Optional[dict] = None) -> dict:
+        return self.get_response(url, params).json()
+
+    def get_response(self, url: str, params: Optional[dict] = None, headers: Optional[dict] = None) -> HttpResponse:
+        key = request_cache_key(url, params)
+        if headers:
+            key = f"{key} {sorted(headers.items())}"
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                is_leader = call is None
+                if call is None:
+                    call = self._calls[key] = _InFlightCall()
+            if is_leader:
+                break
+
+            logger.info("Joining in-flight request: %s", key)
+            metrics.increment("weatherconsoleapp_single_flight_joins_total")
+            if not call.done.wait(get_remaining_time()):
+                raise DeadlineExceeded(f"Request deadline exceeded while waiting for the in-flight request: {key}")
+            if call.response is not None:
+                return call.response
+            if not isinstance(call.error, (DeadlineExceeded, CircuitOpenError)):
+                raise call.error or RuntimeError(f"In-flight request finished without a response: {key}")
+            # The deadline or the open circuit were the leader's, not this caller's.
+            logger.info("In-flight request failed with %s, sending it again: %s", type(call.error).__name__, key)
+
+        try:
+            call.response = self._requests_factory.get_response(url, params, headers)
+            return call.response
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+class AsyncSingleFlightRequestsFactory(AsyncBaseRequestsFactory):
+    """Asynchronous counterpart of `SingleFlightRequestsFactory`, coalescing
+    identical requests awaited concurrently in the same event loop.
+
+    Cancelling a task only cancels its own wait: when the task sending the
+    request is cancelled, the tasks which joined it send it again.
+    """
+    def __init__(self, requests_factory: AsyncBaseRequestsFactory):
+        self._requests_factory = requests_factory
+        self._calls: Dict[str, "asyncio.Future[HttpResponse]"] = {}
+
+    async def get(self, url: str, params: Optional[dict] = None) -> dict:
+        return (await self.get_response(url, params)).json()
+
+    async def get_response(self, url: str, params: Optional[dict] = None) -> HttpResponse:
+        key = request_cache_key(url, params)
+        joined_call = self._calls.get(key)
+        while joined_call is not None:
+            logger.info("Joining in-flight request: %s", key)
+            metrics.increment("weatherconsoleapp_single_flight_joins_total")
+            # Unlike awaiting the call, waiting for it is only cancelled when this task is.
+            await asyncio.wait([joined_call])
+            if not joined_call.cancelled():
+                return joined_call.result()
+            logger.info("In-flight request cancelled, sending it again: %s", key)
+            joined_call = self._calls.get(key)
+
+        call: "asyncio.Future[HttpResponse]" = asyncio.get_running_loop().create_future()
+        # Retrieving the outcome avoids "exception was never retrieved" warnings
+        # when no other task joined the call.
+        call.add_done_callback(lambda future: future.cancelled() or future.exception())
+        self._calls[key] = call
+        try:
+            response = await self._requests_factory.get_response(url, params)
+            call.set_result(response)
+            return response
+        except asyncio.CancelledError:
+            call.cancel()
+            raise
+        except BaseException as error:
+            call.set_exception(error)
+            raise
+        finally:
+            del self._calls[key]
@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
 from typing import List
-from ..domain import Location, WeatherInfo, Units
+from ..domain import Location, WeatherInfo, WeatherSeries, Units
 
 class WeatherApiConnector(ABC):
     """Base weather APIs connector. Specific connector implementations should inherit from this class.
@@ -18,3 +18,13 @@ class WeatherApiConnector(ABC):
         days: int = 5) -> List[WeatherInfo]:
         """Retrieves the 5 days weather forecast for a given location.
         """
+
+    def get_hourly_forecast_for_location(
+        self,
+        location: Location,
+        unit: Units,
+        hours: int = 12) -> WeatherSeries:
+        """Retrieves the hourly weather forecast for the next `hours` hours of a
+        given location. Connectors without hourly forecasts raise NotImplementedError.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not provide hourly forecasts.")
@@ -1,4 +1,6 @@
 from .date import Date
+from .date_time import DateTime
 from .temperature import Temperature, Units
 from .location import Location
 from .weather_info import WeatherInfo
+from .weather_series import WeatherSeries
@@ -0,0 +1,12 @@
+from typing import NamedTuple
+from datetime import datetime
+
+class DateTime(NamedTuple):
+    """DateTime is an immutable domain value representing a local date and time.
+    Its field keeps the name of `Date.date` so both can be used interchangeably
+    in a `WeatherInfo`.
+    """
+    date: datetime
+
+    def __str__(self):
+        return self.date.strftime("%b %d, %Y %H:%M")
@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import NamedTuple, List
+from typing import NamedTuple, List, Tuple
 
 class Units(Enum):
     """Enumeration for supported units:
@@ -33,5 +33,22 @@ class Temperature(NamedTuple):
         average_value = sum(t.value for t in temperatures)/len(temperatures)
         return Temperature(average_value, temperatures[0].units)
 
+    @staticmethod
+    def get_conversion(from_units: Units, to_units: Units) -> Tuple[float, float]:
+        """Returns the (scale, offset) converting values in `from_units` to
+        `to_units` as value * scale + offset.
+        """
+        if from_units == to_units:
+            return (1.0, 0.0)
+        if from_units == Units.METRIC:
+            return (9 / 5, 32.0)
+        return (5 / 9, -32 * 5 / 9)
+
+    def to_units(self, units: Units) -> "Temperature":
+        if units == self.units:
+            return self
+        scale, offset = Temperature.get_conversion(self.units, units)
+        return Temperature(self.value * scale + offset, units)
+
     def __str__(self):
         return f"{self.value:.2f} {Temperature._get_units_string(self.units)}"
@@ -1,11 +1,11 @@
-from typing import NamedTuple
-from . import Temperature, Location, Date
+from typing import NamedTuple, Union
+from . import Temperature, Location, Date, DateTime
 
 class WeatherInfo(NamedTuple):
     """Weather is an immutable domain value representing a weather temperature ad
     description.
     """
-    date: Date
+    date: Union[Date, DateTime]
     location: Location
     temperature: Temperature
     weather_description: str
@@ -0,0 +1,151 @@
+from array import array
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+import math
+import sys
+from .temperature import Temperature, Units
+from .location import Location
+from .date import Date
+from .date_time import DateTime
+from .weather_info import WeatherInfo
+
+SECONDS_PER_HOUR = 3600
+SECONDS_PER_DAY = 86400
+
+class WeatherSeries:
+    """WeatherSeries is a columnar sequence of weather observations or forecasts
+    of a location, sampled every `interval` seconds.
+
+    Each column is a contiguous array: UTC epoch timestamps, UTC offsets of the
+    local time (seconds), temperature values and condition codes. The condition
+    phrase of each code is stored once in `condition_phrases`. Aggregations run
+    over the arrays without creating a domain value per entry.
+    """
+    __slots__ = ("location", "units", "interval", "timestamps", "utc_offsets", "temperatures", "condition_codes",
+        "condition_phrases")
+
+    AGGREGATES = ("mean", "min", "max")
+
+    def __init__(self,
+        location: Location,
+        units: Units,
+        interval: int = SECONDS_PER_HOUR,
+        timestamps: Optional[Iterable[int]] = None,
+        utc_offsets: Optional[Iterable[int]] = None,
+        temperatures: Optional[Iterable[float]] = None,
+        condition_codes: Optional[Iterable[int]] = None,
+        condition_phrases: Optional[Dict[int, str]] = None):
+        self.location = Location(sys.intern(location.city), sys.intern(location.country_code))
+        self.units = units
+        self.interval = interval
+        self.timestamps = array("q", () if timestamps is None else timestamps)
+        self.utc_offsets = array("l", () if utc_offsets is None else utc_offsets)
+        self.temperatures = array("d", () if temperatures is None else temperatures)
+        self.condition_codes = array("H", () if condition_codes is None else condition_codes)
+        self.condition_phrases = {} if condition_phrases is None else condition_phrases
+        if not (len(self.timestamps) == len(self.utc_offsets) == len(self.temperatures) == len(self.condition_codes)):
+            raise ValueError("Every column of a WeatherSeries must have the same length.")
+
+    def append(self, timestamp: int, utc_offset: int, temperature: float, condition_code: int, condition_phrase: str):
+        self.timestamps.append(timestamp)
+        self.utc_offsets.append(utc_offset)
+        self.temperatures.append(temperature)
+        self.condition_codes.append(condition_code)
+        if condition_code not in self.condition_phrases:
+            self.condition_phrases[condition_code] = sys.intern(condition_phrase)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def min_temperature(self) -> Temperature:
+        self._ensure_not_empty()
+        return Temperature(min(self.temperatures), self.units)
+
+    def max_temperature(self) -> Temperature:
+        self._ensure_not_empty()
+        return Temperature(max(self.temperatures), self.units)
+
+    def mean_temperature(self) -> Temperature:
+        self._ensure_not_empty()
+        return Temperature(math.fsum(self.temperatures) / len(self.temperatures), self.units)
+
+    def resample_daily(self, aggregate: str = "mean") -> "WeatherSeries":
+        """Returns a series with one entry per local day, whose temperature is the
+        `aggregate` ('mean', 'min' or 'max') of the temperatures of that day and
+        whose condition is the most frequent one. Each entry keeps the timestamp
+        of the first sample of its day.
+        """
+        if aggregate not in self.AGGREGATES:
+            raise ValueError(f"aggregate must be one of {', '.join(self.AGGREGATES)}.")
+
+        daily = WeatherSeries(self.location, self.units, SECONDS_PER_DAY, condition_phrases=self.condition_phrases)
+        start = 0
+        for end in self._get_day_boundaries():
+            temperatures = self.temperatures[start:end]
+            if aggregate == "mean":
+                temperature = math.fsum(temperatures) / len(temperatures)
+            elif aggregate == "min":
+                temperature = min(temperatures)
+            else:
+                temperature = max(temperatures)
+            condition_code = Counter(self.condition_codes[start:end]).most_common(1)[0][0]
+            daily.timestamps.append(self.timestamps[start])
+            daily.utc_offsets.append(self.utc_offsets[start])
+            daily.temperatures.append(temperature)
+            daily.condition_codes.append(condition_code)
+            start = end
+        return daily
+
+    def to_units(self, units: Units) -> "WeatherSeries":
+        """Returns the series with its temperatures converted to `units`.
+        """
+        if units == self.units:
+            return self
+        scale, offset = Temperature.get_conversion(self.units, units)
+        return WeatherSeries(
+            self.location,
+            units,
+            self.interval,
+            self.timestamps,
+            self.utc_offsets,
+            array("d", (value * scale + offset for value in self.temperatures)),
+            self.condition_codes,
+            self.condition_phrases)
+
+    def to_weather_infos(self) -> List[WeatherInfo]:
+        """Returns a `WeatherInfo` per entry, dated by day for daily series and by
+        local time otherwise.
+        """
+        weather_infos = []
+        for timestamp, utc_offset, temperature, condition_code in zip(
+            self.timestamps, self.utc_offsets, self.temperatures, self.condition_codes):
+            local_datetime = datetime.fromtimestamp(timestamp, timezone(timedelta(seconds=utc_offset)))
+            date = Date(local_datetime.date()) if self.interval >= SECONDS_PER_DAY else DateTime(local_datetime)
+            weather_infos.append(WeatherInfo(
+                date,
+                self.location,
+                Temperature(temperature, self.units),
+                self.condition_phrases.get(condition_code, "")))
+        return weather_infos
+
+    def _get_day_boundaries(self) -> List[int]:
+        """Returns the end index of each run of entries sharing a local day.
+        """
+        boundaries = []
+        current_day = None
+        for index, (timestamp, utc_offset) in enumerate(zip(self.timestamps, self.utc_offsets)):
+            day = (timestamp + utc_offset) // SECONDS_PER_DAY
+            if current_day is not None and day != current_day:
+                boundaries.append(index)
+            current_day = day
+        if len(self.timestamps) > 0:
+            boundaries.append(len(self.timestamps))
+        return boundaries
+
+    def _ensure_not_empty(self):
+        if len(self.temperatures) == 0:
+            raise ValueError("Cannot aggregate an empty WeatherSeries.")
+
+    def __repr__(self):
+        return f"WeatherSeries({self.location!r}, {self.units}, {len(self)} entries every {self.interval}s)"
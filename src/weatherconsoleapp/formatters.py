@@ -0,0 +1,216 @@
+"""Output formats of the weather reports.
+
+A formatter turns a report into one chunk of text holding a record per
+`WeatherInfo`. Chunks are written in order by a `ReportWriter`, which adds the
+header, separators and footer of the format and batches the writes to the
+underlying stream, so reports are streamed as soon as they are ready without
+holding the whole output in memory.
+"""
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterator, List, Optional, Protocol, TextIO, TYPE_CHECKING
+import io
+import csv
+import sys
+import json
+from .domain import Location, WeatherInfo
+from .utils import Utils
+
+if TYPE_CHECKING:
+    from .commands import WeatherReport
+
+class ReportFormatter(ABC):
+    """Formats the reports of a format. `header` and `footer` are written once,
+    `separator` between two consecutive reports.
+    """
+    name: str
+    header = ""
+    footer = ""
+    separator = ""
+
+    @abstractmethod
+    def format_report(self, report: "WeatherReport") -> str:
+        """Returns the records of the report.
+        """
+
+    @staticmethod
+    def get_records(report: "WeatherReport") -> Iterator[Dict[str, Any]]:
+        location = Utils.location_to_dict(report.location)
+        for weather_info in report.weather_infos:
+            yield {**location, **Utils.weather_info_to_dict(weather_info)}
+
+class TextFormatter(ReportFormatter):
+    """Human readable format printed by default.
+    """
+    name = "text"
+
+    def format_report(self, report: "WeatherReport") -> str:
+        lines = [self.format_location(report.location)]
+        for weather_info in report.weather_infos:
+            lines.extend(self.format_weather_info(weather_info))
+        lines.append("")
+        return "\n".join(lines)
+
+    @staticmethod
+    def format_location(location: Location) -> str:
+        return f"{location.city.upper()} ({location.country_code.upper()})"
+
+    @staticmethod
+    def format_weather_info(weather_info: WeatherInfo) -> List[str]:
+        weather_description = Utils.ensure_string_ends_with_dot(weather_info.weather_description.lower().capitalize())
+        return [
+            str(weather_info.date),
+            f"> Weather: {weather_description}",
+            f"> Temperature: {weather_info.temperature}"]
+
+class JsonFormatter(ReportFormatter):
+    """A JSON array with an object per record.
+    """
+    name = "json"
+    header = "[\n"
+    footer = "\n]\n"
+    separator = ",\n"
+
+    def format_report(self, report: "WeatherReport") -> str:
+        return ",\n".join(json.dumps(record, ensure_ascii=False) for record in self.get_records(report))
+
+class JsonLinesFormatter(ReportFormatter):
+    """A JSON object per line and record.
+    """
+    name = "jsonl"
+
+    def format_report(self, report: "WeatherReport") -> str:
+        return "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in self.get_records(report))
+
+class CsvFormatter(ReportFormatter):
+    """Comma separated values with a header line.
+    """
+    name = "csv"
+    COLUMNS = ("city", "country_code", "date", "weather", "temperature", "units")
+    header = ",".join(COLUMNS) + "\n"
+
+    def format_report(self, report: "WeatherReport") -> str:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, self.COLUMNS, lineterminator="\n")
+        writer.writerows(self.get_records(report))
+        return buffer.getvalue()
+
+FORMATTERS = {formatter.name: formatter for formatter in (TextFormatter, JsonFormatter, JsonLinesFormatter, CsvFormatter)}
+
+def create_formatter(name: str) -> ReportFormatter:
+    """Returns the formatter of the format `name`. Raises ValueError if unknown.
+    """
+    if name not in FORMATTERS:
+        raise ValueError(f"Unknown format {name}.")
+    return FORMATTERS[name]()
+
+class TextOutput(Protocol):
+    """Destination of the reports of a command: a text stream or a `ReportWriter`.
+    """
+    def write(self, chunk: str) -> int:
+        ...
+
+class ReportWriter:
+    """Writes formatted reports, in order, to `file` (the standard output by
+    default). Writes are gathered until `buffer_size` characters are pending
+    and `flush` or `close` is called; `close` writes the footer.
+    """
+    DEFAULT_BUFFER_SIZE = 64 * 1024
+
+    def __init__(self, formatter: ReportFormatter, file: Optional[TextIO] = None, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        self._formatter = formatter
+        self._file = file
+        self._buffer_size = buffer_size
+        self._pending: List[str] = [formatter.header]
+        self._pending_size = len(formatter.header)
+        self._has_reports = False
+
+    def write(self, chunk: str) -> int:
+        """Writes the chunk of text of one or more formatted reports.
+        """
+        if len(chunk) == 0:
+            return 0
+        if self._has_reports and self._formatter.separator:
+            self._append(self._formatter.separator)
+        self._has_reports = True
+        self._append(chunk)
+        return len(chunk)
+
+    def write_report(self, report: "WeatherReport"):
+        self.write(self._formatter.format_report(report))
+
+    def flush(self):
+        file = sys.stdout if self._file is None else self._file
+        if len(self._pending) > 0:
+            file.write("".join(self._pending))
+            self._pending.clear()
+            self._pending_size = 0
+        file.flush()
+
+    def close(self):
+        self._pending.append(self._formatter.footer)
+        self._pending_size += len(self._formatter.footer)
+        self.flush()
+
+    def __enter__(self) -> "ReportWriter":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _append(self, text: str):
+        self._pending.append(text)
+        self._pending_size += len(text)
+        if self._pending_size >= self._buffer_size:
+            self.flush()
+
+class LineDiffRenderer:
+    """Draws a block of text lines and, on later calls, only the lines that
+    changed since the previous block.
+
+    On a terminal, changed lines are rewritten in place with ANSI escape
+    sequences. Otherwise they are appended after `prefix`, so the output of a
+    long-running watch only grows with the changes. Detail lines, starting with
+    "> " as in the text format, are appended after the line they belong to.
+    """
+    DETAIL_PREFIX = "> "
+
+    def __init__(self, file: Optional[TextIO] = None, is_terminal: Optional[bool] = None):
+        self._file = sys.stdout if file is None else file
+        self._is_terminal = self._file.isatty() if is_terminal is None else is_terminal
+        self._lines: Optional[List[str]] = None
+
+    def render(self, lines: List[str], prefix: str = "") -> int:
+        """Draws the lines and returns how many of them were written.
+        """
+        previous_lines, self._lines = self._lines, list(lines)
+        if previous_lines is None:
+            self._file.write("".join(f"{line}\n" for line in lines))
+            changed = len(lines)
+        elif not self._is_terminal:
+            changed_lines = [self._get_heading(lines, index) + line for index, line in enumerate(lines)
+                if index >= len(previous_lines) or previous_lines[index] != line]
+            self._file.write("".join(f"{prefix}{line}\n" for line in changed_lines))
+            changed = len(changed_lines)
+        elif len(lines) != len(previous_lines):
+            # Move to the first line of the block and clear the screen below.
+            self._file.write(f"\x1b[{len(previous_lines)}F\x1b[J" + "".join(f"{line}\n" for line in lines))
+            changed = len(lines)
+        else:
+            changed = 0
+            for index, line in enumerate(lines):
+                if previous_lines[index] != line:
+                    lines_up = len(lines) - index
+                    # Go up to the line, rewrite it and come back below the block.
+                    self._file.write(f"\x1b[{lines_up}F\x1b[2K{line}\x1b[{lines_up}E")
+                    changed += 1
+        self._file.flush()
+        return changed
+
+    @classmethod
+    def _get_heading(cls, lines: List[str], index: int) -> str:
+        if not lines[index].startswith(cls.DETAIL_PREFIX):
+            return ""
+        for heading in reversed(lines[:index]):
+            if not heading.startswith(cls.DETAIL_PREFIX):
+                return f"{heading} "
+        return ""
@@ -0,0 +1,287 @@
+"""Offline index of city names to Accuweather location keys.
+
+The index is a single file, memory-mapped when opened, so lookups cost a
+binary search over the pages actually touched whatever its size:
+
+    header   magic (8 bytes) and number of entries (uint32)
+    offsets  start of each record, plus the end of the last one (uint32)
+    records  'COUNTRYCODE\\tnormalized city\\tCity\\tkey' in UTF-8, sorted
+
+Records of a country are contiguous, so prefix searches only touch the
+cities of the requested country, and fuzzy suggestions a bounded window of
+its cities sharing the first letter of the requested name.
+"""
+import os
+import csv
+import json
+import mmap
+import struct
+import difflib
+import logging
+import pathlib
+import tempfile
+import unicodedata
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from .domain import Location
+from .persistence import PathLike
+
+logger = logging.getLogger(__name__)
+
+class GazetteerEntry(NamedTuple):
+    city: str
+    country_code: str
+    key_code: str
+
+    @property
+    def location(self) -> Location:
+        return Location(self.city, self.country_code)
+
+class Gazetteer:
+    """Read-only view of a gazetteer index file. Use `build` to write one.
+    """
+    FILENAME = "gazetteer.idx"
+    MAGIC = b"WCAGAZ01"
+    SUGGESTION_CUTOFF = 0.75
+    SUGGESTION_SCAN_LIMIT = 2000
+
+    _HEADER = struct.Struct("<8sI")
+    _OFFSET = struct.Struct("<I")
+
+    def __init__(self, filepath: PathLike):
+        with open(filepath, "rb") as index_file:
+            self._mmap = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, self._count = self._HEADER.unpack_from(self._mmap, 0)
+            if magic != self.MAGIC:
+                raise ValueError(f"{filepath} is not a gazetteer index.")
+            self._records_start = self._HEADER.size + (self._count + 1) * self._OFFSET.size
+            if self._records_start + self._get_offset(self._count) != len(self._mmap):
+                raise ValueError(f"{filepath} is truncated.")
+        except (ValueError, struct.error):
+            self._mmap.close()
+            raise
+
+    @classmethod
+    def open(cls, filepath: PathLike) -> Optional["Gazetteer"]:
+        """Returns the gazetteer of `filepath`, or None if the file does not
+        exist or is not a valid index.
+        """
+        try:
+            return cls(filepath)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, struct.error):
+            logger.warning("Ignoring unreadable or corrupt gazetteer %s", filepath, exc_info=True)
+            return None
+
+    @staticmethod
+    def normalize_city(city: str) -> str:
+        """Returns the city name casefolded, without accents and with single spaces.
+        """
+        decomposed = unicodedata.normalize("NFKD", city.casefold())
+        return " ".join("".join(char for char in decomposed if not unicodedata.combining(char)).split())
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __enter__(self) -> "Gazetteer":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._mmap.close()
+
+    def get(self, location: Location) -> Optional[GazetteerEntry]:
+        """Returns the entry of `location`, or None if it is not indexed.
+        """
+        key = self._get_key(location.country_code, self.normalize_city(location.city)) + b"\t"
+        index = self._bisect(key, 0, self._count)
+        if index < self._count and self._get_record(index).startswith(key):
+            return self._decode(self._get_record(index))
+        return None
+
+    def has_country(self, country_code: str) -> bool:
+        low, high = self._get_country_range(country_code)
+        return high > low
+
+    def find_prefix(self, country_code: str, prefix: str, limit: int = 10) -> List[GazetteerEntry]:
+        """Returns up to `limit` entries of the country whose city starts with
+        `prefix`, in alphabetical order.
+        """
+        key = self._get_key(country_code, self.normalize_city(prefix))
+        _, high = self._get_country_range(country_code)
+        entries: List[GazetteerEntry] = []
+        index = self._bisect(key, 0, self._count)
+        while index < high and len(entries) < limit and self._get_record(index).startswith(key):
+            entries.append(self._decode(self._get_record(index)))
+            index += 1
+        return entries
+
+    def suggest(self, location: Location, limit: int = 5) -> List[GazetteerEntry]:
+        """Returns up to `limit` entries of the country resembling `location`,
+        closest first: cities starting with the given name, then the ones
+        whose name is similar enough to be a misspelling of it.
+
+        Misspellings are only looked for among the cities starting with the
+        same letter, at most `SUGGESTION_SCAN_LIMIT` of them around the
+        given name in alphabetical order.
+        """
+        city = self.normalize_city(location.city)
+        if len(city) == 0:
+            return []
+        suggestions = self.find_prefix(location.country_code, city, limit)
+        initial = self._get_key(location.country_code, city[0])
+        low = self._bisect(initial, 0, self._count)
+        # Incrementing the last byte gives the first key past every city with that initial.
+        high = self._bisect(initial[:-1] + bytes([initial[-1] + 1]), low, self._count)
+        index = self._bisect(self._get_key(location.country_code, city), low, high)
+        start = max(low, min(index - self.SUGGESTION_SCAN_LIMIT // 2, high - self.SUGGESTION_SCAN_LIMIT))
+        candidates: Dict[str, int] = {}
+        for index in range(start, min(high, start + self.SUGGESTION_SCAN_LIMIT)):
+            normalized_city = self._get_record(index).split(b"\t", 2)[1].decode("utf-8")
+            candidates.setdefault(normalized_city, index)
+        for match in difflib.get_close_matches(city, candidates, limit, self.SUGGESTION_CUTOFF):
+            entry = self._decode(self._get_record(candidates[match]))
+            if entry not in suggestions:
+                suggestions.append(entry)
+        return suggestions[:limit]
+
+    def get_unknown_location_message(self, location: Location, strict: bool = False) -> Optional[str]:
+        """Returns why `location` is rejected, or None if it may be requested.
+        Indexed locations are accepted, and so are the unknown ones unless
+        `strict`, as the index may not list every city: see
+        `get_suggestion_message` for a hint about them.
+        """
+        if self.get(location) is not None or not strict:
+            return None
+        return self.get_suggestion_message(location) or f"Unknown location {location.city},{location.country_code}."
+
+    def get_suggestion_message(self, location: Location) -> Optional[str]:
+        """Returns the indexed cities `location` may be a misspelling of, or
+        None if it is indexed or resembles no indexed city.
+        """
+        if self.get(location) is not None:
+            return None
+        suggestions = self.suggest(location)
+        if len(suggestions) == 0:
+            return None
+        names = ", ".join(f"{entry.city},{entry.country_code}" for entry in suggestions)
+        return f"Unknown location {location.city},{location.country_code}. Did you mean: {names}?"
+
+    def iter_entries(self) -> Iterator[GazetteerEntry]:
+        for index in range(self._count):
+            yield self._decode(self._get_record(index))
+
+    @classmethod
+    def build(cls, filepath: PathLike, entries: Iterable[GazetteerEntry]) -> int:
+        """Writes the index of `entries` to a temporary file which then replaces
+        `filepath`, and returns the number of indexed entries. Later entries
+        win over earlier ones for the same location.
+        """
+        records: Dict[bytes, bytes] = {}
+        for entry in entries:
+            city, country_code, key_code = " ".join(entry.city.split()), entry.country_code.strip().upper(), entry.key_code.strip()
+            normalized_city = cls.normalize_city(city)
+            if len(normalized_city) == 0 or len(country_code) == 0 or len(key_code) == 0:
+                continue
+            key = cls._get_key(country_code, normalized_city)
+            records[key] = b"\t".join((key, city.encode("utf-8"), key_code.encode("utf-8")))
+
+        sorted_records = [records[key] for key in sorted(records)]
+        offsets, offset = [], 0
+        for record in sorted_records:
+            offsets.append(offset)
+            offset += len(record)
+        offsets.append(offset)
+
+        dirname = pathlib.Path(filepath).parent
+        file_descriptor, temp_path = tempfile.mkstemp(dir=dirname, prefix=".gazetteer-", suffix=".tmp")
+        try:
+            with os.fdopen(file_descriptor, "wb") as temp_file:
+                temp_file.write(cls._HEADER.pack(cls.MAGIC, len(sorted_records)))
+                temp_file.write(struct.pack(f"<{len(offsets)}I", *offsets))
+                for record in sorted_records:
+                    temp_file.write(record)
+            os.replace(temp_path, filepath)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        return len(sorted_records)
+
+    @staticmethod
+    def _get_key(country_code: str, normalized_city: str) -> bytes:
+        return f"{country_code.strip().upper()}\t{normalized_city}".encode("utf-8")
+
+    def _get_offset(self, index: int) -> int:
+        return self._OFFSET.unpack_from(self._mmap, self._HEADER.size + index * self._OFFSET.size)[0]
+
+    def _get_record(self, index: int) -> bytes:
+        return self._mmap[self._records_start + self._get_offset(index):self._records_start + self._get_offset(index + 1)]
+
+    def _bisect(self, key: bytes, low: int, high: int) -> int:
+        """Returns the index of the first record not lower than `key`.
+        """
+        while low < high:
+            middle = (low + high) // 2
+            if self._get_record(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _get_country_range(self, country_code: str) -> Tuple[int, int]:
+        # '\n' follows '\t', so the second bound is past every city of the country.
+        country = country_code.strip().upper().encode("utf-8")
+        low = self._bisect(country + b"\t", 0, self._count)
+        return low, self._bisect(country + b"\n", low, self._count)
+
+    @staticmethod
+    def _decode(record: bytes) -> GazetteerEntry:
+        country_code, _, city, key_code = record.decode("utf-8").split("\t")
+        return GazetteerEntry(city, country_code, key_code)
+
+def read_seed_file(filepath: PathLike) -> List[GazetteerEntry]:
+    """Returns the entries of a seed file, which is either:
+      - a CSV file with city, country code and key columns, optionally headed
+        by 'city,country_code,key',
+      - an Accuweather locations listing in JSON, like the responses of the
+        top cities or city search endpoints,
+      - a location keys cache file (see `LocationKeyCache`).
+    Raises OSError or ValueError when the file cannot be read or parsed.
+    """
+    if str(filepath).lower().endswith(".csv"):
+        return _read_csv_seed_file(filepath)
+    with open(filepath, "r", encoding="utf-8") as seed_file:
+        content = json.load(seed_file)
+    try:
+        if isinstance(content, dict):
+            return [_parse_cached_location(location, key_code) for location, key_code, *_ in content["entries"]]
+        entries: Dict[bytes, GazetteerEntry] = {}
+        for location in content:
+            entry = GazetteerEntry(location.get("EnglishName") or location["LocalizedName"], location["Country"]["ID"], str(location["Key"]))
+            # Listings are sorted by rank, and the key of the first homonym is the one a search resolves to.
+            entries.setdefault(Gazetteer._get_key(entry.country_code, Gazetteer.normalize_city(entry.city)), entry)
+        return list(entries.values())
+    except (KeyError, TypeError, AttributeError) as error:
+        raise ValueError(f"{filepath} is not a locations listing nor a location keys file: {error!r}") from error
+
+def _read_csv_seed_file(filepath: PathLike) -> List[GazetteerEntry]:
+    entries = []
+    with open(filepath, "r", encoding="utf-8", newline="") as seed_file:
+        for line_number, row in enumerate(csv.reader(seed_file), 1):
+            if len(row) == 0 or (line_number == 1 and [column.strip().lower() for column in row] == ["city", "country_code", "key"]):
+                continue
+            if len(row) != 3:
+                raise ValueError(f"{filepath}:{line_number}: expected city, country code and key, got {row}.")
+            entries.append(GazetteerEntry(*row))
+    return entries
+
+def _parse_cached_location(location: str, key_code: str) -> GazetteerEntry:
+    # Cached locations are normalized as 'city,CC' with a casefolded city.
+    city, _, country_code = str(location).rpartition(",")
+    return GazetteerEntry(city.title(), country_code, str(key_code))
@@ -0,0 +1,290 @@
+"""Local history of the weather information fetched by the application.
+
+Every current condition, daily forecast and hourly forecast returned by the
+connector is stored in a SQLite database, always with temperatures in metric
+units. Rows are unique by location key, kind and date: a revised forecast
+replaces the previous one for its date, and fetching unchanged information
+again changes nothing. The unique index also covers time-range queries and
+aggregates of a location.
+
+Locations are identified by the key their provider resolved them to, read
+from the location key cache, so every name of a place shares one history.
+The key each name was recorded with is kept in the store. Names whose key is
+unknown are recorded under their normalized name.
+"""
+import time
+import sqlite3
+import logging
+import threading
+from datetime import date, datetime, timedelta
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+from .connectors import WeatherApiConnector
+from .connectors.location_key_cache import LocationKeyCache
+from .domain import Date, DateTime, Location, Temperature, Units, WeatherInfo, WeatherSeries
+from .persistence import PathLike
+
+logger = logging.getLogger(__name__)
+
+CURRENT = "current"
+FORECAST = "forecast"
+HOURLY = "hourly"
+KINDS = (CURRENT, FORECAST, HOURLY)
+
+class HistoryAggregates(NamedTuple):
+    """Number of records and temperature statistics of a time range.
+    Temperatures are None when there are no records.
+    """
+    records: int
+    min_temperature: Optional[Temperature]
+    max_temperature: Optional[Temperature]
+    mean_temperature: Optional[Temperature]
+
+class HistoryStore:
+    """Store of the latest weather information of every date in a SQLite
+    database shared by every process of the application. Thread safe.
+    """
+    FILENAME = "history.sqlite3"
+    UNITS = Units.METRIC
+    EXPORT_FORMATS = (".arrow", ".feather", ".parquet")
+    # Decimals of the stored temperatures, so that values converted back from
+    # imperial units match the metric ones.
+    PRECISION = 2
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS observations (
+            location_key TEXT NOT NULL,
+            location TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            date TEXT NOT NULL,
+            temperature REAL NOT NULL,
+            description TEXT NOT NULL,
+            recorded_at REAL NOT NULL);
+        CREATE UNIQUE INDEX IF NOT EXISTS observations_by_date
+            ON observations (location_key, kind, date);
+        CREATE TABLE IF NOT EXISTS location_keys (
+            location TEXT PRIMARY KEY,
+            location_key TEXT NOT NULL);
+    """
+    _COLUMNS = ("location_key", "location", "kind", "date", "temperature", "description", "recorded_at")
+
+    def __init__(self, filepath: PathLike, location_key_cache: Optional[LocationKeyCache] = None, timeout: float = 5.0):
+        self._filepath = filepath
+        self._location_key_cache = location_key_cache
+        self._connection = sqlite3.connect(str(filepath), timeout=timeout, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.executescript(self._SCHEMA)
+
+    def __enter__(self) -> "HistoryStore":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def record(self, kind: str, weather_infos: Iterable[WeatherInfo]) -> int:
+        """Stores the weather information not stored yet, replacing the revised
+        one of an already stored date, and returns the number of added or
+        replaced rows.
+        """
+        recorded_at = time.time()
+        location_keys = {}
+        rows = []
+        for weather_info in weather_infos:
+            location = LocationKeyCache.normalize(weather_info.location)
+            if location not in location_keys:
+                location_keys[location] = self._get_location_key(weather_info.location)
+            rows.append((
+                location_keys[location],
+                location,
+                kind,
+                weather_info.date.date.isoformat(),
+                round(weather_info.temperature.to_units(self.UNITS).value, self.PRECISION),
+                weather_info.weather_description,
+                recorded_at))
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT INTO location_keys VALUES (?, ?)"
+                " ON CONFLICT (location) DO UPDATE SET location_key = excluded.location_key",
+                location_keys.items())
+            before = self._connection.total_changes
+            self._connection.executemany(
+                "INSERT INTO observations VALUES (?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (location_key, kind, date) DO UPDATE SET"
+                " location = excluded.location, temperature = excluded.temperature,"
+                " description = excluded.description, recorded_at = excluded.recorded_at"
+                " WHERE temperature != excluded.temperature OR description != excluded.description", rows)
+            return self._connection.total_changes - before
+
+    def query(self,
+        location: Location,
+        kind: str,
+        units: Units = Units.METRIC,
+        start: Optional[date] = None,
+        end: Optional[date] = None) -> Iterator[WeatherInfo]:
+        """Yields the weather information of `location` dated between `start`
+        and `end`, both included, in chronological order.
+        """
+        condition, params = self._get_range_condition(self._get_location_key(location), kind, start, end)
+        scale, offset = Temperature.get_conversion(self.UNITS, units)
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT date, temperature, description FROM observations WHERE {condition} ORDER BY date",
+                params).fetchall()
+        for date_string, temperature, description in rows:
+            yield WeatherInfo(
+                self._parse_date(kind, date_string),
+                location,
+                Temperature(temperature * scale + offset, units),
+                description)
+
+    def aggregate(self,
+        location: Location,
+        kind: str,
+        units: Units = Units.METRIC,
+        start: Optional[date] = None,
+        end: Optional[date] = None) -> HistoryAggregates:
+        """Returns the number of records and the minimum, maximum and mean
+        temperatures of `location` between `start` and `end`, both included,
+        computed by the database.
+        """
+        condition, params = self._get_range_condition(self._get_location_key(location), kind, start, end)
+        with self._lock:
+            records, minimum, maximum, mean = self._connection.execute(
+                f"SELECT COUNT(*), MIN(temperature), MAX(temperature), AVG(temperature) FROM observations WHERE {condition}",
+                params).fetchone()
+        if records == 0:
+            return HistoryAggregates(0, None, None, None)
+        return HistoryAggregates(records, *(Temperature(value, self.UNITS).to_units(units) for value in (minimum, maximum, mean)))
+
+    def export(self,
+        filepath: PathLike,
+        location: Optional[Location] = None,
+        kind: Optional[str] = None,
+        batch_size: int = 65536) -> int:
+        """Writes the records, of every location and kind unless given, to an
+        Arrow IPC (`.arrow`, `.feather`) or Parquet (`.parquet`) file, one
+        batch of rows at a time, and returns the number of exported rows.
+
+        Requires the optional `pyarrow` dependency (`pip install .[arrow]`).
+        """
+        suffix = str(filepath)[str(filepath).rfind("."):].lower()
+        if suffix not in self.EXPORT_FORMATS:
+            raise ValueError(f"Export file must end with one of: {', '.join(self.EXPORT_FORMATS)}.")
+        try:
+            import pyarrow  # type: ignore[import-not-found]
+            import pyarrow.ipc  # type: ignore[import-not-found]
+            import pyarrow.parquet  # type: ignore[import-not-found]
+        except ImportError as error:
+            raise ImportError("Exporting the history requires pyarrow: pip install weatherconsoleapp[arrow]") from error
+
+        schema = pyarrow.schema([
+            ("location_key", pyarrow.string()),
+            ("location", pyarrow.string()),
+            ("kind", pyarrow.string()),
+            ("date", pyarrow.string()),
+            ("temperature", pyarrow.float64()),
+            ("description", pyarrow.string()),
+            ("recorded_at", pyarrow.float64())])
+        conditions, params = [], []
+        if location is not None:
+            conditions.append("location_key = ?")
+            params.append(self._get_location_key(location))
+        if kind is not None:
+            conditions.append("kind = ?")
+            params.append(kind)
+        where = f"WHERE {' AND '.join(conditions)}" if len(conditions) > 0 else ""
+
+        exported = 0
+        # A dedicated connection streams the rows without blocking the writers.
+        connection = sqlite3.connect(str(self._filepath))
+        try:
+            cursor = connection.execute(
+                f"SELECT {', '.join(self._COLUMNS)} FROM observations {where} ORDER BY location_key, kind, date", params)
+            if suffix == ".parquet":
+                writer = pyarrow.parquet.ParquetWriter(str(filepath), schema)
+            else:
+                writer = pyarrow.ipc.new_file(str(filepath), schema)
+            with writer:
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if len(rows) == 0:
+                        break
+                    columns = [pyarrow.array(column, field.type) for column, field in zip(zip(*rows), schema)]
+                    writer.write_batch(pyarrow.record_batch(columns, schema=schema))
+                    exported += len(rows)
+        finally:
+            connection.close()
+        return exported
+
+    def _get_location_key(self, location: Location) -> str:
+        """Returns the key of `location` in the location key cache, else the one
+        it was recorded with, else its normalized name.
+        """
+        if self._location_key_cache is not None:
+            location_key = self._location_key_cache.get(location)
+            if location_key is not None:
+                return location_key
+        normalized_location = LocationKeyCache.normalize(location)
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT location_key FROM location_keys WHERE location = ?", (normalized_location,)).fetchone()
+        return normalized_location if row is None else row[0]
+
+    @staticmethod
+    def _get_range_condition(
+        location_key: str,
+        kind: str,
+        start: Optional[date],
+        end: Optional[date]) -> Tuple[str, List[object]]:
+        conditions = ["location_key = ?", "kind = ?"]
+        params: List[object] = [location_key, kind]
+        # ISO dates and date times sort as text, and every date time of a day
+        # is between the day and the next one.
+        if start is not None:
+            conditions.append("date >= ?")
+            params.append(start.isoformat())
+        if end is not None:
+            conditions.append("date < ?")
+            params.append((end + timedelta(days=1)).isoformat())
+        return " AND ".join(conditions), params
+
+    @staticmethod
+    def _parse_date(kind: str, date_string: str) -> Union[Date, DateTime]:
+        if kind == HOURLY:
+            return DateTime(datetime.fromisoformat(date_string))
+        return Date(datetime.fromisoformat(date_string) if "T" in date_string else date.fromisoformat(date_string))
+
+class RecordingConnector(WeatherApiConnector):
+    """Connector decorator appending the weather information it returns to a
+    `HistoryStore`. Failures to record are logged, never raised.
+    """
+    def __init__(self, connector: WeatherApiConnector, store: HistoryStore):
+        self._connector = connector
+        self._store = store
+
+    def get_current_weather_for_location(self, location: Location, unit: Units) -> WeatherInfo:
+        weather_info = self._connector.get_current_weather_for_location(location, unit)
+        self._record(CURRENT, [weather_info])
+        return weather_info
+
+    def get_weather_forecast_for_location(self, location: Location, unit: Units, days: int = 5) -> List[WeatherInfo]:
+        weather_infos = self._connector.get_weather_forecast_for_location(location, unit, days)
+        self._record(FORECAST, weather_infos)
+        return weather_infos
+
+    def get_hourly_forecast_for_location(self, location: Location, unit: Units, hours: int = 12) -> WeatherSeries:
+        weather_series = self._connector.get_hourly_forecast_for_location(location, unit, hours)
+        self._record(HOURLY, weather_series.to_weather_infos())
+        return weather_series
+
+    def _record(self, kind: str, weather_infos: List[WeatherInfo]):
+        try:
+            self._store.record(kind, weather_infos)
+        except sqlite3.Error:
+            logger.warning("Could not record %s weather information in the history", kind, exc_info=True)
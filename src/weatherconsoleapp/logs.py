@@ -0,0 +1,219 @@
+"""Application log pipeline.
+
+Loggers only put their records in a bounded in-memory queue. A background
+thread takes them from the queue and writes them to the log file, which is
+rotated by size or time. Logging a message thus never waits for the disk,
+and records are dropped rather than blocking the caller when the writer
+falls behind.
+
+Several processes may write the same file, e.g. a `serve` daemon and one-off
+commands. Only the one holding the file's `RotationLock` rotates it, the
+others append to it.
+"""
+import os
+import sys
+import pathlib
+import copy
+import json
+import queue
+import atexit
+import logging
+import logging.handlers
+from datetime import datetime, timezone
+from typing import Any, BinaryIO, Optional
+from .config import LoggingSettings
+from .persistence import PathLike
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as JSON objects, one per line, with the time in UTC.
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+            "process": record.process}
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler which drops, and counts, the records that do not fit in
+    the queue instead of blocking or reporting an error.
+    """
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]"):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Unlike the base implementation, only the arguments are merged here.
+        # The records are formatted by the writer thread.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.stack_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class RotationLock:
+    """Exclusive inter-process lock on the sidecar `.lock` file of a log file,
+    taken without waiting and held until released. The process holding it is
+    the only one rotating the log file.
+    """
+    def __init__(self, filepath: PathLike):
+        self._path = pathlib.Path(f"{filepath}.lock")
+        self._file: Optional[BinaryIO] = None
+
+    def acquire(self) -> bool:
+        """Returns whether the lock is held by this process, taking it if free.
+        """
+        if self._file is not None:
+            return True
+        try:
+            lock_file = open(self._path, "a+b")
+        except OSError:
+            return False
+        try:
+            if sys.platform == "win32":
+                import msvcrt
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._file = lock_file
+        return True
+
+    def release(self):
+        # Closing the file releases the lock.
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+class ExclusiveRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Size rotating file handler which only rotates while holding `rotation_lock`.
+    """
+    def __init__(self, filepath: PathLike, rotation_lock: RotationLock, **kwargs: Any):
+        super().__init__(filepath, **kwargs)
+        self.rotation_lock = rotation_lock
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        return bool(super().shouldRollover(record)) and self.rotation_lock.acquire()
+
+    def close(self):
+        super().close()
+        self.rotation_lock.release()
+
+class ExclusiveTimedRotatingFileHandler(logging.handlers.TimedRotatingFileHandler):
+    """Time rotating file handler which only rotates while holding `rotation_lock`.
+    """
+    def __init__(self, filepath: PathLike, rotation_lock: RotationLock, **kwargs: Any):
+        super().__init__(filepath, **kwargs)
+        self.rotation_lock = rotation_lock
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        return bool(super().shouldRollover(record)) and self.rotation_lock.acquire()
+
+    def close(self):
+        super().close()
+        self.rotation_lock.release()
+
+def create_file_handler(filepath: PathLike, settings: LoggingSettings, rotate: bool = True) -> logging.Handler:
+    """Returns the handler writing the log file in the configured format,
+    rotated by time if `rotate_when` is set, otherwise by size, by the first
+    process needing to rotate it while no other process holds its
+    `RotationLock`. Without `rotate`, the file is only appended to.
+    """
+    if not rotate:
+        handler: logging.Handler = logging.FileHandler(filepath, encoding="utf-8", delay=True)
+    elif len(settings.rotate_when) > 0:
+        handler = ExclusiveTimedRotatingFileHandler(
+            filepath,
+            RotationLock(filepath),
+            when=settings.rotate_when,
+            backupCount=settings.backup_count,
+            encoding="utf-8",
+            delay=True)
+    else:
+        handler = ExclusiveRotatingFileHandler(
+            filepath,
+            RotationLock(filepath),
+            maxBytes=settings.max_bytes,
+            backupCount=settings.backup_count,
+            encoding="utf-8",
+            delay=True)
+    handler.setFormatter(JsonFormatter() if settings.format == "json" else logging.Formatter(TEXT_FORMAT))
+    return handler
+
+class LogPipeline:
+    """Queue of up to `queue_size` records between the loggers and `handler`,
+    which writes them on a background thread once started.
+    """
+    def __init__(self, handler: logging.Handler, queue_size: int = 10000):
+        self._queue: "queue.Queue[logging.LogRecord]" = queue.Queue(max(1, queue_size))
+        self.handler = DroppingQueueHandler(self._queue)
+        self._target = handler
+        self._listener = logging.handlers.QueueListener(self._queue, handler, respect_handler_level=True)
+        self._started = False
+        self.pid = os.getpid()
+
+    @property
+    def dropped(self) -> int:
+        return self.handler.dropped
+
+    def start(self):
+        if not self._started:
+            self._listener.start()
+            self._started = True
+
+    def stop(self):
+        """Writes the queued records, then stops the writer thread and closes
+        the file. Safe to call more than once.
+        """
+        if self._started:
+            self._started = False
+            self._listener.stop()
+            self._target.close()
+
+_pipeline: Optional[LogPipeline] = None
+
+def start_log_pipeline(filepath: PathLike, settings: LoggingSettings, rotate: bool = True) -> LogPipeline:
+    """Routes the records of every logger at `settings.level` or above to the
+    log file through a started `LogPipeline`, stopped at exit. Returns the
+    pipeline already started by the process, if any.
+
+    Processes which must never rotate the file, e.g. the workers of a bulk
+    job, pass `rotate` as False.
+    """
+    global _pipeline
+    root_logger = logging.getLogger()
+    if _pipeline is not None:
+        if _pipeline.pid == os.getpid():
+            return _pipeline
+        # Forked processes inherit the handler, but not the writer thread.
+        root_logger.removeHandler(_pipeline.handler)
+
+    pipeline = LogPipeline(create_file_handler(filepath, settings, rotate), settings.queue_size)
+    root_logger.setLevel(settings.level)
+    root_logger.addHandler(pipeline.handler)
+    pipeline.start()
+    atexit.register(pipeline.stop)
+    _pipeline = pipeline
+    return pipeline
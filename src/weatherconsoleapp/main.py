@@ -1,37 +1,58 @@
 import logging
 import argparse
+import functools
 import os
 import sys
 import pathlib
-import shutil
-import configparser
-import importlib.resources as resources
-from weatherconsoleapp.connectors import AccuWeatherApiConnector, requests_factories
-from weatherconsoleapp.commands import PrintCurrentWeatherCommand, PrintWeatherForecastCommand, CommandResultStatus
+from typing import Callable, List, Optional, TextIO, Tuple, TYPE_CHECKING
+from weatherconsoleapp.config import AppConfig, CONFIG_FILENAME, get_config_dirname, get_config_filepath
+from weatherconsoleapp.commands import WeatherCommand, WeatherReportCommand, PrintCurrentWeatherCommand, PrintWeatherForecastCommand, PrintHourlyForecastCommand, PrintHistoryCommand, WatchCommand, BatchCommand, CommandResultStatus
+from weatherconsoleapp.utils import Utils
+from weatherconsoleapp.formatters import FORMATTERS, ReportFormatter, ReportWriter, TextFormatter, create_formatter
+from weatherconsoleapp.domain import Location
+from weatherconsoleapp import metrics
 
 import weatherconsoleapp
 
-CONFIG_FILENAME = "config.ini"
+# Connectors, caches and the HTTP server pull in heavy modules (requests,
+# http.server...), so they are imported by the functions using them, once
+# arguments have been validated and a network command is about to run.
+if TYPE_CHECKING:
+    from weatherconsoleapp.connectors import WeatherApiConnector
+    from weatherconsoleapp.connectors.location_key_cache import LocationKeyCache
+    from weatherconsoleapp.connectors.requests_factories import BaseRequestsFactory
+    from weatherconsoleapp.connectors.quota_scheduler import QuotaScheduler
+    from weatherconsoleapp.watchlist import AccessCounter, WatchListRefresher
+    from weatherconsoleapp.gazetteer import Gazetteer, GazetteerEntry
+    from weatherconsoleapp.history import HistoryStore
+    from weatherconsoleapp.logs import LogPipeline
+
 CURRENT_WEATHER_COMMAND = "current"
 WEATHER_FORECAST_COMMAND = "forecast"
+HOURLY_FORECAST_COMMAND = "hourly"
+SERVE_COMMAND = "serve"
+QUOTA_COMMAND = "quota"
+REFRESH_COMMAND = "refresh"
+WATCH_COMMAND = "watch"
+GAZETTEER_COMMAND = "gazetteer"
+HISTORY_COMMAND = "history"
+SHELL_COMMAND = "shell"
 
-logger = logging.getLogger(__name__)
+LOG_FILENAME = "weatherconsoleapp.log"
 
-def config_logging():
-    logging.basicConfig(
-        filename=pathlib.Path(get_config_dirname(), 'weatherconsoleapp.log'),
-        filemode='a',
-        format="%(name)s: %(asctime)s - %(message)s",
-        encoding='utf-8',
-        level=logging.DEBUG)   
+logger = logging.getLogger(__name__)
 
-def get_config_dirname():
-    app_directory = ".weatherconsoleapp"
-    user_directory = os.path.expanduser("~")
-    return pathlib.Path(user_directory, app_directory)
+def config_logging(config: AppConfig, rotate: bool = True) -> "LogPipeline":
+    """Writes the logs to the configured file from a background thread. The
+    file is rotated by one process at a time, the first one needing to
+    rotate it, and never by the worker processes of a bulk job, where
+    `rotate` is False.
+    """
+    from weatherconsoleapp.logs import start_log_pipeline
 
-def get_config_filepath():
-    return pathlib.Path(get_config_dirname(), CONFIG_FILENAME)
+    path = config.get_log_path()
+    filepath = pathlib.Path(get_config_dirname(), LOG_FILENAME) if path is None else pathlib.Path(path).expanduser()
+    return start_log_pipeline(filepath, config.get_logging_settings(), rotate)
 
 def create_config_dir() -> bool:
     """Returns True if the config dir did not exist and was created.
@@ -48,6 +69,9 @@ def create_config_dir() -> bool:
 def create_config_file() -> bool:
     """Returns True if the config file did not exist and was created.
     """
+    import shutil
+    import importlib.resources as resources
+
     with resources.as_file(resources.files(weatherconsoleapp).joinpath(CONFIG_FILENAME)) as config_file:
         target_path = get_config_filepath()
         if not os.path.isfile(target_path):
@@ -58,71 +82,763 @@ def create_config_file() -> bool:
 def create_config() -> bool:
     """Returns True if any of the config dir or file were created.
     """
-    return create_config_dir() or create_config_file()
+    if os.path.isfile(get_config_filepath()):
+        return False
+    config_dir_created = create_config_dir()
+    return create_config_file() or config_dir_created
 
-def get_api_key():
-    try:
-        config = configparser.ConfigParser()
-        config.read(get_config_filepath())
-        apikey = config['accuweather']['apikey']
-        return apikey
-    except Exception:
-        logger.error("Could not find an apikey for Accuweather", exc_info=True)
+def get_api_key(config: AppConfig):
+    if AppConfig.ACCUWEATHER_PROVIDER not in config.get_providers():
         return None
+    apikey = config.get_apikey()
+    if apikey is None:
+        logger.error("Could not find an apikey for Accuweather")
+    return apikey
+
+def create_location_key_cache(config: AppConfig, filename: Optional[str] = None) -> "LocationKeyCache":
+    from weatherconsoleapp.connectors.location_key_cache import LocationKeyCache
+
+    filepath = pathlib.Path(get_config_dirname(), LocationKeyCache.FILENAME if filename is None else filename)
+    return LocationKeyCache(filepath, config.get_location_key_cache_size())
+
+def create_provider_location_key_cache(config: AppConfig, provider: str) -> "LocationKeyCache":
+    """Returns the cache of the location keys, or coordinates, of `provider`.
+    """
+    if provider == AppConfig.OPEN_METEO_PROVIDER:
+        from weatherconsoleapp.connectors.open_meteo_api_connector import OpenMeteoApiConnector
+
+        return create_location_key_cache(config, OpenMeteoApiConnector.FILENAME)
+    return create_location_key_cache(config)
+
+def open_gazetteer(config: AppConfig) -> Optional["Gazetteer"]:
+    """Returns the configured gazetteer, or None if it has not been seeded.
+    """
+    from weatherconsoleapp.gazetteer import Gazetteer
+
+    return Gazetteer.open(get_gazetteer_filepath(config))
+
+def get_gazetteer_filepath(config: AppConfig) -> pathlib.Path:
+    from weatherconsoleapp.gazetteer import Gazetteer
 
-def print_command_result_status(command_result_status: CommandResultStatus):
+    path = config.get_gazetteer_path()
+    return pathlib.Path(get_config_dirname(), Gazetteer.FILENAME) if path is None else pathlib.Path(path).expanduser()
+
+def create_quota_scheduler(config: AppConfig, shared: bool = False) -> "QuotaScheduler":
+    from weatherconsoleapp.connectors.quota_scheduler import QuotaScheduler, QuotaUsageStore
+
+    usage_store = QuotaUsageStore(pathlib.Path(get_config_dirname(), QuotaUsageStore.FILENAME))
+    return QuotaScheduler(
+        config.get_apikeys(),
+        config.get_daily_limit(),
+        config.get_requests_per_second(),
+        usage_store,
+        shared=shared)
+
+def create_circuit_breaker(
+    config: AppConfig,
+    requests_factory: "BaseRequestsFactory",
+    endpoints: List[str]) -> "BaseRequestsFactory":
+    from weatherconsoleapp.connectors.circuit_breaker import CircuitBreakerRequestsFactory
+
+    return CircuitBreakerRequestsFactory(
+        requests_factory,
+        endpoints,
+        config.get_circuit_failure_threshold(),
+        config.get_circuit_reset_timeout())
+
+def create_requests_factory(config: AppConfig, shared_quota: bool = False) -> "BaseRequestsFactory":
+    from weatherconsoleapp.connectors import requests_factories
+    from weatherconsoleapp.connectors.response_cache import ResponseCache, CachingRequestsFactory
+    from weatherconsoleapp.connectors.single_flight import SingleFlightRequestsFactory
+    from weatherconsoleapp.connectors.quota_scheduler import QuotaSchedulingRequestsFactory
+    from weatherconsoleapp.connectors.accuweather_requests import LocationKeyRequest, CurrentWeatherRequest, WeatherForecastRequest, HourlyForecastRequest
+
+    response_cache = ResponseCache(
+        pathlib.Path(get_config_dirname(), ResponseCache.DIRNAME),
+        config.get_max_stale())
+    endpoint_ttls = {
+        CurrentWeatherRequest.request_url: config.get_current_conditions_ttl(),
+        WeatherForecastRequest.request_url: config.get_forecast_ttl(),
+        HourlyForecastRequest.request_url: config.get_forecast_ttl()}
+    endpoints = [LocationKeyRequest.request_url, *endpoint_ttls]
+    # The circuit breaker is below the cache, which serves stale responses
+    # while a circuit is open, and does not take quota for rejected requests.
+    return CachingRequestsFactory(
+        SingleFlightRequestsFactory(create_circuit_breaker(
+            config,
+            QuotaSchedulingRequestsFactory(
+                requests_factories.RequestsFactory(config.get_http_settings()),
+                create_quota_scheduler(config, shared_quota)),
+            endpoints)),
+        response_cache,
+        endpoint_ttls)
+
+def create_open_meteo_requests_factory(config: AppConfig) -> "BaseRequestsFactory":
+    from weatherconsoleapp.connectors import requests_factories
+    from weatherconsoleapp.connectors.response_cache import ResponseCache, CachingRequestsFactory
+    from weatherconsoleapp.connectors.single_flight import SingleFlightRequestsFactory
+    from weatherconsoleapp.connectors.open_meteo_requests import GeocodingRequest, ForecastRequest
+
+    response_cache = ResponseCache(
+        pathlib.Path(get_config_dirname(), ResponseCache.DIRNAME),
+        config.get_max_stale())
+    # Current conditions and forecasts share the endpoint, so the shortest ttl applies.
+    endpoint_ttls = {ForecastRequest.request_url: config.get_current_conditions_ttl()}
+    # Open-Meteo has no apikeys nor daily quota, so requests are not scheduled.
+    return CachingRequestsFactory(
+        SingleFlightRequestsFactory(create_circuit_breaker(
+            config,
+            requests_factories.RequestsFactory(config.get_http_settings()),
+            [GeocodingRequest.request_url, ForecastRequest.request_url])),
+        response_cache,
+        endpoint_ttls)
+
+def print_command_result_status(
+    command_result_status: CommandResultStatus,
+    label: Optional[str] = None,
+    file: Optional[TextIO] = None):
+    prefix = "" if label is None else f"{label}: "
     if command_result_status == CommandResultStatus.ERROR:
-        print(f"An unexpected error happened. Please check whether the configured apikey is valid ({get_config_filepath()}).")
+        print(f"{prefix}An unexpected error happened. Please check whether the configured apikey is valid ({get_config_filepath()}).", file=file)
     elif command_result_status == CommandResultStatus.TIMEOUT:
-        print("Request timedout while requesting weather information.")
+        print(f"{prefix}Request timedout while requesting weather information.", file=file)
+    elif command_result_status == CommandResultStatus.CONNECTION_ERROR:
+        print(f"{prefix}Could not connect to the weather service. Please check the network connection.", file=file)
+
+def create_provider_connector(
+    config: AppConfig,
+    provider: str,
+    apikey: Optional[str],
+    shared_quota: bool = False) -> Tuple["WeatherApiConnector", "LocationKeyCache"]:
+    if provider == AppConfig.OPEN_METEO_PROVIDER:
+        from weatherconsoleapp.connectors.open_meteo_api_connector import OpenMeteoApiConnector
+
+        coordinates_cache = create_provider_location_key_cache(config, provider)
+        connector = OpenMeteoApiConnector(
+            create_open_meteo_requests_factory(config),
+            coordinates_cache,
+            config.get_open_meteo_api_url(),
+            config.get_open_meteo_geocoding_url())
+        return connector, coordinates_cache
+
+    from weatherconsoleapp.connectors import AccuWeatherApiConnector
+
+    location_key_cache = create_provider_location_key_cache(config, provider)
+    connector = AccuWeatherApiConnector(
+        apikey,
+        create_requests_factory(config, shared_quota),
+        location_key_cache,
+        config.get_api_url(),
+        open_gazetteer(config))
+    return connector, location_key_cache
+
+def create_connector(
+    config: AppConfig,
+    apikey: Optional[str],
+    shared_quota: bool = False) -> Tuple["WeatherApiConnector", List["LocationKeyCache"]]:
+    """Returns the connector of the configured provider, or a connector hedging
+    across providers when a secondary one is configured, together with the
+    location caches to flush once done. With `shared_quota`, Accuweather
+    quotas are enforced across processes instead of per process.
+    """
+    providers = config.get_providers()
+    connectors, caches = [], []
+    for provider in providers:
+        connector, cache = create_provider_connector(config, provider, apikey, shared_quota)
+        connectors.append((provider, connector))
+        caches.append(cache)
+    if len(connectors) == 1:
+        return record_history(config, connectors[0][1], caches[0]), caches
 
-def execute_command(command_builder, apikey, validation_error_messages, validated_input):
+    from weatherconsoleapp.connectors.hedged_connector import HedgedWeatherApiConnector
+
+    connector = HedgedWeatherApiConnector(
+        connectors,
+        hedge_quantile=config.get_hedge_quantile(),
+        default_hedge_delay=config.get_default_hedge_delay(),
+        max_error_rate=config.get_max_error_rate(),
+        failover_cooldown=config.get_failover_cooldown())
+    return record_history(config, connector, caches[0]), caches
+
+def open_history_store(config: AppConfig, location_key_cache: Optional["LocationKeyCache"] = None) -> Optional["HistoryStore"]:
+    """Returns the history store, or None if the history is disabled or its
+    database cannot be opened. Locations are identified by their key in
+    `location_key_cache`, the one of the primary provider by default.
+    """
+    import sqlite3
+    from weatherconsoleapp.history import HistoryStore
+
+    if not config.is_history_enabled():
+        return None
+    path = config.get_history_path()
+    filepath = pathlib.Path(get_config_dirname(), HistoryStore.FILENAME) if path is None else pathlib.Path(path).expanduser()
+    if location_key_cache is None:
+        location_key_cache = create_provider_location_key_cache(config, config.get_providers()[0])
+    try:
+        return HistoryStore(filepath, location_key_cache)
+    except sqlite3.Error:
+        logger.warning("Could not open the history %s", filepath, exc_info=True)
+        return None
+
+def record_history(
+    config: AppConfig,
+    connector: "WeatherApiConnector",
+    location_key_cache: "LocationKeyCache") -> "WeatherApiConnector":
+    from weatherconsoleapp.history import RecordingConnector
+
+    store = open_history_store(config, location_key_cache)
+    return connector if store is None else RecordingConnector(connector, store)
+
+def flush_location_caches(caches: List["LocationKeyCache"]):
+    for cache in caches:
+        cache.flush()
+
+def create_access_counter() -> "AccessCounter":
+    from weatherconsoleapp.watchlist import AccessCounter
+
+    return AccessCounter(pathlib.Path(get_config_dirname(), AccessCounter.FILENAME))
+
+def count_accesses(connector: "WeatherApiConnector", access_counter: "AccessCounter") -> "WeatherApiConnector":
+    from weatherconsoleapp.watchlist import AccessCountingConnector
+
+    return AccessCountingConnector(connector, access_counter)
+
+def create_refresher(
+    config: AppConfig,
+    connector: "WeatherApiConnector",
+    access_counter: "AccessCounter") -> Optional["WatchListRefresher"]:
+    """Returns the refresher of the watch-list locations, or None when the
+    watch-list is empty.
+    """
+    from weatherconsoleapp.watchlist import WatchListRefresher, parse_watchlist
+    from weatherconsoleapp.connectors.quota_scheduler import QuotaUsageStore
+
+    locations = parse_watchlist(config.get_watchlist())
+    if len(locations) == 0:
+        return None
+    return WatchListRefresher(
+        connector,
+        locations,
+        access_counter,
+        config.get_refresh_margin(),
+        config.get_refresh_interval(),
+        config.get_refresh_daily_budget(),
+        QuotaUsageStore(pathlib.Path(get_config_dirname(), WatchListRefresher.FILENAME)))
+
+def create_report_writer(formatter: ReportFormatter) -> ReportWriter:
+    """Returns a writer to the standard output, buffered unless it is a terminal.
+    """
+    return ReportWriter(formatter, buffer_size=0 if sys.stdout.isatty() else ReportWriter.DEFAULT_BUFFER_SIZE)
+
+def get_messages_file(formatter: ReportFormatter) -> Optional[TextIO]:
+    """Returns where error messages are printed: the standard output for text,
+    the standard error otherwise so they never mix with the records.
+    """
+    return None if isinstance(formatter, TextFormatter) else sys.stderr
+
+def execute_command(
+    command_builder,
+    config: AppConfig,
+    apikey,
+    validation_error_messages,
+    validated_input,
+    formatter: ReportFormatter = TextFormatter()):
+    messages_file = get_messages_file(formatter)
     if len(validation_error_messages) > 0:
         for message in validation_error_messages:
-            print(message)
+            print(message, file=messages_file)
         return
 
-    requests_factory = requests_factories.RequestsFactory()
-    connector = AccuWeatherApiConnector(apikey, requests_factory)
-    command = command_builder(connector, **validated_input)
-    result_status = command.execute()
-    print_command_result_status(result_status)
+    connector, location_caches = create_connector(config, apikey)
+    access_counter = create_access_counter()
+    with create_report_writer(formatter) as writer:
+        command = command_builder(count_accesses(connector, access_counter), output=writer, formatter=formatter, **validated_input)
+        result_status = command.execute()
+    flush_location_caches(location_caches)
+    access_counter.flush()
+    print_command_result_status(result_status, file=messages_file)
 
-def try_execute_print_current_weather(apikey: str, location: str, units: str):
-    validation_error_messages, validated_input = PrintCurrentWeatherCommand.validate_arguments(location, units)
-    execute_command(PrintCurrentWeatherCommand, apikey, validation_error_messages, validated_input)
+def execute_batch_command(
+    command_builder,
+    config: AppConfig,
+    apikey,
+    labeled_validations,
+    max_workers: int,
+    formatter: ReportFormatter = TextFormatter()):
+    from weatherconsoleapp.connectors.quota_scheduler import RequestPriority, request_priority
 
-def try_execute_print_weather_forecast(apikey: str, location: str, units: str, days: str):
-    validation_error_messages, validated_input = PrintWeatherForecastCommand.validate_arguments(location, units, days)
-    execute_command(PrintWeatherForecastCommand, apikey, validation_error_messages, validated_input)
+    messages_file = get_messages_file(formatter)
+    connector, location_caches = create_connector(config, apikey)
+    access_counter = create_access_counter()
+    connector = count_accesses(connector, access_counter)
+    print_validation_error_messages(labeled_validations, messages_file)
+    labeled_command_builders = (
+        (label, functools.partial(command_builder, connector, formatter=formatter, **validated_input))
+        for label, (validation_error_messages, validated_input) in labeled_validations
+        if len(validation_error_messages) == 0)
 
-def main():
-    if create_config():
-        print(f"Please configure your Accuweather apikey in the {get_config_filepath()} file.")
+    with request_priority(RequestPriority.BATCH), create_report_writer(formatter) as writer:
+        for result in BatchCommand(labeled_command_builders, max_workers, writer).iter_results():
+            if result.status != CommandResultStatus.SUCCESS and messages_file is None:
+                writer.flush()
+            print_command_result_status(result.status, result.label, messages_file)
+    flush_location_caches(location_caches)
+    access_counter.flush()
+
+def execute_command_for_locations(
+    command_builder,
+    config: AppConfig,
+    apikey,
+    labeled_validations,
+    max_workers: int,
+    formatter: ReportFormatter = TextFormatter()):
+    if len(labeled_validations) == 1:
+        _, (validation_error_messages, validated_input) = labeled_validations[0]
+        execute_command(command_builder, config, apikey, validation_error_messages, validated_input, formatter)
+    else:
+        execute_batch_command(command_builder, config, apikey, labeled_validations, max_workers, formatter)
+
+def create_bulk_connector(apikey: Optional[str]) -> "WeatherApiConnector":
+    """Creates the connector of a bulk job worker process, which shares the
+    Accuweather quotas with the other workers.
+    """
+    import multiprocessing.util
+
+    config = AppConfig.load()
+    pipeline = config_logging(config, rotate=False)
+    # Worker processes exit without running atexit handlers, but run the
+    # multiprocessing finalizers, so the queued records are still written.
+    multiprocessing.util.Finalize(pipeline, pipeline.stop, exitpriority=10)
+    connector, _ = create_connector(config, apikey, shared_quota=True)
+    return connector
+
+def run_bulk_job(
+    command_builder: Callable[..., WeatherReportCommand],
+    apikey: Optional[str],
+    labeled_validations,
+    job_dirname: str,
+    processes: int,
+    shard: Tuple[int, int],
+    max_workers: int,
+    formatter: ReportFormatter = TextFormatter()):
+    """Runs the share of this node of a bulk job, then prints the merged output
+    of the job if every location has been completed, by any node.
+    """
+    from weatherconsoleapp.bulk import BulkJobRunner
+
+    messages_file = get_messages_file(formatter)
+    print_validation_error_messages(labeled_validations, messages_file)
+    labeled_inputs = [(label, validated_input)
+        for label, (validation_error_messages, validated_input) in labeled_validations
+        if len(validation_error_messages) == 0]
+    runner = BulkJobRunner(
+        job_dirname,
+        command_builder,
+        labeled_inputs,
+        formatter,
+        functools.partial(create_bulk_connector, apikey),
+        processes,
+        max_workers,
+        *shard)
+    summary = runner.run()
+    print(f"Shard {shard[0]}/{shard[1]}: {summary.succeeded} locations completed, {summary.failed} failed, "
+        f"{summary.skipped} completed by previous runs.", file=sys.stderr)
+    missing = runner.merge(sys.stdout)
+    if len(missing) > 0:
+        print(f"{len(missing)} locations are not completed yet. Run the job again to retry them, "
+            f"once every shard has run and its journals are in {job_dirname}.", file=sys.stderr)
+
+def parse_shard_argument(shard: str) -> Optional[Tuple[int, int]]:
+    """Returns the (index, count) of a 'INDEX/COUNT' shard argument, or None if invalid.
+    """
+    index_string, _, count_string = shard.partition("/")
+    index, count = Utils.try_parse_string_to_int(index_string), Utils.try_parse_string_to_int(count_string)
+    if index is None or count is None or not 0 <= index < count:
+        return None
+    return (index, count)
+
+def validate_command_arguments(command: str, locations: List[str], units: str, days: str, hours: str = "12"):
+    """Returns the command class together with the validation result of the
+    arguments for each location.
+    """
+    if command == CURRENT_WEATHER_COMMAND:
+        return (PrintCurrentWeatherCommand,
+            [(location, PrintCurrentWeatherCommand.validate_arguments(location, units)) for location in locations])
+    if command == HOURLY_FORECAST_COMMAND:
+        return (PrintHourlyForecastCommand,
+            [(location, PrintHourlyForecastCommand.validate_arguments(location, units, hours)) for location in locations])
+    return (PrintWeatherForecastCommand,
+        [(location, PrintWeatherForecastCommand.validate_arguments(location, units, days)) for location in locations])
+
+def set_deadline(labeled_validations, deadline: Optional[float]):
+    """Adds the deadline of the requests, if any, to the validated input of
+    each location.
+    """
+    if deadline is None:
+        return
+    for _, (_, validated_input) in labeled_validations:
+        validated_input[WeatherReportCommand.DEADLINE] = deadline
+
+def validate_locations_in_gazetteer(config: AppConfig, labeled_validations, file: Optional[TextIO] = None):
+    """Returns the validations with an error message for each location
+    missing from the gazetteer, if seeded and strict, so that no request is
+    sent for them. Otherwise, the suggestions for unknown locations resembling
+    indexed cities are printed to `file` and the locations still requested.
+    """
+    gazetteer = open_gazetteer(config)
+    if gazetteer is None:
+        return labeled_validations
+    strict = config.is_gazetteer_strict()
+    checked_validations = []
+    with gazetteer:
+        for label, (validation_error_messages, validated_input) in labeled_validations:
+            location = validated_input.get(WeatherCommand.LOCATION)
+            if len(validation_error_messages) == 0 and location is not None:
+                message = gazetteer.get_unknown_location_message(location, strict)
+                if message is not None:
+                    validation_error_messages = validation_error_messages + [message]
+                else:
+                    hint = gazetteer.get_suggestion_message(location)
+                    if hint is not None:
+                        print(hint, file=file)
+            checked_validations.append((label, (validation_error_messages, validated_input)))
+    return checked_validations
+
+def seed_gazetteer(config: AppConfig, filenames: List[str]):
+    """Adds the locations of the seed files to the gazetteer, the last file
+    winning for locations listed more than once.
+    """
+    from weatherconsoleapp.gazetteer import Gazetteer, read_seed_file
+
+    filepath = get_gazetteer_filepath(config)
+    gazetteer = Gazetteer.open(filepath)
+    entries: List["GazetteerEntry"] = []
+    if gazetteer is not None:
+        with gazetteer:
+            entries.extend(gazetteer.iter_entries())
+    for filename in filenames:
+        try:
+            entries.extend(read_seed_file(filename))
+        except (OSError, ValueError) as error:
+            print(f"Could not read seed file {filename}: {error}")
+            return
+    count = Gazetteer.build(filepath, entries)
+    print(f"The gazetteer {filepath} indexes {count} locations.")
+
+def print_validation_error_messages(labeled_validations, file: Optional[TextIO] = None):
+    for label, (validation_error_messages, _) in labeled_validations:
+        for message in validation_error_messages:
+            print(message if len(labeled_validations) == 1 else f"{label}: {message}", file=file)
+
+def serve(config: AppConfig, apikey: str, host: Optional[str], port: Optional[int]):
+    from weatherconsoleapp.server import WeatherHttpServer
+
+    connector, location_caches = create_connector(config, apikey)
+    access_counter = create_access_counter()
+    refresher = create_refresher(config, connector, access_counter)
+    server_address = (config.get_server_host() if host is None else host, config.get_server_port() if port is None else port)
+    server = WeatherHttpServer(
+        server_address,
+        count_accesses(connector, access_counter),
+        config.get_server_max_workers(),
+        config.get_server_idle_timeout(),
+        config.get_server_max_pending())
+    if refresher is not None:
+        refresher.start()
+    print(f"Serving weather information on http://{server_address[0]}:{server.server_address[1]} (press Ctrl+C to stop).")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if refresher is not None:
+            refresher.stop()
+        server.server_close()
+        flush_location_caches(location_caches)
+        access_counter.flush()
+
+def refresh(config: AppConfig, apikey: Optional[str], once: bool):
+    """Keeps the watch-list locations fresh in the responses cache until
+    interrupted, or refreshes them a single time with `once`.
+    """
+    connector, location_caches = create_connector(config, apikey)
+    refresher = create_refresher(config, connector, create_access_counter())
+    if refresher is None:
+        print(f"Please add locations to the [watchlist] section of {get_config_filepath()}.")
+        return
+    try:
+        if once:
+            requests = refresher.refresh_once()
+            print(f"Watch-list refreshed with {requests} requests, {refresher.get_remaining_budget()} left in today's budget.")
+        else:
+            print("Refreshing the watch-list locations (press Ctrl+C to stop).")
+            refresher.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        flush_location_caches(location_caches)
+
+def watch(config: AppConfig, apikey: Optional[str], validated_input):
+    """Polls the weather of a location until interrupted.
+    """
+    connector, location_caches = create_connector(config, apikey)
+    access_counter = create_access_counter()
+    try:
+        WatchCommand(count_accesses(connector, access_counter), **validated_input).execute()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        flush_location_caches(location_caches)
+        access_counter.flush()
+
+def shell(config: AppConfig, apikey: Optional[str], deadline: Optional[float]):
+    """Runs weather queries typed interactively, with the same connector and
+    caches for the whole session, until exit.
+    """
+    from weatherconsoleapp.shell import WeatherShell
+
+    connector, location_caches = create_connector(config, apikey)
+    access_counter = create_access_counter()
+    gazetteer = open_gazetteer(config)
+    weather_shell = WeatherShell(
+        count_accesses(connector, access_counter),
+        pathlib.Path(get_config_dirname(), WeatherShell.FILENAME),
+        gazetteer,
+        config.is_gazetteer_strict(),
+        config.get_deadline() if deadline is None else deadline)
+    try:
+        weather_shell.cmdloop()
+    except KeyboardInterrupt:
+        print()
+    finally:
+        flush_location_caches(location_caches)
+        access_counter.flush()
+
+def print_history(config: AppConfig, validated_input, aggregate: bool, formatter: ReportFormatter):
+    """Prints the recorded weather information of a location, or its aggregates.
+    """
+    store = open_history_store(config)
+    if store is None:
+        print(f"The history is disabled or unavailable, please check the [history] section of {get_config_filepath()}.")
+        return
+    with store, create_report_writer(formatter) as writer:
+        PrintHistoryCommand(store, aggregate=aggregate, output=writer, formatter=formatter, **validated_input).execute()
+
+def export_history(config: AppConfig, filename: str, location: Optional[Location], kind: Optional[str]):
+    """Exports the recorded weather information to an Arrow or Parquet file.
+    """
+    store = open_history_store(config)
+    if store is None:
+        print(f"The history is disabled or unavailable, please check the [history] section of {get_config_filepath()}.")
         return
-    config_logging()
+    with store:
+        try:
+            rows = store.export(filename, location, kind)
+        except (ImportError, ValueError, OSError) as error:
+            print(f"Could not export the history: {error}")
+            return
+    print(f"Exported {rows} records to {filename}.")
+
+def print_quota(config: AppConfig):
+    scheduler = create_quota_scheduler(config)
+    for status in scheduler.snapshot():
+        print(f"{status.masked_apikey}: {status.used_today}/{status.daily_limit} requests used today, {status.remaining_today} remaining.")
+
+def run_profiled(function):
+    """Runs `function` and prints the time spent in each phase to the standard error.
+    """
+    with metrics.profiling() as profile:
+        with metrics.span("total"):
+            function()
+    print(profile.format(), file=sys.stderr)
+
+def read_locations(locations: List[str], locations_filename: Optional[str]) -> List[str]:
+    """Returns the command line locations followed by the ones of the locations
+    file, '-' meaning the standard input.
+    """
+    if locations_filename is None:
+        return locations
+    if locations_filename == "-":
+        return locations + Utils.read_locations_file(sys.stdin)
+    with open(locations_filename, "r", encoding="utf-8") as locations_file:
+        return locations + Utils.read_locations_file(locations_file)
 
+def main():
     parser = argparse.ArgumentParser(
                     prog = "WeatherConsoleApp",
                     description = "A simple console application for worldwide weather forecasts. More info and examples at github.com/santimontaner/weather-console-app.",                    
                     epilog = 'Text at the bottom of help')
-    parser.add_argument("command", help="Possible values are : 'current' and 'forecast'.")
-    parser.add_argument("location", help="Location for the requested weather information. Format must be City,COUNTRYCODE. Example: Paris,FR.")
+    parser.add_argument("command", help="Possible values are : 'current', 'forecast', 'hourly', 'watch', 'history', 'shell', 'serve', 'refresh', 'quota' and 'gazetteer'.")
+    parser.add_argument("location", nargs="*", help="Locations for the requested weather information. Format must be City,COUNTRYCODE. Example: Paris,FR. Seed files for the 'gazetteer' command.")
+    parser.add_argument("--locations-file", help="File with one location per line. Use '-' to read locations from the standard input.")
+    parser.add_argument("--workers", type=int, help="Maximum number of locations requested concurrently.")
     parser.add_argument("--units", default="metric", help="Options are 'metric' (default) and 'imperial'.")
     parser.add_argument("--days", default="5", help="Number of days for the forecast. Maximum is 5 (default).")
+    parser.add_argument("--hours", default="12", help="Number of hours for the hourly forecast: 1, 12 (default), 24, 72 or 120.")
+    parser.add_argument("--interval", default="60", help="Seconds between two polls of the 'watch' command. Minimum is 10, default is 60.")
+    parser.add_argument("--format", default="text", help="Output format: 'text' (default), 'json', 'jsonl' or 'csv'.")
+    parser.add_argument("--deadline", type=float, help="Seconds within which the weather of each location must be retrieved, all requests included, by 'current', 'forecast', 'hourly' and 'shell'. Defaults to the 'deadline' setting of the config file, if any.")
+    parser.add_argument("--profile", action="store_true", help="Print the time spent in each phase (requests, parsing, rendering...) to the standard error.")
+    parser.add_argument("--host", help="Address the 'serve' command listens on.")
+    parser.add_argument("--port", type=int, help="Port the 'serve' command listens on.")
+    parser.add_argument("--once", action="store_true", help="Refresh the watch-list a single time instead of until interrupted.")
+    parser.add_argument("--bulk", metavar="JOB_DIR", help="Run as a resumable bulk job journaled in JOB_DIR, printing the merged output once every location is completed.")
+    parser.add_argument("--processes", type=int, default=1, help="Worker processes of a bulk job.")
+    parser.add_argument("--shard", default="0/1", help="Share of a bulk job run by this machine, as INDEX/COUNT (e.g. 0/3, 1/3 and 2/3).")
+    parser.add_argument("--kind", help="Records of the 'history' command: 'current' (default), 'forecast' or 'hourly'.")
+    parser.add_argument("--from", dest="start", help="First date (YYYY-MM-DD) of the 'history' command records.")
+    parser.add_argument("--to", dest="end", help="Last date (YYYY-MM-DD) of the 'history' command records.")
+    parser.add_argument("--aggregate", action="store_true", help="Print the number of records and their minimum, maximum and mean temperatures instead of the records.")
+    parser.add_argument("--export", help="Export the history records, of every location unless one is given, to an .arrow, .feather or .parquet file.")
     args = parser.parse_args()
 
-    apikey = get_api_key()
-    if apikey is None:
+    if args.command not in (CURRENT_WEATHER_COMMAND, WEATHER_FORECAST_COMMAND, HOURLY_FORECAST_COMMAND, WATCH_COMMAND, SERVE_COMMAND, QUOTA_COMMAND, REFRESH_COMMAND, GAZETTEER_COMMAND, HISTORY_COMMAND, SHELL_COMMAND):
+        print(f"{args.command} is not a valid option")
+        return
+
+    if args.deadline is not None and args.deadline <= 0:
+        print("Deadline must be a positive number of seconds.")
+        return
+
+    if args.command in (CURRENT_WEATHER_COMMAND, WEATHER_FORECAST_COMMAND, HOURLY_FORECAST_COMMAND, HISTORY_COMMAND):
+        if args.format not in FORMATTERS:
+            print(f"Format must be one of: {', '.join(FORMATTERS)}.")
+            return
+        formatter = create_formatter(args.format)
+
+    if args.command in (CURRENT_WEATHER_COMMAND, WEATHER_FORECAST_COMMAND, HOURLY_FORECAST_COMMAND):
+        try:
+            locations = read_locations(args.location, args.locations_file)
+        except OSError as error:
+            print(f"Could not read locations file: {error}")
+            return
+        if len(locations) == 0:
+            print("At least one location is required.")
+            return
+        command_builder, labeled_validations = validate_command_arguments(
+            args.command,
+            locations,
+            args.units,
+            args.days,
+            args.hours)
+        if all(len(validation_error_messages) > 0 for _, (validation_error_messages, _) in labeled_validations):
+            print_validation_error_messages(labeled_validations, get_messages_file(formatter))
+            return
+        shard = parse_shard_argument(args.shard)
+        if shard is None:
+            print("Shard must have this format: INDEX/COUNT, with INDEX between 0 and COUNT - 1.")
+            return
+        if args.processes < 1:
+            print("Input 'processes' argument must be a positive integer.")
+            return
+        if args.workers is not None and args.workers < 1:
+            print("Input 'workers' argument must be a positive integer.")
+            return
+
+    if args.command == WATCH_COMMAND:
+        if len(args.location) != 1:
+            print("The watch command requires exactly one location.")
+            return
+        validation_error_messages, validated_input = WatchCommand.validate_arguments(
+            args.location[0],
+            args.units,
+            args.days,
+            args.interval)
+        if len(validation_error_messages) > 0:
+            for message in validation_error_messages:
+                print(message)
+            return
+
+    if args.command == HISTORY_COMMAND:
+        export_location = None
+        if args.export is not None and len(args.location) <= 1:
+            validation_error_messages = []
+            if args.kind is not None:
+                kind_validation_message, _ = PrintHistoryCommand.validate_kind_argument(args.kind)
+                if kind_validation_message is not None:
+                    validation_error_messages.append(kind_validation_message)
+            if len(args.location) == 1:
+                location_validation_message, export_location = PrintHistoryCommand.validate_location_argument(args.location[0])
+                if export_location is None:
+                    validation_error_messages.append(location_validation_message)
+        elif len(args.location) != 1:
+            validation_error_messages = ["The history command requires exactly one location, or at most one with --export."]
+        else:
+            validation_error_messages, validated_input = PrintHistoryCommand.validate_arguments(
+                args.location[0],
+                args.units,
+                "current" if args.kind is None else args.kind,
+                args.start,
+                args.end)
+        if len(validation_error_messages) > 0:
+            for message in validation_error_messages:
+                print(message)
+            return
+
+    if args.command == GAZETTEER_COMMAND and len(args.location) == 0:
+        print("At least one seed file is required.")
+        return
+
+    if create_config():
+        print(f"Please configure your Accuweather apikey in the {get_config_filepath()} file.")
+        return
+    config = AppConfig.load()
+    config_logging(config)
+    if args.command == GAZETTEER_COMMAND:
+        seed_gazetteer(config, args.location)
+        return
+    if args.command == HISTORY_COMMAND:
+        if args.export is not None:
+            export_history(config, args.export, export_location, args.kind)
+        else:
+            print_history(config, validated_input, args.aggregate, formatter)
+        return
+    if args.command in (CURRENT_WEATHER_COMMAND, WEATHER_FORECAST_COMMAND, HOURLY_FORECAST_COMMAND):
+        labeled_validations = validate_locations_in_gazetteer(config, labeled_validations, get_messages_file(formatter))
+        if all(len(validation_error_messages) > 0 for _, (validation_error_messages, _) in labeled_validations):
+            print_validation_error_messages(labeled_validations, get_messages_file(formatter))
+            return
+        set_deadline(labeled_validations, config.get_deadline() if args.deadline is None else args.deadline)
+    if args.command == WATCH_COMMAND:
+        labeled_validations = [(args.location[0], (validation_error_messages, validated_input))]
+        _, (validation_error_messages, _) = validate_locations_in_gazetteer(config, labeled_validations)[0]
+        if len(validation_error_messages) > 0:
+            for message in validation_error_messages:
+                print(message)
+            return
+
+    apikey = get_api_key(config)
+    if apikey is None and AppConfig.ACCUWEATHER_PROVIDER in config.get_providers():
         print(f"Please set a valid apikey in {get_config_filepath()}.")
         return
 
-    if args.command == CURRENT_WEATHER_COMMAND:
-        try_execute_print_current_weather(apikey, args.location, args.units)
-    elif args.command == WEATHER_FORECAST_COMMAND:
-        try_execute_print_weather_forecast(apikey, args.location, args.units, args.days)
+    if args.command == SERVE_COMMAND:
+        serve(config, apikey, args.host, args.port)
+    elif args.command == QUOTA_COMMAND:
+        print_quota(config)
+    elif args.command == REFRESH_COMMAND:
+        refresh(config, apikey, args.once)
+    elif args.command == WATCH_COMMAND:
+        watch(config, apikey, validated_input)
+    elif args.command == SHELL_COMMAND:
+        shell(config, apikey, args.deadline)
+    elif args.bulk is not None:
+        max_workers = config.get_batch_max_workers() if args.workers is None else args.workers
+        run_bulk_job(command_builder, apikey, labeled_validations, args.bulk, args.processes, shard, max_workers, formatter)
     else:
-        print(f"{args.command} is not a valid option")
+        max_workers = config.get_batch_max_workers() if args.workers is None else args.workers
+        execute = functools.partial(
+            execute_command_for_locations,
+            command_builder,
+            config,
+            apikey,
+            labeled_validations,
+            max_workers,
+            formatter)
+        if args.profile:
+            run_profiled(execute)
+        else:
+            execute()
 
 if __name__ == "__main__":
     main()
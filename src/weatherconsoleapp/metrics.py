@@ -0,0 +1,181 @@
+"""In-process metrics: timing spans and counters of the hot paths.
+
+Spans time a phase (an upstream request, a parse, a render...) and counters
+count events (bytes, status codes, timeouts, cache hits...). Both are labelled
+and aggregated in a process wide `MetricsRegistry`, exported as Prometheus text
+or JSON. Spans are also appended to the `Profile` active in the current context,
+if any, which breaks down a single run by phase.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+import threading
+import time
+
+SPAN_METRIC = "weatherconsoleapp_span_seconds"
+
+Labels = Tuple[Tuple[str, str], ...]
+
+class SpanStats:
+    """Number, total, minimum and maximum duration of the spans of a phase.
+    """
+    __slots__ = ("count", "total", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def to_dict(self) -> Dict[str, float]:
+        return {"count": self.count, "total": self.total, "min": self.min if self.count > 0 else 0.0, "max": self.max}
+
+class ProfiledSpan(NamedTuple):
+    name: str
+    labels: Labels
+    seconds: float
+
+class Profile:
+    """Spans recorded while the profile is active, see `profiling`. Threads
+    running in a copy of the context record into the same profile.
+    """
+    def __init__(self):
+        self.spans: List[ProfiledSpan] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: ProfiledSpan):
+        with self._lock:
+            self.spans.append(span)
+
+    def get_breakdown(self) -> List[Tuple[str, SpanStats]]:
+        """Returns the stats of each phase, named after the span and its labels,
+        in order of first appearance.
+        """
+        breakdown: Dict[str, SpanStats] = {}
+        with self._lock:
+            for span in self.spans:
+                phase = span.name + "".join(f" {value}" for _, value in span.labels)
+                breakdown.setdefault(phase, SpanStats()).add(span.seconds)
+        return list(breakdown.items())
+
+    def format(self) -> str:
+        lines = [f"{'Phase':<40} {'Calls':>6} {'Total ms':>10} {'Mean ms':>10}"]
+        for phase, stats in self.get_breakdown():
+            lines.append(f"{phase:<40} {stats.count:>6} {stats.total * 1000:>10.2f} {stats.total * 1000 / stats.count:>10.2f}")
+        return "\n".join(lines)
+
+_current_profile: "ContextVar[Optional[Profile]]" = ContextVar("profile", default=None)
+
+@contextmanager
+def profiling() -> Iterator[Profile]:
+    """Records the spans of the context in a new `Profile`.
+    """
+    profile = Profile()
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+
+class MetricsRegistry:
+    """Thread safe aggregation of counters and span durations by name and labels.
+    """
+    def __init__(self):
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._spans: Dict[Labels, SpanStats] = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: float = 1, **labels: Any):
+        key = (name, self._to_labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, span_name: str, seconds: float, **labels: Any):
+        span_labels = (("span", span_name),) + self._to_labels(labels)
+        with self._lock:
+            stats = self._spans.get(span_labels)
+            if stats is None:
+                stats = self._spans[span_labels] = SpanStats()
+            stats.add(seconds)
+        profile = _current_profile.get()
+        if profile is not None:
+            profile.add(ProfiledSpan(span_name, span_labels[1:], seconds))
+
+    @contextmanager
+    def span(self, name: str, **labels: Any) -> Iterator[None]:
+        """Times the enclosed block, including when it raises.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def get_counter(self, name: str, **labels: Any) -> float:
+        with self._lock:
+            return self._counters.get((name, self._to_labels(labels)), 0)
+
+    def get_span_stats(self, name: str, **labels: Any) -> Optional[SpanStats]:
+        with self._lock:
+            return self._spans.get((("span", name),) + self._to_labels(labels))
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._spans.clear()
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "counters": [{"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self._counters.items())],
+                "spans": [{"labels": dict(labels), **stats.to_dict()}
+                    for labels, stats in sorted(self._spans.items())]}
+
+    def to_prometheus(self) -> str:
+        """Returns the metrics in the Prometheus text exposition format. Spans are
+        exported as summaries without quantiles.
+        """
+        lines = []
+        with self._lock:
+            counter_names = sorted({name for name, _ in self._counters})
+            for counter_name in counter_names:
+                lines.append(f"# TYPE {counter_name} counter")
+                for (name, labels), value in sorted(self._counters.items()):
+                    if name == counter_name:
+                        lines.append(f"{name}{self._format_labels(labels)} {value:g}")
+            if len(self._spans) > 0:
+                lines.append(f"# TYPE {SPAN_METRIC} summary")
+            for labels, stats in sorted(self._spans.items()):
+                lines.append(f"{SPAN_METRIC}_count{self._format_labels(labels)} {stats.count}")
+                lines.append(f"{SPAN_METRIC}_sum{self._format_labels(labels)} {stats.total:.6f}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _to_labels(labels: Dict[str, Any]) -> Labels:
+        return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+    @staticmethod
+    def _format_labels(labels: Labels) -> str:
+        if len(labels) == 0:
+            return ""
+        escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+        return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + "}"
+
+registry = MetricsRegistry()
+
+def span(name: str, **labels: Any):
+    """Times the enclosed block in the process wide registry.
+    """
+    return registry.span(name, **labels)
+
+def increment(name: str, value: float = 1, **labels: Any):
+    """Increments a counter of the process wide registry.
+    """
+    registry.increment(name, value, **labels)
@@ -0,0 +1,74 @@
+import os
+import sys
+import json
+import pathlib
+import tempfile
+import logging
+from typing import Any, BinaryIO, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+PathLike = Union[str, os.PathLike]
+
+class FileLock:
+    """Exclusive inter-process lock held on a sidecar `.lock` file.
+
+    The lock also serializes threads of the same process, since every
+    acquisition opens its own file handle.
+    """
+    def __init__(self, path: PathLike):
+        self._path = pathlib.Path(f"{path}.lock")
+        self._file: Optional[BinaryIO] = None
+
+    def __enter__(self) -> "FileLock":
+        file = self._file = open(self._path, "a+b")
+        if sys.platform == "win32":
+            import msvcrt
+            file.seek(0)
+            msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        file, self._file = self._file, None
+        if file is None:
+            return
+        try:
+            if sys.platform == "win32":
+                import msvcrt
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+        finally:
+            file.close()
+
+def read_json_file(path: PathLike) -> Optional[Any]:
+    """Returns the decoded content of a JSON file, or None if the file does not
+    exist or is corrupt.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as json_file:
+            return json.load(json_file)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError):
+        logger.warning("Ignoring unreadable or corrupt file %s", path, exc_info=True)
+        return None
+
+def write_json_file_atomically(path: PathLike, content: Any):
+    """Writes `content` as JSON to a temporary file which then replaces `path`,
+    so readers never observe a partially written file.
+    """
+    target = pathlib.Path(path)
+    file_descriptor, temp_path = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(file_descriptor, "w", encoding="utf-8") as temp_file:
+            json.dump(content, temp_file, separators=(",", ":"))
+        os.replace(temp_path, target)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
@@ -0,0 +1,167 @@
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Any, Dict, Tuple
+from urllib.parse import urlsplit, parse_qs
+import json
+import logging
+import threading
+from .connectors import WeatherApiConnector
+from .commands import PrintCurrentWeatherCommand, PrintWeatherForecastCommand, PrintHourlyForecastCommand, CommandResultStatus, WeatherReport
+from . import Utils
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+class WeatherRequestHandler(BaseHTTPRequestHandler):
+    """Serves the current weather and forecast commands as JSON:
+
+    - GET /current?location=Paris,FR&units=metric
+    - GET /forecast?location=Paris,FR&units=imperial&days=3
+    - GET /hourly?location=Paris,FR&units=metric&hours=12
+
+    and the metrics of the process:
+
+    - GET /metrics (Prometheus text format) or /metrics?format=json
+
+    Connections are kept alive between requests, and closed once idle for
+    the `idle_timeout` of the server.
+    """
+    protocol_version = "HTTP/1.1"
+    server: "WeatherHttpServer"
+
+    _STATUS_CODES = {
+        CommandResultStatus.SUCCESS: 200,
+        CommandResultStatus.ERROR: 502,
+        CommandResultStatus.TIMEOUT: 504,
+        CommandResultStatus.CONNECTION_ERROR: 502}
+
+    def setup(self):
+        self.timeout = self.server.idle_timeout
+        super().setup()
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        location = query.get("location", "")
+        units = query.get("units", "metric")
+
+        if url.path == "/metrics":
+            self._send_metrics(query.get("format", "prometheus"))
+            return
+
+        if url.path == "/current":
+            validation_error_messages, validated_input = PrintCurrentWeatherCommand.validate_arguments(location, units)
+            command_builder = PrintCurrentWeatherCommand
+        elif url.path == "/forecast":
+            validation_error_messages, validated_input = PrintWeatherForecastCommand.validate_arguments(
+                location,
+                units,
+                query.get("days", "5"))
+            command_builder = PrintWeatherForecastCommand
+        elif url.path == "/hourly":
+            validation_error_messages, validated_input = PrintHourlyForecastCommand.validate_arguments(
+                location,
+                units,
+                query.get("hours", "12"))
+            command_builder = PrintHourlyForecastCommand
+        else:
+            self._send_json(404, {"errors": [f"Unknown path {url.path}. Valid paths are /current, /forecast, /hourly and /metrics."]})
+            return
+
+        if len(validation_error_messages) > 0:
+            self._send_json(400, {"errors": validation_error_messages})
+            return
+
+        command = command_builder(self.server.connector, **validated_input)
+        status, report = command.try_get_report()
+        if report is None:
+            self._send_json(self._STATUS_CODES[status], {"errors": [status.name.lower()]})
+        else:
+            self._send_json(200, self._report_to_dict(report))
+
+    def log_message(self, format: str, *args: Any):
+        logger.info("%s - %s", self.address_string(), format % args)
+
+    @staticmethod
+    def _report_to_dict(report: WeatherReport) -> Dict[str, Any]:
+        return {
+            "location": Utils.location_to_dict(report.location),
+            "weather": [Utils.weather_info_to_dict(weather_info) for weather_info in report.weather_infos]}
+
+    def _send_metrics(self, format: str):
+        if format == "json":
+            self._send_json(200, metrics.registry.to_dict())
+        elif format == "prometheus":
+            self._send_body(200, "text/plain; version=0.0.4; charset=utf-8", metrics.registry.to_prometheus().encode("utf-8"))
+        else:
+            self._send_json(400, {"errors": ["Metrics format must be 'prometheus' (default) or 'json'."]})
+
+    def _send_json(self, status_code: int, content: Dict[str, Any]):
+        self._send_body(status_code, "application/json", json.dumps(content).encode("utf-8"))
+
+    def _send_body(self, status_code: int, content_type: str, body: bytes):
+        self.send_response(status_code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class WeatherHttpServer(HTTPServer):
+    """HTTP server sharing one connector between all its clients. Connections
+    are handled by a bounded pool of threads, and wait for a thread in a
+    queue of up to `max_pending` connections. Connections arriving when the
+    queue is full are answered with a `503` status code and closed.
+    """
+    _UNAVAILABLE_BODY = json.dumps({"errors": ["The server is busy, retry later."]}).encode("utf-8")
+    _UNAVAILABLE_RESPONSE = (
+        b"HTTP/1.1 503 Service Unavailable\r\n"
+        b"Content-Type: application/json\r\n"
+        b"Content-Length: " + str(len(_UNAVAILABLE_BODY)).encode("ascii") + b"\r\n"
+        b"Retry-After: 1\r\n"
+        b"Connection: close\r\n\r\n" + _UNAVAILABLE_BODY)
+
+    def __init__(self,
+        server_address: Tuple[str, int],
+        connector: WeatherApiConnector,
+        max_workers: int = 16,
+        idle_timeout: float = 5,
+        max_pending: int = 64):
+        super().__init__(server_address, WeatherRequestHandler)
+        self.connector = connector
+        self.idle_timeout = idle_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="weather-server")
+        self._connections = threading.BoundedSemaphore(max_workers + max_pending)
+
+    def process_request(self, request, client_address):
+        if not self._connections.acquire(blocking=False):
+            self._reject_request(request, client_address)
+            return
+        try:
+            self._executor.submit(self._process_request_in_worker, request, client_address)
+        except RuntimeError:
+            # The executor is shut down when the server is closed.
+            self._connections.release()
+            self.shutdown_request(request)
+
+    def _process_request_in_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._connections.release()
+
+    def _reject_request(self, request, client_address):
+        logger.warning("Rejecting connection from %s: every worker is busy and the queue is full.", client_address[0])
+        try:
+            request.settimeout(1)
+            request.sendall(self._UNAVAILABLE_RESPONSE)
+        except OSError:
+            pass
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._executor.shutdown(wait=True)
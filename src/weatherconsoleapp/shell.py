@@ -0,0 +1,236 @@
+"""Interactive shell running weather queries one after the other.
+
+The shell keeps a single connector for the whole session, so the HTTP
+connections, the location keys and the responses cached in memory are reused
+by every query, and repeated lookups are answered without a request. The
+time taken by each query is printed after its report.
+
+Queries are saved to a history file, recalled with the arrow keys where
+readline is available, and the locations of previous queries are completed
+with the tab key.
+"""
+import cmd
+import time
+import logging
+from typing import Any, Callable, Dict, List, Optional, TextIO, Tuple, TYPE_CHECKING
+from .commands import CommandResultStatus, PrintCurrentWeatherCommand, PrintHourlyForecastCommand, PrintWeatherForecastCommand, WeatherReportCommand
+from .connectors import WeatherApiConnector
+from .persistence import PathLike
+
+if TYPE_CHECKING:
+    from .gazetteer import Gazetteer
+
+logger = logging.getLogger(__name__)
+
+class WeatherShell(cmd.Cmd):
+    """Read-eval-print loop of `current`, `forecast` and `hourly` queries
+    against `connector`. Queries take the arguments of the command line
+    application, e.g. `forecast Bilbao,ES --days 3 --units imperial`.
+    """
+    FILENAME = "shell_history"
+    MAX_HISTORY = 1000
+    OPTIONS = ("units", "days", "hours")
+
+    intro = "Weather shell. Type 'help' for the available commands and 'exit' to quit."
+    prompt = "weather> "
+
+    def __init__(self,
+        connector: WeatherApiConnector,
+        history_filepath: Optional[PathLike] = None,
+        gazetteer: Optional["Gazetteer"] = None,
+        strict: bool = False,
+        deadline: Optional[float] = None,
+        stdin: Optional[TextIO] = None,
+        stdout: Optional[TextIO] = None,
+        clock: Callable[[], float] = time.perf_counter):
+        super().__init__(stdin=stdin, stdout=stdout)
+        # Lines are read from the given file instead of the terminal, e.g. in tests.
+        self.use_rawinput = stdin is None
+        self._connector = connector
+        self._history_filepath = history_filepath
+        self._gazetteer = gazetteer
+        self._strict = strict
+        self._deadline = deadline
+        self._clock = clock
+        self._history: List[str] = []
+        self._locations: Dict[str, str] = {}
+        self._read_history()
+
+    @property
+    def locations(self) -> List[str]:
+        """Returns the locations of the previous queries, the most recent last.
+        """
+        return list(self._locations.values())
+
+    def preloop(self):
+        readline = self._import_readline()
+        if readline is not None:
+            # Locations contain commas, which must not split the completed word.
+            readline.set_completer_delims(" \t\n")
+            for line in self._history:
+                readline.add_history(line)
+
+    def emptyline(self) -> bool:
+        # Unlike cmd.Cmd, an empty line does not run the previous query again.
+        return False
+
+    def default(self, line: str):
+        self.stdout.write(f"Unknown command: {line.split()[0]}. Type 'help' for the available commands.\n")
+
+    def do_current(self, arg: str):
+        """current LOCATION [--units metric|imperial]
+        Prints the current weather of LOCATION, e.g. current Bilbao,ES."""
+        self._query("current", arg, lambda location, options: PrintCurrentWeatherCommand.validate_arguments(
+            location, options.get("units", "metric")), PrintCurrentWeatherCommand)
+
+    def do_forecast(self, arg: str):
+        """forecast LOCATION [--days 1-5] [--units metric|imperial]
+        Prints the daily forecast of LOCATION, 5 days by default."""
+        self._query("forecast", arg, lambda location, options: PrintWeatherForecastCommand.validate_arguments(
+            location, options.get("units", "metric"), options.get("days", "5")), PrintWeatherForecastCommand)
+
+    def do_hourly(self, arg: str):
+        """hourly LOCATION [--hours 1|12|24|72|120] [--units metric|imperial]
+        Prints the hourly forecast of LOCATION, 12 hours by default."""
+        self._query("hourly", arg, lambda location, options: PrintHourlyForecastCommand.validate_arguments(
+            location, options.get("units", "metric"), options.get("hours", "12")), PrintHourlyForecastCommand)
+
+    def complete_current(self, text: str, line: str, begidx: int, endidx: int) -> List[str]:
+        return self.complete_location(text)
+
+    complete_forecast = complete_current
+    complete_hourly = complete_current
+
+    def complete_location(self, text: str) -> List[str]:
+        """Returns the locations of previous queries starting with `text`,
+        ignoring case.
+        """
+        prefix = text.casefold()
+        return sorted(location for location in self._locations.values() if location.casefold().startswith(prefix))
+
+    def do_exit(self, arg: str) -> bool:
+        """exit
+        Quits the shell."""
+        return True
+
+    do_quit = do_exit
+
+    def do_EOF(self, arg: str) -> bool:
+        self.stdout.write("\n")
+        return True
+
+    def _query(self,
+        name: str,
+        arg: str,
+        validate: Callable[[str, Dict[str, str]], Tuple[List[str], Dict[str, Any]]],
+        command_builder):
+        self._append_history(f"{name} {arg}".strip())
+        try:
+            location, options = self.parse_arguments(arg)
+        except ValueError as error:
+            self.stdout.write(f"{error}\n")
+            return
+        validation_error_messages, validated_input = validate(location, options)
+        if len(validation_error_messages) == 0 and self._gazetteer is not None:
+            location_input = validated_input[WeatherReportCommand.LOCATION]
+            message = self._gazetteer.get_unknown_location_message(location_input, self._strict)
+            if message is not None:
+                validation_error_messages.append(message)
+            else:
+                hint = self._gazetteer.get_suggestion_message(location_input)
+                if hint is not None:
+                    self.stdout.write(f"{hint}\n")
+        if len(validation_error_messages) > 0:
+            for message in validation_error_messages:
+                self.stdout.write(f"{message}\n")
+            return
+
+        started_at = self._clock()
+        status = command_builder(self._connector, output=self.stdout, deadline=self._deadline, **validated_input).execute()
+        elapsed = self._clock() - started_at
+        if status == CommandResultStatus.SUCCESS:
+            self._remember_location(location)
+        elif status == CommandResultStatus.TIMEOUT:
+            self.stdout.write("Request timed out while requesting weather information.\n")
+        elif status == CommandResultStatus.CONNECTION_ERROR:
+            self.stdout.write("Could not connect to the weather service.\n")
+        else:
+            self.stdout.write("An unexpected error happened.\n")
+        self.stdout.write(f"({elapsed * 1000:.1f} ms)\n")
+
+    @classmethod
+    def parse_arguments(cls, arg: str) -> Tuple[str, Dict[str, str]]:
+        """Returns the location and the options of a query. Words of the location
+        need no quotes, e.g. `current San Sebastian,ES`, and apostrophes are part
+        of the words, e.g. `current L'Aquila,IT`. Raises ValueError if the
+        arguments cannot be parsed.
+        """
+        words = arg.split()
+        location_words: List[str] = []
+        options: Dict[str, str] = {}
+        index = 0
+        while index < len(words):
+            word = words[index]
+            index += 1
+            if not word.startswith("--"):
+                location_words.append(word)
+                continue
+            name, separator, value = word[2:].partition("=")
+            if name not in cls.OPTIONS:
+                raise ValueError(f"Unknown option --{name}. Options are: {', '.join(f'--{option}' for option in cls.OPTIONS)}.")
+            if separator == "":
+                if index >= len(words):
+                    raise ValueError(f"Option --{name} requires a value.")
+                value = words[index]
+                index += 1
+            options[name] = value
+        if len(location_words) == 0:
+            raise ValueError("A location is required, e.g. Bilbao,ES.")
+        return " ".join(location_words), options
+
+    def _remember_location(self, location: str):
+        key = location.strip().casefold()
+        self._locations.pop(key, None)
+        self._locations[key] = location.strip()
+
+    def _read_history(self):
+        if self._history_filepath is None:
+            return
+        try:
+            with open(self._history_filepath, "r", encoding="utf-8") as history_file:
+                self._history = [line.rstrip("\n") for line in history_file if len(line.strip()) > 0][-self.MAX_HISTORY:]
+        except OSError:
+            return
+        for line in self._history:
+            name, _, arg = line.partition(" ")
+            if name not in ("current", "forecast", "hourly"):
+                continue
+            try:
+                location, _ = self.parse_arguments(arg)
+            except ValueError:
+                continue
+            if len(PrintCurrentWeatherCommand.validate_location_argument(location)[0]) == 0:
+                self._remember_location(location)
+
+    def _append_history(self, line: str):
+        self._history.append(line)
+        if self._history_filepath is None:
+            return
+        try:
+            if len(self._history) > 2 * self.MAX_HISTORY:
+                self._history = self._history[-self.MAX_HISTORY:]
+                with open(self._history_filepath, "w", encoding="utf-8") as history_file:
+                    history_file.writelines(f"{history_line}\n" for history_line in self._history)
+            else:
+                with open(self._history_filepath, "a", encoding="utf-8") as history_file:
+                    history_file.write(f"{line}\n")
+        except OSError:
+            logger.warning("Could not save the shell history %s", self._history_filepath, exc_info=True)
+
+    @staticmethod
+    def _import_readline():
+        try:
+            import readline
+        except ImportError:
+            return None
+        return readline
@@ -1,15 +1,7 @@
-from typing import List, Union
+from typing import Any, Dict, Iterable, List, Union
 from .domain import WeatherInfo, Location
 
 class Utils:
-    @staticmethod
-    def print_weather_forecast(weather_forecast: WeatherInfo):
-        formatted_weather = weather_forecast.weather_description.lower().capitalize()
-        weather_description = Utils.ensure_string_ends_with_dot(formatted_weather)
-        print(weather_forecast.date)
-        print(f"> Weather: {weather_description}")
-        print(f"> Temperature: {weather_forecast.temperature}")
-
     @staticmethod
     def ensure_string_ends_with_dot(string: str):
         if(len(string) > 0 and string[-1] != '.'):
@@ -17,13 +9,28 @@ class Utils:
         return string
 
     @staticmethod
-    def print_location(location: Location):
-        print(f"{location.city.upper()} ({location.country_code.upper()})")
+    def location_to_dict(location: Location) -> Dict[str, Any]:
+        return {"city": location.city, "country_code": location.country_code}
+
+    @staticmethod
+    def weather_info_to_dict(weather_info: WeatherInfo) -> Dict[str, Any]:
+        return {
+            "date": weather_info.date.date.isoformat(),
+            "weather": weather_info.weather_description,
+            "temperature": weather_info.temperature.value,
+            "units": weather_info.temperature.units.name.lower()}
 
     @staticmethod
     def parse_location_string(location: str) -> List[str]:
         return location.split(",")
 
+    @staticmethod
+    def read_locations_file(lines: Iterable[str]) -> List[str]:
+        """Returns the non empty lines, ignoring '#' comments.
+        """
+        stripped_lines = (line.split("#", 1)[0].strip() for line in lines)
+        return [line for line in stripped_lines if len(line) > 0]
+
     @staticmethod
     def try_parse_string_to_int(int_string: str) -> Union[int, None]:
         try:
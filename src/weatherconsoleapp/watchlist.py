@@ -0,0 +1,205 @@
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+import logging
+import threading
+from .commands import WeatherCommand
+from .connectors import WeatherApiConnector
+from .connectors.errors import WeatherConnectorTimeout
+from .connectors.location_key_cache import LocationKeyCache
+from .connectors.quota_scheduler import QuotaExhausted, QuotaUsageStore, RequestPriority, get_utc_today, request_priority
+from .connectors.response_cache import refresh_ahead
+from .domain import Location, Units, WeatherInfo, WeatherSeries
+from .persistence import FileLock, PathLike, read_json_file, write_json_file_atomically
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+def parse_watchlist(locations: List[str]) -> List[Location]:
+    """Returns the valid locations of the watch-list, logging the invalid ones.
+    """
+    parsed_locations = []
+    for location in locations:
+        error_message, parsed_location = WeatherCommand.validate_location_argument(location)
+        if parsed_location is None:
+            logger.warning("Ignoring watch-list location '%s': %s", location, error_message)
+        elif parsed_location not in parsed_locations:
+            parsed_locations.append(parsed_location)
+    return parsed_locations
+
+class AccessCounter:
+    """Number of times each location was requested, persisted in a JSON file
+    shared by every process of the application. Accesses are counted in memory
+    and added to the file on `flush`.
+    """
+    FILENAME = "location_accesses.json"
+
+    def __init__(self, filepath: PathLike):
+        self._filepath = filepath
+        self._pending: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, location: Location):
+        with self._lock:
+            self._pending[LocationKeyCache.normalize(location)] += 1
+
+    def get_counts(self) -> Dict[str, int]:
+        """Returns the accesses by normalized location, including the ones not flushed yet.
+        """
+        counts = Counter(self._read_counts())
+        with self._lock:
+            counts.update(self._pending)
+        return dict(counts)
+
+    def get_count(self, location: Location) -> int:
+        return self.get_counts().get(LocationKeyCache.normalize(location), 0)
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+        if len(pending) == 0:
+            return
+        try:
+            with FileLock(self._filepath):
+                counts = Counter(self._read_counts())
+                counts.update(pending)
+                write_json_file_atomically(self._filepath, dict(counts))
+        except OSError:
+            logger.warning("Could not persist location accesses %s", self._filepath, exc_info=True)
+
+    def _read_counts(self) -> Dict[str, int]:
+        content = read_json_file(self._filepath)
+        try:
+            return {} if content is None else {str(location): int(count) for location, count in content.items()}
+        except (TypeError, ValueError, AttributeError):
+            logger.warning("Ignoring corrupt location accesses file %s", self._filepath, exc_info=True)
+            return {}
+
+class AccessCountingConnector(WeatherApiConnector):
+    """Connector decorator recording every requested location in an `AccessCounter`.
+    """
+    def __init__(self, connector: WeatherApiConnector, access_counter: AccessCounter):
+        self._connector = connector
+        self._access_counter = access_counter
+
+    def get_current_weather_for_location(self, location: Location, unit: Units) -> WeatherInfo:
+        self._access_counter.record(location)
+        return self._connector.get_current_weather_for_location(location, unit)
+
+    def get_weather_forecast_for_location(self, location: Location, unit: Units, days: int = 5) -> List[WeatherInfo]:
+        self._access_counter.record(location)
+        return self._connector.get_weather_forecast_for_location(location, unit, days)
+
+    def get_hourly_forecast_for_location(self, location: Location, unit: Units, hours: int = 12) -> WeatherSeries:
+        self._access_counter.record(location)
+        return self._connector.get_hourly_forecast_for_location(location, unit, hours)
+
+class WatchListRefresher:
+    """Keeps the cached current conditions and forecasts of the watch-list
+    locations fresh, so commands for them are served from the cache.
+
+    Every `interval` seconds, the responses expiring within `refresh_margin`
+    seconds are fetched again, most accessed locations first, with background
+    priority. At most `daily_budget` upstream requests are spent per UTC day,
+    counted in `usage_store` so that every process shares the budget. A
+    location is only refreshed while the budget covers every request it may
+    need.
+    """
+    BUDGET_NAME = "watchlist"
+    FILENAME = "refresh_usage.json"
+    # Location key, current conditions and forecast.
+    MAX_REQUESTS_PER_LOCATION = 3
+
+    def __init__(self,
+        connector: WeatherApiConnector,
+        locations: List[Location],
+        access_counter: Optional[AccessCounter] = None,
+        refresh_margin: float = 120.0,
+        interval: float = 60.0,
+        daily_budget: int = 25,
+        usage_store: Optional[QuotaUsageStore] = None,
+        today: Callable[[], str] = get_utc_today):
+        self._connector = connector
+        self._locations = locations
+        self._access_counter = access_counter
+        self._refresh_margin = refresh_margin
+        self._interval = interval
+        self._daily_budget = daily_budget
+        self._usage_store = usage_store
+        self._today = today
+        self._date = today()
+        self._used_today = 0
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def get_ordered_locations(self) -> List[Location]:
+        """Returns the locations sorted by descending number of accesses, keeping
+        the watch-list order between equally accessed ones.
+        """
+        if self._access_counter is None:
+            return list(self._locations)
+        counts = self._access_counter.get_counts()
+        return sorted(self._locations, key=lambda location: -counts.get(LocationKeyCache.normalize(location), 0))
+
+    def get_remaining_budget(self) -> int:
+        if self._usage_store is not None:
+            self._used_today = self._usage_store.get_usage().get(QuotaUsageStore.hash_apikey(self.BUDGET_NAME), 0)
+        elif self._today() != self._date:
+            self._date = self._today()
+            self._used_today = 0
+        return max(0, self._daily_budget - self._used_today)
+
+    def refresh_once(self) -> int:
+        """Refreshes the locations whose cached responses are about to expire,
+        until the budget is spent, and returns the number of upstream requests.
+        """
+        requests = 0
+        for location in self.get_ordered_locations():
+            if self._stopped.is_set() or self.get_remaining_budget() < self.MAX_REQUESTS_PER_LOCATION:
+                break
+            try:
+                requests += self._refresh_location(location)
+            except QuotaExhausted:
+                logger.warning("Quota exhausted, stopping watch-list refresh.")
+                break
+            except (Exception, WeatherConnectorTimeout):
+                logger.warning("Could not refresh %s,%s", location.city, location.country_code, exc_info=True)
+        return requests
+
+    def run(self):
+        """Refreshes the watch-list every `interval` seconds until `stop` is called.
+        """
+        while not self._stopped.is_set():
+            with metrics.span("refresh"):
+                requests = self.refresh_once()
+            logger.info("Watch-list refresh sent %s requests.", requests)
+            self._stopped.wait(self._interval)
+
+    def start(self):
+        """Runs the refresher in a background thread.
+        """
+        self._thread = threading.Thread(target=self.run, name="watchlist-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _refresh_location(self, location: Location) -> int:
+        # Temperatures are always requested in metric units and forecasts for 5
+        # days, so these responses serve every --units and --days value.
+        with request_priority(RequestPriority.BACKGROUND), refresh_ahead(self._refresh_margin) as state:
+            try:
+                self._connector.get_current_weather_for_location(location, Units.METRIC)
+                self._connector.get_weather_forecast_for_location(location, Units.METRIC, 5)
+            finally:
+                self._count_requests(state.upstream_requests)
+        return state.upstream_requests
+
+    def _count_requests(self, requests: int):
+        self._used_today += requests
+        if requests > 0:
+            metrics.increment("weatherconsoleapp_refresh_requests_total", requests)
+        if self._usage_store is not None:
+            for _ in range(requests):
+                self._usage_store.increment(self.BUDGET_NAME)